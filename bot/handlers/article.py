@@ -11,8 +11,11 @@ from utils.exceptions import InvalidArticleError, ProductNotFoundError, WBAPIErr
 from services.wb_media_client import get_wb_media_client
 from services.video_cache import get_video_cache
 from services.gateway_adapter import get_gateway_adapter
+from services.message_editor import get_message_editor
 from bot.keyboards.inline import get_media_type_keyboard
+from config.settings import get_settings
 from utils.decorators import retry_on_telegram_error
+from utils.tracing import annotate, traced
 
 router = Router()
 logger = logging.getLogger(__name__)
@@ -46,6 +49,7 @@ async def handle_article(message: Message):
         nm_id = ArticleValidator.extract_article(message.text)
 
         logger.info(f"✅ Артикул распознан: {nm_id} (user {user.id})")
+        annotate(nm_id=nm_id)
 
         # Трекинг запроса артикула через GatewayAdapter
         gateway = get_gateway_adapter()
@@ -70,27 +74,29 @@ async def handle_article(message: Message):
             f"✅Товар: {nm_id} — найден!\n\n"
             f"📷 Фото: {len(media.photos)} шт.\n"
         )
+        archive = len(media.photos) >= get_settings().ZIP_ARCHIVE_MIN_PHOTOS
 
         # Отправка клавиатуры с начальным статусом видео
-        await status_msg.edit_text(
+        editor = get_message_editor()
+        await editor.edit_now(
+            status_msg,
             text=info_text_base + f'🎥 Видео: ⏳ ищем 0%\nㅤ\n<a href="{wb_url}">&#8203;</a>',
-            reply_markup=get_media_type_keyboard(nm_id, "searching"),
+            reply_markup=get_media_type_keyboard(nm_id, "searching", archive=archive),
             parse_mode="HTML"
         )
 
         # Запуск фонового поиска видео
         async def update_video_progress(progress: int):
-            """Обновление прогресса поиска видео."""
-            try:
-                await status_msg.edit_text(
-                    text=info_text_base + f'🎥 Видео: ⏳ ищем {progress}%\nㅤ\n<a href="{wb_url}">&#8203;</a>',
-                    reply_markup=get_media_type_keyboard(nm_id, "searching"),
-                    parse_mode="HTML"
-                )
-            except Exception as e:
-                logger.debug(f"Failed to update progress: {e}")
-
-        # Фоновый поиск видео
+            """Обновление прогресса поиска видео (коалесцируется)."""
+            await editor.request(
+                status_msg,
+                text=info_text_base + f'🎥 Видео: ⏳ ищем {progress}%\nㅤ\n<a href="{wb_url}">&#8203;</a>',
+                reply_markup=get_media_type_keyboard(nm_id, "searching", archive=archive),
+                parse_mode="HTML"
+            )
+
+        # Фоновый поиск видео (в трассе запроса)
+        @traced("search_video")
         async def search_video():
             try:
                 video_url = await wb_media.search_video(
@@ -104,9 +110,10 @@ async def handle_article(message: Message):
                 # Финальное обновление
                 video_text = "есть ✅" if video_url else "нет ⚠️ или недоступно.\nПробуйте снова если уверены, что в карточке есть видео"
                 keyboard_status = "found" if video_url else "not_found"
-                await status_msg.edit_text(
+                await editor.edit_now(
+                    status_msg,
                     text=info_text_base + f'🎥 Видео: {video_text}\nㅤ\n<a href="{wb_url}">&#8203;</a>',
-                    reply_markup=get_media_type_keyboard(nm_id, keyboard_status),
+                    reply_markup=get_media_type_keyboard(nm_id, keyboard_status, archive=archive),
                     parse_mode="HTML"
                 )
 
@@ -118,9 +125,10 @@ async def handle_article(message: Message):
             except Exception as e:
                 logger.error(f"Video search error for {nm_id}: {e}")
                 # Убираем строку о видео при ошибке
-                await status_msg.edit_text(
+                await editor.edit_now(
+                    status_msg,
                     text=info_text_base + f'ㅤ\n<a href="{wb_url}">&#8203;</a>',
-                    reply_markup=get_media_type_keyboard(nm_id, "not_found"),
+                    reply_markup=get_media_type_keyboard(nm_id, "not_found", archive=archive),
                     parse_mode="HTML"
                 )
 
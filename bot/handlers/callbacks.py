@@ -10,6 +10,7 @@ from services.media_downloader import MediaDownloader
 from services.gateway_adapter import get_gateway_adapter
 from utils.exceptions import NoMediaError, WBAPIError
 from utils.decorators import retry_on_telegram_error
+from utils.tracing import annotate
 
 router = Router()
 logger = logging.getLogger(__name__)
@@ -17,7 +18,9 @@ logger = logging.getLogger(__name__)
 
 @router.callback_query(F.data.startswith("download:"))
 @retry_on_telegram_error(max_retries=3, delay=1.0)
-async def handle_download_callback(callback: CallbackQuery, bot: Bot):
+async def handle_download_callback(
+    callback: CallbackQuery, bot: Bot, callback_answered: bool = False
+):
     """
     Обработчик callback для загрузки медиа.
 
@@ -26,6 +29,7 @@ async def handle_download_callback(callback: CallbackQuery, bot: Bot):
     Args:
         callback: Callback query от пользователя
         bot: Bot instance
+        callback_answered: Callback уже отвечен (загрузка стояла в очереди)
     """
     start_time = time.perf_counter()
 
@@ -36,11 +40,13 @@ async def handle_download_callback(callback: CallbackQuery, bot: Bot):
         f"name={user.first_name or ''} {user.last_name or ''}".strip()
     )
 
-    await callback.answer()
+    if not callback_answered:
+        await callback.answer()
 
     try:
         # Парсинг callback data
         _, nm_id, media_type = callback.data.split(":")
+        annotate(nm_id=nm_id, media_type=media_type)
 
         logger.info(
             f"🎯 Callback от пользователя [{user_info}]: "
@@ -53,7 +59,7 @@ async def handle_download_callback(callback: CallbackQuery, bot: Bot):
 
         # Получение данных товара через wb-media-service или WBParser
         wb_media = get_wb_media_client()
-        if media_type == "photo":
+        if media_type in ("photo", "zip"):
             media = await wb_media.get_product_media(nm_id, skip_video=True)
         elif media_type == "video":
             media = await wb_media.get_product_media(nm_id, skip_photos=True)
@@ -73,6 +79,16 @@ async def handle_download_callback(callback: CallbackQuery, bot: Bot):
                     user.id, "photo_sent", {"nm_id": int(nm_id), "count": count}
                 )
             )
+        elif media_type == "zip":
+            await downloader.send_photos_archive(
+                callback.message.chat.id,
+                media,
+                status_msg,
+                on_success=lambda count: gateway.track_event(
+                    user.id, "photo_sent",
+                    {"nm_id": int(nm_id), "count": count, "archive": True}
+                )
+            )
         elif media_type == "video":
             await downloader.send_video(
                 callback.message.chat.id,
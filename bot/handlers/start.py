@@ -1,9 +1,12 @@
 """Обработчики команд /start и /help."""
 
+import asyncio
 import logging
-from aiogram import Router
+from typing import Set
+
+from aiogram import Bot, Router
 from aiogram.filters import Command
-from aiogram.types import Message
+from aiogram.types import Message, User
 
 from services.gateway_adapter import get_gateway_adapter
 from services.notifications import send_new_user_notification
@@ -11,6 +14,44 @@ from services.notifications import send_new_user_notification
 logger = logging.getLogger(__name__)
 router = Router()
 
+# Ссылки на фоновые задачи регистрации (чтобы их не собрал GC)
+_background_tasks: Set[asyncio.Task] = set()
+
+
+async def register_and_notify(bot: Bot, user: User) -> None:
+    """
+    Регистрация пользователя и уведомление о новом пользователе.
+
+    Выполняется в фоне после ответа на /start.
+
+    Args:
+        bot: Bot instance
+        user: Пользователь Telegram
+    """
+    try:
+        # Регистрация через GatewayAdapter (микросервисы или локальная БД)
+        gateway = get_gateway_adapter()
+        result = await gateway.register_user(
+            user_id=user.id,
+            username=user.username,
+            first_name=user.first_name,
+            last_name=user.last_name
+        )
+
+        # Отправка уведомления о новом пользователе в канал
+        if result.is_new:
+            await send_new_user_notification(
+                bot=bot,
+                user_id=user.id,
+                username=user.username,
+                first_name=user.first_name
+            )
+    except Exception as e:
+        logger.warning(
+            f"⚠️  Ошибка регистрации пользователя {user.id}: "
+            f"{type(e).__name__}: {e}"
+        )
+
 
 @router.message(Command("start"))
 async def cmd_start(message: Message):
@@ -24,24 +65,6 @@ async def cmd_start(message: Message):
         f"{user.first_name or ''} {user.last_name or ''}".strip()
     )
 
-    # Регистрация через GatewayAdapter (микросервисы или локальная БД)
-    gateway = get_gateway_adapter()
-    result = await gateway.register_user(
-        user_id=user.id,
-        username=user.username,
-        first_name=user.first_name,
-        last_name=user.last_name
-    )
-
-    # Отправка уведомления о новом пользователе в канал
-    if result.is_new:
-        await send_new_user_notification(
-            bot=message.bot,
-            user_id=user.id,
-            username=user.username,
-            first_name=user.first_name
-        )
-
     # Сообщение 1: О проекте MPCabinet
     await message.answer(
         "ℹ️ Этот бот — часть <b>экосистемы MPCabinet:</b> набора Telegram-ботов для удобной ежедневной работы менеджера на Wildberries.\n\n"
@@ -57,6 +80,11 @@ async def cmd_start(message: Message):
         parse_mode="HTML"
     )
 
+    # Регистрация и уведомление — вне пути ответа пользователю
+    task = asyncio.create_task(register_and_notify(message.bot, user))
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
 
 @router.message(Command("help"))
 async def cmd_help(message: Message):
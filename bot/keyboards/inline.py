@@ -4,7 +4,11 @@ from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 
 
-def get_media_type_keyboard(nm_id: str, video_status: str = "searching") -> InlineKeyboardMarkup:
+def get_media_type_keyboard(
+    nm_id: str,
+    video_status: str = "searching",
+    archive: bool = False
+) -> InlineKeyboardMarkup:
     """
     Клавиатура выбора типа медиа.
 
@@ -13,6 +17,7 @@ def get_media_type_keyboard(nm_id: str, video_status: str = "searching") -> Inli
     Args:
         nm_id: Артикул товара
         video_status: Статус видео - "searching", "found", "not_found"
+        archive: Показать кнопку "Скачать архивом" (много фото)
 
     Returns:
         InlineKeyboardMarkup с кнопками выбора
@@ -27,6 +32,15 @@ def get_media_type_keyboard(nm_id: str, video_status: str = "searching") -> Inli
         )
     )
 
+    # Кнопка архива - для карточек с большим числом фото
+    if archive:
+        builder.row(
+            InlineKeyboardButton(
+                text="🗂 Фото архивом (оригинал)",
+                callback_data=f"download:{nm_id}:zip"
+            )
+        )
+
     # Кнопки с видео - только если видео найдено
     if video_status == "found":
         builder.row(
@@ -0,0 +1,154 @@
+"""Защита тяжёлых загрузок от повторных нажатий и параллельных задач."""
+
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Set, Tuple
+
+from aiogram import BaseMiddleware
+from aiogram.types import CallbackQuery
+
+from config.settings import get_settings
+from utils.metrics import gauge
+
+logger = logging.getLogger(__name__)
+
+# Загрузки с HLS/ffmpeg или сборкой архива
+HEAVY_MEDIA_TYPES = frozenset({"video", "both", "zip"})
+
+
+@dataclass
+class _UserJobs:
+    """Тяжёлые загрузки пользователя: выполняются и ждут в очереди."""
+
+    semaphore: asyncio.Semaphore
+    jobs: int = 0
+
+
+@dataclass
+class DownloadGuardStats:
+    """Счётчики DownloadGuardMiddleware."""
+
+    deduped: int = 0
+    queued: int = 0
+    rejected: int = 0
+
+
+class DownloadGuardMiddleware(BaseMiddleware):
+    """
+    Middleware для callback «download:{nm_id}:{media_type}».
+
+    - Повторное нажатие, пока та же загрузка (чат, товар, тип) ещё идёт
+      или ждёт очереди, отбрасывается.
+    - Тяжёлых загрузок (видео, всё, архив) на пользователя выполняется
+      не больше concurrency; следующие queue ждут в очереди, остальные
+      отклоняются.
+
+    Пользователь получает ответ на callback сразу, даже если загрузка
+    стоит в очереди; handler получает callback_answered=True.
+    """
+
+    def __init__(self, concurrency: int, queue: int):
+        """
+        Args:
+            concurrency: Одновременных тяжёлых загрузок на пользователя
+            queue: Тяжёлых загрузок в очереди пользователя сверх concurrency
+        """
+        self.concurrency = concurrency
+        self.queue = queue
+        self._in_flight: Set[Tuple[int, str, str]] = set()
+        self._users: Dict[int, _UserJobs] = {}
+        self.stats = DownloadGuardStats()
+
+    async def __call__(
+        self,
+        handler: Callable[[CallbackQuery, Dict[str, Any]], Awaitable[Any]],
+        event: CallbackQuery,
+        data: Dict[str, Any]
+    ) -> Any:
+        """
+        Проверка повторов и лимита загрузок перед обработкой callback.
+
+        Args:
+            handler: Следующий handler в цепочке
+            event: CallbackQuery событие
+            data: Данные контекста
+
+        Returns:
+            Результат handler или None если загрузка отброшена
+        """
+        if not event.data or not event.data.startswith("download:"):
+            return await handler(event, data)
+        try:
+            _, nm_id, media_type = event.data.split(":")
+        except ValueError:
+            return await handler(event, data)
+
+        user_id = event.from_user.id
+        # У inline-сообщений message нет — повторы различаются по пользователю
+        chat_id = event.message.chat.id if event.message else user_id
+        key = (chat_id, nm_id, media_type)
+
+        if key in self._in_flight:
+            self.stats.deduped += 1
+            logger.debug(f"Повторное нажатие user {user_id}: {nm_id}/{media_type}")
+            await event.answer("⏳ Уже загружаю, подождите.")
+            return None
+
+        if media_type not in HEAVY_MEDIA_TYPES:
+            self._in_flight.add(key)
+            try:
+                return await handler(event, data)
+            finally:
+                self._in_flight.discard(key)
+
+        user = self._users.get(user_id)
+        if user is None:
+            user = _UserJobs(semaphore=asyncio.Semaphore(self.concurrency))
+            self._users[user_id] = user
+
+        if user.jobs >= self.concurrency + self.queue:
+            self.stats.rejected += 1
+            logger.info(f"Лимит загрузок user {user_id}: отклонено {nm_id}/{media_type}")
+            await event.answer(
+                "⏳ Слишком много загрузок. Дождитесь завершения текущих.",
+                show_alert=True
+            )
+            return None
+
+        user.jobs += 1
+        self._in_flight.add(key)
+        try:
+            if user.semaphore.locked():
+                self.stats.queued += 1
+                await event.answer("⏳ Загрузка начнётся после текущей.")
+                data["callback_answered"] = True
+            async with user.semaphore:
+                return await handler(event, data)
+        finally:
+            self._in_flight.discard(key)
+            user.jobs -= 1
+            if user.jobs == 0:
+                del self._users[user_id]
+
+    def snapshot(self) -> Dict[str, int]:
+        """Счётчики и текущие загрузки."""
+        return {
+            "in_flight": len(self._in_flight),
+            "deduped": self.stats.deduped,
+            "queued": self.stats.queued,
+            "rejected": self.stats.rejected,
+        }
+
+
+def create_download_guard() -> DownloadGuardMiddleware:
+    """Создать DownloadGuardMiddleware по настройкам."""
+    settings = get_settings()
+    guard = DownloadGuardMiddleware(
+        concurrency=settings.DOWNLOAD_USER_CONCURRENCY,
+        queue=settings.DOWNLOAD_USER_QUEUE,
+    )
+    gauge(
+        "download_jobs_in_flight", "Загрузок выполняется или ждёт очереди"
+    ).set_function(lambda: len(guard._in_flight))
+    return guard
@@ -1,23 +1,38 @@
 """Rate limiting middleware для защиты от спама."""
 
-import time
 import logging
-from typing import Any, Awaitable, Callable, Dict
+from typing import Any, Awaitable, Callable, Dict, Optional, Union
 
 from aiogram import BaseMiddleware
 from aiogram.types import Message
 
-from config.settings import Settings
+from services.user_limiter import (
+    PostgresRateLimiter,
+    UserRateLimiter,
+    get_user_rate_limiter,
+)
 
 logger = logging.getLogger(__name__)
 
 
 class RateLimiterMiddleware(BaseMiddleware):
-    """Middleware для ограничения частоты запросов от пользователей."""
+    """
+    Middleware для ограничения частоты запросов от пользователей.
 
-    def __init__(self):
-        self.settings = Settings()
-        self._user_last_request: Dict[int, float] = {}
+    Per-user token bucket: RATE_LIMIT_BURST запросов подряд, затем один
+    запрос в RATE_LIMIT_SECONDS. Стоимость проверки не зависит от числа
+    активных пользователей (см. services/user_limiter.py).
+    """
+
+    def __init__(
+        self,
+        limiter: Optional[Union[UserRateLimiter, PostgresRateLimiter]] = None
+    ):
+        """
+        Args:
+            limiter: Лимитер пользователей (по умолчанию singleton по настройкам)
+        """
+        self.limiter = limiter or get_user_rate_limiter()
 
     async def __call__(
         self,
@@ -37,41 +52,16 @@ class RateLimiterMiddleware(BaseMiddleware):
             Результат handler или None если rate limit превышен
         """
         user_id = event.from_user.id
-        current_time = time.time()
-        limit_seconds = self.settings.RATE_LIMIT_SECONDS
+        wait = await self.limiter.check(user_id)
 
-        # Проверяем время последнего запроса
-        last_request = self._user_last_request.get(user_id, 0)
-        time_passed = current_time - last_request
-
-        if time_passed < limit_seconds:
+        if wait > 0:
             # Rate limit превышен
-            wait_time = int(limit_seconds - time_passed) + 1
-            logger.debug(
-                f"Rate limit для user {user_id}: "
-                f"прошло {time_passed:.1f}s, нужно {limit_seconds}s"
-            )
+            wait_time = int(wait) + 1
+            logger.debug(f"Rate limit для user {user_id}: ждать {wait:.1f}s")
             await event.answer(
                 f"⏳ Вы отправляете слишком часто.\n"
                 f"Подождите {wait_time} сек., после чего можно снова отправлять запросы."
             )
             return None
 
-        # Сохраняем время запроса
-        self._user_last_request[user_id] = current_time
-
-        # Периодическая очистка старых записей (каждые 100 запросов)
-        if len(self._user_last_request) > 1000:
-            self._cleanup_old_entries(current_time)
-
         return await handler(event, data)
-
-    def _cleanup_old_entries(self, current_time: float) -> None:
-        """Удаление записей старше 1 часа."""
-        hour_ago = current_time - 3600
-        self._user_last_request = {
-            user_id: timestamp
-            for user_id, timestamp in self._user_last_request.items()
-            if timestamp > hour_ago
-        }
-        logger.debug(f"Rate limiter cleanup: осталось {len(self._user_last_request)} записей")
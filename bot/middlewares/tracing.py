@@ -0,0 +1,42 @@
+"""Корневой span трассировки на каждое обновление Telegram."""
+
+from aiogram import BaseMiddleware
+from aiogram.types import Update
+from typing import Callable, Dict, Any, Awaitable
+
+from utils.tracing import span
+
+
+class TracingMiddleware(BaseMiddleware):
+    """
+    Outer middleware для dp.update: открывает новую трассу на обновление.
+
+    Всё, что выполняется при обработке (включая задачи, запущенные
+    handler'ом), пишет в лог request_id этой трассы.
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[Update, Dict[str, Any]], Awaitable[Any]],
+        event: Update,
+        data: Dict[str, Any]
+    ) -> Any:
+        """
+        Обработка обновления в корневом span.
+
+        Args:
+            handler: Следующий handler в цепочке
+            event: Update событие
+            data: Данные контекста
+
+        Returns:
+            Результат handler
+        """
+        user = data.get("event_from_user")
+        with span(
+            f"update.{event.event_type}",
+            parent=None,
+            update_id=event.update_id,
+            user_id=user.id if user else None,
+        ):
+            return await handler(event, data)
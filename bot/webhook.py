@@ -0,0 +1,184 @@
+"""
+Webhook режим: приём обновлений Telegram встроенным aiohttp сервером.
+
+Альтернатива long polling (WEBHOOK_URL задан): обновления приходят
+POST-запросами, поэтому несколько реплик бота можно поставить за
+балансировщик. Запросы без верного X-Telegram-Bot-Api-Secret-Token
+отклоняются; если WEBHOOK_SECRET не задан, секрет выводится из токена
+бота (одинаковый у всех реплик, неизвестен без токена).
+
+- GET /healthz — процесс жив
+- GET /readyz — реплика принимает обновления (503 во время остановки)
+
+При остановке реплика сначала перестаёт быть ready и отвечает 503 на
+новые обновления (Telegram повторит их на другую реплику), затем
+дожидается обработки уже принятых и только после этого закрывает сервер.
+Webhook в Telegram при этом не удаляется: остальные реплики продолжают
+работу.
+"""
+
+import asyncio
+import hashlib
+import logging
+import signal
+from typing import Optional
+
+from aiogram import Bot, Dispatcher
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+from aiohttp import web
+
+logger = logging.getLogger(__name__)
+
+
+def derive_secret_token(bot_token: str) -> str:
+    """Секрет webhook из токена бота (символы, допустимые Telegram)."""
+    return hashlib.sha256(f"webhook:{bot_token}".encode()).hexdigest()
+
+
+class _WebhookRequestHandler(SimpleRequestHandler):
+    """SimpleRequestHandler с отказом в приёме во время остановки."""
+
+    draining = False
+
+    @property
+    def pending(self) -> int:
+        """Обновления, которые ещё обрабатываются."""
+        return len(self._background_feed_update_tasks)
+
+    async def handle(self, request: web.Request) -> web.Response:
+        if self.draining:
+            return web.Response(status=503, text="draining")
+        return await super().handle(request)
+
+    async def drain(self, timeout: float) -> bool:
+        """
+        Дождаться обработки принятых обновлений.
+
+        Returns:
+            True если все обработаны за timeout
+        """
+        self.draining = True
+        tasks = set(self._background_feed_update_tasks)
+        if not tasks:
+            return True
+        _, pending = await asyncio.wait(tasks, timeout=timeout)
+        return not pending
+
+    async def close(self) -> None:
+        """Сессию бота закрывает main после остановки сервера."""
+
+
+class WebhookServer:
+    """Встроенный aiohttp сервер webhook с health/readiness и drain."""
+
+    def __init__(
+        self,
+        bot: Bot,
+        dp: Dispatcher,
+        host: str,
+        port: int,
+        path: str,
+        secret_token: Optional[str] = None,
+        drain_timeout: float = 30.0
+    ):
+        """
+        Args:
+            bot: Bot instance
+            dp: Dispatcher
+            host: Адрес прослушивания
+            port: Порт прослушивания
+            path: Путь webhook (POST)
+            secret_token: Секрет X-Telegram-Bot-Api-Secret-Token
+                (None — выводится из токена бота)
+            drain_timeout: Макс. ожидание обработки принятых обновлений (сек)
+        """
+        self.bot = bot
+        self.dp = dp
+        self.host = host
+        self.port = port
+        self.path = path
+        # Без секрета POST на webhook мог бы отправить кто угодно
+        self.secret_token = secret_token or derive_secret_token(bot.token)
+        self.drain_timeout = drain_timeout
+        self.ready = False
+
+        self.handler = _WebhookRequestHandler(
+            dispatcher=dp, bot=bot, secret_token=self.secret_token
+        )
+        self.app = web.Application()
+        self.handler.register(self.app, path=path)
+        self.app.router.add_get("/healthz", self._healthz)
+        self.app.router.add_get("/readyz", self._readyz)
+        setup_application(self.app, dp, bot=bot)
+        self._runner: Optional[web.AppRunner] = None
+
+    async def _healthz(self, request: web.Request) -> web.Response:
+        return web.json_response({"status": "ok"})
+
+    async def _readyz(self, request: web.Request) -> web.Response:
+        if not self.ready:
+            return web.json_response({"status": "draining"}, status=503)
+        return web.json_response({"status": "ready", "pending": self.handler.pending})
+
+    async def start(self, url: Optional[str] = None) -> None:
+        """
+        Запустить сервер и (если задан url) зарегистрировать webhook.
+
+        Args:
+            url: Публичный URL webhook (None — не вызывать set_webhook)
+        """
+        self._runner = web.AppRunner(self.app, handle_signals=False)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        logger.info(f"✅ Webhook сервер слушает {self.host}:{self.port}{self.path}")
+
+        if url:
+            # Без drop_pending_updates: при поочерёдном деплое реплик
+            # обновления не теряются
+            await self.bot.set_webhook(
+                url,
+                secret_token=self.secret_token,
+                allowed_updates=self.dp.resolve_used_update_types(),
+            )
+            logger.info(f"✅ Webhook установлен: {url}")
+        self.ready = True
+
+    async def stop(self) -> None:
+        """Перестать принимать обновления, дождаться принятых и закрыть сервер."""
+        self.ready = False
+        pending = self.handler.pending
+        if pending:
+            logger.info(f"Webhook: ожидание обработки {pending} обновлений...")
+        if not await self.handler.drain(self.drain_timeout):
+            logger.warning(
+                f"⚠️  Webhook: не все обновления обработаны за {self.drain_timeout:.0f}s"
+            )
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+        logger.info("Webhook сервер остановлен")
+
+
+async def run_webhook(server: WebhookServer, url: str) -> None:
+    """
+    Запустить webhook сервер и работать до SIGINT/SIGTERM.
+
+    Args:
+        server: WebhookServer
+        url: Публичный URL webhook
+    """
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except (NotImplementedError, RuntimeError):
+            # Windows: остановка через KeyboardInterrupt
+            pass
+
+    await server.start(url)
+    try:
+        await stop.wait()
+    finally:
+        logger.info("Webhook: остановка...")
+        await server.stop()
@@ -2,9 +2,10 @@
 
 import asyncpg
 import logging
-from typing import Optional
+from typing import Dict, Optional, Tuple
 
 from config.settings import Settings
+from utils.metrics import gauge
 
 logger = logging.getLogger(__name__)
 
@@ -91,3 +92,15 @@ async def close_pool() -> None:
         logger.info("✅ Пул соединений PostgreSQL закрыт")
     else:
         logger.debug("Пул соединений PostgreSQL уже закрыт или не был создан")
+
+
+def _pool_connections() -> Dict[Tuple[str, ...], float]:
+    if _pool is None:
+        return {}
+    idle = _pool.get_idle_size()
+    return {("busy",): _pool.get_size() - idle, ("idle",): idle}
+
+
+gauge(
+    "db_pool_connections", "Соединения пула PostgreSQL", ("state",)
+).set_function(_pool_connections)
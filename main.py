@@ -16,8 +16,24 @@ from utils.logger import setup_logger
 from bot.handlers import start, article, callbacks
 from bot.middlewares.error_handler import ErrorHandlerMiddleware
 from bot.middlewares.rate_limiter import RateLimiterMiddleware
-from services.digest import send_daily_digest_job
+from bot.middlewares.download_guard import create_download_guard
+from bot.middlewares.tracing import TracingMiddleware
+from bot.webhook import WebhookServer, run_webhook
+from services.digest import send_daily_digest_job, refresh_daily_rollup_job
 from db.connection import get_pool, close_pool
+from services.http_session import close_http_session
+from services.event_buffer import close_event_buffer
+from services.gateway_adapter import close_gateway_adapter, get_gateway_adapter
+from services.wb_media_client import close_wb_media_client
+from services.user_limiter import close_user_rate_limiter
+from services.video_cache import close_video_cache, get_video_cache
+from services.media_cache_l2 import close_media_cache_l2, start_media_cache_l2
+from services.wb_parser import WBParser
+from utils.circuit_breaker import circuit_breakers_snapshot
+from utils.metrics import start_metrics_server
+from utils.tracing import close_tracing, start_tracing
+from services.analytics import maintain_partitions_job
+from services.telegram_scheduler import get_telegram_scheduler
 
 
 async def main():
@@ -50,12 +66,19 @@ async def main():
         session=session
     )
 
+    # Глобальный планировщик исходящих запросов (лимит + приоритеты)
+    telegram_scheduler = get_telegram_scheduler()
+    bot.session.middleware(telegram_scheduler)
+
     # Инициализация диспетчера
     dp = Dispatcher()
 
-    # Регистрация middleware (порядок важен: rate limiter → error handler)
+    # Регистрация middleware (порядок важен: rate limiter / guard → error handler)
+    download_guard = create_download_guard()
+    dp.update.outer_middleware(TracingMiddleware())
     dp.message.middleware(RateLimiterMiddleware())
     dp.message.middleware(ErrorHandlerMiddleware())
+    dp.callback_query.middleware(download_guard)
     dp.callback_query.middleware(ErrorHandlerMiddleware())
 
     # Регистрация роутеров (порядок важен!)
@@ -67,7 +90,11 @@ async def main():
     logger.info(f"Log level: {settings.LOG_LEVEL}")
     logger.info(f"WB API timeout: {settings.WB_API_TIMEOUT}s")
     logger.info(f"WB rate limit delay: {settings.WB_RATE_LIMIT_DELAY}s")
-    logger.info(f"User rate limit: {settings.RATE_LIMIT_SECONDS}s")
+    logger.info(
+        f"User rate limit: {settings.RATE_LIMIT_SECONDS}s "
+        f"(burst={settings.RATE_LIMIT_BURST}, backend={settings.RATE_LIMIT_BACKEND})"
+    )
+    logger.info(f"Telegram global rate: {settings.TELEGRAM_GLOBAL_RATE} req/s")
 
     # Инициализация пула PostgreSQL
     pool = await get_pool()
@@ -76,6 +103,18 @@ async def main():
     else:
         logger.warning("⚠️  PostgreSQL unavailable - analytics disabled")
 
+    # Постоянные клиенты микросервисов (пул соединений на весь процесс)
+    await get_gateway_adapter().start()
+
+    # Фоновая очистка кеша видео
+    get_video_cache().start_sweeper(settings.VIDEO_CACHE_SWEEP_INTERVAL)
+
+    # L2-кеш поиска медиа: прогрев in-memory кешей снимком
+    media_cache_l2 = await start_media_cache_l2()
+    if media_cache_l2:
+        await get_video_cache().attach_l2(media_cache_l2)
+        await WBParser.attach_l2(media_cache_l2)
+
     # Настройка APScheduler для ежедневного дайджеста
     scheduler = None
     if settings.ENABLE_ANALYTICS and pool:
@@ -92,18 +131,62 @@ async def main():
             replace_existing=True
         )
 
+        # Добавление задачи: ежечасный пересчёт дневного rollup статистики
+        scheduler.add_job(
+            refresh_daily_rollup_job,
+            trigger=CronTrigger(minute=10, timezone=msk_tz),
+            id='daily_rollup',
+            name='Analytics Daily Rollup',
+            replace_existing=True
+        )
+
+        # Добавление задачи: ежедневное обслуживание партиций событий
+        scheduler.add_job(
+            maintain_partitions_job,
+            trigger=CronTrigger(hour=3, minute=30, timezone=msk_tz),
+            id='analytics_partitions',
+            name='Analytics Partitions Maintenance',
+            replace_existing=True
+        )
+
+        # Партиции на текущий и ближайшие месяцы нужны до первой записи событий
+        await maintain_partitions_job()
+
         scheduler.start()
-        logger.info("✅ APScheduler started: daily digest at 00:00 MSK")
+        logger.info(
+            "✅ APScheduler started: daily digest at 00:00 MSK, rollup hourly, "
+            "partitions daily at 03:30 MSK"
+        )
     else:
         logger.info("ℹ️  APScheduler not started (analytics disabled or DB unavailable)")
 
+    start_tracing()
+    metrics_runner = None
     try:
-        # Удаляем webhook (для long polling)
-        await bot.delete_webhook(drop_pending_updates=True)
-
-        # Запуск long polling
-        logger.info("Starting long polling...")
-        await dp.start_polling(bot)
+        if settings.METRICS_PORT:
+            metrics_runner = await start_metrics_server(
+                settings.METRICS_HOST, settings.METRICS_PORT
+            )
+
+        if settings.WEBHOOK_URL:
+            # Webhook: встроенный aiohttp сервер
+            logger.info("Starting webhook server...")
+            webhook = WebhookServer(
+                bot, dp,
+                host=settings.WEBHOOK_HOST,
+                port=settings.WEBHOOK_PORT,
+                path=settings.WEBHOOK_PATH,
+                secret_token=settings.WEBHOOK_SECRET,
+                drain_timeout=settings.WEBHOOK_DRAIN_TIMEOUT,
+            )
+            await run_webhook(webhook, settings.WEBHOOK_URL)
+        else:
+            # Удаляем webhook (для long polling)
+            await bot.delete_webhook(drop_pending_updates=True)
+
+            # Запуск long polling
+            logger.info("Starting long polling...")
+            await dp.start_polling(bot)
     except Exception as e:
         logger.critical(f"Fatal error: {e}")
     finally:
@@ -112,10 +195,28 @@ async def main():
             scheduler.shutdown(wait=False)
             logger.info("APScheduler stopped")
 
+        # Доставка событий из очереди и закрытие клиентов микросервисов,
+        # затем запись буфера (до закрытия пула)
+        await close_gateway_adapter()
+        await close_event_buffer()
+        await close_user_rate_limiter()
+        await close_media_cache_l2()
+
         # Закрытие пула БД
         await close_pool()
         logger.info("PostgreSQL pool closed")
 
+        # Закрытие общей HTTP сессии и клиента wb-media-service
+        await close_http_session()
+        await close_wb_media_client()
+        await close_video_cache()
+
+        logger.info(f"Telegram scheduler stats: {telegram_scheduler.snapshot()}")
+        logger.info(f"Circuit breakers: {circuit_breakers_snapshot()}")
+        logger.info(f"Download guard stats: {download_guard.snapshot()}")
+        if metrics_runner is not None:
+            await metrics_runner.cleanup()
+        await close_tracing()
         await bot.session.close()
         logger.info("Bot stopped")
 
@@ -1,5 +1,6 @@
 """Analytics Client - Async HTTP client for Analytics Service microservice."""
 
+from analytics_client.batcher import EventBatcher
 from analytics_client.client import AnalyticsClient
 from analytics_client.exceptions import (
     AnalyticsServiceError,
@@ -9,7 +10,10 @@ from analytics_client.exceptions import (
     ValidationError,
 )
 from analytics_client.models import (
+    BatchEventError,
+    BatchResult,
     DailyStats,
+    DigestStats,
     EventCreated,
     UsersCount,
 )
@@ -19,6 +23,7 @@ __version__ = "0.1.0"
 __all__ = [
     # Client
     "AnalyticsClient",
+    "EventBatcher",
     # Exceptions
     "AnalyticsServiceError",
     "ConnectionError",
@@ -26,7 +31,10 @@ __all__ = [
     "ValidationError",
     "ServerError",
     # Models
+    "BatchEventError",
+    "BatchResult",
     "DailyStats",
+    "DigestStats",
     "EventCreated",
     "UsersCount",
 ]
@@ -0,0 +1,154 @@
+"""Accumulating helper for batch event ingestion."""
+
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+from analytics_client.client import DEFAULT_BATCH_CHUNK_SIZE, AnalyticsClient
+from analytics_client.models import BatchEventError, BatchResult
+
+logger = logging.getLogger(__name__)
+
+FailureCallback = Callable[[List[Dict[str, Any]]], Awaitable[None]]
+ResultCallback = Callable[[BatchResult], None]
+
+
+class EventBatcher:
+    """Accumulate events and ship them with ``events.record_batch``.
+
+    A flush starts when ``max_batch`` events are pending or ``flush_interval``
+    seconds after the first pending event, whichever comes first.
+
+    Usage:
+        async with AnalyticsClient(base_url="http://analytics-service:8003") as client:
+            batcher = EventBatcher(client, max_batch=200, flush_interval=1.0)
+            batcher.add(telegram_id=123, event_type="article.requested")
+            ...
+            await batcher.close()
+    """
+
+    def __init__(
+        self,
+        client: AnalyticsClient,
+        max_batch: int = 200,
+        flush_interval: float = 1.0,
+        chunk_size: int = DEFAULT_BATCH_CHUNK_SIZE,
+        on_failure: Optional[FailureCallback] = None,
+        on_result: Optional[ResultCallback] = None,
+    ):
+        """Initialize Event Batcher.
+
+        Args:
+            client: Open AnalyticsClient
+            max_batch: Pending events that trigger an immediate flush
+            flush_interval: Max delay of a pending event in seconds
+            chunk_size: Max events per HTTP request
+            on_failure: Awaited with events the service did not accept
+            on_result: Called with the BatchResult of every non-empty flush
+                (e.g. to feed a circuit breaker)
+        """
+        self.client = client
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self.chunk_size = chunk_size
+        self.on_failure = on_failure
+        self.on_result = on_result
+        self._pending: List[Dict[str, Any]] = []
+        self._lock = asyncio.Lock()
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: Set[asyncio.Task] = set()
+        self.sent = 0
+        self.failed = 0
+        self.requests = 0
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def add(
+        self,
+        telegram_id: int,
+        event_type: str,
+        event_data: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        """Queue event for the next batch.
+
+        Args:
+            telegram_id: Telegram user ID
+            event_type: Event type
+            event_data: Optional event metadata
+        """
+        event: Dict[str, Any] = {"telegram_id": telegram_id, "event_type": event_type}
+        if event_data is not None:
+            event["event_data"] = event_data
+        self._pending.append(event)
+
+        if len(self._pending) >= self.max_batch:
+            self._spawn_flush()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(
+                self.flush_interval, self._spawn_flush
+            )
+
+    def _cancel_timer(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    def _spawn_flush(self) -> None:
+        self._cancel_timer()
+        task = asyncio.create_task(self.flush())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def flush(self) -> BatchResult:
+        """Send all pending events.
+
+        Returns:
+            BatchResult of the sent events
+        """
+        async with self._lock:
+            self._cancel_timer()
+            if not self._pending:
+                return BatchResult()
+
+            events, self._pending = self._pending, []
+            requests = -(-len(events) // self.chunk_size)
+            try:
+                result = await self.client.events.record_batch(
+                    events, chunk_size=self.chunk_size
+                )
+            except Exception as e:
+                # The events are already taken from _pending: report them all
+                # as retryable failures so on_failure still receives them
+                logger.error(f"Batch ingestion error: {e}")
+                result = BatchResult(errors=[
+                    BatchEventError(index=i, detail=str(e), retryable=True)
+                    for i in range(len(events))
+                ])
+            self.requests += requests
+            self.sent += result.accepted
+            if self.on_result is not None:
+                try:
+                    self.on_result(result)
+                except Exception as e:
+                    logger.error(f"Batch result callback error: {e}")
+            if result.errors:
+                failed = [events[i] for i in result.failed_indexes]
+                self.failed += len(failed)
+                logger.warning(
+                    f"Batch ingestion: {len(failed)} of {len(events)} events rejected "
+                    f"({result.errors[0].detail})"
+                )
+                if self.on_failure is not None:
+                    try:
+                        await self.on_failure(failed)
+                    except Exception as e:
+                        logger.error(f"Batch failure callback error: {e}")
+            return result
+
+    async def close(self) -> None:
+        """Wait for running flushes and send the remaining events."""
+        self._cancel_timer()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        await self.flush()
@@ -1,17 +1,29 @@
 """Analytics Client implementation."""
 
+import asyncio
 import logging
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Optional, Sequence
 
 import httpx
 
 from analytics_client.exceptions import (
+    AnalyticsServiceError,
     ConnectionError,
     ServerError,
     TimeoutError,
     ValidationError,
 )
-from analytics_client.models import DailyStats, EventCreated, UsersCount
+from analytics_client.models import (
+    BatchEventError,
+    BatchResult,
+    DailyStats,
+    DigestStats,
+    EventCreated,
+    UsersCount,
+)
+
+# Max events per POST /events/batch request
+DEFAULT_BATCH_CHUNK_SIZE = 500
 
 logger = logging.getLogger(__name__)
 
@@ -92,10 +104,84 @@ class EventsClient(_BaseSubClient):
         data = await self._handle_response(response)
         return EventCreated(**data)
 
+    async def record_batch(
+        self,
+        events: Sequence[Dict[str, Any]],
+        chunk_size: int = DEFAULT_BATCH_CHUNK_SIZE,
+    ) -> BatchResult:
+        """Record many analytics events with as few requests as possible.
+
+        Events are posted to ``/events/batch`` in chunks of ``chunk_size``.
+        A failed chunk does not stop the remaining ones: its events are
+        reported in ``BatchResult.errors`` instead of raising.
+
+        Args:
+            events: Dicts with ``telegram_id``, ``event_type`` and optional
+                ``event_data``
+            chunk_size: Max events per request
+
+        Returns:
+            BatchResult with accepted count and rejected event indexes
+        """
+        if chunk_size < 1:
+            raise ValueError("chunk_size must be >= 1")
+
+        result = BatchResult()
+        for offset in range(0, len(events), chunk_size):
+            chunk = events[offset:offset + chunk_size]
+            logger.debug(f"Recording batch: offset={offset}, size={len(chunk)}")
+            try:
+                chunk_result = await self._post_batch(chunk)
+            except AnalyticsServiceError as e:
+                retryable = not isinstance(e, ValidationError)
+                result.errors.extend(
+                    BatchEventError(index=offset + i, detail=str(e), retryable=retryable)
+                    for i in range(len(chunk))
+                )
+                continue
+
+            result.accepted += chunk_result.accepted
+            result.errors.extend(
+                BatchEventError(index=offset + error.index, detail=error.detail)
+                for error in chunk_result.errors
+            )
+        return result
+
+    async def _post_batch(self, chunk: Sequence[Dict[str, Any]]) -> BatchResult:
+        """Post one chunk to /events/batch."""
+        payload = {
+            "events": [
+                {
+                    key: event[key]
+                    for key in ("telegram_id", "event_type", "event_data")
+                    if event.get(key) is not None
+                }
+                for event in chunk
+            ]
+        }
+        try:
+            response = await self._client.post("/events/batch", json=payload)
+        except httpx.ConnectError as e:
+            raise ConnectionError(str(e)) from e
+        except httpx.TimeoutException as e:
+            raise TimeoutError(str(e)) from e
+        except httpx.HTTPError as e:
+            # Other transport failures (dropped connection, protocol error)
+            # fail the chunk as retryable instead of aborting the batch
+            raise ConnectionError(str(e)) from e
+
+        data = await self._handle_response(response)
+        return BatchResult(**data)
+
 
 class StatsClient(_BaseSubClient):
     """Statistics client."""
 
+    def __init__(self, client: httpx.AsyncClient):
+        super().__init__(client)
+        # None - unknown yet, False - service has no /stats/digest
+        self._digest_supported: Optional[bool] = None
+
     async def get_daily(self, date: str) -> DailyStats:
         """Get daily statistics.
 
@@ -161,6 +247,66 @@ class StatsClient(_BaseSubClient):
         data = await self._handle_response(response)
         return UsersCount(count=data["count"])
 
+    async def get_digest(
+        self,
+        date: str,
+        started_event: str = "user_start",
+        active_event: str = "article_request",
+    ) -> DigestStats:
+        """Get everything the daily digest needs.
+
+        Uses the combined ``/stats/digest`` endpoint when the service has it;
+        otherwise fetches daily stats, users count and funnel concurrently.
+
+        Args:
+            date: Date in YYYY-MM-DD format
+            started_event: Event type of the funnel's first step
+            active_event: Event type of the active/returning funnel steps
+
+        Returns:
+            DigestStats object
+        """
+        if self._digest_supported is not False:
+            logger.debug(f"Getting digest for date={date}")
+            try:
+                response = await self._client.get(
+                    "/stats/digest",
+                    params={
+                        "date": date,
+                        "started_event": started_event,
+                        "active_event": active_event,
+                    },
+                )
+            except httpx.ConnectError as e:
+                raise ConnectionError(str(e)) from e
+            except httpx.TimeoutException as e:
+                raise TimeoutError(str(e)) from e
+
+            if response.status_code not in (404, 405):
+                data = await self._handle_response(response)
+                self._digest_supported = True
+                return DigestStats(**data)
+
+            logger.debug("/stats/digest not supported, falling back to fan-out")
+            self._digest_supported = False
+
+        daily, users, started, active, returning = await asyncio.gather(
+            self.get_daily(date),
+            self.get_users_count(),
+            self.get_users_by_event(started_event),
+            self.get_users_by_event(active_event),
+            self.get_users_by_event(active_event, min_count=2),
+        )
+        return DigestStats(
+            date=daily.date,
+            stats=daily.stats,
+            total_events=daily.total_events,
+            users_count=users.count,
+            funnel_started=started.count,
+            funnel_active=active.count,
+            funnel_returning=returning.count,
+        )
+
 
 class AnalyticsClient:
     """Async HTTP client for Analytics Service.
@@ -172,35 +318,64 @@ class AnalyticsClient:
                 telegram_id=123, event_type="user.started"
             )
 
+            # Record many events in one request
+            result = await client.events.record_batch([
+                {"telegram_id": 123, "event_type": "article.requested"},
+                {"telegram_id": 456, "event_type": "user.started"},
+            ])
+
             # Get daily stats
             stats = await client.stats.get_daily("2026-02-08")
 
             # Get users count
             users = await client.stats.get_users_count()
+
+            # Get daily stats, users count and funnel at once
+            digest = await client.stats.get_digest("2026-02-08")
+
+    Long-lived usage (one connection pool for the whole process):
+        client = AnalyticsClient(base_url="http://analytics-service:8003")
+        await client.open()
+        ...
+        await client.close()
     """
 
     def __init__(
         self,
         base_url: str,
         timeout: float = 10.0,
+        limits: Optional[httpx.Limits] = None,
+        http2: bool = False,
     ):
         """Initialize Analytics Client.
 
         Args:
             base_url: Base URL for Analytics Service (e.g., http://localhost:8003)
             timeout: Request timeout in seconds
+            limits: Connection pool limits (httpx defaults if None)
+            http2: Enable HTTP/2 (requires the ``http2`` extra)
         """
         self.base_url = base_url
         self.timeout = timeout
+        self.limits = limits
+        self.http2 = http2
         self._client: Optional[httpx.AsyncClient] = None
         self._events: Optional[EventsClient] = None
         self._stats: Optional[StatsClient] = None
 
-    async def __aenter__(self):
-        """Enter context manager - create HTTP client."""
+    async def open(self) -> "AnalyticsClient":
+        """Create HTTP client (no-op if already open)."""
+        if self._client is not None:
+            return self
+
+        kwargs: Dict[str, Any] = {}
+        if self.limits is not None:
+            kwargs["limits"] = self.limits
         self._client = httpx.AsyncClient(
             base_url=self.base_url,
             timeout=self.timeout,
+            http2=self.http2,
+            **kwargs,
         )
 
         self._events = EventsClient(self._client)
@@ -208,17 +383,33 @@ class AnalyticsClient:
 
         return self
 
-    async def __aexit__(self, exc_type, exc_val, exc_tb):
-        """Exit context manager - close HTTP client."""
+    async def close(self) -> None:
+        """Close HTTP client and its connection pool."""
         if self._client:
             await self._client.aclose()
+        self._client = None
+        self._events = None
+        self._stats = None
+
+    @property
+    def is_open(self) -> bool:
+        """Whether HTTP client is open."""
+        return self._client is not None
+
+    async def __aenter__(self):
+        """Enter context manager - create HTTP client."""
+        return await self.open()
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        """Exit context manager - close HTTP client."""
+        await self.close()
 
     @property
     def events(self) -> EventsClient:
         """Events client."""
         if self._events is None:
             raise RuntimeError(
-                "Client not initialized. Use 'async with' context manager."
+                "Client not initialized. Use 'async with' or open()."
             )
         return self._events
 
@@ -227,6 +418,6 @@ class AnalyticsClient:
         """Stats client."""
         if self._stats is None:
             raise RuntimeError(
-                "Client not initialized. Use 'async with' context manager."
+                "Client not initialized. Use 'async with' or open()."
             )
         return self._stats
@@ -1,6 +1,6 @@
 """Pydantic models for Analytics Client."""
 
-from typing import Dict
+from typing import Dict, List
 
 from pydantic import BaseModel
 
@@ -13,6 +13,18 @@ class DailyStats(BaseModel):
     total_events: int
 
 
+class DigestStats(BaseModel):
+    """Daily digest: daily stats, total users and user funnel."""
+
+    date: str
+    stats: Dict[str, int]
+    total_events: int
+    users_count: int
+    funnel_started: int
+    funnel_active: int
+    funnel_returning: int
+
+
 class UsersCount(BaseModel):
     """Users count response model."""
 
@@ -23,3 +35,45 @@ class EventCreated(BaseModel):
     """Event created response model."""
 
     status: str
+
+
+class BatchEventError(BaseModel):
+    """Rejected event of a batch.
+
+    Attributes:
+        index: Position of the event in the submitted sequence
+        detail: Rejection reason
+        retryable: True if the request failed (network, timeout, 5xx)
+            rather than the event being rejected by validation
+    """
+
+    index: int
+    detail: str
+    retryable: bool = False
+
+
+class BatchResult(BaseModel):
+    """Result of a batch ingestion (possibly several requests).
+
+    Attributes:
+        accepted: Number of events stored by the service
+        errors: Rejected events; ``index`` refers to the submitted sequence
+    """
+
+    accepted: int = 0
+    errors: List[BatchEventError] = []
+
+    @property
+    def ok(self) -> bool:
+        """True if every event was accepted."""
+        return not self.errors
+
+    @property
+    def failed_indexes(self) -> List[int]:
+        """Indexes of rejected events in the submitted sequence."""
+        return [error.index for error in self.errors]
+
+    @property
+    def retryable_indexes(self) -> List[int]:
+        """Indexes of events worth sending again later."""
+        return [error.index for error in self.errors if error.retryable]
@@ -0,0 +1,129 @@
+"""Tests for EventBatcher."""
+
+import asyncio
+
+import httpx
+import pytest
+import respx
+
+from analytics_client import AnalyticsClient, EventBatcher
+
+
+class TestEventBatcher:
+    """Test accumulating batch helper."""
+
+    @pytest.mark.asyncio
+    @respx.mock
+    async def test_flush_by_size(self, base_url):
+        """Reaching max_batch should send pending events in one request."""
+        route = respx.post(f"{base_url}/events/batch").mock(
+            return_value=httpx.Response(200, json={"accepted": 3, "errors": []})
+        )
+
+        async with AnalyticsClient(base_url=base_url) as client:
+            batcher = EventBatcher(client, max_batch=3, flush_interval=60)
+            for i in range(3):
+                batcher.add(telegram_id=i, event_type="user.started")
+            await asyncio.sleep(0.01)
+
+            assert route.call_count == 1
+            assert batcher.sent == 3
+            assert len(batcher) == 0
+            await batcher.close()
+
+        assert route.call_count == 1
+
+    @pytest.mark.asyncio
+    @respx.mock
+    async def test_flush_by_interval(self, base_url):
+        """Pending events should be sent after flush_interval."""
+        route = respx.post(f"{base_url}/events/batch").mock(
+            return_value=httpx.Response(200, json={"accepted": 1, "errors": []})
+        )
+
+        async with AnalyticsClient(base_url=base_url) as client:
+            batcher = EventBatcher(client, max_batch=100, flush_interval=0.01)
+            batcher.add(telegram_id=1, event_type="user.started", event_data={"a": 1})
+            await asyncio.sleep(0.05)
+
+            assert route.call_count == 1
+            await batcher.close()
+
+    @pytest.mark.asyncio
+    @respx.mock
+    async def test_close_sends_remaining(self, base_url):
+        """close() should send events that have not been flushed yet."""
+        route = respx.post(f"{base_url}/events/batch").mock(
+            return_value=httpx.Response(200, json={"accepted": 2, "errors": []})
+        )
+
+        async with AnalyticsClient(base_url=base_url) as client:
+            batcher = EventBatcher(client, max_batch=100, flush_interval=60)
+            batcher.add(telegram_id=1, event_type="user.started")
+            batcher.add(telegram_id=2, event_type="user.started")
+            await batcher.close()
+
+        assert route.call_count == 1
+        assert batcher.requests == 1
+
+    @pytest.mark.asyncio
+    @respx.mock
+    async def test_failed_events_passed_to_callback(self, base_url):
+        """Rejected events should be handed to on_failure."""
+        respx.post(f"{base_url}/events/batch").mock(
+            return_value=httpx.Response(
+                200, json={"accepted": 1, "errors": [{"index": 0, "detail": "bad"}]}
+            )
+        )
+        failed = []
+
+        async def on_failure(events):
+            failed.extend(events)
+
+        async with AnalyticsClient(base_url=base_url) as client:
+            batcher = EventBatcher(client, flush_interval=60, on_failure=on_failure)
+            batcher.add(telegram_id=1, event_type="bad.type")
+            batcher.add(telegram_id=2, event_type="user.started")
+            await batcher.close()
+
+        assert failed == [{"telegram_id": 1, "event_type": "bad.type"}]
+        assert batcher.failed == 1
+
+    @pytest.mark.asyncio
+    @respx.mock
+    async def test_result_passed_to_callback(self, base_url):
+        """on_result should receive the BatchResult of every flush."""
+        respx.post(f"{base_url}/events/batch").mock(
+            return_value=httpx.Response(200, json={"accepted": 2, "errors": []})
+        )
+        results = []
+
+        async with AnalyticsClient(base_url=base_url) as client:
+            batcher = EventBatcher(client, flush_interval=60, on_result=results.append)
+            batcher.add(telegram_id=1, event_type="user.started")
+            batcher.add(telegram_id=2, event_type="user.started")
+            await batcher.close()
+
+        assert [result.accepted for result in results] == [2]
+
+    @pytest.mark.asyncio
+    async def test_unexpected_error_passes_events_to_callback(self, base_url):
+        """Events of a flush that raised should reach on_failure, not be lost."""
+        failed = []
+
+        async def on_failure(events):
+            failed.extend(events)
+
+        async with AnalyticsClient(base_url=base_url) as client:
+            batcher = EventBatcher(client, flush_interval=60, on_failure=on_failure)
+
+            async def broken(events, chunk_size):
+                raise RuntimeError("unexpected")
+
+            client.events.record_batch = broken
+            batcher.add(telegram_id=1, event_type="user.started")
+            result = await batcher.flush()
+
+        assert result.retryable_indexes == [0]
+        assert failed == [{"telegram_id": 1, "event_type": "user.started"}]
+        assert len(batcher) == 0
@@ -11,7 +11,13 @@ from analytics_client.exceptions import (
     TimeoutError,
     ValidationError,
 )
-from analytics_client.models import DailyStats, EventCreated, UsersCount
+from analytics_client.models import (
+    BatchResult,
+    DailyStats,
+    DigestStats,
+    EventCreated,
+    UsersCount,
+)
 
 
 class TestAnalyticsClientInit:
@@ -67,6 +73,41 @@ class TestAnalyticsClientContextManager:
             _ = client.stats
 
 
+class TestAnalyticsClientLongLived:
+    """Test AnalyticsClient open/close lifecycle."""
+
+    @pytest.mark.asyncio
+    async def test_open_is_idempotent(self, base_url):
+        """open() should reuse the existing HTTP client."""
+        client = AnalyticsClient(base_url=base_url)
+        await client.open()
+        inner_client = client._client
+        await client.open()
+        assert client._client is inner_client
+        await client.close()
+        assert inner_client.is_closed
+        assert not client.is_open
+
+    @pytest.mark.asyncio
+    @respx.mock
+    async def test_reuses_connection_pool_across_calls(self, base_url):
+        """Several requests should go through one HTTP client."""
+        route = respx.post(f"{base_url}/events").mock(
+            return_value=httpx.Response(201, json={"id": 1, "status": "created"})
+        )
+        client = AnalyticsClient(
+            base_url=base_url,
+            limits=httpx.Limits(max_connections=5, max_keepalive_connections=5),
+        )
+        await client.open()
+        inner_client = client._client
+        await client.events.record(telegram_id=1, event_type="user.started")
+        await client.events.record(telegram_id=2, event_type="user.started")
+        assert client._client is inner_client
+        assert route.call_count == 2
+        await client.close()
+
+
 class TestEventsClient:
     """Test events functionality."""
 
@@ -134,6 +175,101 @@ class TestEventsClient:
         assert '"event_data"' not in body
 
 
+class TestEventsBatch:
+    """Test batch event ingestion."""
+
+    @pytest.mark.asyncio
+    @respx.mock
+    async def test_record_batch_single_request(self, base_url):
+        """events.record_batch() should post all events in one request."""
+        route = respx.post(f"{base_url}/events/batch").mock(
+            return_value=httpx.Response(200, json={"accepted": 3, "errors": []})
+        )
+
+        async with AnalyticsClient(base_url=base_url) as client:
+            result = await client.events.record_batch([
+                {"telegram_id": 1, "event_type": "user.started"},
+                {"telegram_id": 2, "event_type": "article.requested",
+                 "event_data": {"nm_id": 5}},
+                {"telegram_id": 3, "event_type": "user.started", "event_data": None},
+            ])
+
+        assert isinstance(result, BatchResult)
+        assert result.ok
+        assert result.accepted == 3
+        assert route.call_count == 1
+        body = route.calls[0].request.content.decode()
+        assert body.count('"event_data"') == 1
+
+    @pytest.mark.asyncio
+    @respx.mock
+    async def test_record_batch_chunks(self, base_url):
+        """events.record_batch() should split events into chunks."""
+        route = respx.post(f"{base_url}/events/batch").mock(
+            side_effect=[
+                httpx.Response(200, json={"accepted": 2, "errors": []}),
+                httpx.Response(200, json={"accepted": 2, "errors": []}),
+                httpx.Response(200, json={"accepted": 1, "errors": []}),
+            ]
+        )
+        events = [{"telegram_id": i, "event_type": "user.started"} for i in range(5)]
+
+        async with AnalyticsClient(base_url=base_url) as client:
+            result = await client.events.record_batch(events, chunk_size=2)
+
+        assert route.call_count == 3
+        assert result.accepted == 5
+
+    @pytest.mark.asyncio
+    @respx.mock
+    async def test_record_batch_partial_failure(self, base_url):
+        """Rejected events and failed chunks should be reported by index."""
+        respx.post(f"{base_url}/events/batch").mock(
+            side_effect=[
+                httpx.Response(
+                    200,
+                    json={"accepted": 1, "errors": [{"index": 1, "detail": "bad type"}]},
+                ),
+                httpx.Response(503, json={"detail": "Service Unavailable"}),
+            ]
+        )
+        events = [{"telegram_id": i, "event_type": "user.started"} for i in range(4)]
+
+        async with AnalyticsClient(base_url=base_url) as client:
+            result = await client.events.record_batch(events, chunk_size=2)
+
+        assert not result.ok
+        assert result.accepted == 1
+        assert result.failed_indexes == [1, 2, 3]
+        assert result.retryable_indexes == [2, 3]
+        assert "503" in result.errors[-1].detail
+
+    @pytest.mark.asyncio
+    @respx.mock
+    async def test_record_batch_transport_error_retryable(self, base_url):
+        """Any transport error should fail its chunk as retryable."""
+        respx.post(f"{base_url}/events/batch").mock(
+            side_effect=[
+                httpx.RemoteProtocolError("Server disconnected"),
+                httpx.Response(200, json={"accepted": 2, "errors": []}),
+            ]
+        )
+        events = [{"telegram_id": i, "event_type": "user.started"} for i in range(4)]
+
+        async with AnalyticsClient(base_url=base_url) as client:
+            result = await client.events.record_batch(events, chunk_size=2)
+
+        assert result.accepted == 2
+        assert result.retryable_indexes == [0, 1]
+
+    @pytest.mark.asyncio
+    async def test_record_batch_invalid_chunk_size(self, base_url):
+        """chunk_size below 1 should be rejected."""
+        async with AnalyticsClient(base_url=base_url) as client:
+            with pytest.raises(ValueError):
+                await client.events.record_batch([], chunk_size=0)
+
+
 class TestStatsClient:
     """Test statistics functionality."""
 
@@ -211,6 +347,82 @@ class TestStatsClient:
             assert result.count == 0
 
 
+class TestDigest:
+    """Test combined digest statistics."""
+
+    @pytest.mark.asyncio
+    @respx.mock
+    async def test_get_digest_single_request(self, base_url):
+        """stats.get_digest() should use /stats/digest when available."""
+        route = respx.get(f"{base_url}/stats/digest").mock(
+            return_value=httpx.Response(
+                200,
+                json={
+                    "date": "2026-02-08",
+                    "stats": {"article_request": 10},
+                    "total_events": 10,
+                    "users_count": 42,
+                    "funnel_started": 40,
+                    "funnel_active": 30,
+                    "funnel_returning": 15,
+                },
+            )
+        )
+        daily = respx.get(f"{base_url}/stats/daily")
+
+        async with AnalyticsClient(base_url=base_url) as client:
+            result = await client.stats.get_digest("2026-02-08")
+
+        assert isinstance(result, DigestStats)
+        assert result.users_count == 42
+        assert result.funnel_returning == 15
+        assert route.call_count == 1
+        assert route.calls[0].request.url.params["date"] == "2026-02-08"
+        assert daily.call_count == 0
+
+    @pytest.mark.asyncio
+    @respx.mock
+    async def test_get_digest_falls_back_to_fan_out(self, base_url):
+        """Without /stats/digest the client should fetch parts concurrently."""
+        digest = respx.get(f"{base_url}/stats/digest").mock(
+            return_value=httpx.Response(404, json={"detail": "Not Found"})
+        )
+        respx.get(f"{base_url}/stats/daily").mock(
+            return_value=httpx.Response(
+                200,
+                json={"date": "2026-02-08", "stats": {"user_start": 3}, "total_events": 3},
+            )
+        )
+        respx.get(f"{base_url}/stats/users/count").mock(
+            return_value=httpx.Response(200, json={"count": 42})
+        )
+        respx.get(
+            f"{base_url}/stats/users/by-event",
+            params={"event_type": "user_start", "min_count": 1},
+        ).mock(return_value=httpx.Response(200, json={"count": 40}))
+        respx.get(
+            f"{base_url}/stats/users/by-event",
+            params={"event_type": "article_request", "min_count": 1},
+        ).mock(return_value=httpx.Response(200, json={"count": 30}))
+        respx.get(
+            f"{base_url}/stats/users/by-event",
+            params={"event_type": "article_request", "min_count": 2},
+        ).mock(return_value=httpx.Response(200, json={"count": 15}))
+
+        async with AnalyticsClient(base_url=base_url) as client:
+            first = await client.stats.get_digest("2026-02-08")
+            second = await client.stats.get_digest("2026-02-08")
+
+        assert first == second
+        assert first.stats == {"user_start": 3}
+        assert first.users_count == 42
+        assert (first.funnel_started, first.funnel_active, first.funnel_returning) == (
+            40, 30, 15
+        )
+        # Missing endpoint is remembered
+        assert digest.call_count == 1
+
+
 class TestErrorHandling:
     """Test HTTP error handling."""
 
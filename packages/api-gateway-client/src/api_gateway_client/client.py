@@ -233,6 +233,12 @@ class APIGatewayClient:
             token = await client.tokens.get_next(telegram_id=123)
             await client.tokens.add(telegram_id=123, plain_token="abc")
             await client.tokens.delete(token_id=1)
+
+    Long-lived usage (one connection pool for the whole process):
+        client = APIGatewayClient(base_url="http://api-gateway:8000")
+        await client.open()
+        ...
+        await client.close()
     """
 
     def __init__(
@@ -240,6 +246,8 @@ class APIGatewayClient:
         base_url: str,
         api_key: Optional[str] = None,
         timeout: float = 10.0,
+        limits: Optional[httpx.Limits] = None,
+        http2: bool = False,
     ):
         """Initialize API Gateway Client.
 
@@ -247,25 +255,37 @@ class APIGatewayClient:
             base_url: Base URL for API Gateway (e.g., http://localhost:8000)
             api_key: Optional JWT token for authentication
             timeout: Request timeout in seconds
+            limits: Connection pool limits (httpx defaults if None)
+            http2: Enable HTTP/2 (requires the ``http2`` extra)
         """
         self.base_url = base_url
         self.api_key = api_key
         self.timeout = timeout
+        self.limits = limits
+        self.http2 = http2
         self._client: Optional[httpx.AsyncClient] = None
         self._health: Optional[HealthClient] = None
         self._users: Optional[UsersClient] = None
         self._tokens: Optional[TokensClient] = None
 
-    async def __aenter__(self):
-        """Enter context manager - create HTTP client."""
+    async def open(self) -> "APIGatewayClient":
+        """Create HTTP client (no-op if already open)."""
+        if self._client is not None:
+            return self
+
         headers = {}
         if self.api_key:
             headers["Authorization"] = f"Bearer {self.api_key}"
 
+        kwargs: Dict[str, Any] = {}
+        if self.limits is not None:
+            kwargs["limits"] = self.limits
         self._client = httpx.AsyncClient(
             base_url=self.base_url,
             timeout=self.timeout,
             headers=headers,
+            http2=self.http2,
+            **kwargs,
         )
 
         self._health = HealthClient(self._client)
@@ -274,28 +294,45 @@ class APIGatewayClient:
 
         return self
 
-    async def __aexit__(self, exc_type, exc_val, exc_tb):
-        """Exit context manager - close HTTP client."""
+    async def close(self) -> None:
+        """Close HTTP client and its connection pool."""
         if self._client:
             await self._client.aclose()
+        self._client = None
+        self._health = None
+        self._users = None
+        self._tokens = None
+
+    @property
+    def is_open(self) -> bool:
+        """Whether HTTP client is open."""
+        return self._client is not None
+
+    async def __aenter__(self):
+        """Enter context manager - create HTTP client."""
+        return await self.open()
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        """Exit context manager - close HTTP client."""
+        await self.close()
 
     @property
     def health(self) -> HealthClient:
         """Health check client."""
         if self._health is None:
-            raise RuntimeError("Client not initialized. Use 'async with' context manager.")
+            raise RuntimeError("Client not initialized. Use 'async with' or open().")
         return self._health
 
     @property
     def users(self) -> UsersClient:
         """Users management client."""
         if self._users is None:
-            raise RuntimeError("Client not initialized. Use 'async with' context manager.")
+            raise RuntimeError("Client not initialized. Use 'async with' or open().")
         return self._users
 
     @property
     def tokens(self) -> TokensClient:
         """Tokens management client."""
         if self._tokens is None:
-            raise RuntimeError("Client not initialized. Use 'async with' context manager.")
+            raise RuntimeError("Client not initialized. Use 'async with' or open().")
         return self._tokens
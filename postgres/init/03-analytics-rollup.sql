@@ -0,0 +1,78 @@
+-- Миграция 03: Дневной rollup статистики
+-- Версия: 0.6.0
+-- Дата: 2026-10-19
+
+-- Предрасчитанная статистика по дням (UTC): дайджест и отчёты за период
+-- читают готовые строки вместо сканирования shared.analytics_events
+CREATE TABLE IF NOT EXISTS shared.analytics_daily_rollup (
+    day DATE PRIMARY KEY,
+    new_users BIGINT NOT NULL DEFAULT 0,
+    total_users BIGINT NOT NULL DEFAULT 0,
+    returning_users BIGINT NOT NULL DEFAULT 0,
+    article_requests BIGINT NOT NULL DEFAULT 0,
+    photos_sent BIGINT NOT NULL DEFAULT 0,
+    unique_products BIGINT NOT NULL DEFAULT 0,
+    videos_sent BIGINT NOT NULL DEFAULT 0,
+    errors BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP NOT NULL DEFAULT (NOW() AT TIME ZONE 'UTC')
+);
+
+COMMENT ON TABLE shared.analytics_daily_rollup IS 'Дневная статистика бота (пересчитывается ежечасно за сегодня и вчера)';
+COMMENT ON COLUMN shared.analytics_daily_rollup.day IS 'День (UTC)';
+COMMENT ON COLUMN shared.analytics_daily_rollup.new_users IS 'Новых пользователей за день';
+COMMENT ON COLUMN shared.analytics_daily_rollup.total_users IS 'Всего пользователей на конец дня';
+COMMENT ON COLUMN shared.analytics_daily_rollup.returning_users IS 'Вернувшихся пользователей (повторный /start)';
+COMMENT ON COLUMN shared.analytics_daily_rollup.article_requests IS 'Запросов артикулов';
+COMMENT ON COLUMN shared.analytics_daily_rollup.photos_sent IS 'Отправлено фото';
+COMMENT ON COLUMN shared.analytics_daily_rollup.unique_products IS 'Уникальных товаров с отправленными фото';
+COMMENT ON COLUMN shared.analytics_daily_rollup.videos_sent IS 'Отправлено видео';
+COMMENT ON COLUMN shared.analytics_daily_rollup.errors IS 'Ошибок';
+COMMENT ON COLUMN shared.analytics_daily_rollup.updated_at IS 'Время последнего пересчёта (UTC)';
+
+-- Заполнение rollup за прошедшие дни (по одному проходу на день)
+INSERT INTO shared.analytics_daily_rollup (
+    day, new_users, total_users, returning_users, article_requests,
+    photos_sent, unique_products, videos_sent, errors
+)
+SELECT d.day, u.new_users, u.total_users, e.returning_users, e.article_requests,
+       e.photos_sent, e.unique_products, e.videos_sent, e.errors
+FROM (
+    SELECT generate_series(
+        (SELECT MIN(created_at)::date FROM shared.analytics_events),
+        (NOW() AT TIME ZONE 'UTC')::date - 1,
+        INTERVAL '1 day'
+    )::date AS day
+) d
+CROSS JOIN LATERAL (
+    SELECT
+        COUNT(*) FILTER (WHERE first_seen >= d.day) AS new_users,
+        COUNT(*) AS total_users
+    FROM shared.users
+    WHERE first_seen < d.day + 1
+) u
+CROSS JOIN LATERAL (
+    SELECT
+        COUNT(DISTINCT telegram_id) FILTER (
+            WHERE event_type = 'user_start' AND event_data->>'is_new' = 'false'
+        ) AS returning_users,
+        COUNT(*) FILTER (WHERE event_type = 'article_request') AS article_requests,
+        COALESCE(
+            SUM((event_data->>'count')::int) FILTER (WHERE event_type = 'photo_sent'),
+            0
+        ) AS photos_sent,
+        COUNT(DISTINCT event_data->>'nm_id') FILTER (
+            WHERE event_type = 'photo_sent'
+        ) AS unique_products,
+        COUNT(*) FILTER (WHERE event_type = 'video_sent') AS videos_sent,
+        COUNT(*) FILTER (WHERE event_type = 'error') AS errors
+    FROM shared.analytics_events
+    WHERE created_at >= d.day AND created_at < d.day + 1
+) e
+ON CONFLICT (day) DO NOTHING;
+
+DO $$
+BEGIN
+    RAISE NOTICE 'Миграция 03-analytics-rollup.sql успешно выполнена';
+    RAISE NOTICE 'Создано:';
+    RAISE NOTICE '  - Таблица: shared.analytics_daily_rollup';
+END $$;
@@ -0,0 +1,175 @@
+-- Миграция 04: Помесячное партиционирование shared.analytics_events
+-- Версия: 0.6.0
+-- Дата: 2026-10-19
+--
+-- Таблица событий становится декларативно партиционированной по created_at
+-- (одна партиция на месяц). Вставка и индексы работают с небольшой текущей
+-- партицией, запросы по датам отсекают лишние партиции, а старые данные
+-- убираются отсоединением партиций вместо массовых DELETE.
+--
+-- События вне созданных месячных партиций (часы сервера ушли вперёд,
+-- партиции не созданы вовремя) попадают в партицию DEFAULT, а не
+-- отклоняются; ensure_analytics_partitions переносит их в партицию месяца
+-- при её создании.
+--
+-- Подпартиционирования по боту нет: таблицу пишут все боты экосистемы,
+-- но колонки с ботом в ней нет — события различаются только event_type.
+-- Ключ по боту потребовал бы добавить колонку и заполнять её во всех
+-- ботах одновременно; до этого все строки попали бы в одну подпартицию.
+
+-- Схема для отсоединённых (архивных) партиций
+CREATE SCHEMA IF NOT EXISTS shared_archive;
+
+-- Создание партиций от месяца p_from до текущего месяца + p_months_ahead
+CREATE OR REPLACE FUNCTION shared.ensure_analytics_partitions(
+    p_months_ahead INT DEFAULT 2,
+    p_from DATE DEFAULT NULL
+) RETURNS INT
+LANGUAGE plpgsql AS $$
+DECLARE
+    v_month DATE := date_trunc('month', COALESCE(p_from, (NOW() AT TIME ZONE 'UTC')::date))::date;
+    v_last DATE := (
+        date_trunc('month', NOW() AT TIME ZONE 'UTC') + make_interval(months => p_months_ahead)
+    )::date;
+    v_next DATE;
+    v_name TEXT;
+    v_in_default BOOLEAN;
+    v_created INT := 0;
+BEGIN
+    WHILE v_month <= v_last LOOP
+        v_name := 'analytics_events_' || to_char(v_month, 'YYYY_MM');
+        v_next := (v_month + INTERVAL '1 month')::date;
+        IF to_regclass('shared.' || v_name) IS NULL THEN
+            v_in_default := FALSE;
+            IF to_regclass('shared.analytics_events_default') IS NOT NULL THEN
+                SELECT EXISTS (
+                    SELECT 1 FROM shared.analytics_events_default
+                    WHERE created_at >= v_month AND created_at < v_next
+                ) INTO v_in_default;
+            END IF;
+
+            -- Партиция месяца не создаётся, пока в DEFAULT есть строки этого
+            -- месяца: DEFAULT отсоединяется, строки переносятся в новую партицию
+            IF v_in_default THEN
+                ALTER TABLE shared.analytics_events
+                    DETACH PARTITION shared.analytics_events_default;
+            END IF;
+            EXECUTE format(
+                'CREATE TABLE shared.%I PARTITION OF shared.analytics_events '
+                'FOR VALUES FROM (%L) TO (%L)',
+                v_name, v_month, v_next
+            );
+            IF v_in_default THEN
+                INSERT INTO shared.analytics_events (id, telegram_id, event_type, event_data, created_at)
+                SELECT id, telegram_id, event_type, event_data, created_at
+                FROM shared.analytics_events_default
+                WHERE created_at >= v_month AND created_at < v_next;
+                DELETE FROM shared.analytics_events_default
+                WHERE created_at >= v_month AND created_at < v_next;
+                ALTER TABLE shared.analytics_events
+                    ATTACH PARTITION shared.analytics_events_default DEFAULT;
+            END IF;
+            v_created := v_created + 1;
+        END IF;
+        v_month := v_next;
+    END LOOP;
+    RETURN v_created;
+END $$;
+
+COMMENT ON FUNCTION shared.ensure_analytics_partitions(INT, DATE) IS
+    'Создаёт недостающие месячные партиции shared.analytics_events вперёд (строки месяца из DEFAULT переносятся)';
+
+-- Отсоединение партиций старше p_keep_months полных месяцев в shared_archive
+CREATE OR REPLACE FUNCTION shared.detach_old_analytics_partitions(p_keep_months INT)
+RETURNS SETOF TEXT
+LANGUAGE plpgsql AS $$
+DECLARE
+    v_cutoff DATE := (
+        date_trunc('month', NOW() AT TIME ZONE 'UTC') - make_interval(months => p_keep_months)
+    )::date;
+    v_partition TEXT;
+BEGIN
+    FOR v_partition IN
+        SELECT c.relname
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = 'shared.analytics_events'::regclass
+          AND c.relname ~ '^analytics_events_[0-9]{4}_[0-9]{2}$'
+          AND to_date(right(c.relname, 7), 'YYYY_MM') < v_cutoff
+        ORDER BY c.relname
+    LOOP
+        EXECUTE format(
+            'ALTER TABLE shared.analytics_events DETACH PARTITION shared.%I', v_partition
+        );
+        EXECUTE format('ALTER TABLE shared.%I SET SCHEMA shared_archive', v_partition);
+        RETURN NEXT v_partition;
+    END LOOP;
+END $$;
+
+COMMENT ON FUNCTION shared.detach_old_analytics_partitions(INT) IS
+    'Отсоединяет старые партиции shared.analytics_events и переносит их в shared_archive';
+
+-- Перенос существующей таблицы в партиционированную
+DO $$
+DECLARE
+    v_first DATE;
+BEGIN
+    IF EXISTS (
+        SELECT 1 FROM pg_partitioned_table
+        WHERE partrelid = 'shared.analytics_events'::regclass
+    ) THEN
+        RAISE NOTICE 'shared.analytics_events уже партиционирована - пропуск';
+        RETURN;
+    END IF;
+
+    ALTER TABLE shared.analytics_events RENAME TO analytics_events_legacy;
+    ALTER INDEX IF EXISTS shared.analytics_events_pkey RENAME TO analytics_events_legacy_pkey;
+    ALTER SEQUENCE IF EXISTS shared.analytics_events_id_seq RENAME TO analytics_events_legacy_id_seq;
+
+    CREATE TABLE shared.analytics_events (
+        id BIGINT GENERATED BY DEFAULT AS IDENTITY,
+        telegram_id BIGINT NOT NULL REFERENCES shared.users(telegram_id) ON DELETE CASCADE,
+        event_type VARCHAR(50) NOT NULL,
+        event_data JSONB,
+        created_at TIMESTAMP NOT NULL DEFAULT NOW(),
+        PRIMARY KEY (id, created_at)
+    ) PARTITION BY RANGE (created_at);
+
+    SELECT MIN(created_at)::date INTO v_first FROM shared.analytics_events_legacy;
+    PERFORM shared.ensure_analytics_partitions(2, v_first);
+
+    INSERT INTO shared.analytics_events (id, telegram_id, event_type, event_data, created_at)
+    SELECT id, telegram_id, event_type, event_data, COALESCE(created_at, NOW())
+    FROM shared.analytics_events_legacy;
+
+    PERFORM setval(
+        pg_get_serial_sequence('shared.analytics_events', 'id'),
+        COALESCE((SELECT MAX(id) FROM shared.analytics_events), 0) + 1,
+        false
+    );
+
+    DROP TABLE shared.analytics_events_legacy;
+END $$;
+
+-- Партиция для событий вне месячных партиций (по retention не отсоединяется)
+CREATE TABLE IF NOT EXISTS shared.analytics_events_default
+    PARTITION OF shared.analytics_events DEFAULT;
+
+COMMENT ON TABLE shared.analytics_events IS 'События аналитики для всех ботов экосистемы (помесячные партиции)';
+COMMENT ON COLUMN shared.analytics_events.created_at IS 'Время создания события (ключ партиционирования)';
+
+-- Индексы создаются на каждой партиции; отдельные индексы по created_at
+-- и event_type не нужны (их покрывают отсечение партиций и составной индекс)
+CREATE INDEX IF NOT EXISTS idx_analytics_events_date_type
+    ON shared.analytics_events (created_at, event_type);
+CREATE INDEX IF NOT EXISTS idx_analytics_events_telegram_id
+    ON shared.analytics_events (telegram_id);
+
+DO $$
+BEGIN
+    RAISE NOTICE 'Миграция 04-analytics-partitioning.sql успешно выполнена';
+    RAISE NOTICE 'Создано:';
+    RAISE NOTICE '  - Партиционированная таблица: shared.analytics_events (по месяцам + DEFAULT)';
+    RAISE NOTICE '  - Функции: shared.ensure_analytics_partitions, shared.detach_old_analytics_partitions';
+    RAISE NOTICE '  - Схема: shared_archive';
+END $$;
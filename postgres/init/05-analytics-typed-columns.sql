@@ -0,0 +1,44 @@
+-- Миграция 05: Типизированные колонки событий аналитики
+-- Версия: 0.6.0
+-- Дата: 2026-10-19
+--
+-- Поля, по которым считается статистика, выносятся из event_data (JSONB)
+-- в генерируемые колонки. Таблица общая для ботов экосистемы и
+-- analytics-service, поэтому колонки вычисляются самой БД из event_data
+-- для любого писателя (и для исторических строк), а не заполняются ботом.
+-- Некорректные значения в event_data дают NULL, а не ошибку вставки.
+
+ALTER TABLE shared.analytics_events
+    ADD COLUMN IF NOT EXISTS nm_id BIGINT GENERATED ALWAYS AS (
+        CASE WHEN event_data->>'nm_id' ~ '^[0-9]{1,18}$'
+            THEN (event_data->>'nm_id')::bigint END
+    ) STORED,
+    ADD COLUMN IF NOT EXISTS count INT GENERATED ALWAYS AS (
+        CASE WHEN event_type = 'photo_sent' AND event_data->>'count' ~ '^[0-9]{1,9}$'
+            THEN (event_data->>'count')::int END
+    ) STORED,
+    ADD COLUMN IF NOT EXISTS is_new BOOLEAN GENERATED ALWAYS AS (
+        CASE WHEN event_type = 'user_start' AND event_data->>'is_new' IN ('true', 'false')
+            THEN (event_data->>'is_new')::boolean END
+    ) STORED,
+    ADD COLUMN IF NOT EXISTS error_type VARCHAR(100) GENERATED ALWAYS AS (
+        CASE WHEN event_type = 'error'
+            THEN left(event_data->>'error_type', 100) END
+    ) STORED;
+
+COMMENT ON COLUMN shared.analytics_events.nm_id IS 'Артикул WB из event_data (article_request, photo_sent, video_sent)';
+COMMENT ON COLUMN shared.analytics_events.count IS 'Количество отправленных фото из event_data (photo_sent)';
+COMMENT ON COLUMN shared.analytics_events.is_new IS 'Новый пользователь из event_data (user_start)';
+COMMENT ON COLUMN shared.analytics_events.error_type IS 'Тип ошибки из event_data (error)';
+
+-- Отдельных индексов по типам событий нет: однопроходная дневная
+-- статистика (_DAILY_STATS_SQL) читает все события дня по диапазону
+-- created_at (составной индекс из миграции 04), а каждый лишний индекс
+-- удорожает запись в самую нагруженную таблицу
+
+DO $$
+BEGIN
+    RAISE NOTICE 'Миграция 05-analytics-typed-columns.sql успешно выполнена';
+    RAISE NOTICE 'Создано:';
+    RAISE NOTICE '  - Генерируемые колонки: nm_id, count, is_new, error_type';
+END $$;
@@ -0,0 +1,20 @@
+-- Миграция 06: Общие token buckets для rate limiter пользователей
+-- Версия: 0.6.0
+-- Дата: 2026-10-19
+--
+-- Состояние лимитера пользователей, общее для всех реплик бота
+-- (RATE_LIMIT_BACKEND=postgres). Таблица UNLOGGED: после аварийного
+-- рестарта PostgreSQL она очищается, что для лимитов безопасно, зато
+-- запись не идёт в WAL. Строки неактивных пользователей удаляет бот.
+
+CREATE UNLOGGED TABLE IF NOT EXISTS shared.user_rate_limits (
+    telegram_id BIGINT PRIMARY KEY,
+    tokens DOUBLE PRECISION NOT NULL,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_user_rate_limits_updated_at
+    ON shared.user_rate_limits (updated_at);
+
+COMMENT ON TABLE shared.user_rate_limits IS 'Token buckets rate limiter пользователей (общие для реплик)';
+COMMENT ON COLUMN shared.user_rate_limits.tokens IS 'Токены на момент updated_at';
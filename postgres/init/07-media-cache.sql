@@ -0,0 +1,20 @@
+-- Миграция 07: L2-кеш результатов поиска медиа
+-- Версия: 0.6.0
+-- Дата: 2026-10-19
+--
+-- Общий для реплик бота кеш найденных видео и basket (MEDIA_CACHE_L2=postgres).
+-- Бот загружает снимок при старте, дочитывает промахи in-memory кеша и
+-- дописывает новые записи пачками. Истекшие строки удаляются при старте бота.
+
+CREATE TABLE IF NOT EXISTS shared.media_cache (
+    namespace VARCHAR(32) NOT NULL,
+    key VARCHAR(64) NOT NULL,
+    value JSONB,
+    expires_at TIMESTAMPTZ NOT NULL,
+    PRIMARY KEY (namespace, key)
+);
+
+CREATE INDEX IF NOT EXISTS idx_media_cache_expires_at
+    ON shared.media_cache (namespace, expires_at);
+
+COMMENT ON TABLE shared.media_cache IS 'L2-кеш поиска медиа (video: nm_id → URL или null, basket: vol → basket)';
@@ -2,14 +2,94 @@
 
 import logging
 from datetime import date, datetime, timedelta
-from typing import Dict, Optional
+from typing import Dict, List, Optional
 
 import asyncpg
 
+from config.settings import get_settings
 from db.connection import get_pool
+from services.event_buffer import get_event_buffer
 
 logger = logging.getLogger(__name__)
 
+# Показатели дневной статистики (колонки shared.analytics_daily_rollup)
+STAT_KEYS = (
+    "new_users",
+    "total_users",
+    "returning_users",
+    "article_requests",
+    "photos_sent",
+    "unique_products",
+    "videos_sent",
+    "errors",
+)
+
+# Все показатели дня за один проход по событиям дня ($2 <= created_at < $3)
+_DAILY_STATS_SQL = """
+    SELECT
+        u.new_users,
+        u.total_users,
+        e.returning_users,
+        e.article_requests,
+        e.photos_sent,
+        e.unique_products,
+        e.videos_sent,
+        e.errors
+    FROM (
+        SELECT
+            COUNT(*) FILTER (WHERE first_seen >= $2) AS new_users,
+            COUNT(*) AS total_users
+        FROM shared.users
+        WHERE first_seen < $3
+    ) u
+    CROSS JOIN (
+        SELECT
+            COUNT(DISTINCT telegram_id) FILTER (
+                WHERE event_type = 'user_start' AND NOT is_new
+            ) AS returning_users,
+            COUNT(*) FILTER (WHERE event_type = 'article_request') AS article_requests,
+            COALESCE(SUM(count) FILTER (WHERE event_type = 'photo_sent'), 0) AS photos_sent,
+            COUNT(DISTINCT nm_id) FILTER (WHERE event_type = 'photo_sent') AS unique_products,
+            COUNT(*) FILTER (WHERE event_type = 'video_sent') AS videos_sent,
+            COUNT(*) FILTER (WHERE event_type = 'error') AS errors
+        FROM shared.analytics_events
+        WHERE created_at >= $2 AND created_at < $3
+    ) e
+"""
+
+# Пересчёт строки дня в rollup ($1 — день)
+_REFRESH_ROLLUP_SQL = f"""
+    INSERT INTO shared.analytics_daily_rollup (day, {", ".join(STAT_KEYS)}, updated_at)
+    SELECT $1::date, s.*, NOW() AT TIME ZONE 'UTC'
+    FROM ({_DAILY_STATS_SQL}) s
+    ON CONFLICT (day) DO UPDATE SET
+        {", ".join(f"{key} = EXCLUDED.{key}" for key in STAT_KEYS)},
+        updated_at = EXCLUDED.updated_at
+    RETURNING {", ".join(STAT_KEYS)}
+"""
+
+# Rollup считается окончательным, если посчитан позже конца дня + запас
+# на события, ещё лежавшие в буфере записи
+_ROLLUP_FINAL_GRACE = timedelta(minutes=5)
+
+# Строка rollup, посчитанная после окончания дня (окончательная)
+_FINAL_ROLLUP_SQL = f"""
+    SELECT {", ".join(STAT_KEYS)}
+    FROM shared.analytics_daily_rollup
+    WHERE day = $1 AND updated_at >= $2
+"""
+
+
+def _day_bounds(target_date: date):
+    """Начало и конец дня (UTC)."""
+    start_dt = datetime.combine(target_date, datetime.min.time())
+    end_dt = datetime.combine(target_date + timedelta(days=1), datetime.min.time())
+    return start_dt, end_dt
+
+
+def _row_to_stats(row) -> Dict:
+    return {key: row[key] or 0 for key in STAT_KEYS}
+
 
 class AnalyticsService:
     """Сервис для отслеживания событий и сбора статистики."""
@@ -24,9 +104,9 @@ class AnalyticsService:
         """
         Отследить запуск бота пользователем (/start).
 
-        Создаёт запись в shared.users если пользователь новый,
-        обновляет last_seen если пользователь уже существует.
-        Создаёт событие 'user_start' в shared.analytics_events.
+        Одним запросом (upsert + событие в CTE): создаёт запись в shared.users
+        если пользователь новый, иначе обновляет last_seen и данные профиля,
+        и создаёт событие 'user_start' в shared.analytics_events.
 
         Args:
             user_id: Telegram ID пользователя
@@ -45,53 +125,39 @@ class AnalyticsService:
 
         try:
             async with pool.acquire() as conn:
-                # Проверяем существование пользователя
-                existing = await conn.fetchrow(
-                    "SELECT telegram_id FROM shared.users WHERE telegram_id = $1",
-                    user_id
-                )
-
-                is_new_user = existing is None
-
-                if is_new_user:
-                    # Новый пользователь - создаём запись
-                    await conn.execute(
-                        """
+                # xmax = 0 только у только что вставленной строки
+                is_new_user = await conn.fetchval(
+                    """
+                    WITH upsert AS (
                         INSERT INTO shared.users (telegram_id, username, first_name, last_name)
                         VALUES ($1, $2, $3, $4)
-                        """,
-                        user_id, username, first_name, last_name
-                    )
-                    logger.info(
-                        f"✅ Новый пользователь добавлен в БД: "
-                        f"id={user_id}, @{username or 'no_username'}"
-                    )
-                else:
-                    # Повторный пользователь - обновляем last_seen и данные
-                    await conn.execute(
-                        """
-                        UPDATE shared.users
+                        ON CONFLICT (telegram_id) DO UPDATE
                         SET last_seen = NOW(),
-                            username = $2,
-                            first_name = $3,
-                            last_name = $4
-                        WHERE telegram_id = $1
-                        """,
-                        user_id, username, first_name, last_name
+                            username = EXCLUDED.username,
+                            first_name = EXCLUDED.first_name,
+                            last_name = EXCLUDED.last_name
+                        RETURNING (xmax = 0) AS is_new
+                    ), event AS (
+                        INSERT INTO shared.analytics_events (
+                            telegram_id, event_type, event_data
+                        )
+                        SELECT $1, 'user_start', jsonb_build_object('is_new', is_new)
+                        FROM upsert
                     )
-                    logger.debug(f"Обновлен last_seen для user {user_id}")
-
-                # Создаём событие user_start
-                await conn.execute(
-                    """
-                    INSERT INTO shared.analytics_events (telegram_id, event_type, event_data)
-                    VALUES ($1, 'user_start', $2::jsonb)
+                    SELECT is_new FROM upsert
                     """,
-                    user_id,
-                    f'{{"is_new": {str(is_new_user).lower()}}}'
+                    user_id, username, first_name, last_name
                 )
 
-                return is_new_user
+            if is_new_user:
+                logger.info(
+                    f"✅ Новый пользователь добавлен в БД: "
+                    f"id={user_id}, @{username or 'no_username'}"
+                )
+            else:
+                logger.debug(f"Обновлен last_seen для user {user_id}")
+
+            return is_new_user
 
         except Exception as e:
             logger.warning(
@@ -104,94 +170,43 @@ class AnalyticsService:
         """
         Отследить запрос артикула пользователем.
 
+        Событие записывается пачкой через AnalyticsEventBuffer.
+
         Args:
             user_id: Telegram ID пользователя
             nm_id: Артикул WB (nmId)
         """
-        pool = await get_pool()
-        if pool is None:
-            logger.warning("БД недоступна - track_article_request пропущен")
-            return
-
-        try:
-            async with pool.acquire() as conn:
-                await conn.execute(
-                    """
-                    INSERT INTO shared.analytics_events (telegram_id, event_type, event_data)
-                    VALUES ($1, 'article_request', $2::jsonb)
-                    """,
-                    user_id,
-                    f'{{"nm_id": {nm_id}}}'
-                )
-                logger.debug(f"Событие article_request: user={user_id}, nm_id={nm_id}")
-
-        except Exception as e:
-            logger.warning(
-                f"⚠️  Ошибка при track_article_request: {type(e).__name__}: {e}"
-            )
+        get_event_buffer().add(user_id, "article_request", {"nm_id": nm_id})
+        logger.debug(f"Событие article_request: user={user_id}, nm_id={nm_id}")
 
     async def track_photos_sent(self, user_id: int, nm_id: int, count: int) -> None:
         """
         Отследить отправку фото пользователю.
 
+        Событие записывается пачкой через AnalyticsEventBuffer.
+
         Args:
             user_id: Telegram ID пользователя
             nm_id: Артикул WB (nmId)
             count: Количество отправленных фото
         """
-        pool = await get_pool()
-        if pool is None:
-            logger.warning("БД недоступна - track_photos_sent пропущен")
-            return
-
-        try:
-            async with pool.acquire() as conn:
-                await conn.execute(
-                    """
-                    INSERT INTO shared.analytics_events (telegram_id, event_type, event_data)
-                    VALUES ($1, 'photo_sent', $2::jsonb)
-                    """,
-                    user_id,
-                    f'{{"nm_id": {nm_id}, "count": {count}}}'
-                )
-                logger.debug(
-                    f"Событие photo_sent: user={user_id}, nm_id={nm_id}, count={count}"
-                )
-
-        except Exception as e:
-            logger.warning(
-                f"⚠️  Ошибка при track_photos_sent: {type(e).__name__}: {e}"
-            )
+        get_event_buffer().add(user_id, "photo_sent", {"nm_id": nm_id, "count": count})
+        logger.debug(
+            f"Событие photo_sent: user={user_id}, nm_id={nm_id}, count={count}"
+        )
 
     async def track_video_sent(self, user_id: int, nm_id: int) -> None:
         """
         Отследить отправку видео пользователю.
 
+        Событие записывается пачкой через AnalyticsEventBuffer.
+
         Args:
             user_id: Telegram ID пользователя
             nm_id: Артикул WB (nmId)
         """
-        pool = await get_pool()
-        if pool is None:
-            logger.warning("БД недоступна - track_video_sent пропущен")
-            return
-
-        try:
-            async with pool.acquire() as conn:
-                await conn.execute(
-                    """
-                    INSERT INTO shared.analytics_events (telegram_id, event_type, event_data)
-                    VALUES ($1, 'video_sent', $2::jsonb)
-                    """,
-                    user_id,
-                    f'{{"nm_id": {nm_id}}}'
-                )
-                logger.debug(f"Событие video_sent: user={user_id}, nm_id={nm_id}")
-
-        except Exception as e:
-            logger.warning(
-                f"⚠️  Ошибка при track_video_sent: {type(e).__name__}: {e}"
-            )
+        get_event_buffer().add(user_id, "video_sent", {"nm_id": nm_id})
+        logger.debug(f"Событие video_sent: user={user_id}, nm_id={nm_id}")
 
     async def track_error(
         self,
@@ -202,42 +217,29 @@ class AnalyticsService:
         """
         Отследить ошибку при работе с пользователем.
 
+        Событие записывается пачкой через AnalyticsEventBuffer.
+
         Args:
             user_id: Telegram ID пользователя
             error_type: Тип ошибки (например, 'product_not_found', 'wb_api_error')
             error_message: Сообщение об ошибке
         """
-        pool = await get_pool()
-        if pool is None:
-            logger.warning("БД недоступна - track_error пропущен")
-            return
-
-        try:
-            async with pool.acquire() as conn:
-                # Экранируем кавычки в JSON
-                safe_message = error_message.replace('"', '\\"').replace("'", "\\'")
-                await conn.execute(
-                    """
-                    INSERT INTO shared.analytics_events (telegram_id, event_type, event_data)
-                    VALUES ($1, 'error', $2::jsonb)
-                    """,
-                    user_id,
-                    f'{{"error_type": "{error_type}", "message": "{safe_message}"}}'
-                )
-                logger.debug(
-                    f"Событие error: user={user_id}, type={error_type}, "
-                    f"message={error_message[:50]}"
-                )
-
-        except Exception as e:
-            logger.warning(
-                f"⚠️  Ошибка при track_error: {type(e).__name__}: {e}"
-            )
+        get_event_buffer().add(
+            user_id, "error", {"error_type": error_type, "message": error_message}
+        )
+        logger.debug(
+            f"Событие error: user={user_id}, type={error_type}, "
+            f"message={error_message[:50]}"
+        )
 
     async def get_daily_stats(self, target_date: date) -> Optional[Dict]:
         """
         Получить статистику за конкретный день.
 
+        Для завершившегося дня читается готовая строка
+        shared.analytics_daily_rollup; если её нет (или она посчитана до конца
+        дня) — день пересчитывается одним проходом и сохраняется в rollup.
+
         Args:
             target_date: Дата для получения статистики
 
@@ -261,109 +263,149 @@ class AnalyticsService:
             return None
 
         try:
+            start_dt, end_dt = _day_bounds(target_date)
             async with pool.acquire() as conn:
-                # Начало и конец дня (UTC)
-                start_dt = datetime.combine(target_date, datetime.min.time())
-                end_dt = datetime.combine(
-                    target_date + timedelta(days=1),
-                    datetime.min.time()
+                row = await conn.fetchrow(
+                    _FINAL_ROLLUP_SQL, target_date, end_dt + _ROLLUP_FINAL_GRACE
                 )
+                if row is None:
+                    row = await conn.fetchrow(
+                        _REFRESH_ROLLUP_SQL, target_date, start_dt, end_dt
+                    )
+            return _row_to_stats(row)
 
-                # Новые пользователи за день
-                new_users = await conn.fetchval(
-                    """
-                    SELECT COUNT(*)
-                    FROM shared.users
-                    WHERE first_seen >= $1 AND first_seen < $2
-                    """,
-                    start_dt, end_dt
-                )
+        except Exception as e:
+            logger.error(
+                f"❌ Ошибка при get_daily_stats для {target_date}: "
+                f"{type(e).__name__}: {e}"
+            )
+            return None
 
-                # Всего пользователей (на конец дня)
-                total_users = await conn.fetchval(
-                    "SELECT COUNT(*) FROM shared.users WHERE first_seen < $1",
-                    end_dt
-                )
+    async def refresh_daily_rollup(self, target_date: date) -> Optional[Dict]:
+        """
+        Пересчитать строку дня в shared.analytics_daily_rollup.
 
-                # Повторные пользователи (вернулись)
-                returning_users = await conn.fetchval(
-                    """
-                    SELECT COUNT(DISTINCT telegram_id)
-                    FROM shared.analytics_events
-                    WHERE event_type = 'user_start'
-                      AND created_at >= $1
-                      AND created_at < $2
-                      AND event_data->>'is_new' = 'false'
-                    """,
-                    start_dt, end_dt
-                )
+        Читаются только события этого дня (по индексу created_at),
+        поэтому стоимость не зависит от размера всей таблицы событий.
 
-                # Запросы артикулов
-                article_requests = await conn.fetchval(
-                    """
-                    SELECT COUNT(*)
-                    FROM shared.analytics_events
-                    WHERE event_type = 'article_request'
-                      AND created_at >= $1
-                      AND created_at < $2
-                    """,
-                    start_dt, end_dt
-                )
+        Args:
+            target_date: День для пересчёта
 
-                # Фото отправлено (сумма count из event_data)
-                photos_result = await conn.fetchrow(
-                    """
-                    SELECT
-                        COALESCE(SUM((event_data->>'count')::int), 0) as total_photos,
-                        COUNT(DISTINCT (event_data->>'nm_id')::int) as unique_products
-                    FROM shared.analytics_events
-                    WHERE event_type = 'photo_sent'
-                      AND created_at >= $1
-                      AND created_at < $2
-                    """,
-                    start_dt, end_dt
-                )
-                photos_sent = photos_result["total_photos"] if photos_result else 0
-                unique_products = photos_result["unique_products"] if photos_result else 0
+        Returns:
+            Статистика дня или None при ошибке БД
+        """
+        pool = await get_pool()
+        if pool is None:
+            logger.warning("БД недоступна - refresh_daily_rollup пропущен")
+            return None
 
-                # Видео отправлено
-                videos_sent = await conn.fetchval(
-                    """
-                    SELECT COUNT(*)
-                    FROM shared.analytics_events
-                    WHERE event_type = 'video_sent'
-                      AND created_at >= $1
-                      AND created_at < $2
-                    """,
-                    start_dt, end_dt
+        try:
+            start_dt, end_dt = _day_bounds(target_date)
+            async with pool.acquire() as conn:
+                row = await conn.fetchrow(
+                    _REFRESH_ROLLUP_SQL, target_date, start_dt, end_dt
                 )
+            logger.debug(f"Rollup за {target_date} обновлён")
+            return _row_to_stats(row)
 
-                # Ошибки
-                errors = await conn.fetchval(
-                    """
-                    SELECT COUNT(*)
-                    FROM shared.analytics_events
-                    WHERE event_type = 'error'
-                      AND created_at >= $1
-                      AND created_at < $2
+        except Exception as e:
+            logger.warning(
+                f"⚠️  Ошибка при refresh_daily_rollup для {target_date}: "
+                f"{type(e).__name__}: {e}"
+            )
+            return None
+
+    async def get_stats_range(self, start_date: date, end_date: date) -> Optional[List[Dict]]:
+        """
+        Получить готовую статистику за период из rollup (для недельных отчётов).
+
+        Args:
+            start_date: Первый день периода
+            end_date: Последний день периода (включительно)
+
+        Returns:
+            Список словарей {"day": date, **показатели} по возрастанию дня
+            None при ошибке БД
+        """
+        pool = await get_pool()
+        if pool is None:
+            logger.warning("БД недоступна - get_stats_range пропущен")
+            return None
+
+        try:
+            async with pool.acquire() as conn:
+                rows = await conn.fetch(
+                    f"""
+                    SELECT day, {", ".join(STAT_KEYS)}
+                    FROM shared.analytics_daily_rollup
+                    WHERE day BETWEEN $1 AND $2
+                    ORDER BY day
                     """,
-                    start_dt, end_dt
+                    start_date, end_date
                 )
-
-                return {
-                    "new_users": new_users or 0,
-                    "total_users": total_users or 0,
-                    "returning_users": returning_users or 0,
-                    "article_requests": article_requests or 0,
-                    "photos_sent": photos_sent or 0,
-                    "unique_products": unique_products or 0,
-                    "videos_sent": videos_sent or 0,
-                    "errors": errors or 0,
-                }
+            return [{"day": row["day"], **_row_to_stats(row)} for row in rows]
 
         except Exception as e:
             logger.error(
-                f"❌ Ошибка при get_daily_stats для {target_date}: "
+                f"❌ Ошибка при get_stats_range {start_date}..{end_date}: "
                 f"{type(e).__name__}: {e}"
             )
             return None
+
+    async def maintain_partitions(
+        self,
+        months_ahead: int,
+        retention_months: int
+    ) -> Optional[Dict]:
+        """
+        Обслуживание помесячных партиций shared.analytics_events.
+
+        Создаёт партиции на months_ahead месяцев вперёд и отсоединяет
+        (переносит в shared_archive) партиции старше retention_months.
+
+        Args:
+            months_ahead: На сколько месяцев вперёд держать партиции
+            retention_months: Сколько полных месяцев хранить (0 = не отсоединять)
+
+        Returns:
+            {"created": int, "detached": [имена партиций]} или None при ошибке БД
+        """
+        pool = await get_pool()
+        if pool is None:
+            logger.warning("БД недоступна - maintain_partitions пропущен")
+            return None
+
+        try:
+            async with pool.acquire() as conn:
+                created = await conn.fetchval(
+                    "SELECT shared.ensure_analytics_partitions($1)", months_ahead
+                )
+                detached = []
+                if retention_months > 0:
+                    rows = await conn.fetch(
+                        "SELECT shared.detach_old_analytics_partitions($1) AS name",
+                        retention_months
+                    )
+                    detached = [row["name"] for row in rows]
+
+            if created or detached:
+                logger.info(
+                    f"✅ Партиции событий: создано={created}, "
+                    f"отсоединено={detached or 0}"
+                )
+            return {"created": created or 0, "detached": detached}
+
+        except Exception as e:
+            logger.warning(
+                f"⚠️  Ошибка обслуживания партиций событий: {type(e).__name__}: {e}"
+            )
+            return None
+
+
+async def maintain_partitions_job() -> None:
+    """Ежедневное обслуживание партиций событий (по настройкам)."""
+    settings = get_settings()
+    await AnalyticsService().maintain_partitions(
+        months_ahead=settings.ANALYTICS_PARTITIONS_AHEAD,
+        retention_months=settings.ANALYTICS_RETENTION_MONTHS,
+    )
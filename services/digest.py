@@ -1,7 +1,7 @@
 """Сервис формирования и отправки ежедневной статистики."""
 
 import logging
-from datetime import date, datetime, timedelta
+from datetime import date, datetime, timedelta, timezone
 from typing import Optional
 
 import pytz
@@ -9,7 +9,9 @@ from aiogram import Bot
 
 from config.settings import get_settings
 from services.analytics import AnalyticsService
+from services.gateway_adapter import ANALYTICS_BREAKER, get_gateway_adapter
 from services.notifications import send_daily_digest
+from utils.circuit_breaker import get_circuit_breaker
 
 logger = logging.getLogger(__name__)
 
@@ -17,39 +19,34 @@ logger = logging.getLogger(__name__)
 async def _get_stats_via_service(target_date: date):
     """Получить статистику через analytics-service.
 
-    Конвертирует DailyStats из analytics-service в dict формат,
+    Все данные дайджеста (статистика дня, пользователи, воронка) берутся
+    одним запросом get_digest; если сервис его не поддерживает, клиент
+    запрашивает части параллельно.
+
+    Конвертирует DigestStats из analytics-service в dict формат,
     ожидаемый send_daily_digest (new_users, total_users, article_requests, ...).
+    Используется клиент gateway adapter (его пул соединений), а не новый.
     """
-    from analytics_client import AnalyticsClient
-
-    settings = get_settings()
-    async with AnalyticsClient(
-        base_url=settings.ANALYTICS_SERVICE_URL,
-        timeout=float(settings.ANALYTICS_SERVICE_TIMEOUT),
-    ) as client:
-        daily = await client.stats.get_daily(target_date.strftime("%Y-%m-%d"))
-        users_count = await client.stats.get_users_count()
-
-        # Воронка пользователей
-        funnel_started = await client.stats.get_users_by_event("user_start")
-        funnel_active = await client.stats.get_users_by_event("article_request")
-        funnel_returning = await client.stats.get_users_by_event(
-            "article_request", min_count=2
-        )
-
-    event_stats = daily.stats
+    client = await get_gateway_adapter().get_analytics_client()
+    digest = await client.stats.get_digest(
+        target_date.strftime("%Y-%m-%d"),
+        started_event="user_start",
+        active_event="article_request",
+    )
+
+    event_stats = digest.stats
     return {
         "new_users": event_stats.get("user_start", 0),
-        "total_users": users_count.count,
+        "total_users": digest.users_count,
         "returning_users": 0,
         "article_requests": event_stats.get("article_request", 0),
         "photos_sent": event_stats.get("photo_sent", 0),
         "unique_products": 0,
         "videos_sent": event_stats.get("video_sent", 0),
         "errors": event_stats.get("error", 0),
-        "funnel_started": funnel_started.count,
-        "funnel_active": funnel_active.count,
-        "funnel_returning": funnel_returning.count,
+        "funnel_started": digest.funnel_started,
+        "funnel_active": digest.funnel_active,
+        "funnel_returning": digest.funnel_returning,
     }
 
 
@@ -59,7 +56,7 @@ async def send_daily_digest_job(bot: Bot, target_date: Optional[date] = None) ->
 
     При USE_ANALYTICS_SERVICE=True: получает данные из analytics-service.
     При USE_ANALYTICS_SERVICE=False: получает данные из локальной БД.
-    При ошибке analytics-service: fallback на локальную БД.
+    При ошибке analytics-service или разомкнутом circuit breaker: локальная БД.
 
     Args:
         bot: Экземпляр aiogram Bot
@@ -80,21 +77,30 @@ async def send_daily_digest_job(bot: Bot, target_date: Optional[date] = None) ->
         settings = get_settings()
         stats = None
 
-        if settings.USE_ANALYTICS_SERVICE:
+        breaker = get_circuit_breaker(ANALYTICS_BREAKER)
+        if settings.USE_ANALYTICS_SERVICE and breaker.allow():
             try:
                 stats = await _get_stats_via_service(target_date)
+                breaker.record_success()
                 logger.info(
                     f"Статистика получена из analytics-service за {target_date}"
                 )
             except Exception as e:
+                breaker.record_failure()
                 logger.warning(
                     f"analytics-service ошибка: {e}. Fallback на локальную БД."
                 )
-
-        # Fallback на локальную БД или USE_ANALYTICS_SERVICE=False
+            except BaseException:
+                # Отмена без результата: освобождаем half-open пробу
+                breaker.release()
+                raise
+
+        # Fallback на локальную БД или USE_ANALYTICS_SERVICE=False:
+        # строка rollup дня пересчитывается и сразу используется
+        # (дайджест идёт в момент окончания дня, готовой строки ещё нет)
         if stats is None:
             analytics = AnalyticsService()
-            stats = await analytics.get_daily_stats(target_date)
+            stats = await analytics.refresh_daily_rollup(target_date)
 
         if stats is None:
             logger.warning("БД недоступна - дайджест не может быть отправлен")
@@ -115,4 +121,18 @@ async def send_daily_digest_job(bot: Bot, target_date: Optional[date] = None) ->
             f"Ошибка при формировании дайджеста за {target_date.strftime('%d.%m.%Y')}: "
             f"{type(e).__name__}: {e}"
         )
-        return False
\ No newline at end of file
+        return False
+
+
+async def refresh_daily_rollup_job() -> None:
+    """
+    Ежечасный пересчёт shared.analytics_daily_rollup.
+
+    Пересчитываются сегодняшний и вчерашний дни (UTC): вчерашний —
+    чтобы строка стала окончательной с учётом поздно записанных событий.
+    """
+    analytics = AnalyticsService()
+    today = datetime.now(timezone.utc).date()
+    for day in (today - timedelta(days=1), today):
+        await analytics.refresh_daily_rollup(day)
+    logger.info(f"Rollup статистики обновлён за {today - timedelta(days=1)} и {today}")
@@ -0,0 +1,268 @@
+"""
+Буферизованная запись событий аналитики в PostgreSQL.
+
+События копятся в памяти и записываются в shared.analytics_events
+пачками одной командой COPY (copy_records_to_table): по размеру буфера
+или по таймеру. Запись одного события — это только append в список,
+без get_pool/acquire/INSERT на каждое событие.
+
+created_at не передаётся: его ставит DEFAULT NOW() БД, как и при прямой
+записи событий (AnalyticsService), — часы и часовой пояс у всех событий
+одни. Время события — момент записи пачки, т.е. позже фактического
+не больше чем на flush_interval (и на время повторов при ошибке БД).
+
+Повторяется только запись, прерванная ошибкой соединения. Пачку,
+отклонённую самой БД (DataError, \u0000 в JSON и т.п.), буфер пишет по
+одному событию: отклонённые события отбрасываются, остальные сохраняются.
+"""
+
+import asyncio
+import json
+import logging
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Set, Tuple
+
+import asyncpg
+
+from config.settings import get_settings
+from db.connection import get_pool
+from utils.metrics import gauge
+from utils.tracing import create_background_task
+
+logger = logging.getLogger(__name__)
+
+EventRecord = Tuple[int, str, Optional[str]]
+
+# Типизированные колонки (nm_id, count, is_new, error_type) генерируются
+# БД из event_data (миграция 05), created_at — DEFAULT NOW(); не записываются
+_COLUMNS = ("telegram_id", "event_type", "event_data")
+
+# Fallback для пачки с событиями неизвестных пользователей: COPY атомарен,
+# поэтому одно такое событие отменило бы всю пачку
+_INSERT_IF_USER_EXISTS = """
+    INSERT INTO shared.analytics_events (telegram_id, event_type, event_data)
+    SELECT $1, $2, $3::jsonb
+    WHERE EXISTS (SELECT 1 FROM shared.users WHERE telegram_id = $1)
+"""
+
+# Ошибки соединения: пачка возвращается в буфер. Остальные ошибки
+# повтором не исправить
+_TRANSIENT_ERRORS = (asyncpg.PostgresConnectionError, OSError, asyncio.TimeoutError)
+
+
+class AnalyticsEventBuffer:
+    """Буфер событий аналитики с пакетной записью."""
+
+    def __init__(self, batch_size: int, flush_interval: float, max_pending: int):
+        """
+        Args:
+            batch_size: Размер пачки, при котором запись запускается сразу
+            flush_interval: Макс. задержка записи события (сек)
+            max_pending: Лимит событий в памяти (старые отбрасываются)
+        """
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._records: Deque[EventRecord] = deque()
+        self._lock = asyncio.Lock()
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: Set[asyncio.Task] = set()
+        self.written = 0
+        self.dropped = 0
+        self.rejected = 0
+        self.flushes = 0
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def add(
+        self,
+        telegram_id: int,
+        event_type: str,
+        event_data: Optional[Dict[str, Any]] = None
+    ) -> None:
+        """
+        Добавить событие в буфер.
+
+        Args:
+            telegram_id: Telegram ID пользователя
+            event_type: Тип события
+            event_data: Данные события (сериализуются в JSON)
+        """
+        if len(self._records) >= self.max_pending:
+            self._records.popleft()
+            self.dropped += 1
+        self._records.append((
+            telegram_id,
+            event_type,
+            json.dumps(event_data, ensure_ascii=False) if event_data is not None else None,
+        ))
+
+        if len(self._records) >= self.batch_size:
+            self._spawn_flush()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(
+                self.flush_interval, self._spawn_flush
+            )
+
+    def _cancel_timer(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    def _spawn_flush(self) -> None:
+        self._cancel_timer()
+        task = create_background_task(self.flush())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def flush(self) -> int:
+        """
+        Записать накопленные события.
+
+        Returns:
+            Количество записанных событий
+        """
+        async with self._lock:
+            self._cancel_timer()
+            if not self._records:
+                return 0
+
+            batch = list(self._records)
+            self._records.clear()
+
+            pool = await get_pool()
+            if pool is None:
+                self.dropped += len(batch)
+                logger.debug(f"БД недоступна - {len(batch)} событий аналитики отброшено")
+                return 0
+
+            try:
+                async with pool.acquire() as conn:
+                    written = await self._write(conn, batch)
+            except _TRANSIENT_ERRORS as e:
+                logger.warning(
+                    f"⚠️  Ошибка записи {len(batch)} событий аналитики: "
+                    f"{type(e).__name__}: {e}"
+                )
+                self._requeue(batch)
+                return 0
+
+            self.written += written
+            self.flushes += 1
+            logger.debug(f"Записано событий аналитики: {written}")
+            return written
+
+    async def _write(self, conn: asyncpg.Connection, batch: List[EventRecord]) -> int:
+        try:
+            await conn.copy_records_to_table(
+                "analytics_events",
+                schema_name="shared",
+                columns=_COLUMNS,
+                records=batch,
+            )
+            return len(batch)
+        except _TRANSIENT_ERRORS:
+            raise
+        except asyncpg.ForeignKeyViolationError:
+            logger.debug("COPY отклонён (неизвестный пользователь), запись через executemany")
+        except Exception as e:
+            logger.warning(
+                f"⚠️  COPY событий аналитики отклонён ({type(e).__name__}: {e}), "
+                f"запись по одному"
+            )
+            return await self._write_rows(conn, batch)
+
+        try:
+            await conn.executemany(_INSERT_IF_USER_EXISTS, batch)
+            return len(batch)
+        except _TRANSIENT_ERRORS:
+            raise
+        except Exception as e:
+            logger.warning(
+                f"⚠️  Пачка событий аналитики отклонена ({type(e).__name__}: {e}), "
+                f"запись по одному"
+            )
+            return await self._write_rows(conn, batch)
+
+    async def _write_rows(self, conn: asyncpg.Connection, batch: List[EventRecord]) -> int:
+        """Записать события по одному, отбрасывая отклонённые БД."""
+        written = 0
+        for i, record in enumerate(batch):
+            try:
+                await conn.execute(_INSERT_IF_USER_EXISTS, *record)
+            except _TRANSIENT_ERRORS as e:
+                # Записанные события не повторяются: в буфер — только остаток
+                logger.warning(
+                    f"⚠️  Ошибка записи событий аналитики: {type(e).__name__}: {e}"
+                )
+                self._requeue(batch[i:])
+                break
+            except Exception as e:
+                self.rejected += 1
+                logger.warning(
+                    f"⚠️  Событие аналитики {record[1]} отклонено БД и отброшено: "
+                    f"{type(e).__name__}: {e}"
+                )
+            else:
+                written += 1
+        return written
+
+    def _requeue(self, batch: List[EventRecord]) -> None:
+        """Вернуть пачку в начало буфера для повторной попытки."""
+        pending = batch + list(self._records)
+        overflow = len(pending) - self.max_pending
+        if overflow > 0:
+            self.dropped += overflow
+            pending = pending[overflow:]
+        self._records = deque(pending)
+        if self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(
+                self.flush_interval, self._spawn_flush
+            )
+
+    def stop(self) -> None:
+        """Остановить таймер записи (без записи накопленного)."""
+        self._cancel_timer()
+
+    async def close(self) -> None:
+        """Дождаться начатых записей и записать остаток (graceful shutdown)."""
+        self.stop()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        await self.flush()
+        self.stop()
+        logger.info(
+            f"✅ Буфер аналитики закрыт: записано={self.written}, "
+            f"отброшено={self.dropped}, отклонено БД={self.rejected}"
+        )
+
+
+# Singleton instance
+_event_buffer: Optional[AnalyticsEventBuffer] = None
+
+
+def get_event_buffer() -> AnalyticsEventBuffer:
+    """Получить singleton экземпляр AnalyticsEventBuffer."""
+    global _event_buffer
+    if _event_buffer is None:
+        settings = get_settings()
+        _event_buffer = AnalyticsEventBuffer(
+            batch_size=settings.ANALYTICS_BATCH_SIZE,
+            flush_interval=settings.ANALYTICS_FLUSH_INTERVAL,
+            max_pending=settings.ANALYTICS_BUFFER_MAX,
+        )
+    return _event_buffer
+
+
+async def close_event_buffer() -> None:
+    """Записать остаток событий и сбросить singleton."""
+    global _event_buffer
+    if _event_buffer is not None:
+        await _event_buffer.close()
+        _event_buffer = None
+
+
+gauge(
+    "analytics_buffer_pending", "Событий в буфере записи в БД"
+).set_function(lambda: len(_event_buffer) if _event_buffer is not None else 0)
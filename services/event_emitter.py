@@ -0,0 +1,184 @@
+"""
+Неблокирующая отправка событий аналитики.
+
+EventEmitter кладёт событие в ограниченную очередь и сразу возвращает
+управление; доставку (analytics-service или локальная БД) выполняют
+фоновые воркеры (в трассе запроса, отправившего событие). Поведение при переполнении очереди задаётся политикой:
+- drop_oldest: вытеснить самое старое событие;
+- sample: по мере заполнения очереди принимать всё меньшую долю событий;
+- block: ждать свободного места (событие задерживается, но не теряется).
+"""
+
+import asyncio
+import logging
+import random
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from utils.tracing import create_background_task, current_span, span
+
+logger = logging.getLogger(__name__)
+
+POLICY_DROP_OLDEST = "drop_oldest"
+POLICY_SAMPLE = "sample"
+POLICY_BLOCK = "block"
+
+POLICIES = (POLICY_DROP_OLDEST, POLICY_SAMPLE, POLICY_BLOCK)
+
+Handler = Callable[[int, str, dict], Awaitable[bool]]
+
+
+@dataclass
+class EmitterStats:
+    """Счётчики EventEmitter."""
+
+    emitted: int = 0
+    delivered: int = 0
+    failed: int = 0
+    dropped: int = 0
+    delayed: int = 0
+
+
+class EventEmitter:
+    """Ограниченная очередь событий с фоновыми воркерами доставки."""
+
+    def __init__(
+        self,
+        handler: Handler,
+        maxsize: int,
+        workers: int = 2,
+        policy: str = POLICY_DROP_OLDEST
+    ):
+        """
+        Args:
+            handler: Корутина доставки события (user_id, event_type, event_data)
+            maxsize: Ёмкость очереди
+            workers: Количество воркеров доставки
+            policy: Политика переполнения (drop_oldest, sample, block)
+        """
+        if policy not in POLICIES:
+            raise ValueError(f"Неизвестная политика переполнения: {policy}")
+        self.handler = handler
+        self.maxsize = maxsize
+        self.workers = workers
+        self.policy = policy
+        self.stats = EmitterStats()
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        self._random = random.Random()
+
+    def _ensure_started(self) -> asyncio.Queue:
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.maxsize)
+        if not self._workers:
+            self._workers = [
+                create_background_task(self._worker()) for _ in range(self.workers)
+            ]
+        return self._queue
+
+    async def emit(self, user_id: int, event_type: str, event_data: dict) -> bool:
+        """
+        Поставить событие в очередь.
+
+        Returns:
+            True если событие принято, False если отброшено политикой
+        """
+        queue = self._ensure_started()
+        event = (user_id, event_type, event_data, current_span())
+        self.stats.emitted += 1
+
+        if self.policy == POLICY_BLOCK:
+            if queue.full():
+                self.stats.delayed += 1
+            await queue.put(event)
+            return True
+
+        if self.policy == POLICY_SAMPLE:
+            # Выше половины ёмкости вероятность приёма падает до нуля
+            fill = queue.qsize() / self.maxsize
+            if fill > 0.5 and self._random.random() > 2 * (1 - fill):
+                self._drop(event_type)
+                return False
+            if queue.full():
+                self._drop(event_type)
+                return False
+            queue.put_nowait(event)
+            return True
+
+        # POLICY_DROP_OLDEST
+        if queue.full():
+            dropped = queue.get_nowait()
+            queue.task_done()
+            self._drop(dropped[1])
+        queue.put_nowait(event)
+        return True
+
+    def _drop(self, event_type: str) -> None:
+        self.stats.dropped += 1
+        if self.stats.dropped % 1000 == 1:
+            logger.warning(
+                f"⚠️  Очередь аналитики переполнена ({self.policy}): "
+                f"отброшено событий={self.stats.dropped}, последнее={event_type}"
+            )
+
+    async def _worker(self) -> None:
+        queue = self._queue
+        while True:
+            user_id, event_type, event_data, parent = await queue.get()
+            try:
+                if parent is None:
+                    await self._deliver(user_id, event_type, event_data)
+                else:
+                    with span("analytics.deliver", parent=parent, event_type=event_type):
+                        await self._deliver(user_id, event_type, event_data)
+            finally:
+                queue.task_done()
+
+    async def _deliver(self, user_id: int, event_type: str, event_data: dict) -> None:
+        try:
+            if await self.handler(user_id, event_type, event_data):
+                self.stats.delivered += 1
+            else:
+                self.stats.failed += 1
+        except Exception as e:
+            self.stats.failed += 1
+            logger.warning(
+                f"⚠️  Ошибка доставки события {event_type} для {user_id}: "
+                f"{type(e).__name__}: {e}"
+            )
+
+    def pending(self) -> int:
+        """Событий в очереди."""
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def snapshot(self) -> Dict[str, int]:
+        """Текущие счётчики и глубина очереди."""
+        return {
+            "emitted": self.stats.emitted,
+            "delivered": self.stats.delivered,
+            "failed": self.stats.failed,
+            "dropped": self.stats.dropped,
+            "delayed": self.stats.delayed,
+            "pending": self.pending(),
+        }
+
+    async def close(self, timeout: float = 10.0) -> None:
+        """
+        Доставить оставшиеся события (не дольше timeout) и остановить воркеры.
+
+        Args:
+            timeout: Максимальное время ожидания доставки (сек)
+        """
+        if self._queue is not None and self._workers:
+            try:
+                await asyncio.wait_for(self._queue.join(), timeout=timeout)
+            except asyncio.TimeoutError:
+                logger.warning(
+                    f"⚠️  Не доставлено событий аналитики при остановке: {self.pending()}"
+                )
+        for task in self._workers:
+            task.cancel()
+        if self._workers:
+            await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        logger.info(f"Очередь аналитики остановлена: {self.snapshot()}")
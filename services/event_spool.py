@@ -0,0 +1,307 @@
+"""
+Локальный журнал (spool) событий аналитики на диске.
+
+Если analytics-service недоступен, события дописываются в журнал вместо
+синхронной записи в БД: append строки JSON в текущий сегмент без ожидания
+диска, fsync выполняется пачкой по таймеру. Журнал разбит на сегменты
+фиксированного размера; при превышении лимита удаляются самые старые.
+Фоновый replayer периодически отправляет закрытые сегменты пачками и
+удаляет их после успешной доставки.
+"""
+
+import asyncio
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List, Optional, Set, TextIO, Tuple
+
+from config.settings import get_settings
+from utils.tracing import create_background_task
+
+logger = logging.getLogger(__name__)
+
+_SEGMENT_PREFIX = "events-"
+_SEGMENT_SUFFIX = ".jsonl"
+
+# Отправка пачки; возвращает события, которые нужно оставить в журнале
+ReplaySender = Callable[[List[Dict]], Awaitable[List[Dict]]]
+
+
+class EventSpool:
+    """Сегментированный append-only журнал событий."""
+
+    def __init__(
+        self,
+        directory: str,
+        segment_bytes: int,
+        max_bytes: int,
+        fsync_interval: float = 1.0
+    ):
+        """
+        Args:
+            directory: Каталог сегментов
+            segment_bytes: Размер сегмента, после которого открывается новый
+            max_bytes: Лимит журнала на диске (старые сегменты удаляются)
+            fsync_interval: Период fsync дописанных событий (сек)
+        """
+        self.directory = Path(directory)
+        self.segment_bytes = segment_bytes
+        self.max_bytes = max_bytes
+        self.fsync_interval = fsync_interval
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+        self._file: Optional[TextIO] = None
+        self._file_path: Optional[Path] = None
+        self._file_size = 0
+        self._seq = self._last_seq()
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._sync_task: Optional[asyncio.Task] = None
+        self._seal_tasks: Set[asyncio.Task] = set()
+        self._replay_lock = asyncio.Lock()
+        self._replayer: Optional[asyncio.Task] = None
+        self.appended = 0
+        self.replayed = 0
+        self.dropped_segments = 0
+
+    def _segment_path(self, seq: int) -> Path:
+        return self.directory / f"{_SEGMENT_PREFIX}{seq:012d}{_SEGMENT_SUFFIX}"
+
+    def _segments(self) -> List[Path]:
+        return sorted(self.directory.glob(f"{_SEGMENT_PREFIX}*{_SEGMENT_SUFFIX}"))
+
+    def _last_seq(self) -> int:
+        segments = self._segments()
+        if not segments:
+            return 0
+        return int(segments[-1].name[len(_SEGMENT_PREFIX):-len(_SEGMENT_SUFFIX)])
+
+    def sealed_segments(self) -> List[Path]:
+        """Закрытые сегменты (готовые к отправке), от старых к новым."""
+        return [path for path in self._segments() if path != self._file_path]
+
+    def size_bytes(self) -> int:
+        """Размер журнала на диске."""
+        return sum(path.stat().st_size for path in self._segments())
+
+    def append(self, event: Dict) -> None:
+        """
+        Дописать событие в текущий сегмент.
+
+        Args:
+            event: Событие (telegram_id, event_type, event_data)
+        """
+        if self._file is None:
+            self._open_segment()
+        line = json.dumps(event, ensure_ascii=False) + "\n"
+        self._file.write(line)
+        self._file_size += len(line.encode("utf-8"))
+        self.appended += 1
+
+        if self._file_size >= self.segment_bytes:
+            self._seal()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(
+                self.fsync_interval, self._spawn_sync
+            )
+
+    def _open_segment(self) -> None:
+        self._seq += 1
+        self._file_path = self._segment_path(self._seq)
+        self._file = open(self._file_path, "a", encoding="utf-8")
+        self._file_size = 0
+
+    def _seal(self) -> None:
+        """Закрыть текущий сегмент (fsync в фоне) и применить лимит размера."""
+        self._cancel_timer()
+        if self._file is not None:
+            self._file.flush()
+            # fsync дубликата дескриптора в потоке: сегмент закрывается сразу
+            task = create_background_task(self._fsync_fd(os.dup(self._file.fileno())))
+            self._seal_tasks.add(task)
+            task.add_done_callback(self._seal_tasks.discard)
+            self._file.close()
+            self._file = None
+            self._file_path = None
+        self._enforce_limit()
+
+    def _enforce_limit(self) -> None:
+        segments = self.sealed_segments()
+        total = self.size_bytes()
+        while total > self.max_bytes and segments:
+            oldest = segments.pop(0)
+            total -= oldest.stat().st_size
+            oldest.unlink()
+            self.dropped_segments += 1
+            logger.warning(f"⚠️  Журнал аналитики превысил лимит, удалён сегмент {oldest.name}")
+
+    def _cancel_timer(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    def _spawn_sync(self) -> None:
+        self._timer = None
+        if self._sync_task is None or self._sync_task.done():
+            self._sync_task = create_background_task(self.sync())
+
+    async def sync(self) -> None:
+        """Сбросить дописанные события на диск (fsync вне event loop)."""
+        if self._file is None:
+            return
+        self._file.flush()
+        # Дубликат дескриптора: сегмент может закрыться, пока идёт fsync
+        await self._fsync_fd(os.dup(self._file.fileno()))
+
+    @staticmethod
+    async def _fsync_fd(fd: int) -> None:
+        """fsync дескриптора вне event loop; дескриптор закрывается."""
+        try:
+            await asyncio.to_thread(os.fsync, fd)
+        finally:
+            os.close(fd)
+
+    async def replay(
+        self,
+        send: ReplaySender,
+        batch_size: int = 500,
+        ready: Optional[Callable[[], bool]] = None
+    ) -> int:
+        """
+        Отправить накопленные события.
+
+        Закрытые сегменты отправляются пачками. Если sender вернул события
+        для повтора, отправка останавливается: эти и неотправленные события
+        остаются в сегменте (он перезаписывается, только если часть пачек
+        доставлена). Текущий сегмент закрывается и отправляется, только
+        когда все закрытые доставлены, — пока сервис не принимает события,
+        мелкие сегменты не плодятся.
+
+        Args:
+            send: Отправка пачки
+            batch_size: Событий в пачке
+            ready: Проверка готовности получателя; False — проход пропускается
+
+        Returns:
+            Количество доставленных событий
+        """
+        async with self._replay_lock:
+            if ready is not None and not ready():
+                return 0
+
+            delivered = 0
+            complete = True
+            for segment in self.sealed_segments():
+                sent, complete = await self._replay_segment(segment, send, batch_size)
+                delivered += sent
+                if not complete:
+                    break
+
+            if complete and self._file is not None and self._file_size:
+                self._seal()
+                sent, _ = await self._replay_segment(
+                    self.sealed_segments()[-1], send, batch_size
+                )
+                delivered += sent
+
+            self.replayed += delivered
+            if delivered:
+                logger.info(f"✅ Из журнала аналитики доставлено событий: {delivered}")
+            return delivered
+
+    async def _replay_segment(
+        self,
+        segment: Path,
+        send: ReplaySender,
+        batch_size: int
+    ) -> Tuple[int, bool]:
+        """Отправить сегмент; возвращает (доставлено, сегмент доставлен целиком)."""
+        events = self._read_segment(segment)
+        delivered = 0
+        for offset in range(0, len(events), batch_size):
+            batch = events[offset:offset + batch_size]
+            retry = await send(batch)
+            delivered += len(batch) - len(retry)
+            if retry:
+                if delivered:
+                    await self._rewrite_segment(segment, retry + events[offset + batch_size:])
+                return delivered, False
+        # Сегмент мог быть удалён по лимиту размера во время отправки
+        segment.unlink(missing_ok=True)
+        return delivered, True
+
+    def _read_segment(self, segment: Path) -> List[Dict]:
+        events = []
+        with open(segment, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    events.append(json.loads(line))
+                except json.JSONDecodeError:
+                    # Недописанная строка после аварийной остановки
+                    logger.warning(f"⚠️  Пропущена повреждённая строка в {segment.name}")
+        return events
+
+    async def _rewrite_segment(self, segment: Path, events: List[Dict]) -> None:
+        tmp = segment.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            for event in events:
+                f.write(json.dumps(event, ensure_ascii=False) + "\n")
+            f.flush()
+            await self._fsync_fd(os.dup(f.fileno()))
+        os.replace(tmp, segment)
+
+    def start_replayer(
+        self,
+        send: ReplaySender,
+        interval: float,
+        batch_size: int = 500,
+        ready: Optional[Callable[[], bool]] = None
+    ) -> None:
+        """
+        Запустить фоновую отправку журнала.
+
+        Args:
+            send: Отправка пачки
+            interval: Период попыток (сек)
+            batch_size: Событий в пачке
+            ready: Проверка готовности получателя (см. replay)
+        """
+        async def run() -> None:
+            while True:
+                await asyncio.sleep(interval)
+                try:
+                    await self.replay(send, batch_size, ready)
+                except Exception as e:
+                    logger.warning(f"⚠️  Ошибка отправки журнала аналитики: {e}")
+
+        if self._replayer is None or self._replayer.done():
+            self._replayer = create_background_task(run())
+
+    async def close(self) -> None:
+        """Остановить replayer и закрыть текущий сегмент с fsync."""
+        if self._replayer is not None:
+            self._replayer.cancel()
+            await asyncio.gather(self._replayer, return_exceptions=True)
+            self._replayer = None
+        if self._sync_task is not None:
+            await asyncio.gather(self._sync_task, return_exceptions=True)
+        self._seal()
+        if self._seal_tasks:
+            await asyncio.gather(*self._seal_tasks, return_exceptions=True)
+        logger.info(
+            f"Журнал аналитики закрыт: записано={self.appended}, "
+            f"доставлено={self.replayed}, удалено сегментов={self.dropped_segments}"
+        )
+
+
+def create_event_spool() -> Optional[EventSpool]:
+    """Создать журнал по настройкам (None если ANALYTICS_SPOOL_DIR пуст)."""
+    settings = get_settings()
+    if not settings.ANALYTICS_SPOOL_DIR:
+        return None
+    return EventSpool(
+        directory=settings.ANALYTICS_SPOOL_DIR,
+        segment_bytes=settings.ANALYTICS_SPOOL_SEGMENT_KB * 1024,
+        max_bytes=settings.ANALYTICS_SPOOL_MAX_MB * 1024 * 1024,
+        fsync_interval=settings.ANALYTICS_SPOOL_FSYNC_INTERVAL,
+    )
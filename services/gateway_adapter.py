@@ -9,17 +9,30 @@ Feature Flag: USE_ANALYTICS_SERVICE
 - True: события отправляются в analytics-service (8003) через analytics-client
 - False: события записываются в локальную БД
 
-При ошибке Gateway/analytics-service автоматически происходит fallback на локальную БД.
+При ошибке Gateway/analytics-service автоматически происходит fallback на локальную БД;
+события, не доставленные в analytics-service, пишутся в журнал на диске
+(EventSpool) и отправляются повторно после восстановления сервиса.
+
+События аналитики доставляются фоновыми воркерами из ограниченной очереди
+(EventEmitter), поэтому track_event не добавляет задержку обработчикам.
 """
 
 import logging
 from dataclasses import dataclass
-from typing import Optional
+from typing import List, Optional
 
 from config.settings import get_settings
+from services.event_emitter import EventEmitter
+from services.event_spool import create_event_spool
+from utils.circuit_breaker import STATE_OPEN, get_circuit_breaker
+from utils.metrics import gauge
 
 logger = logging.getLogger(__name__)
 
+# Имена circuit breaker'ов микросервисов
+GATEWAY_BREAKER = "api-gateway"
+ANALYTICS_BREAKER = "analytics-service"
+
 
 @dataclass
 class UserRegistrationResult:
@@ -44,6 +57,19 @@ class GatewayAdapter:
     При ошибке автоматически происходит fallback на локальную БД.
     """
 
+    # Очередь доставки событий (None — доставка в вызывающей корутине)
+    _emitter: Optional[EventEmitter] = None
+
+    # Долгоживущие HTTP клиенты (создаются в start() или при первом вызове)
+    _gateway_client = None
+    _analytics_client = None
+
+    # Пакетная отправка событий в analytics-service (создаётся в start())
+    _event_batcher = None
+
+    # Журнал недоставленных событий (создаётся в start())
+    _spool = None
+
     def __init__(self):
         """Инициализация адаптера."""
         settings = get_settings()
@@ -60,10 +86,24 @@ class GatewayAdapter:
         self.analytics_service_timeout = getattr(
             settings, 'ANALYTICS_SERVICE_TIMEOUT', 10
         )
+        self.analytics_batch_size = settings.ANALYTICS_SERVICE_BATCH_SIZE
+        self.analytics_batch_interval = settings.ANALYTICS_SERVICE_BATCH_INTERVAL
+
+        # Пул соединений к микросервисам
+        self.http2 = settings.SERVICE_HTTP2
+        self.max_connections = settings.SERVICE_MAX_CONNECTIONS
+        self.keepalive_expiry = settings.SERVICE_KEEPALIVE_EXPIRY
 
         # Lazy-init для локальных сервисов
         self._analytics = None
 
+        self._emitter = EventEmitter(
+            handler=self._deliver_event,
+            maxsize=settings.ANALYTICS_QUEUE_SIZE,
+            workers=settings.ANALYTICS_QUEUE_WORKERS,
+            policy=settings.ANALYTICS_OVERFLOW_POLICY,
+        )
+
         logger.info(
             f"GatewayAdapter инициализирован: USE_GATEWAY={self.use_gateway}, "
             f"USE_ANALYTICS_SERVICE={self.use_analytics_service}, "
@@ -77,6 +117,15 @@ class GatewayAdapter:
             self._analytics = AnalyticsService()
         return self._analytics
 
+    def _limits(self):
+        """Лимиты пула соединений httpx."""
+        import httpx
+        return httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_connections,
+            keepalive_expiry=self.keepalive_expiry,
+        )
+
     def _create_client(self):
         """Создаёт API Gateway Client."""
         try:
@@ -84,12 +133,65 @@ class GatewayAdapter:
             return APIGatewayClient(
                 base_url=self.gateway_url,
                 api_key=self.api_key,
-                timeout=float(self.timeout)
+                timeout=float(self.timeout),
+                limits=self._limits(),
+                http2=self.http2,
             )
         except ImportError:
             logger.error("api_gateway_client не установлен! pip install api-gateway-client")
             raise
 
+    async def _get_gateway_client(self):
+        """Открытый API Gateway Client (один на процесс)."""
+        if self._gateway_client is None:
+            client = self._create_client()
+            await client.open()
+            self._gateway_client = client
+        return self._gateway_client
+
+    async def get_analytics_client(self):
+        """Открытый Analytics Client (один на процесс, общий пул соединений)."""
+        if self._analytics_client is None:
+            from analytics_client import AnalyticsClient
+            client = AnalyticsClient(
+                base_url=self.analytics_service_url,
+                timeout=float(self.analytics_service_timeout),
+                limits=self._limits(),
+                http2=self.http2,
+            )
+            await client.open()
+            self._analytics_client = client
+        return self._analytics_client
+
+    async def start(self) -> None:
+        """Открыть клиенты включённых микросервисов (при старте бота)."""
+        try:
+            if self.use_gateway:
+                await self._get_gateway_client()
+            if self.use_analytics_service:
+                client = await self.get_analytics_client()
+                if self.analytics_batch_size > 0:
+                    from analytics_client import EventBatcher
+                    self._event_batcher = EventBatcher(
+                        client,
+                        max_batch=self.analytics_batch_size,
+                        flush_interval=self.analytics_batch_interval,
+                        on_failure=self._spool_or_local,
+                        on_result=self._record_batch_result,
+                    )
+                self._spool = create_event_spool()
+                if self._spool is not None:
+                    settings = get_settings()
+                    self._spool.start_replayer(
+                        self._replay_events,
+                        interval=settings.ANALYTICS_SPOOL_REPLAY_INTERVAL,
+                        batch_size=settings.ANALYTICS_SERVICE_BATCH_SIZE or 500,
+                        ready=self._analytics_ready,
+                    )
+        except Exception as e:
+            # Клиент будет создан при первом вызове, до тех пор работает fallback
+            logger.warning(f"⚠️  Не удалось открыть клиенты микросервисов: {e}")
+
     async def register_user(
         self,
         user_id: int,
@@ -102,7 +204,7 @@ class GatewayAdapter:
 
         При USE_GATEWAY=True: вызов client.users.register()
         При USE_GATEWAY=False: вызов analytics.track_user_start()
-        При ошибке Gateway: fallback на локальную БД.
+        При ошибке Gateway или разомкнутом circuit breaker: локальная БД.
 
         Args:
             user_id: Telegram ID пользователя
@@ -114,22 +216,28 @@ class GatewayAdapter:
             UserRegistrationResult с информацией о регистрации
         """
         if self.use_gateway:
-            try:
-                return await self._register_user_via_gateway(
-                    user_id, username, first_name
-                )
-            except Exception as e:
-                logger.warning(
-                    f"Gateway ошибка при register_user: {e}. Fallback на локальную БД."
-                )
-                # Fallback
-                return await self._register_user_local(
-                    user_id, username, first_name, last_name
-                )
-        else:
-            return await self._register_user_local(
-                user_id, username, first_name, last_name
-            )
+            breaker = get_circuit_breaker(GATEWAY_BREAKER)
+            if breaker.allow():
+                try:
+                    result = await self._register_user_via_gateway(
+                        user_id, username, first_name
+                    )
+                except Exception as e:
+                    breaker.record_failure()
+                    logger.warning(
+                        f"Gateway ошибка при register_user: {e}. Fallback на локальную БД."
+                    )
+                except BaseException:
+                    # Отмена без результата: освобождаем half-open пробу
+                    breaker.release()
+                    raise
+                else:
+                    breaker.record_success()
+                    return result
+
+        return await self._register_user_local(
+            user_id, username, first_name, last_name
+        )
 
     async def _register_user_via_gateway(
         self,
@@ -138,19 +246,18 @@ class GatewayAdapter:
         first_name: Optional[str]
     ) -> UserRegistrationResult:
         """Регистрация через API Gateway."""
-        client = self._create_client()
-        async with client:
-            user = await client.users.register(
-                telegram_id=user_id,
-                username=username,
-                first_name=first_name
-            )
-            logger.info(f"Пользователь {user_id} зарегистрирован через Gateway")
-            return UserRegistrationResult(
-                telegram_id=user.telegram_id,
-                username=user.username,
-                is_new=getattr(user, 'is_new', True)
-            )
+        client = await self._get_gateway_client()
+        user = await client.users.register(
+            telegram_id=user_id,
+            username=username,
+            first_name=first_name
+        )
+        logger.info(f"Пользователь {user_id} зарегистрирован через Gateway")
+        return UserRegistrationResult(
+            telegram_id=user.telegram_id,
+            username=user.username,
+            is_new=getattr(user, 'is_new', True)
+        )
 
     async def _register_user_local(
         self,
@@ -183,6 +290,9 @@ class GatewayAdapter:
         """
         Отслеживание события.
 
+        Событие ставится в очередь и доставляется фоновым воркером;
+        при переполнении очереди действует ANALYTICS_OVERFLOW_POLICY.
+
         При USE_ANALYTICS_SERVICE=True: отправка в analytics-service через analytics-client.
         При USE_ANALYTICS_SERVICE=False: запись в локальную БД.
         При ошибке analytics-service: fallback на локальную БД.
@@ -193,18 +303,45 @@ class GatewayAdapter:
             event_data: Данные события
 
         Returns:
-            True если событие успешно записано
+            True если событие принято (или записано при доставке без очереди)
         """
-        if self.use_analytics_service:
+        if self._emitter is not None:
+            return await self._emitter.emit(user_id, event_type, event_data)
+        return await self._deliver_event(user_id, event_type, event_data)
+
+    async def _deliver_event(
+        self,
+        user_id: int,
+        event_type: str,
+        event_data: dict
+    ) -> bool:
+        """Доставка события с fallback на журнал или локальную БД."""
+        if not self.use_analytics_service:
+            return await self._track_event_local(user_id, event_type, event_data)
+
+        breaker = get_circuit_breaker(ANALYTICS_BREAKER)
+        if breaker.allow():
             try:
-                return await self._track_event_via_service(user_id, event_type, event_data)
+                result = await self._track_event_via_service(user_id, event_type, event_data)
             except Exception as e:
-                logger.warning(
-                    f"analytics-service ошибка: {e}. Fallback на локальную БД."
-                )
-                return await self._track_event_local(user_id, event_type, event_data)
-        else:
-            return await self._track_event_local(user_id, event_type, event_data)
+                breaker.record_failure()
+                logger.warning(f"analytics-service ошибка: {e}. Fallback.")
+            except BaseException:
+                breaker.release()
+                raise
+            else:
+                # В пакетном режиме событие только поставлено в очередь:
+                # исход учитывается по результату пачки (_record_batch_result)
+                if self._event_batcher is None:
+                    breaker.record_success()
+                return result
+
+        if self._spool is not None:
+            self._spool.append(
+                {"telegram_id": user_id, "event_type": event_type, "event_data": event_data}
+            )
+            return True
+        return await self._track_event_local(user_id, event_type, event_data)
 
     async def _track_event_via_service(
         self,
@@ -213,17 +350,21 @@ class GatewayAdapter:
         event_data: dict
     ) -> bool:
         """Отправка события в analytics-service через analytics-client."""
-        from analytics_client import AnalyticsClient
-
-        async with AnalyticsClient(
-            base_url=self.analytics_service_url,
-            timeout=float(self.analytics_service_timeout),
-        ) as client:
-            await client.events.record(
+        if self._event_batcher is not None:
+            # Уходит пачкой через POST /events/batch; отклонённые — в локальную БД
+            self._event_batcher.add(
                 telegram_id=user_id,
                 event_type=event_type,
                 event_data=event_data,
             )
+            return True
+
+        client = await self.get_analytics_client()
+        await client.events.record(
+            telegram_id=user_id,
+            event_type=event_type,
+            event_data=event_data,
+        )
 
         logger.debug(f"Событие {event_type} для {user_id} отправлено в analytics-service")
         return True
@@ -261,6 +402,82 @@ class GatewayAdapter:
         logger.debug(f"Событие {event_type} для {user_id} записано локально")
         return True
 
+    async def _spool_or_local(self, events: List[dict]) -> None:
+        """Недоставленные события: в журнал (если включён) или в локальную БД."""
+        if self._spool is None:
+            await self._track_events_local(events)
+            return
+        for event in events:
+            self._spool.append(event)
+
+    @staticmethod
+    def _analytics_ready() -> bool:
+        """analytics-service принимает события (breaker не разомкнут)."""
+        return get_circuit_breaker(ANALYTICS_BREAKER).state != STATE_OPEN
+
+    async def _replay_events(self, events: List[dict]) -> List[dict]:
+        """
+        Отправка пачки из журнала в analytics-service.
+
+        Отклонённые сервисом события пишутся в локальную БД.
+
+        Returns:
+            События, которые нужно оставить в журнале (сервис недоступен)
+        """
+        breaker = get_circuit_breaker(ANALYTICS_BREAKER)
+        if not breaker.allow():
+            return events
+
+        try:
+            client = await self.get_analytics_client()
+            result = await client.events.record_batch(events)
+        except Exception:
+            breaker.record_failure()
+            raise
+        except BaseException:
+            breaker.release()
+            raise
+        self._record_batch_result(result)
+        retryable = set(result.retryable_indexes)
+        rejected = [events[i] for i in result.failed_indexes if i not in retryable]
+        if rejected:
+            await self._track_events_local(rejected)
+        return [events[i] for i in sorted(retryable)]
+
+    def _record_batch_result(self, result) -> None:
+        """Учесть исход пачки в circuit breaker analytics-service."""
+        breaker = get_circuit_breaker(ANALYTICS_BREAKER)
+        if result.retryable_indexes and not result.accepted:
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+
+    async def _track_events_local(self, events: List[dict]) -> None:
+        """Fallback для событий, не принятых analytics-service в пакете."""
+        for event in events:
+            await self._track_event_local(
+                event["telegram_id"],
+                event["event_type"],
+                event.get("event_data") or {},
+            )
+
+    async def close(self) -> None:
+        """Доставить события из очереди, остановить воркеры и закрыть клиенты."""
+        if self._emitter is not None:
+            await self._emitter.close()
+        if self._event_batcher is not None:
+            await self._event_batcher.close()
+            self._event_batcher = None
+        if self._spool is not None:
+            # Недоставленное остаётся на диске до следующего запуска
+            await self._spool.close()
+            self._spool = None
+        for client in (self._gateway_client, self._analytics_client):
+            if client is not None:
+                await client.close()
+        self._gateway_client = None
+        self._analytics_client = None
+
 
 # Singleton instance
 _gateway_adapter: Optional[GatewayAdapter] = None
@@ -271,4 +488,32 @@ def get_gateway_adapter() -> GatewayAdapter:
     global _gateway_adapter
     if _gateway_adapter is None:
         _gateway_adapter = GatewayAdapter()
-    return _gateway_adapter
\ No newline at end of file
+    return _gateway_adapter
+
+
+async def close_gateway_adapter() -> None:
+    """Доставить оставшиеся события и сбросить singleton."""
+    global _gateway_adapter
+    if _gateway_adapter is not None:
+        await _gateway_adapter.close()
+        _gateway_adapter = None
+
+
+def _emitter_pending() -> int:
+    if _gateway_adapter is None or _gateway_adapter._emitter is None:
+        return 0
+    return _gateway_adapter._emitter.pending()
+
+
+def _spool_bytes() -> int:
+    if _gateway_adapter is None or _gateway_adapter._spool is None:
+        return 0
+    return _gateway_adapter._spool.size_bytes()
+
+
+gauge(
+    "analytics_emitter_pending", "Событий в очереди отправки в analytics-service"
+).set_function(_emitter_pending)
+gauge(
+    "analytics_spool_bytes", "Размер журнала недоставленных событий"
+).set_function(_spool_bytes)
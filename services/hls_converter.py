@@ -9,9 +9,20 @@ from typing import Optional
 
 from config.settings import Settings
 from utils.exceptions import HLSConversionError, FFmpegNotFoundError
+from utils.metrics import histogram
+from utils.tracing import annotate, traced
 
 logger = logging.getLogger(__name__)
 
+# Метрики ffmpeg: convert — перекодирование, copy — без перекодирования
+_FFMPEG_SECONDS = histogram(
+    "ffmpeg_seconds", "Время работы ffmpeg", ("mode", "outcome")
+)
+_FFMPEG_BYTES = histogram(
+    "ffmpeg_output_bytes", "Размер MP4 после ffmpeg", ("mode",),
+    buckets=tuple(mb * 1024 * 1024 for mb in (1, 2, 5, 10, 20, 30, 50, 100, 200))
+)
+
 
 class HLSConverter:
     """Асинхронная конвертация HLS (m3u8) в MP4 через ffmpeg."""
@@ -60,6 +71,7 @@ class HLSConverter:
         except Exception:
             return 0.0  # Неизвестная длительность
 
+    @traced()
     async def convert_hls_to_mp4(
         self,
         hls_url: str,
@@ -93,6 +105,7 @@ class HLSConverter:
 
         logger.info(f"🎬 Начинаю конвертацию HLS → MP4: {hls_url}")
         start_time = time.perf_counter()
+        mode = "convert"
 
         # Получаем длительность для расчёта прогресса
         duration = await self.get_duration(hls_url) if progress_callback else 0
@@ -156,6 +169,9 @@ class HLSConverter:
             except asyncio.TimeoutError:
                 process.kill()
                 self.cleanup_temp_file(output_path)
+                _FFMPEG_SECONDS.observe(
+                    time.perf_counter() - start_time, mode=mode, outcome="timeout"
+                )
                 raise HLSConversionError(
                     f"Timeout конвертации ({self.settings.HLS_CONVERT_TIMEOUT}s)"
                 )
@@ -163,6 +179,9 @@ class HLSConverter:
             if process.returncode != 0:
                 error_msg = stderr_data.decode() if stderr_data else "Unknown error"
                 self.cleanup_temp_file(output_path)
+                _FFMPEG_SECONDS.observe(
+                    time.perf_counter() - start_time, mode=mode, outcome="error"
+                )
                 raise HLSConversionError(f"ffmpeg error: {error_msg[:200]}")
 
             # Проверка что файл создан
@@ -170,8 +189,12 @@ class HLSConverter:
                 raise HLSConversionError("Выходной файл не создан")
 
             # Проверка размера
-            file_size_mb = output_path.stat().st_size / (1024 * 1024)
+            file_size = output_path.stat().st_size
+            file_size_mb = file_size / (1024 * 1024)
             elapsed = time.perf_counter() - start_time
+            _FFMPEG_SECONDS.observe(elapsed, mode=mode, outcome="ok")
+            _FFMPEG_BYTES.observe(file_size, mode=mode)
+            annotate(nm_id=nm_id, bytes=file_size)
 
             logger.info(
                 f"✅ Конвертация завершена: {file_size_mb:.1f}MB за {elapsed:.1f}s"
@@ -188,6 +211,7 @@ class HLSConverter:
         except FileNotFoundError:
             raise FFmpegNotFoundError("ffmpeg не найден в PATH")
 
+    @traced()
     async def download_hls_fast(
         self,
         hls_url: str,
@@ -221,6 +245,7 @@ class HLSConverter:
 
         logger.info(f"📥 Быстрое скачивание HLS (без сжатия): {hls_url}")
         start_time = time.perf_counter()
+        mode = "copy"
 
         duration = await self.get_duration(hls_url) if progress_callback else 0
 
@@ -275,6 +300,9 @@ class HLSConverter:
             except asyncio.TimeoutError:
                 process.kill()
                 self.cleanup_temp_file(output_path)
+                _FFMPEG_SECONDS.observe(
+                    time.perf_counter() - start_time, mode=mode, outcome="timeout"
+                )
                 raise HLSConversionError(
                     f"Timeout скачивания ({self.settings.HLS_CONVERT_TIMEOUT}s)"
                 )
@@ -282,13 +310,20 @@ class HLSConverter:
             if process.returncode != 0:
                 error_msg = stderr_data.decode() if stderr_data else "Unknown error"
                 self.cleanup_temp_file(output_path)
+                _FFMPEG_SECONDS.observe(
+                    time.perf_counter() - start_time, mode=mode, outcome="error"
+                )
                 raise HLSConversionError(f"ffmpeg error: {error_msg[:200]}")
 
             if not output_path.exists():
                 raise HLSConversionError("Выходной файл не создан")
 
-            file_size_mb = output_path.stat().st_size / (1024 * 1024)
+            file_size = output_path.stat().st_size
+            file_size_mb = file_size / (1024 * 1024)
             elapsed = time.perf_counter() - start_time
+            _FFMPEG_SECONDS.observe(elapsed, mode=mode, outcome="ok")
+            _FFMPEG_BYTES.observe(file_size, mode=mode)
+            annotate(nm_id=nm_id, bytes=file_size)
 
             logger.info(
                 f"✅ Скачивание завершено: {file_size_mb:.1f}MB за {elapsed:.1f}s"
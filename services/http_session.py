@@ -0,0 +1,59 @@
+"""Общая HTTP сессия aiohttp для загрузок с CDN Wildberries."""
+
+import logging
+from typing import Optional
+
+import aiohttp
+
+from config.settings import get_settings
+
+logger = logging.getLogger(__name__)
+
+# Глобальная сессия (singleton), переиспользует keep-alive соединения
+_session: Optional[aiohttp.ClientSession] = None
+
+
+async def get_http_session() -> aiohttp.ClientSession:
+    """
+    Получить общую HTTP сессию (singleton).
+
+    Сессия создаётся лениво при первом вызове и держит пул
+    keep-alive соединений к CDN, чтобы параллельные загрузки
+    не платили за TCP/TLS handshake на каждый файл.
+
+    Returns:
+        aiohttp.ClientSession
+    """
+    global _session
+
+    if _session is not None and not _session.closed:
+        return _session
+
+    settings = get_settings()
+    timeout = aiohttp.ClientTimeout(
+        total=settings.HTTP_SESSION_TIMEOUT,
+        connect=5,
+        sock_read=settings.HTTP_SESSION_TIMEOUT,
+    )
+    connector = aiohttp.TCPConnector(
+        limit=settings.HTTP_SESSION_LIMIT,
+        limit_per_host=settings.HTTP_SESSION_LIMIT_PER_HOST,
+        ttl_dns_cache=300,
+    )
+    _session = aiohttp.ClientSession(timeout=timeout, connector=connector)
+    logger.info(
+        f"📡 Общая HTTP сессия создана: limit={settings.HTTP_SESSION_LIMIT}, "
+        f"limit_per_host={settings.HTTP_SESSION_LIMIT_PER_HOST}"
+    )
+    return _session
+
+
+async def close_http_session() -> None:
+    """Закрыть общую HTTP сессию (graceful shutdown)."""
+    global _session
+
+    if _session is not None:
+        if not _session.closed:
+            await _session.close()
+        _session = None
+        logger.info("📡 Общая HTTP сессия закрыта")
@@ -0,0 +1,391 @@
+"""
+L2-кеш результатов поиска медиа (общий для реплик и рестартов).
+
+In-memory кеши (VideoCache, WBParser._basket_cache) остаются L1. L2 хранит
+их записи в PostgreSQL (MEDIA_CACHE_L2=postgres, таблица shared.media_cache)
+или в локальном SQLite-файле (MEDIA_CACHE_L2=sqlite):
+- при старте снимок L2 загружается в L1 (прогрев после деплоя);
+- промах L1 дочитывается из L2 (read-through);
+- запись в L1 ставится в очередь и сбрасывается в L2 пачкой по таймеру
+  (write-behind), не задерживая обработку запроса.
+
+Недоступность L2 не ломает поиск: ошибки логируются, работает только L1.
+"""
+
+import asyncio
+import json
+import logging
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set, Tuple, Union
+
+from config.settings import get_settings
+from db.connection import get_pool
+from utils.metrics import gauge
+from utils.tracing import create_background_task
+
+logger = logging.getLogger(__name__)
+
+L2_POSTGRES = "postgres"
+L2_SQLITE = "sqlite"
+
+# (namespace, key, value, expires_at unix time)
+CacheRow = Tuple[str, str, Any, float]
+
+
+class PostgresCacheStore:
+    """Записи L2 в shared.media_cache (общие для всех реплик)."""
+
+    async def load(self, namespace: str, limit: int) -> List[Tuple[str, Any, float]]:
+        """Неистекшие записи namespace, самые свежие первыми."""
+        pool = await get_pool()
+        if pool is None:
+            return []
+        async with pool.acquire() as conn:
+            rows = await conn.fetch(
+                """
+                SELECT key, value, EXTRACT(EPOCH FROM expires_at)::float8 AS expires_at
+                FROM shared.media_cache
+                WHERE namespace = $1 AND expires_at > NOW()
+                ORDER BY expires_at DESC
+                LIMIT $2
+                """,
+                namespace, limit
+            )
+        return [(row["key"], json.loads(row["value"]), row["expires_at"]) for row in rows]
+
+    async def get(self, namespace: str, key: str) -> Optional[Tuple[Any, float]]:
+        """Значение и срок записи или None."""
+        pool = await get_pool()
+        if pool is None:
+            return None
+        async with pool.acquire() as conn:
+            row = await conn.fetchrow(
+                """
+                SELECT value, EXTRACT(EPOCH FROM expires_at)::float8 AS expires_at
+                FROM shared.media_cache
+                WHERE namespace = $1 AND key = $2 AND expires_at > NOW()
+                """,
+                namespace, key
+            )
+        if row is None:
+            return None
+        return json.loads(row["value"]), row["expires_at"]
+
+    async def put_many(self, rows: List[CacheRow]) -> None:
+        """Записать (перезаписать) пачку записей."""
+        pool = await get_pool()
+        if pool is None:
+            return
+        async with pool.acquire() as conn:
+            await conn.executemany(
+                """
+                INSERT INTO shared.media_cache (namespace, key, value, expires_at)
+                VALUES ($1, $2, $3::jsonb, to_timestamp($4))
+                ON CONFLICT (namespace, key) DO UPDATE
+                SET value = EXCLUDED.value,
+                    expires_at = EXCLUDED.expires_at
+                """,
+                [(ns, key, json.dumps(value), expires) for ns, key, value, expires in rows]
+            )
+
+    async def delete_expired(self) -> int:
+        """Удалить истекшие записи."""
+        pool = await get_pool()
+        if pool is None:
+            return 0
+        async with pool.acquire() as conn:
+            result = await conn.execute(
+                "DELETE FROM shared.media_cache WHERE expires_at <= NOW()"
+            )
+        return int(result.split()[-1])
+
+    async def close(self) -> None:
+        """Пул закрывается отдельно (close_pool)."""
+
+
+class SqliteCacheStore:
+    """Записи L2 в локальном SQLite-файле (переживают рестарт одной реплики)."""
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path: Путь к файлу БД
+        """
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        # Запросы идут из потоков asyncio.to_thread, соединение одно
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS media_cache (
+                    namespace TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    expires_at REAL NOT NULL,
+                    PRIMARY KEY (namespace, key)
+                ) WITHOUT ROWID
+                """
+            )
+            self._conn.commit()
+
+    def _query(self, sql: str, params: tuple) -> List[tuple]:
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    async def load(self, namespace: str, limit: int) -> List[Tuple[str, Any, float]]:
+        """Неистекшие записи namespace, самые свежие первыми."""
+        rows = await asyncio.to_thread(
+            self._query,
+            "SELECT key, value, expires_at FROM media_cache "
+            "WHERE namespace = ? AND expires_at > ? ORDER BY expires_at DESC LIMIT ?",
+            (namespace, time.time(), limit)
+        )
+        return [(key, json.loads(value), expires) for key, value, expires in rows]
+
+    async def get(self, namespace: str, key: str) -> Optional[Tuple[Any, float]]:
+        """Значение и срок записи или None."""
+        rows = await asyncio.to_thread(
+            self._query,
+            "SELECT value, expires_at FROM media_cache "
+            "WHERE namespace = ? AND key = ? AND expires_at > ?",
+            (namespace, key, time.time())
+        )
+        if not rows:
+            return None
+        value, expires = rows[0]
+        return json.loads(value), expires
+
+    def _put_many(self, rows: List[CacheRow]) -> None:
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO media_cache (namespace, key, value, expires_at) "
+                "VALUES (?, ?, ?, ?)",
+                [(ns, key, json.dumps(value), expires) for ns, key, value, expires in rows]
+            )
+            self._conn.commit()
+
+    async def put_many(self, rows: List[CacheRow]) -> None:
+        """Записать (перезаписать) пачку записей."""
+        await asyncio.to_thread(self._put_many, rows)
+
+    def _delete_expired(self) -> int:
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM media_cache WHERE expires_at <= ?", (time.time(),)
+            )
+            self._conn.commit()
+            return cursor.rowcount
+
+    async def delete_expired(self) -> int:
+        """Удалить истекшие записи."""
+        return await asyncio.to_thread(self._delete_expired)
+
+    async def close(self) -> None:
+        """Закрыть файл БД."""
+        with self._lock:
+            self._conn.close()
+
+
+@dataclass
+class L2Stats:
+    """Счётчики L2-кеша."""
+
+    reads: int = 0
+    hits: int = 0
+    writes: int = 0
+    flushes: int = 0
+    errors: int = 0
+
+
+class L2Cache:
+    """Read-through / write-behind поверх PostgresCacheStore или SqliteCacheStore."""
+
+    def __init__(
+        self,
+        store: Union[PostgresCacheStore, SqliteCacheStore],
+        flush_interval: float = 2.0,
+        max_pending: int = 500
+    ):
+        """
+        Args:
+            store: PostgresCacheStore или SqliteCacheStore
+            flush_interval: Макс. задержка записи в L2 (сек)
+            max_pending: Записей в очереди для немедленного сброса
+        """
+        self.store = store
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        # Повторная запись того же ключа до сброса заменяет предыдущую
+        self._pending: Dict[Tuple[str, str], Tuple[Any, float]] = {}
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: Set[asyncio.Task] = set()
+        self._lock = asyncio.Lock()
+        self.stats = L2Stats()
+
+    def put(self, namespace: str, key: str, value: Any, ttl: float) -> None:
+        """
+        Поставить запись в очередь на запись в L2.
+
+        Args:
+            namespace: Пространство ключей ("video", "basket")
+            key: Ключ
+            value: Значение (JSON-сериализуемое, None допустим)
+            ttl: Время жизни записи (сек)
+        """
+        self._pending[(namespace, key)] = (value, time.time() + ttl)
+        if len(self._pending) >= self.max_pending:
+            self._spawn_flush()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(
+                self.flush_interval, self._spawn_flush
+            )
+
+    def _cancel_timer(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    def _spawn_flush(self) -> None:
+        self._cancel_timer()
+        task = create_background_task(self.flush())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def flush(self) -> None:
+        """Записать очередь в L2."""
+        async with self._lock:
+            self._cancel_timer()
+            if not self._pending:
+                return
+            pending, self._pending = self._pending, {}
+            rows = [
+                (namespace, key, value, expires)
+                for (namespace, key), (value, expires) in pending.items()
+            ]
+            try:
+                await self.store.put_many(rows)
+            except Exception as e:
+                self.stats.errors += 1
+                logger.warning(f"⚠️  L2-кеш: не удалось записать {len(rows)} записей: {e}")
+                return
+            self.stats.writes += len(rows)
+            self.stats.flushes += 1
+
+    async def get(self, namespace: str, key: str) -> Optional[Tuple[Any, float]]:
+        """
+        Прочитать запись из L2.
+
+        Returns:
+            (value, ttl) — значение и оставшееся время жизни (сек), None если нет
+        """
+        self.stats.reads += 1
+        now = time.time()
+        pending = self._pending.get((namespace, key))
+        if pending is not None:
+            row = pending
+        else:
+            try:
+                row = await self.store.get(namespace, key)
+            except Exception as e:
+                self.stats.errors += 1
+                logger.warning(f"⚠️  L2-кеш: ошибка чтения {namespace}/{key}: {e}")
+                return None
+        if row is None or row[1] <= now:
+            return None
+        self.stats.hits += 1
+        return row[0], row[1] - now
+
+    async def load(self, namespace: str, limit: int) -> List[Tuple[str, Any, float]]:
+        """
+        Снимок записей namespace для прогрева L1.
+
+        Returns:
+            [(key, value, ttl)] — самые свежие записи первыми
+        """
+        now = time.time()
+        try:
+            rows = await self.store.load(namespace, limit)
+        except Exception as e:
+            self.stats.errors += 1
+            logger.warning(f"⚠️  L2-кеш: ошибка загрузки снимка {namespace}: {e}")
+            return []
+        return [(key, value, expires - now) for key, value, expires in rows if expires > now]
+
+    def snapshot(self) -> Dict:
+        """Счётчики и размер очереди."""
+        return {
+            "pending": len(self._pending),
+            "reads": self.stats.reads,
+            "hits": self.stats.hits,
+            "writes": self.stats.writes,
+            "flushes": self.stats.flushes,
+            "errors": self.stats.errors,
+        }
+
+    async def close(self) -> None:
+        """Дописать очередь и закрыть хранилище."""
+        self._cancel_timer()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        await self.flush()
+        await self.store.close()
+
+
+# Singleton instance (None — L2 выключен)
+_media_cache_l2: Optional[L2Cache] = None
+
+
+async def start_media_cache_l2() -> Optional[L2Cache]:
+    """
+    Создать L2-кеш по настройкам MEDIA_CACHE_L2 и удалить истекшие записи.
+
+    Returns:
+        L2Cache или None если L2 выключен
+    """
+    global _media_cache_l2
+    settings = get_settings()
+    if settings.MEDIA_CACHE_L2 == L2_POSTGRES:
+        store = PostgresCacheStore()
+    elif settings.MEDIA_CACHE_L2 == L2_SQLITE:
+        store = SqliteCacheStore(settings.MEDIA_CACHE_L2_PATH)
+    else:
+        return None
+
+    _media_cache_l2 = L2Cache(store, flush_interval=settings.MEDIA_CACHE_L2_FLUSH_INTERVAL)
+    try:
+        removed = await store.delete_expired()
+        logger.info(f"✅ L2-кеш медиа ({settings.MEDIA_CACHE_L2}): удалено истекших {removed}")
+    except Exception as e:
+        logger.warning(f"⚠️  L2-кеш медиа недоступен: {e}")
+    return _media_cache_l2
+
+
+async def close_media_cache_l2() -> None:
+    """Отключить L2-кеш от кешей и дописать его очередь (до закрытия пула БД)."""
+    global _media_cache_l2
+    if _media_cache_l2 is not None:
+        # Закрытый L2 не должен получать put/get: кеши работают дальше без него
+        from services import video_cache
+        from services.wb_parser import WBParser
+        if video_cache._video_cache is not None:
+            video_cache._video_cache.detach_l2()
+        WBParser.detach_l2()
+        logger.info(f"L2-кеш медиа: {_media_cache_l2.snapshot()}")
+        await _media_cache_l2.close()
+        _media_cache_l2 = None
+
+
+def _l2_pending() -> int:
+    return len(_media_cache_l2._pending) if _media_cache_l2 is not None else 0
+
+
+gauge(
+    "media_cache_l2_pending", "Записей L2-кеша в очереди записи"
+).set_function(_l2_pending)
@@ -6,10 +6,14 @@ import time
 from pathlib import Path
 from typing import List, Optional, Callable, Awaitable
 from aiogram import Bot
-from aiogram.types import Message, InputMediaPhoto, URLInputFile, FSInputFile
+from aiogram.types import Message, URLInputFile, FSInputFile
 
 from services.wb_parser import ProductMedia
 from services.hls_converter import HLSConverter
+from services.photo_delivery import PhotoDelivery
+from services.message_editor import get_message_editor
+from services.zip_stream import ZipStreamInputFile
+from config.settings import get_settings
 from utils.exceptions import NoMediaError, HLSConversionError, FFmpegNotFoundError
 from utils.decorators import log_execution_time
 
@@ -52,54 +56,52 @@ class MediaDownloader:
         )
 
         total_start = time.perf_counter()
+        delivery = PhotoDelivery(self.bot)
+        editor = get_message_editor()
 
-        # Отправка группами по 10 (лимит sendMediaGroup)
-        for i in range(0, total, 10):
-            batch = media.photos[i:i+10]
-            batch_num = i // 10 + 1
-            total_batches = (total + 9) // 10
+        # Группы по 10 (лимит sendMediaGroup)
+        batches = [media.photos[i:i+10] for i in range(0, total, 10)]
+        total_batches = len(batches)
 
-            # Обновление прогресса
-            progress = min(i + len(batch), total)
-            try:
-                await status_msg.edit_text(
-                    f"📷 Загружаю фото {progress}/{total}..."
+        # Конвейер: следующая группа готовится, пока текущая загружается
+        next_group = asyncio.create_task(delivery.prepare(batches[0]))
+        sent = 0
+        try:
+            for batch_num, batch in enumerate(batches, start=1):
+                prepared = await next_group
+                if batch_num < total_batches:
+                    next_group = asyncio.create_task(delivery.prepare(batches[batch_num]))
+
+                # Обновление прогресса (коалесцируется)
+                await editor.request(
+                    status_msg, f"📷 Загружаю фото {sent + len(batch)}/{total}..."
                 )
-            except Exception as e:
-                logger.warning(f"⚠️  Не удалось обновить прогресс: {e}")
-
-            # Создание media group
-            media_group = [
-                InputMediaPhoto(media=URLInputFile(url))
-                for url in batch
-            ]
-
-            logger.debug(
-                f"📷 Отправка batch {batch_num}/{total_batches}: "
-                f"{len(batch)} фото ({i+1}-{i+len(batch)})"
-            )
 
-            try:
-                batch_start = time.perf_counter()
-                await self.bot.send_media_group(
-                    chat_id=chat_id,
-                    media=media_group,
-                    request_timeout=120  # Увеличен таймаут для медленных сетей
+                logger.debug(
+                    f"📷 Отправка batch {batch_num}/{total_batches}: "
+                    f"{len(batch)} фото ({sent+1}-{sent+len(batch)})"
                 )
-                batch_time = time.perf_counter() - batch_start
 
-                logger.info(
-                    f"✅ Batch {batch_num}/{total_batches} отправлен за {batch_time:.2f}s"
-                )
+                try:
+                    batch_start = time.perf_counter()
+                    strategy = await delivery.send_prepared(chat_id, prepared)
+                    batch_time = time.perf_counter() - batch_start
 
-                await asyncio.sleep(0.5)  # Задержка между группами
+                    logger.info(
+                        f"✅ Batch {batch_num}/{total_batches} отправлен за {batch_time:.2f}s "
+                        f"(стратегия: {strategy})"
+                    )
+                    sent += len(batch)
 
-            except Exception as e:
-                logger.error(
-                    f"❌ Ошибка отправки batch {batch_num}/{total_batches}: "
-                    f"{type(e).__name__}: {e}"
-                )
-                raise
+                except Exception as e:
+                    logger.error(
+                        f"❌ Ошибка отправки batch {batch_num}/{total_batches}: "
+                        f"{type(e).__name__}: {e}"
+                    )
+                    raise
+        finally:
+            if not next_group.done():
+                next_group.cancel()
 
         # Вызов callback после успешной отправки
         if on_success:
@@ -111,11 +113,8 @@ class MediaDownloader:
                     f"{type(e).__name__}: {e}"
                 )
 
-        # Удаление сообщения о прогрессе
-        try:
-            await status_msg.delete()
-        except Exception:
-            pass
+        # Удаление сообщения о прогрессе (вместе с отложенными правками)
+        await editor.delete(status_msg)
 
         total_time = time.perf_counter() - total_start
         logger.info(
@@ -123,6 +122,82 @@ class MediaDownloader:
             f"за {total_time:.2f}s (средн. {total_time/total:.2f}s на фото)"
         )
 
+    @log_execution_time()
+    async def send_photos_archive(
+        self,
+        chat_id: int,
+        media: ProductMedia,
+        status_msg: Message,
+        on_success: Optional[Callable[[int], Awaitable[None]]] = None
+    ) -> None:
+        """
+        Отправка всех фото одним ZIP архивом в оригинальном качестве.
+
+        Архив собирается потоково во время загрузки в Telegram:
+        один запрос вместо нескольких send_media_group и без пережатия.
+
+        Args:
+            chat_id: ID чата
+            media: Медиа товара
+            status_msg: Сообщение для обновления прогресса
+            on_success: Опциональный callback, вызывается после успешной отправки с количеством фото
+
+        Raises:
+            NoMediaError: Нет фотографий у товара
+            WBAPIError: Ошибка загрузки фото или превышен размер архива
+        """
+        if not media.has_photos():
+            raise NoMediaError("У этого товара нет фотографий")
+
+        total = len(media.photos)
+        logger.info(
+            f"🗂 Отправка архива из {total} фото в чат {chat_id} "
+            f"(product {media.nm_id})"
+        )
+
+        settings = get_settings()
+        editor = get_message_editor()
+        total_start = time.perf_counter()
+
+        async def update_progress(done: int, count: int):
+            await editor.request(status_msg, f"🗂 Упаковываю фото {done}/{count}...")
+
+        await editor.request(status_msg, f"🗂 Собираю архив из {total} фото...")
+
+        archive = ZipStreamInputFile(
+            entries=[
+                (f"{media.nm_id}_{i:02d}.webp", url)
+                for i, url in enumerate(media.photos, start=1)
+            ],
+            filename=f"{media.nm_id}_photos.zip",
+            concurrency=settings.ZIP_ARCHIVE_CONCURRENCY,
+            max_bytes=settings.ZIP_ARCHIVE_MAX_MB * 1024 * 1024,
+            on_entry=update_progress,
+        )
+        await self.bot.send_document(
+            chat_id=chat_id,
+            document=archive,
+            caption=f"🗂 Фото: {media.name} ({total} шт.)",
+            request_timeout=180  # Архив загружается по мере скачивания фото
+        )
+
+        # Вызов callback после успешной отправки
+        if on_success:
+            try:
+                await on_success(total)
+            except Exception as e:
+                logger.warning(
+                    f"⚠️  Ошибка в callback после отправки архива: "
+                    f"{type(e).__name__}: {e}"
+                )
+
+        await editor.delete(status_msg)
+
+        total_time = time.perf_counter() - total_start
+        logger.info(
+            f"✅ Архив из {total} фото отправлен в чат {chat_id} за {total_time:.2f}s"
+        )
+
     @log_execution_time()
     async def send_video(
         self,
@@ -157,6 +232,7 @@ class MediaDownloader:
 
         # Определяем тип видео
         is_hls = HLSConverter.is_hls_url(media.video)
+        editor = get_message_editor()
         temp_path: Optional[Path] = None
         converter: Optional[HLSConverter] = None
 
@@ -168,15 +244,9 @@ class MediaDownloader:
                 async def update_progress(percent: int):
                     if percent > last_progress[0]:
                         last_progress[0] = percent
-                        try:
-                            await status_msg.edit_text(f"⬇️ Скачивание: {percent}%")
-                        except Exception:
-                            pass
+                        await editor.request(status_msg, f"⬇️ Скачивание: {percent}%")
 
-                try:
-                    await status_msg.edit_text("⬇️ Скачивание: 0%")
-                except Exception as e:
-                    logger.warning(f"⚠️  Не удалось обновить прогресс: {e}")
+                await editor.request(status_msg, "⬇️ Скачивание: 0%")
 
                 converter = HLSConverter()
                 temp_path = await converter.download_hls_fast(
@@ -188,10 +258,7 @@ class MediaDownloader:
 
             else:
                 # Прямой MP4 URL
-                try:
-                    await status_msg.edit_text("⬇️ Скачивание...")
-                except Exception as e:
-                    logger.warning(f"⚠️  Не удалось обновить прогресс: {e}")
+                await editor.request(status_msg, "⬇️ Скачивание...")
                 video_input = URLInputFile(media.video)
 
             # Анимированный спиннер для отправки
@@ -201,12 +268,9 @@ class MediaDownloader:
             async def animate_spinner():
                 frame_idx = 0
                 while spinner_running[0]:
-                    try:
-                        await status_msg.edit_text(
-                            f"📤 Отправка в Telegram {spinner_frames[frame_idx]}"
-                        )
-                    except Exception:
-                        pass
+                    await editor.request(
+                        status_msg, f"📤 Отправка в Telegram {spinner_frames[frame_idx]}"
+                    )
                     frame_idx = (frame_idx + 1) % len(spinner_frames)
                     await asyncio.sleep(0.8)
 
@@ -243,30 +307,22 @@ class MediaDownloader:
                     )
 
             # Удаляем сообщение о прогрессе
-            try:
-                await status_msg.delete()
-            except Exception:
-                pass
+            await editor.delete(status_msg)
             logger.info(
                 f"✅ Видео успешно отправлено в чат {chat_id} за {video_time:.2f}s"
             )
 
         except FFmpegNotFoundError:
             logger.error("❌ ffmpeg не установлен")
-            try:
-                await status_msg.edit_text(
-                    "❌ Сервер не поддерживает HLS видео (ffmpeg не установлен)"
-                )
-            except Exception:
-                pass
+            await editor.edit_now(
+                status_msg,
+                "❌ Сервер не поддерживает HLS видео (ffmpeg не установлен)"
+            )
             raise
 
         except HLSConversionError as e:
             logger.error(f"❌ Ошибка конвертации HLS: {e}")
-            try:
-                await status_msg.edit_text(f"❌ Ошибка конвертации видео: {e}")
-            except Exception:
-                pass
+            await editor.edit_now(status_msg, f"❌ Ошибка конвертации видео: {e}")
             raise
 
         except Exception as e:
@@ -274,12 +330,10 @@ class MediaDownloader:
                 f"❌ Ошибка отправки видео: {type(e).__name__}: {e}\n"
                 f"URL: {media.video}"
             )
-            try:
-                await status_msg.edit_text(
-                    "❌ Не удалось загрузить видео. Возможно, файл слишком большой (лимит 50 MB)"
-                )
-            except Exception:
-                pass
+            await editor.edit_now(
+                status_msg,
+                "❌ Не удалось загрузить видео. Возможно, файл слишком большой (лимит 50 MB)"
+            )
             raise
 
         finally:
@@ -318,6 +372,7 @@ class MediaDownloader:
         )
 
         is_hls = HLSConverter.is_hls_url(media.video)
+        editor = get_message_editor()
         temp_path: Optional[Path] = None
         converter: Optional[HLSConverter] = None
 
@@ -328,15 +383,9 @@ class MediaDownloader:
                 async def update_progress(percent: int):
                     if percent > last_progress[0]:
                         last_progress[0] = percent
-                        try:
-                            await status_msg.edit_text(f"⬇️ Скачивание: {percent}%")
-                        except Exception:
-                            pass
+                        await editor.request(status_msg, f"⬇️ Скачивание: {percent}%")
 
-                try:
-                    await status_msg.edit_text("⬇️ Скачивание: 0%")
-                except Exception as e:
-                    logger.warning(f"⚠️  Не удалось обновить прогресс: {e}")
+                await editor.request(status_msg, "⬇️ Скачивание: 0%")
 
                 converter = HLSConverter()
                 # Используем быстрое скачивание без сжатия
@@ -350,10 +399,7 @@ class MediaDownloader:
                     filename=f"video_{media.nm_id}.mp4"
                 )
             else:
-                try:
-                    await status_msg.edit_text("⬇️ Скачивание...")
-                except Exception as e:
-                    logger.warning(f"⚠️  Не удалось обновить прогресс: {e}")
+                await editor.request(status_msg, "⬇️ Скачивание...")
                 file_input = URLInputFile(
                     media.video,
                     filename=f"video_{media.nm_id}.mp4"
@@ -366,12 +412,9 @@ class MediaDownloader:
             async def animate_spinner():
                 frame_idx = 0
                 while spinner_running[0]:
-                    try:
-                        await status_msg.edit_text(
-                            f"📤 Отправка в Telegram {spinner_frames[frame_idx]}"
-                        )
-                    except Exception:
-                        pass
+                    await editor.request(
+                        status_msg, f"📤 Отправка в Telegram {spinner_frames[frame_idx]}"
+                    )
                     frame_idx = (frame_idx + 1) % len(spinner_frames)
                     await asyncio.sleep(0.8)
 
@@ -395,10 +438,7 @@ class MediaDownloader:
 
             send_time = time.perf_counter() - send_start
 
-            try:
-                await status_msg.delete()
-            except Exception:
-                pass
+            await editor.delete(status_msg)
 
             logger.info(
                 f"✅ Видео как документ отправлено в чат {chat_id} за {send_time:.2f}s"
@@ -406,20 +446,15 @@ class MediaDownloader:
 
         except FFmpegNotFoundError:
             logger.error("❌ ffmpeg не установлен")
-            try:
-                await status_msg.edit_text(
-                    "❌ Сервер не поддерживает HLS видео (ffmpeg не установлен)"
-                )
-            except Exception:
-                pass
+            await editor.edit_now(
+                status_msg,
+                "❌ Сервер не поддерживает HLS видео (ffmpeg не установлен)"
+            )
             raise
 
         except HLSConversionError as e:
             logger.error(f"❌ Ошибка скачивания HLS: {e}")
-            try:
-                await status_msg.edit_text(f"❌ Ошибка скачивания видео: {e}")
-            except Exception:
-                pass
+            await editor.edit_now(status_msg, f"❌ Ошибка скачивания видео: {e}")
             raise
 
         except Exception as e:
@@ -427,12 +462,10 @@ class MediaDownloader:
                 f"❌ Ошибка отправки документа: {type(e).__name__}: {e}\n"
                 f"URL: {media.video}"
             )
-            try:
-                await status_msg.edit_text(
-                    "❌ Не удалось загрузить видео. Возможно, файл слишком большой"
-                )
-            except Exception:
-                pass
+            await editor.edit_now(
+                status_msg,
+                "❌ Не удалось загрузить видео. Возможно, файл слишком большой"
+            )
             raise
 
         finally:
@@ -0,0 +1,255 @@
+"""
+Коалесцирование косметических правок сообщений (прогресс, спиннер, статусы).
+
+Прогресс UI генерирует много edit_text подряд, а Telegram считает каждый
+из них запросом к лимитам. MessageEditCoalescer для каждого сообщения:
+- хранит только последний желаемый текст (промежуточные отбрасываются);
+- выдерживает минимальный интервал между правками;
+- пропускает правки, не меняющие сообщение;
+- не отправляет две правки одного сообщения одновременно;
+- забывает отложенные правки, если сообщение удалено.
+"""
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.types import Message
+
+from config.settings import get_settings
+
+logger = logging.getLogger(__name__)
+
+# Ошибки Telegram, после которых сообщение больше нельзя править
+_GONE_MARKERS = (
+    "message to edit not found",
+    "message can't be edited",
+    "message to delete not found",
+)
+
+
+class _EditState:
+    """Состояние правок одного сообщения."""
+
+    __slots__ = ("last", "last_sent", "pending", "task", "inflight")
+
+    def __init__(self):
+        self.last: Optional[Tuple[str, Dict[str, Any]]] = None
+        self.last_sent: float = 0.0
+        self.pending: Optional[Tuple[str, Dict[str, Any]]] = None
+        self.task: Optional[asyncio.Task] = None
+        # Завершается, когда отправленная правка получила ответ Telegram
+        self.inflight: Optional[asyncio.Future] = None
+
+
+class MessageEditCoalescer:
+    """
+    Планировщик правок сообщений с коалесцированием.
+
+    Состояния хранятся в OrderedDict в порядке последнего обращения: при
+    достижении MAX_STATES давно не менявшиеся снимаются с головы, без
+    прохода по всем сообщениям. Лимит строгий: если голова ещё активна,
+    она всё равно снимается вместе с отложенной правкой.
+    """
+
+    MAX_STATES = 10000  # Защита от неограниченного роста
+    IDLE_SECONDS = 600  # Состояние без правок дольше — можно забыть
+
+    def __init__(self, min_interval: float):
+        """
+        Args:
+            min_interval: Минимальный интервал между правками одного сообщения (сек)
+        """
+        self.min_interval = min_interval
+        self._states: "OrderedDict[Hashable, _EditState]" = OrderedDict()
+        self.applied = 0
+        self.coalesced = 0
+        self.skipped = 0
+
+    @staticmethod
+    def _key(message: Message) -> Hashable:
+        return (message.chat.id, message.message_id)
+
+    def _state(self, key: Hashable) -> _EditState:
+        state = self._states.get(key)
+        if state is None:
+            if len(self._states) >= self.MAX_STATES:
+                self._evict()
+            state = _EditState()
+            self._states[key] = state
+        else:
+            self._states.move_to_end(key)
+        return state
+
+    def _evict(self) -> None:
+        """Снять с головы давно не менявшиеся состояния и освободить место под новое."""
+        threshold = time.monotonic() - self.IDLE_SECONDS
+        while self._states:
+            oldest = next(iter(self._states.values()))
+            full = len(self._states) >= self.MAX_STATES
+            if not full and (oldest.pending is not None or oldest.last_sent > threshold):
+                break
+            _, state = self._states.popitem(last=False)
+            self._cancel_pending(state)
+
+    async def request(self, message: Message, text: str, **kwargs: Any) -> None:
+        """
+        Запросить правку сообщения (косметическую).
+
+        Если интервал ещё не прошёл, правка откладывается; более поздний
+        запрос заменяет отложенный. Ошибки Telegram не пробрасываются.
+
+        Args:
+            message: Сообщение для правки
+            text: Желаемый текст
+            **kwargs: Дополнительные параметры edit_text (reply_markup, parse_mode)
+        """
+        key = self._key(message)
+        state = self._state(key)
+        desired = (text, kwargs)
+
+        if state.pending is not None:
+            state.pending = desired
+            self.coalesced += 1
+            return
+
+        if state.last == desired:
+            self.skipped += 1
+            return
+
+        delay = state.last_sent + self.min_interval - time.monotonic()
+        if delay <= 0:
+            await self._apply(key, message, desired)
+            return
+
+        state.pending = desired
+        state.task = asyncio.create_task(self._flush_later(key, message, delay))
+
+    async def edit_now(self, message: Message, text: str, **kwargs: Any) -> bool:
+        """
+        Немедленно применить правку (финальные состояния, ошибки).
+
+        Отложенная правка отменяется. Ошибки Telegram не пробрасываются.
+
+        Returns:
+            True если сообщение в итоге содержит желаемый текст
+        """
+        key = self._key(message)
+        state = self._state(key)
+        self._cancel_pending(state)
+
+        desired = (text, kwargs)
+        if state.last == desired:
+            self.skipped += 1
+            return True
+        return await self._apply(key, message, desired)
+
+    def forget(self, message: Message) -> None:
+        """Забыть сообщение и отменить его отложенные правки."""
+        state = self._states.pop(self._key(message), None)
+        if state is not None:
+            self._cancel_pending(state)
+
+    async def delete(self, message: Message) -> None:
+        """Удалить сообщение, отбросив отложенные правки."""
+        self.forget(message)
+        try:
+            await message.delete()
+        except Exception as e:
+            logger.debug(f"Не удалось удалить сообщение: {e}")
+
+    def pending_count(self) -> int:
+        """Количество сообщений с отложенными правками."""
+        return sum(1 for state in self._states.values() if state.pending is not None)
+
+    @staticmethod
+    def _cancel_pending(state: _EditState) -> None:
+        state.pending = None
+        if state.task is not None and not state.task.done():
+            state.task.cancel()
+        state.task = None
+
+    async def _flush_later(self, key: Hashable, message: Message, delay: float) -> None:
+        await asyncio.sleep(delay)
+        state = self._states.get(key)
+        if state is None or state.pending is None:
+            return
+        desired, state.pending, state.task = state.pending, None, None
+        if state.last == desired:
+            self.skipped += 1
+            return
+        await self._apply(key, message, desired)
+
+    async def _apply(
+        self,
+        key: Hashable,
+        message: Message,
+        desired: Tuple[str, Dict[str, Any]]
+    ) -> bool:
+        state = self._state(key)
+        # Правки одного сообщения выстраиваются в цепочку: следующая
+        # отправляется только после ответа на предыдущую
+        previous = state.inflight
+        done = asyncio.get_running_loop().create_future()
+        state.inflight = done
+        state.last_sent = time.monotonic()
+        try:
+            if previous is not None:
+                await asyncio.shield(previous)
+                if state.last == desired:
+                    self.skipped += 1
+                    return True
+            return await self._send(key, message, state, desired)
+        finally:
+            if not done.done():
+                done.set_result(None)
+            if state.inflight is done:
+                state.inflight = None
+
+    async def _send(
+        self,
+        key: Hashable,
+        message: Message,
+        state: _EditState,
+        desired: Tuple[str, Dict[str, Any]]
+    ) -> bool:
+        text, kwargs = desired
+        try:
+            await message.edit_text(text=text, **kwargs)
+        except TelegramBadRequest as e:
+            description = e.message.lower()
+            if "message is not modified" in description:
+                state.last = desired
+                return True
+            if any(marker in description for marker in _GONE_MARKERS):
+                logger.debug(f"Сообщение {key} удалено, правки отброшены")
+                self.forget(message)
+                return False
+            logger.debug(f"Не удалось изменить сообщение {key}: {e}")
+            return False
+        except Exception as e:
+            logger.debug(f"Не удалось изменить сообщение {key}: {type(e).__name__}: {e}")
+            return False
+        finally:
+            state.last_sent = time.monotonic()
+
+        state.last = desired
+        self.applied += 1
+        return True
+
+
+# Singleton instance
+_message_editor: Optional[MessageEditCoalescer] = None
+
+
+def get_message_editor() -> MessageEditCoalescer:
+    """Получить singleton экземпляр MessageEditCoalescer."""
+    global _message_editor
+    if _message_editor is None:
+        _message_editor = MessageEditCoalescer(
+            min_interval=get_settings().MESSAGE_EDIT_MIN_INTERVAL
+        )
+    return _message_editor
@@ -0,0 +1,324 @@
+"""
+Стратегии доставки групп фото в Telegram.
+
+1. URL passthrough — отдаём Telegram прямые URL, он сам скачивает с CDN
+   (ноль байт через процесс бота).
+2. Prefetch — если Telegram отклонил URL, параллельно скачиваем все фото
+   через общую HTTP сессию (с лимитом байт на группу) и загружаем их сами.
+
+Результаты и время каждой стратегии накапливаются в PhotoDeliveryStats.
+Отправка учитывает лимиты Telegram (TelegramRateLimiter) и retry_after.
+"""
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramBadRequest, TelegramRetryAfter
+from aiogram.types import BufferedInputFile, InputMediaPhoto
+
+from config.settings import get_settings
+from services.http_session import get_http_session
+from services.telegram_limiter import TelegramRateLimiter, get_telegram_rate_limiter
+from utils.exceptions import WBAPIError
+
+logger = logging.getLogger(__name__)
+
+STRATEGY_URL = "url"
+STRATEGY_PREFETCH = "prefetch"
+
+
+@dataclass
+class StrategyStats:
+    """Счётчики одной стратегии доставки."""
+
+    attempts: int = 0
+    successes: int = 0
+    failures: int = 0
+    total_time: float = 0.0
+    bytes_fetched: int = 0
+
+    def avg_time(self) -> float:
+        """Среднее время успешной доставки группы."""
+        return self.total_time / self.successes if self.successes else 0.0
+
+
+class PhotoDeliveryStats:
+    """
+    Статистика стратегий доставки фото.
+
+    Помимо счётчиков хранит адаптивное состояние: после серии отказов
+    URL passthrough временно отключается, чтобы не тратить запрос
+    к Telegram на заведомо неудачную попытку.
+    """
+
+    def __init__(self, failure_threshold: int = 3, cooldown_seconds: float = 600.0):
+        """
+        Args:
+            failure_threshold: Отказов URL подряд до временного отключения
+            cooldown_seconds: На сколько отключать URL passthrough
+        """
+        self._stats: Dict[str, StrategyStats] = {
+            STRATEGY_URL: StrategyStats(),
+            STRATEGY_PREFETCH: StrategyStats(),
+        }
+        self._failure_threshold = failure_threshold
+        self._cooldown = cooldown_seconds
+        self._url_consecutive_failures = 0
+        self._url_disabled_until = 0.0
+
+    def record(
+        self,
+        strategy: str,
+        success: bool,
+        elapsed: float,
+        bytes_fetched: int = 0
+    ) -> None:
+        """Записать результат попытки доставки."""
+        stats = self._stats[strategy]
+        stats.attempts += 1
+        stats.bytes_fetched += bytes_fetched
+        if success:
+            stats.successes += 1
+            stats.total_time += elapsed
+        else:
+            stats.failures += 1
+
+        if strategy == STRATEGY_URL:
+            if success:
+                self._url_consecutive_failures = 0
+            else:
+                self._url_consecutive_failures += 1
+                if self._url_consecutive_failures >= self._failure_threshold:
+                    self._url_disabled_until = time.monotonic() + self._cooldown
+                    self._url_consecutive_failures = 0
+                    logger.warning(
+                        f"⚠️  URL passthrough отключён на {self._cooldown:.0f}s "
+                        f"после {self._failure_threshold} отказов подряд"
+                    )
+
+    def url_allowed(self) -> bool:
+        """Можно ли сейчас пробовать URL passthrough."""
+        return time.monotonic() >= self._url_disabled_until
+
+    def snapshot(self) -> Dict[str, Dict]:
+        """Текущие значения счётчиков по стратегиям."""
+        return {
+            name: {
+                "attempts": s.attempts,
+                "successes": s.successes,
+                "failures": s.failures,
+                "avg_time": round(s.avg_time(), 3),
+                "bytes_fetched": s.bytes_fetched,
+            }
+            for name, s in self._stats.items()
+        }
+
+
+class _ByteBudget:
+    """Общий лимит байт на параллельные загрузки одной группы."""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.used = 0
+
+    def consume(self, size: int) -> None:
+        self.used += size
+        if self.used > self.limit:
+            raise WBAPIError(
+                f"Фото группы превышают лимит {self.limit // (1024 * 1024)} MB"
+            )
+
+
+@dataclass
+class PreparedGroup:
+    """Подготовленная к отправке группа фото."""
+
+    urls: List[str]
+    strategy: str
+    media: list
+    bytes_fetched: int = 0
+
+
+class PhotoDelivery:
+    """Отправка группы фото с выбором стратегии и fallback."""
+
+    def __init__(
+        self,
+        bot: Bot,
+        stats: Optional[PhotoDeliveryStats] = None,
+        limiter: Optional[TelegramRateLimiter] = None
+    ):
+        self.bot = bot
+        self.settings = get_settings()
+        self.stats = stats or get_photo_delivery_stats()
+        self.limiter = limiter or get_telegram_rate_limiter()
+
+    async def prepare(self, urls: List[str]) -> PreparedGroup:
+        """
+        Подготовить группу к отправке.
+
+        Для URL passthrough подготовка мгновенная; если passthrough
+        отключён — фото скачиваются заранее, что позволяет готовить
+        следующую группу, пока текущая загружается в Telegram.
+
+        Args:
+            urls: URLs фотографий группы (до 10 шт.)
+
+        Returns:
+            PreparedGroup
+        """
+        if self.settings.PHOTO_DELIVERY_URL_PASSTHROUGH and self.stats.url_allowed():
+            return PreparedGroup(
+                urls=urls,
+                strategy=STRATEGY_URL,
+                media=[InputMediaPhoto(media=url) for url in urls],
+            )
+        return await self._prepare_prefetch(urls)
+
+    async def send_prepared(self, chat_id: int, group: PreparedGroup) -> str:
+        """
+        Отправить подготовленную группу.
+
+        При отказе Telegram по URL группа скачивается и отправляется повторно.
+
+        Args:
+            chat_id: ID чата
+            group: Результат prepare()
+
+        Returns:
+            Название сработавшей стратегии
+        """
+        if group.strategy == STRATEGY_URL:
+            start = time.perf_counter()
+            try:
+                await self._send_media_group(chat_id, group.media)
+                self.stats.record(STRATEGY_URL, True, time.perf_counter() - start)
+                return STRATEGY_URL
+            except TelegramBadRequest as e:
+                self.stats.record(STRATEGY_URL, False, time.perf_counter() - start)
+                logger.warning(
+                    f"⚠️  Telegram отклонил URL фото ({e.message}), "
+                    f"переключаемся на prefetch"
+                )
+            group = await self._prepare_prefetch(group.urls)
+            # Токен чата уже списан за эту отправку попыткой по URL
+            charged = True
+        else:
+            charged = False
+
+        start = time.perf_counter()
+        try:
+            await self._send_media_group(chat_id, group.media, charged=charged)
+        except Exception:
+            self.stats.record(
+                STRATEGY_PREFETCH, False, time.perf_counter() - start, group.bytes_fetched
+            )
+            raise
+        self.stats.record(
+            STRATEGY_PREFETCH, True, time.perf_counter() - start, group.bytes_fetched
+        )
+        return STRATEGY_PREFETCH
+
+    async def send_group(self, chat_id: int, urls: List[str]) -> str:
+        """
+        Подготовить и отправить группу фото (до 10 шт.).
+
+        Args:
+            chat_id: ID чата
+            urls: URLs фотографий группы
+
+        Returns:
+            Название сработавшей стратегии
+        """
+        return await self.send_prepared(chat_id, await self.prepare(urls))
+
+    async def _prepare_prefetch(self, urls: List[str]) -> PreparedGroup:
+        files = await self.prefetch(urls)
+        return PreparedGroup(
+            urls=urls,
+            strategy=STRATEGY_PREFETCH,
+            media=[
+                InputMediaPhoto(media=BufferedInputFile(data, filename=f"{i}.webp"))
+                for i, data in enumerate(files, start=1)
+            ],
+            bytes_fetched=sum(len(data) for data in files),
+        )
+
+    async def prefetch(self, urls: List[str]) -> List[bytes]:
+        """
+        Параллельно скачать фото через общую HTTP сессию.
+
+        Args:
+            urls: URLs фотографий
+
+        Returns:
+            Содержимое файлов в порядке urls
+
+        Raises:
+            WBAPIError: Ошибка загрузки или превышен лимит байт
+        """
+        session = await get_http_session()
+        semaphore = asyncio.Semaphore(self.settings.PHOTO_PREFETCH_CONCURRENCY)
+        budget = _ByteBudget(self.settings.PHOTO_PREFETCH_MAX_BYTES)
+
+        async def fetch(url: str) -> bytes:
+            async with semaphore:
+                async with session.get(url) as response:
+                    if response.status != 200:
+                        raise WBAPIError(f"HTTP {response.status} при загрузке {url}")
+                    chunks = []
+                    async for chunk in response.content.iter_chunked(64 * 1024):
+                        budget.consume(len(chunk))
+                        chunks.append(chunk)
+                    return b"".join(chunks)
+
+        tasks = [asyncio.create_task(fetch(url)) for url in urls]
+        try:
+            return list(await asyncio.gather(*tasks))
+        except Exception:
+            for task in tasks:
+                task.cancel()
+            raise
+
+    async def _send_media_group(
+        self, chat_id: int, media_group: list, charged: bool = False
+    ) -> None:
+        """
+        Отправка с учётом лимитов чата и повтором после flood wait.
+
+        Одна отправка группы — один запрос и один токен чата, сколько бы
+        фото в ней ни было. charged=True — токен уже списан (повтор той же
+        отправки другой стратегией); после flood wait токен ждётся заново.
+        """
+        retries = self.settings.TELEGRAM_FLOOD_RETRIES
+        for attempt in range(1, retries + 2):
+            if attempt > 1 or not charged:
+                await self.limiter.acquire(chat_id)
+            try:
+                await self.bot.send_media_group(
+                    chat_id=chat_id,
+                    media=media_group,
+                    request_timeout=120  # Увеличен таймаут для медленных сетей
+                )
+                return
+            except TelegramRetryAfter as e:
+                self.limiter.penalize(chat_id, e.retry_after)
+                if attempt > retries:
+                    raise
+                logger.warning(
+                    f"⚠️  Flood wait при отправке группы в чат {chat_id}, "
+                    f"повтор {attempt}/{retries} через {e.retry_after}s"
+                )
+
+
+# Глобальная статистика доставки
+_photo_delivery_stats = PhotoDeliveryStats()
+
+
+def get_photo_delivery_stats() -> PhotoDeliveryStats:
+    """Получить глобальную статистику доставки фото."""
+    return _photo_delivery_stats
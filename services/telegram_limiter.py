@@ -0,0 +1,105 @@
+"""Учёт per-chat лимитов Telegram Bot API."""
+
+import logging
+from collections import OrderedDict
+from typing import Optional
+
+from config.settings import get_settings
+from utils.token_bucket import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+
+class TelegramRateLimiter:
+    """
+    Token bucket лимитер исходящих запросов в отдельные чаты.
+
+    Per-chat bucket: лимит одного чата (~1 сообщение/сек с небольшим burst).
+    Глобальный лимит бота соблюдает TelegramRequestScheduler на уровне
+    сессии aiogram, поэтому здесь он не дублируется.
+
+    Вместо фиксированных пауз запрос ждёт ровно столько, сколько нужно
+    для накопления токенов. Flood wait (retry_after) от Telegram
+    обнуляет bucket чата на указанное время.
+
+    Buckets хранятся в OrderedDict в порядке последнего запроса (как в
+    UserRateLimiter): полные buckets снимаются с головы, поэтому новый
+    чат обходится в O(1) амортизированно, а не в проход по всем чатам.
+    """
+
+    MAX_CHAT_BUCKETS = 10000  # Защита от неограниченного роста
+
+    def __init__(self, chat_rate: float, chat_burst: float):
+        """
+        Args:
+            chat_rate: Запросов в секунду на один чат
+            chat_burst: Максимальный burst одного чата
+        """
+        self._chat_rate = chat_rate
+        self._chat_burst = chat_burst
+        self._chats: "OrderedDict[int, TokenBucket]" = OrderedDict()
+
+    def _chat_bucket(self, chat_id: int) -> TokenBucket:
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            self._evict()
+            bucket = TokenBucket(rate=self._chat_rate, capacity=self._chat_burst)
+            self._chats[chat_id] = bucket
+        else:
+            self._chats.move_to_end(chat_id)
+        return bucket
+
+    def _evict(self) -> None:
+        """Снять с головы полные buckets и лишние сверх MAX_CHAT_BUCKETS."""
+        while len(self._chats) >= self.MAX_CHAT_BUCKETS:
+            self._chats.popitem(last=False)
+        while self._chats:
+            oldest = next(iter(self._chats.values()))
+            if oldest.tokens < oldest.capacity:
+                break
+            self._chats.popitem(last=False)
+
+    async def acquire(self, chat_id: int, cost: float = 1.0) -> float:
+        """
+        Дождаться разрешения на запрос в чат.
+
+        Args:
+            chat_id: ID чата
+            cost: Стоимость запроса в токенах
+
+        Returns:
+            Время ожидания в секундах
+        """
+        waited = await self._chat_bucket(chat_id).acquire(cost)
+        if waited > 0.05:
+            logger.debug(f"Telegram limiter: чат {chat_id} ждал {waited:.2f}s")
+        return waited
+
+    def penalize(self, chat_id: int, retry_after: float) -> None:
+        """
+        Учесть flood wait от Telegram.
+
+        Args:
+            chat_id: ID чата, для которого получен 429
+            retry_after: Сколько секунд Telegram просит подождать
+        """
+        logger.warning(
+            f"⚠️  Flood wait для чата {chat_id}: retry_after={retry_after}s"
+        )
+        self._chat_bucket(chat_id).drain(retry_after)
+
+
+# Singleton instance
+_telegram_rate_limiter: Optional[TelegramRateLimiter] = None
+
+
+def get_telegram_rate_limiter() -> TelegramRateLimiter:
+    """Получить singleton экземпляр TelegramRateLimiter."""
+    global _telegram_rate_limiter
+    if _telegram_rate_limiter is None:
+        settings = get_settings()
+        _telegram_rate_limiter = TelegramRateLimiter(
+            chat_rate=settings.TELEGRAM_CHAT_RATE,
+            chat_burst=settings.TELEGRAM_CHAT_BURST,
+        )
+    return _telegram_rate_limiter
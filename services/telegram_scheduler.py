@@ -0,0 +1,237 @@
+"""
+Глобальный планировщик исходящих запросов к Telegram Bot API.
+
+Подключается как request middleware к сессии aiogram, поэтому через него
+проходят все вызовы бота: карточки, группы фото, видео, правки прогресса,
+уведомления и дайджест. Планировщик:
+- соблюдает общий лимит бота (token bucket);
+- при очереди выдаёт токены по приоритету полос:
+  ответы пользователю → правки прогресса → уведомления в канал;
+- собирает метрики времени ожидания в очереди по полосам.
+"""
+
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from aiogram import Bot
+from aiogram.client.session.middlewares.base import (
+    BaseRequestMiddleware,
+    NextRequestMiddlewareType,
+)
+from aiogram.methods import Response, TelegramMethod
+from aiogram.methods.base import TelegramType
+
+from config.settings import get_settings
+from utils.metrics import gauge, histogram
+from utils.token_bucket import TokenBucket
+from utils.tracing import create_background_task
+
+logger = logging.getLogger(__name__)
+
+# Полосы приоритета (меньше — важнее)
+LANE_USER = 0
+LANE_PROGRESS = 1
+LANE_BACKGROUND = 2
+
+LANE_NAMES = {
+    LANE_USER: "user",
+    LANE_PROGRESS: "progress",
+    LANE_BACKGROUND: "background",
+}
+
+# Служебные методы, не расходующие лимит отправки
+_EXEMPT_METHODS = frozenset({
+    "getUpdates",
+    "getMe",
+    "getWebhookInfo",
+    "setWebhook",
+    "deleteWebhook",
+})
+
+# Косметические методы (прогресс, спиннеры, уборка статусов)
+_PROGRESS_METHODS = frozenset({
+    "editMessageText",
+    "editMessageReplyMarkup",
+    "editMessageCaption",
+    "deleteMessage",
+    "sendChatAction",
+})
+
+_REQUEST_SECONDS = histogram(
+    "telegram_request_seconds", "Время запроса к Bot API", ("method",)
+)
+_QUEUE_WAIT_SECONDS = histogram(
+    "telegram_queue_wait_seconds", "Ожидание токена в очереди", ("lane",)
+)
+
+
+@dataclass
+class LaneStats:
+    """Метрики ожидания одной полосы."""
+
+    requests: int = 0
+    queued: int = 0
+    total_wait: float = 0.0
+    max_wait: float = 0.0
+
+    def record(self, waited: float) -> None:
+        self.requests += 1
+        self.total_wait += waited
+        if waited > self.max_wait:
+            self.max_wait = waited
+
+    def avg_wait(self) -> float:
+        """Среднее время ожидания запроса."""
+        return self.total_wait / self.requests if self.requests else 0.0
+
+
+class TelegramRequestScheduler(BaseRequestMiddleware):
+    """Request middleware с глобальным лимитом и приоритетными полосами."""
+
+    def __init__(
+        self,
+        rate: float,
+        capacity: Optional[float] = None,
+        background_chat_ids: Iterable[int] = ()
+    ):
+        """
+        Args:
+            rate: Запросов в секунду на весь бот
+            capacity: Burst (по умолчанию равен rate)
+            background_chat_ids: Чаты, запросы в которые идут в фоновую полосу
+        """
+        self.bucket = TokenBucket(rate=rate, capacity=capacity or rate)
+        self.background_chat_ids = frozenset(background_chat_ids)
+        self._queue: List[Tuple[int, int, asyncio.Future]] = []
+        self._seq = itertools.count()
+        self._dispatcher: Optional[asyncio.Task] = None
+        self.stats: Dict[int, LaneStats] = {lane: LaneStats() for lane in LANE_NAMES}
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: Bot,
+        method: TelegramMethod[TelegramType],
+    ) -> Response[TelegramType]:
+        lane = self.classify(method)
+        if lane is not None:
+            await self.acquire(lane)
+        start = time.perf_counter()
+        try:
+            return await make_request(bot, method)
+        finally:
+            _REQUEST_SECONDS.observe(
+                time.perf_counter() - start, method=method.__api_method__
+            )
+
+    def classify(self, method: TelegramMethod) -> Optional[int]:
+        """
+        Определить полосу запроса.
+
+        Returns:
+            Полоса или None для служебных методов вне лимита
+        """
+        api_method = method.__api_method__
+        if api_method in _EXEMPT_METHODS:
+            return None
+        if getattr(method, "chat_id", None) in self.background_chat_ids:
+            return LANE_BACKGROUND
+        if api_method in _PROGRESS_METHODS:
+            return LANE_PROGRESS
+        return LANE_USER
+
+    async def acquire(self, lane: int = LANE_USER) -> float:
+        """
+        Дождаться глобального токена для запроса полосы lane.
+
+        Returns:
+            Время ожидания в очереди (сек)
+        """
+        stats = self.stats[lane]
+        if not self._queue and self.bucket.try_consume():
+            stats.record(0.0)
+            _QUEUE_WAIT_SECONDS.observe(0.0, lane=LANE_NAMES[lane])
+            return 0.0
+
+        start = time.monotonic()
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._queue, (lane, next(self._seq), future))
+        stats.queued += 1
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = create_background_task(self._dispatch())
+        try:
+            await future
+        finally:
+            stats.queued -= 1
+
+        waited = time.monotonic() - start
+        stats.record(waited)
+        _QUEUE_WAIT_SECONDS.observe(waited, lane=LANE_NAMES[lane])
+        if waited > 1.0:
+            logger.debug(
+                f"Telegram scheduler: запрос полосы {LANE_NAMES[lane]} ждал {waited:.2f}s"
+            )
+        return waited
+
+    async def _dispatch(self) -> None:
+        """Выдавать токены ожидающим в порядке приоритета."""
+        while self._queue:
+            # Отменённые ожидания не должны тратить токены
+            if self._queue[0][2].done():
+                heapq.heappop(self._queue)
+                continue
+            if not self.bucket.try_consume():
+                await asyncio.sleep(max(self.bucket.time_until(), 0.001))
+                continue
+            _, _, future = heapq.heappop(self._queue)
+            future.set_result(None)
+
+    def snapshot(self) -> Dict[str, Dict]:
+        """Метрики очереди по полосам."""
+        return {
+            LANE_NAMES[lane]: {
+                "requests": s.requests,
+                "queued": s.queued,
+                "avg_wait": round(s.avg_wait(), 3),
+                "max_wait": round(s.max_wait, 3),
+            }
+            for lane, s in self.stats.items()
+        }
+
+
+# Singleton instance
+_telegram_scheduler: Optional[TelegramRequestScheduler] = None
+
+
+def get_telegram_scheduler() -> TelegramRequestScheduler:
+    """Получить singleton экземпляр TelegramRequestScheduler."""
+    global _telegram_scheduler
+    if _telegram_scheduler is None:
+        settings = get_settings()
+        background = (
+            [settings.ANALYTICS_CHANNEL_ID] if settings.ANALYTICS_CHANNEL_ID else []
+        )
+        _telegram_scheduler = TelegramRequestScheduler(
+            rate=settings.TELEGRAM_GLOBAL_RATE,
+            background_chat_ids=background,
+        )
+    return _telegram_scheduler
+
+
+def _queue_depth() -> Dict[Tuple[str, ...], float]:
+    if _telegram_scheduler is None:
+        return {}
+    return {
+        (LANE_NAMES[lane],): s.queued
+        for lane, s in _telegram_scheduler.stats.items()
+    }
+
+
+gauge(
+    "telegram_queue_depth", "Запросов в очереди планировщика", ("lane",)
+).set_function(_queue_depth)
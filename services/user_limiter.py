@@ -0,0 +1,243 @@
+"""Token bucket лимитер входящих запросов пользователей."""
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Callable, Optional, Union
+
+from config.settings import get_settings
+from db.connection import get_pool
+from utils.token_bucket import TokenBucket
+from utils.tracing import create_background_task
+
+logger = logging.getLogger(__name__)
+
+BACKEND_MEMORY = "memory"
+BACKEND_POSTGRES = "postgres"
+
+
+class UserRateLimiter:
+    """
+    Per-user token bucket в памяти процесса.
+
+    Buckets хранятся в OrderedDict в порядке последнего запроса. Bucket
+    пользователя, который не писал дольше capacity / rate секунд, снова
+    полон и ничем не отличается от нового — такие записи снимаются с
+    головы словаря по ходу запросов. Каждая запись удаляется не более
+    одного раза, поэтому стоимость запроса O(1) амортизированно и не
+    зависит от числа активных пользователей. max_users ограничивает
+    память при всплеске новых пользователей.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        burst: float,
+        max_users: int = 100000,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        """
+        Args:
+            rate: Запросов в секунду на пользователя
+            burst: Запросов подряд без ожидания
+            max_users: Лимит buckets в памяти
+            clock: Источник времени (для тестов)
+        """
+        self.rate = rate
+        self.burst = burst
+        self.max_users = max_users
+        self._clock = clock
+        self._buckets: "OrderedDict[int, TokenBucket]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def hit(self, user_id: int) -> float:
+        """
+        Учесть запрос пользователя.
+
+        Args:
+            user_id: Telegram ID пользователя
+
+        Returns:
+            0 если запрос разрешён, иначе сколько секунд ждать
+        """
+        bucket = self._buckets.get(user_id)
+        if bucket is None:
+            bucket = TokenBucket(rate=self.rate, capacity=self.burst, clock=self._clock)
+            self._buckets[user_id] = bucket
+        else:
+            self._buckets.move_to_end(user_id)
+
+        wait = 0.0 if bucket.try_consume() else bucket.time_until()
+        # После списания токена bucket текущего пользователя не полон
+        self._evict()
+        return wait
+
+    def _evict(self) -> None:
+        """Снять с головы полные buckets и лишние сверх max_users."""
+        while len(self._buckets) > self.max_users:
+            self._buckets.popitem(last=False)
+        while self._buckets:
+            oldest = next(iter(self._buckets.values()))
+            if oldest.tokens < oldest.capacity:
+                break
+            self._buckets.popitem(last=False)
+
+    async def check(self, user_id: int) -> float:
+        """Асинхронный интерфейс hit() (общий с PostgresRateLimiter)."""
+        return self.hit(user_id)
+
+    async def close(self) -> None:
+        """Нечего закрывать (интерфейс общий с PostgresRateLimiter)."""
+
+
+class PostgresRateLimiter:
+    """
+    Token buckets в PostgreSQL, общие для нескольких реплик бота.
+
+    Пополнение и списание токена — один атомарный UPSERT. Если БД
+    недоступна, запросы учитываются локальным UserRateLimiter.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        burst: float,
+        fallback: UserRateLimiter,
+        prune_interval: float = 300.0
+    ):
+        """
+        Args:
+            rate: Запросов в секунду на пользователя
+            burst: Запросов подряд без ожидания
+            fallback: Локальный лимитер на время недоступности БД
+            prune_interval: Период удаления строк неактивных пользователей (сек)
+        """
+        self.rate = rate
+        self.burst = burst
+        self.fallback = fallback
+        self.prune_interval = prune_interval
+        self._last_prune = time.monotonic()
+        self._prune_task: Optional[asyncio.Task] = None
+
+    async def check(self, user_id: int) -> float:
+        """
+        Учесть запрос пользователя.
+
+        Args:
+            user_id: Telegram ID пользователя
+
+        Returns:
+            0 если запрос разрешён, иначе сколько секунд ждать
+        """
+        pool = await get_pool()
+        if pool is None:
+            return self.fallback.hit(user_id)
+
+        try:
+            async with pool.acquire() as conn:
+                # NULL — токенов не хватило, строка не изменена
+                tokens = await conn.fetchval(
+                    """
+                    INSERT INTO shared.user_rate_limits AS b (telegram_id, tokens, updated_at)
+                    VALUES ($1, $2::float8 - 1, NOW())
+                    ON CONFLICT (telegram_id) DO UPDATE
+                    SET tokens = LEAST(
+                            $2::float8,
+                            b.tokens + EXTRACT(EPOCH FROM NOW() - b.updated_at) * $3::float8
+                        ) - 1,
+                        updated_at = NOW()
+                    WHERE LEAST(
+                        $2::float8,
+                        b.tokens + EXTRACT(EPOCH FROM NOW() - b.updated_at) * $3::float8
+                    ) >= 1
+                    RETURNING tokens
+                    """,
+                    user_id, self.burst, self.rate
+                )
+                if tokens is None:
+                    tokens = await conn.fetchval(
+                        """
+                        SELECT LEAST(
+                            $2::float8,
+                            tokens + EXTRACT(EPOCH FROM NOW() - updated_at) * $3::float8
+                        )
+                        FROM shared.user_rate_limits
+                        WHERE telegram_id = $1
+                        """,
+                        user_id, self.burst, self.rate
+                    )
+                    return max(0.0, (1 - (tokens or 0.0)) / self.rate)
+        except Exception as e:
+            logger.warning(f"⚠️  Rate limiter: БД недоступна ({e}), локальный лимит")
+            return self.fallback.hit(user_id)
+
+        self._maybe_prune()
+        return 0.0
+
+    def _maybe_prune(self) -> None:
+        now = time.monotonic()
+        if now - self._last_prune < self.prune_interval:
+            return
+        self._last_prune = now
+        if self._prune_task is None or self._prune_task.done():
+            self._prune_task = create_background_task(self.prune())
+
+    async def prune(self) -> None:
+        """Удалить строки пользователей, чьи buckets уже полны."""
+        pool = await get_pool()
+        if pool is None:
+            return
+        idle = self.burst / self.rate
+        try:
+            async with pool.acquire() as conn:
+                await conn.execute(
+                    """
+                    DELETE FROM shared.user_rate_limits
+                    WHERE updated_at < NOW() - make_interval(secs => $1)
+                    """,
+                    idle
+                )
+        except Exception as e:
+            logger.warning(f"⚠️  Rate limiter: ошибка очистки ({e})")
+
+    async def close(self) -> None:
+        """Дождаться фоновой очистки."""
+        if self._prune_task is not None:
+            await asyncio.gather(self._prune_task, return_exceptions=True)
+
+
+# Singleton instance
+_user_rate_limiter: Optional[Union[UserRateLimiter, PostgresRateLimiter]] = None
+
+
+def get_user_rate_limiter() -> Union[UserRateLimiter, PostgresRateLimiter]:
+    """Получить singleton лимитер пользователей (backend по RATE_LIMIT_BACKEND)."""
+    global _user_rate_limiter
+    if _user_rate_limiter is None:
+        settings = get_settings()
+        rate = 1 / settings.RATE_LIMIT_SECONDS
+        memory = UserRateLimiter(
+            rate=rate,
+            burst=settings.RATE_LIMIT_BURST,
+            max_users=settings.RATE_LIMIT_MAX_USERS,
+        )
+        if settings.RATE_LIMIT_BACKEND == BACKEND_POSTGRES:
+            _user_rate_limiter = PostgresRateLimiter(
+                rate=rate,
+                burst=settings.RATE_LIMIT_BURST,
+                fallback=memory,
+            )
+        else:
+            _user_rate_limiter = memory
+    return _user_rate_limiter
+
+
+async def close_user_rate_limiter() -> None:
+    """Закрыть лимитер пользователей (при остановке бота)."""
+    global _user_rate_limiter
+    if _user_rate_limiter is not None:
+        await _user_rate_limiter.close()
+        _user_rate_limiter = None
@@ -1,27 +1,96 @@
 """Кеш для найденных видео URLs."""
 
+import asyncio
+import sys
 import time
-from typing import Optional, Dict, Tuple
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Callable, Dict, Optional, Tuple
 import logging
 
+from config.settings import get_settings
+from utils.metrics import counter, gauge
+
+if TYPE_CHECKING:
+    from services.media_cache_l2 import L2Cache
+
 logger = logging.getLogger(__name__)
 
 
+class _Entry:
+    """Запись кеша: URL (None — видео нет) и момент истечения."""
+
+    __slots__ = ("url", "expires")
+
+    def __init__(self, url: Optional[str], expires: float):
+        self.url = url
+        self.expires = expires
+
+
+# Пространство ключей кеша видео в L2
+L2_NAMESPACE = "video"
+
+# Размер пустой записи в памяти (без ключа и URL)
+_ENTRY_BYTES = sys.getsizeof(_Entry(None, 0.0))
+
+
+def _entry_bytes(nm_id: str, url: Optional[str]) -> int:
+    """Оценка памяти под запись: ключ, URL и сама запись."""
+    return _ENTRY_BYTES + sys.getsizeof(nm_id) + (sys.getsizeof(url) if url else 0)
+
+
+@dataclass
+class VideoCacheStats:
+    """Счётчики кеша видео."""
+
+    hits: int = 0
+    negative_hits: int = 0
+    misses: int = 0
+    l2_hits: int = 0
+    evicted: int = 0
+    expired: int = 0
+
+
 class VideoCache:
     """
-    Кеш видео URLs с TTL.
+    LRU-кеш видео URLs с TTL.
 
     Хранит найденные видео URLs чтобы не искать их повторно.
-    TTL: 1 час (видео редко меняются).
+    TTL: 1 час (видео редко меняются). Результат «видео нет» живёт
+    меньше (negative_ttl_seconds): видео могут добавить в карточку.
+    Число записей ограничено max_entries, при переполнении вытесняются
+    давно не запрошенные. Истекшие записи удаляются при чтении и
+    фоновой очисткой (start_sweeper).
+
+    С attach_l2() записи дублируются в L2-кеш (services/media_cache_l2.py),
+    а fetch() дочитывает промахи из него.
     """
 
-    def __init__(self, ttl_seconds: int = 3600):
+    # L2-кеш (None — только память процесса)
+    _l2: Optional["L2Cache"] = None
+
+    def __init__(
+        self,
+        ttl_seconds: int = 3600,
+        negative_ttl_seconds: Optional[int] = None,
+        max_entries: int = 50000,
+        clock: Callable[[], float] = time.monotonic
+    ):
         """
         Args:
             ttl_seconds: Time to live в секундах (по умолчанию 1 час)
+            negative_ttl_seconds: TTL записей «видео нет» (по умолчанию ttl_seconds)
+            max_entries: Максимум записей (LRU вытеснение)
+            clock: Источник времени (для тестов)
         """
-        self._cache: Dict[str, Dict] = {}
+        self._cache: "OrderedDict[str, _Entry]" = OrderedDict()
         self._ttl = ttl_seconds
+        self._negative_ttl = ttl_seconds if negative_ttl_seconds is None else negative_ttl_seconds
+        self._max_entries = max_entries
+        self._clock = clock
+        self._bytes = 0
+        self._sweeper: Optional[asyncio.Task] = None
+        self.stats = VideoCacheStats()
 
     def get(self, nm_id: str) -> Tuple[bool, Optional[str]]:
         """
@@ -33,19 +102,26 @@ class VideoCache:
         Returns:
             (found, url) - found=True если в кеше, url может быть None если видео нет
         """
-        if nm_id not in self._cache:
+        entry = self._cache.get(nm_id)
+        if entry is None:
+            self.stats.misses += 1
             return (False, None)
 
-        entry = self._cache[nm_id]
-
         # Проверка TTL
-        if time.time() - entry['timestamp'] > self._ttl:
+        if self._clock() >= entry.expires:
             logger.debug(f"Video cache EXPIRED for {nm_id}")
-            del self._cache[nm_id]
+            self._remove(nm_id)
+            self.stats.expired += 1
+            self.stats.misses += 1
             return (False, None)
 
+        self._cache.move_to_end(nm_id)
+        if entry.url is None:
+            self.stats.negative_hits += 1
+        else:
+            self.stats.hits += 1
         logger.info(f"Video cache HIT for {nm_id}")
-        return (True, entry['url'])
+        return (True, entry.url)
 
     def set(self, nm_id: str, url: Optional[str]):
         """
@@ -55,24 +131,85 @@ class VideoCache:
             nm_id: Артикул товара
             url: URL видео (None если видео нет)
         """
-        self._cache[nm_id] = {
-            'url': url,
-            'timestamp': time.time()
-        }
+        ttl = self._ttl if url else self._negative_ttl
+        self._store(nm_id, url, ttl)
+        if self._l2 is not None:
+            self._l2.put(L2_NAMESPACE, nm_id, url, ttl)
 
         status = "found" if url else "not found"
         logger.info(f"Video cache SET for {nm_id}: {status}")
 
+    def _store(self, nm_id: str, url: Optional[str], ttl: float) -> None:
+        if nm_id in self._cache:
+            self._remove(nm_id)
+
+        self._cache[nm_id] = _Entry(url, self._clock() + ttl)
+        self._bytes += _entry_bytes(nm_id, url)
+
+        while len(self._cache) > self._max_entries:
+            oldest = next(iter(self._cache))
+            self._remove(oldest)
+            self.stats.evicted += 1
+
+    async def fetch(self, nm_id: str) -> Tuple[bool, Optional[str]]:
+        """
+        Получить URL видео из кеша, при промахе — из L2.
+
+        Args:
+            nm_id: Артикул товара
+
+        Returns:
+            (found, url) - как get()
+        """
+        found, url = self.get(nm_id)
+        if found or self._l2 is None:
+            return (found, url)
+
+        row = await self._l2.get(L2_NAMESPACE, nm_id)
+        if row is None:
+            return (False, None)
+        url, ttl = row
+        self._store(nm_id, url, ttl)
+        # get() уже учёл промах L1: обращение считается попаданием в L2
+        self.stats.misses -= 1
+        self.stats.l2_hits += 1
+        logger.info(f"Video cache L2 HIT for {nm_id}")
+        return (True, url)
+
+    async def attach_l2(self, l2: "L2Cache") -> int:
+        """
+        Подключить L2-кеш и прогреть кеш его снимком.
+
+        Returns:
+            Количество загруженных записей
+        """
+        self._l2 = l2
+        rows = await l2.load(L2_NAMESPACE, self._max_entries)
+        # Снимок отсортирован от свежих к старым: старые загружаются первыми
+        for nm_id, url, ttl in reversed(rows):
+            self._store(nm_id, url, ttl)
+        logger.info(f"Video cache: загружено из L2 {len(rows)} записей")
+        return len(rows)
+
+    def detach_l2(self) -> None:
+        """Отключить L2-кеш (перед его закрытием)."""
+        self._l2 = None
+
+    def _remove(self, nm_id: str) -> None:
+        entry = self._cache.pop(nm_id)
+        self._bytes -= _entry_bytes(nm_id, entry.url)
+
     def clear_expired(self):
         """Очистить истекшие записи."""
-        now = time.time()
+        now = self._clock()
         expired_keys = [
             nm_id for nm_id, entry in self._cache.items()
-            if now - entry['timestamp'] > self._ttl
+            if now >= entry.expires
         ]
 
         for nm_id in expired_keys:
-            del self._cache[nm_id]
+            self._remove(nm_id)
+        self.stats.expired += len(expired_keys)
 
         if expired_keys:
             logger.info(f"Cleared {len(expired_keys)} expired video cache entries")
@@ -81,11 +218,98 @@ class VideoCache:
         """Размер кеша."""
         return len(self._cache)
 
+    def size_bytes(self) -> int:
+        """Оценка памяти под записи кеша."""
+        return self._bytes
+
+    def snapshot(self) -> Dict:
+        """Размер, память и доля попаданий."""
+        stats = self.stats
+        hits = stats.hits + stats.negative_hits + stats.l2_hits
+        lookups = hits + stats.misses
+        return {
+            "entries": len(self._cache),
+            "bytes": self._bytes,
+            "hits": stats.hits,
+            "negative_hits": stats.negative_hits,
+            "misses": stats.misses,
+            "l2_hits": stats.l2_hits,
+            "hit_ratio": round(hits / lookups, 3) if lookups else 0.0,
+            "evicted": stats.evicted,
+            "expired": stats.expired,
+        }
+
+    def start_sweeper(self, interval: float) -> None:
+        """
+        Запустить фоновую очистку истекших записей.
+
+        Args:
+            interval: Период очистки (сек)
+        """
+        async def run() -> None:
+            while True:
+                await asyncio.sleep(interval)
+                self.clear_expired()
+
+        if self._sweeper is None or self._sweeper.done():
+            self._sweeper = asyncio.create_task(run())
 
-# Глобальный экземпляр кеша
-_video_cache = VideoCache()
+    async def close(self) -> None:
+        """Остановить фоновую очистку."""
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+            await asyncio.gather(self._sweeper, return_exceptions=True)
+            self._sweeper = None
+
+
+# Глобальный экземпляр кеша (создаётся при первом обращении)
+_video_cache: Optional[VideoCache] = None
 
 
 def get_video_cache() -> VideoCache:
     """Получить глобальный экземпляр кеша."""
+    global _video_cache
+    if _video_cache is None:
+        settings = get_settings()
+        _video_cache = VideoCache(
+            ttl_seconds=settings.VIDEO_CACHE_TTL,
+            negative_ttl_seconds=settings.VIDEO_CACHE_NEGATIVE_TTL,
+            max_entries=settings.VIDEO_CACHE_MAX_ENTRIES,
+        )
     return _video_cache
+
+
+async def close_video_cache() -> None:
+    """Остановить фоновую очистку кеша и сбросить singleton (при остановке бота)."""
+    global _video_cache
+    if _video_cache is not None:
+        logger.info(f"Video cache stats: {_video_cache.snapshot()}")
+        _video_cache.detach_l2()
+        await _video_cache.close()
+        _video_cache = None
+
+
+def _cache_lookups() -> Dict[Tuple[str, ...], float]:
+    if _video_cache is None:
+        return {}
+    stats = _video_cache.stats
+    return {
+        ("hit",): stats.hits,
+        ("negative_hit",): stats.negative_hits,
+        ("l2_hit",): stats.l2_hits,
+        ("miss",): stats.misses,
+    }
+
+
+def _cache_size() -> Dict[Tuple[str, ...], float]:
+    if _video_cache is None:
+        return {}
+    return {("entries",): _video_cache.size(), ("bytes",): _video_cache.size_bytes()}
+
+
+counter(
+    "video_cache_lookups_total", "Обращения к кешу видео", ("result",)
+).set_function(_cache_lookups)
+gauge(
+    "video_cache_size", "Размер кеша видео", ("unit",)
+).set_function(_cache_size)
@@ -5,20 +5,37 @@ Feature Flag: USE_WB_MEDIA_SERVICE
 - True: вызовы через HTTP к wb-media-service
 - False: локальный WBParser (текущая логика)
 
-При ошибке сервиса автоматический fallback на WBParser.
+При ошибке сервиса автоматический fallback на WBParser. Пока circuit
+breaker сервиса разомкнут, запросы сразу идут в WBParser без ожидания таймаута.
+
+Запросы к сервису идут через один долгоживущий httpx.AsyncClient
+с пулом keep-alive соединений (закрывается при остановке бота).
+
+WB_MEDIA_HEDGE_ENABLED: если сервис не ответил за p95 своей латентности,
+параллельно запускается WBParser и берётся первый успешный ответ.
 """
 
+import asyncio
 import logging
+import time
 from typing import Optional, Callable, Awaitable
 
 import httpx
 
 from config.settings import get_settings
 from services.wb_parser import WBParser, ProductMedia
+from utils.circuit_breaker import CircuitBreaker, get_circuit_breaker
 from utils.exceptions import ProductNotFoundError, InvalidArticleError
+from utils.hedging import LatencyHedge
+from utils.tracing import traced
 
 logger = logging.getLogger(__name__)
 
+WB_MEDIA_BREAKER = "wb-media-service"
+
+# Ответы сервиса, которые не являются отказом
+_SERVICE_ANSWERS = (ProductNotFoundError, InvalidArticleError)
+
 
 class WbMediaClient:
     """
@@ -31,17 +48,57 @@ class WbMediaClient:
     При ошибке сервиса — автоматический fallback на WBParser.
     """
 
+    # HTTP клиент к wb-media-service (создаётся при первом запросе)
+    _client: Optional[httpx.AsyncClient] = None
+
+    # Hedged-запросы к WBParser (None — выключены)
+    _hedge: Optional[LatencyHedge] = None
+
     def __init__(self):
         settings = get_settings()
         self.use_service = settings.USE_WB_MEDIA_SERVICE
         self.service_url = settings.WB_MEDIA_SERVICE_URL
         self.timeout = settings.WB_MEDIA_SERVICE_TIMEOUT
+        if settings.WB_MEDIA_HEDGE_ENABLED:
+            self._hedge = LatencyHedge(
+                percentile=settings.WB_MEDIA_HEDGE_PERCENTILE,
+                default_delay=settings.WB_MEDIA_HEDGE_DEFAULT_DELAY,
+                min_delay=settings.WB_MEDIA_HEDGE_MIN_DELAY,
+            )
 
         logger.info(
             f"WbMediaClient инициализирован: USE_WB_MEDIA_SERVICE={self.use_service}, "
             f"URL={self.service_url if self.use_service else 'N/A'}"
         )
 
+    @property
+    def _breaker(self) -> CircuitBreaker:
+        return get_circuit_breaker(WB_MEDIA_BREAKER)
+
+    def _get_client(self) -> httpx.AsyncClient:
+        """Общий HTTP клиент с пулом соединений к wb-media-service."""
+        if self._client is None or self._client.is_closed:
+            settings = get_settings()
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=httpx.Limits(
+                    max_connections=settings.SERVICE_MAX_CONNECTIONS,
+                    max_keepalive_connections=settings.SERVICE_MAX_CONNECTIONS,
+                    keepalive_expiry=settings.SERVICE_KEEPALIVE_EXPIRY,
+                ),
+                http2=settings.SERVICE_HTTP2,
+            )
+        return self._client
+
+    async def close(self) -> None:
+        """Закрыть HTTP клиент и пул соединений."""
+        if self._hedge is not None:
+            logger.info(f"Hedging wb-media-service: {self._hedge.snapshot()}")
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    @traced()
     async def get_product_media(
         self,
         nm_id: str,
@@ -63,19 +120,31 @@ class WbMediaClient:
             ProductNotFoundError: Товар не найден (404)
             InvalidArticleError: Неверный формат артикула (422)
         """
-        if self.use_service:
+        if self.use_service and self._breaker.allow():
+            if self._hedge is not None:
+                return await self._get_hedged(nm_id, skip_video, skip_photos)
             try:
-                return await self._get_via_service(nm_id, skip_video, skip_photos)
+                media = await self._get_via_service(nm_id, skip_video, skip_photos)
             except (ProductNotFoundError, InvalidArticleError):
+                # Сервис ответил корректно — это не отказ
+                self._breaker.record_success()
                 raise
             except Exception as e:
+                self._breaker.record_failure()
                 logger.warning(
                     f"wb-media-service ошибка для {nm_id}: {e}. Fallback на WBParser."
                 )
-                return await self._get_via_parser(nm_id, skip_video, skip_photos)
-        else:
-            return await self._get_via_parser(nm_id, skip_video, skip_photos)
+            except BaseException:
+                # Отмена без результата: освобождаем half-open пробу
+                self._breaker.release()
+                raise
+            else:
+                self._breaker.record_success()
+                return media
+
+        return await self._get_via_parser(nm_id, skip_video, skip_photos)
 
+    @traced()
     async def search_video(
         self,
         nm_id: str,
@@ -91,18 +160,25 @@ class WbMediaClient:
         Returns:
             URL видео или None
         """
-        if self.use_service:
+        if self.use_service and self._breaker.allow():
             try:
-                return await self._search_video_via_service(nm_id)
+                video_url = await self._search_video_via_service(nm_id)
             except Exception as e:
+                self._breaker.record_failure()
                 logger.warning(
                     f"wb-media-service video search ошибка для {nm_id}: {e}. "
                     f"Fallback на WBParser."
                 )
-                return await self._search_video_via_parser(nm_id, progress_callback)
-        else:
-            return await self._search_video_via_parser(nm_id, progress_callback)
+            except BaseException:
+                self._breaker.release()
+                raise
+            else:
+                self._breaker.record_success()
+                return video_url
 
+        return await self._search_video_via_parser(nm_id, progress_callback)
+
+    @traced()
     async def _get_via_service(
         self, nm_id: str, skip_video: bool, skip_photos: bool
     ) -> ProductMedia:
@@ -113,8 +189,7 @@ class WbMediaClient:
 
         url = f"{self.service_url}/api/wb/media/{nm_id}"
 
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
-            response = await client.get(url, params=params)
+        response = await self._get_client().get(url, params=params)
 
         if response.status_code == 404:
             raise ProductNotFoundError(f"Товар {nm_id} не найден")
@@ -141,6 +216,89 @@ class WbMediaClient:
             video=video_url,
         )
 
+    async def _get_hedged(
+        self, nm_id: str, skip_video: bool, skip_photos: bool
+    ) -> ProductMedia:
+        """
+        Запрос к сервису с hedge на WBParser.
+
+        Если сервис не ответил за hedge.delay(), параллельно запускается
+        WBParser; берётся первый ответ (успех WBParser или любой корректный
+        ответ сервиса), проигравший запрос отменяется. При ошибке сервиса
+        WBParser работает как обычный fallback.
+        """
+        hedge = self._hedge
+        hedge.stats.requests += 1
+
+        async def timed_service() -> ProductMedia:
+            # Латентность учитывается для ответов сервиса, не для отказов.
+            # Отменённый (проигравший гонку) запрос учитывается временем до
+            # отмены — нижней оценкой, иначе в окне остаются только быстрые
+            # ответы и порог сползает к min_delay
+            start = time.perf_counter()
+            try:
+                media = await self._get_via_service(nm_id, skip_video, skip_photos)
+            except (asyncio.CancelledError, *_SERVICE_ANSWERS):
+                hedge.record(time.perf_counter() - start)
+                raise
+            hedge.record(time.perf_counter() - start)
+            return media
+
+        service = asyncio.create_task(timed_service())
+        parser: Optional[asyncio.Task] = None
+        hedged = False
+        pending = {service}
+        last_error: Optional[BaseException] = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending,
+                    timeout=hedge.delay() if parser is None else None,
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                if not done:
+                    # Сервис отвечает дольше обычного — запускаем WBParser
+                    hedged = True
+                    hedge.stats.hedged += 1
+                    parser = asyncio.create_task(
+                        self._get_via_parser(nm_id, skip_video, skip_photos)
+                    )
+                    pending.add(parser)
+                    continue
+
+                # Если завершились оба, приоритет у ответа сервиса
+                for task in sorted(done, key=lambda t: t is not service):
+                    error = task.exception()
+                    if task is service:
+                        if error is None or isinstance(error, _SERVICE_ANSWERS):
+                            self._breaker.record_success()
+                            if hedged:
+                                hedge.stats.primary_wins += 1
+                            return task.result()
+                        self._breaker.record_failure()
+                        logger.warning(
+                            f"wb-media-service ошибка для {nm_id}: {error}. Fallback на WBParser."
+                        )
+                        if parser is None:
+                            parser = asyncio.create_task(
+                                self._get_via_parser(nm_id, skip_video, skip_photos)
+                            )
+                            pending.add(parser)
+                    elif error is None:
+                        if hedged and service in pending:
+                            hedge.stats.backup_wins += 1
+                        return task.result()
+                    last_error = error
+            raise last_error
+        finally:
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+            if service in pending:
+                # Отменённый запрос не считается ни успехом, ни отказом сервиса
+                self._breaker.release()
+
+    @traced()
     async def _get_via_parser(
         self, nm_id: str, skip_video: bool, skip_photos: bool
     ) -> ProductMedia:
@@ -155,8 +313,7 @@ class WbMediaClient:
         params = {"include_video": True}
         url = f"{self.service_url}/api/wb/media/{nm_id}"
 
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
-            response = await client.get(url, params=params)
+        response = await self._get_client().get(url, params=params)
 
         if response.status_code in (404, 422):
             return None
@@ -178,9 +335,9 @@ class WbMediaClient:
         nm_id: str,
         progress_callback: Optional[Callable[[int], Awaitable[None]]] = None,
     ) -> Optional[str]:
-        """Поиск видео через локальный WBParser."""
+        """Поиск видео через локальный WBParser (с учётом кеша видео)."""
         async with WBParser() as parser:
-            return await parser._check_video(nm_id, progress_callback)
+            return await parser.find_video(nm_id, progress_callback)
 
 
 # Singleton instance
@@ -192,4 +349,12 @@ def get_wb_media_client() -> WbMediaClient:
     global _wb_media_client
     if _wb_media_client is None:
         _wb_media_client = WbMediaClient()
-    return _wb_media_client
\ No newline at end of file
+    return _wb_media_client
+
+
+async def close_wb_media_client() -> None:
+    """Закрыть HTTP клиент и сбросить singleton."""
+    global _wb_media_client
+    if _wb_media_client is not None:
+        await _wb_media_client.close()
+        _wb_media_client = None
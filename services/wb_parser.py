@@ -3,7 +3,7 @@
 import asyncio
 import aiohttp
 import socket
-from typing import List, Optional, Callable, Awaitable
+from typing import TYPE_CHECKING, List, Optional, Callable, Awaitable
 from dataclasses import dataclass
 import logging
 import time
@@ -11,9 +11,29 @@ import time
 from utils.exceptions import ProductNotFoundError, WBAPIError, NoMediaError
 from config.settings import Settings
 from utils.decorators import log_execution_time
+from utils.metrics import histogram
+from utils.tracing import traced
+
+if TYPE_CHECKING:
+    from services.media_cache_l2 import L2Cache
 
 logger = logging.getLogger(__name__)
 
+# Пространство ключей кеша vol → basket в L2
+BASKET_L2_NAMESPACE = "basket"
+
+# Метрики поиска медиа
+_BASKET_SEARCH = histogram(
+    "wb_basket_search_seconds", "Время поиска basket товара", ("result",)
+)
+_VIDEO_SEARCH = histogram(
+    "wb_video_search_seconds", "Время поиска HLS видео", ("outcome",)
+)
+_LOOKUP_PROBES = histogram(
+    "wb_lookup_probes", "HTTP HEAD запросов на один поиск", ("kind",),
+    buckets=(1, 2, 5, 10, 25, 50, 100, 200, 500, 1000, 2500, 5000, 10000, 20000)
+)
+
 
 @dataclass
 class ProductMedia:
@@ -42,10 +62,33 @@ class WBParser:
     # In-memory кеш vol → basket для ускорения повторных запросов
     _basket_cache: dict[int, int] = {}
 
+    # L2-кеш vol → basket (None — только память процесса)
+    _l2: Optional["L2Cache"] = None
+
     def __init__(self):
         self.settings = Settings()
         self.session: Optional[aiohttp.ClientSession] = None
 
+    @classmethod
+    async def attach_l2(cls, l2: "L2Cache") -> int:
+        """
+        Подключить L2-кеш basket и прогреть кеш его снимком.
+
+        Returns:
+            Количество загруженных записей
+        """
+        cls._l2 = l2
+        rows = await l2.load(BASKET_L2_NAMESPACE, limit=100000)
+        for vol, basket, _ in rows:
+            cls._basket_cache[int(vol)] = basket
+        logger.info(f"Basket cache: загружено из L2 {len(rows)} записей")
+        return len(rows)
+
+    @classmethod
+    def detach_l2(cls) -> None:
+        """Отключить L2-кеш basket (перед его закрытием)."""
+        cls._l2 = None
+
     async def __aenter__(self):
         """Создание HTTP сессии."""
         timeout = aiohttp.ClientTimeout(
@@ -131,29 +174,7 @@ class WBParser:
             # 3. Найти видео (если не skip_video)
             video = None
             if not skip_video:
-                # Проверка кеша
-                from services.video_cache import get_video_cache
-                cache = get_video_cache()
-                found_in_cache, cached_video = cache.get(nm_id)
-
-                if found_in_cache:
-                    # В кеше (может быть None если видео нет)
-                    video = cached_video
-                    status = "есть" if video else "НЕТ"
-                    logger.info(f"🎥 Product {nm_id}: видео из КЕША ({status})")
-                else:
-                    # Нет в кеше - ищем
-                    video_start = time.perf_counter()
-                    video = await self._check_video(nm_id)
-                    video_elapsed = time.perf_counter() - video_start
-
-                    # Сохранить в кеш (даже если None - чтобы не искать повторно)
-                    cache.set(nm_id, video)
-
-                    if video:
-                        logger.info(f"🎥 Product {nm_id}: видео найдено за {video_elapsed:.2f}s")
-                    else:
-                        logger.info(f"🎥 Product {nm_id}: видео НЕ найдено ({video_elapsed:.2f}s)")
+                video = await self.find_video(nm_id)
 
             # Проверка что нашли хоть что-то
             if not photos and not video:
@@ -176,6 +197,7 @@ class WBParser:
             logger.error(f"Error fetching product {nm_id}: {e}")
             raise WBAPIError(f"Error fetching product: {e}")
 
+    @traced()
     async def _find_basket(self, nm_id: str, vol: int, part: int) -> Optional[int]:
         """
         Найти рабочий basket параллельной проверкой всех 100.
@@ -192,11 +214,21 @@ class WBParser:
         Returns:
             Номер basket или None если не найден
         """
-        # Проверка кеша
+        start = time.perf_counter()
+        probes = 0
+
+        # Проверка кеша (при промахе — L2-кеш других реплик)
+        if vol not in self._basket_cache and self._l2 is not None:
+            row = await self._l2.get(BASKET_L2_NAMESPACE, str(vol))
+            if row is not None:
+                self._basket_cache[vol] = row[0]
         if vol in self._basket_cache:
             cached_basket = self._basket_cache[vol]
+            probes += 1
             if await self._check_single_basket(nm_id, vol, part, cached_basket):
                 logger.info(f"✅ Product {nm_id}: cache HIT basket={cached_basket}")
+                _BASKET_SEARCH.observe(time.perf_counter() - start, result="cache")
+                _LOOKUP_PROBES.observe(probes, kind="basket")
                 return cached_basket
 
         # Все 100 basket параллельно
@@ -204,9 +236,19 @@ class WBParser:
 
         all_baskets = list(range(1, self.MAX_BASKET + 1))
         basket = await self._check_basket_batch(nm_id, vol, part, all_baskets)
+        probes += len(all_baskets)
+        _BASKET_SEARCH.observe(
+            time.perf_counter() - start, result="found" if basket else "not_found"
+        )
+        _LOOKUP_PROBES.observe(probes, kind="basket")
 
         if basket:
             self._basket_cache[vol] = basket
+            if self._l2 is not None:
+                self._l2.put(
+                    BASKET_L2_NAMESPACE, str(vol), basket,
+                    ttl=self.settings.MEDIA_CACHE_BASKET_TTL
+                )
             logger.info(f"✅ Product {nm_id}: basket={basket:02d} найден, сохранен в кеш")
             return basket
 
@@ -279,6 +321,7 @@ class WBParser:
             logger.debug(f"❌ HTTP HEAD ERROR basket={basket:02d} - {type(e).__name__}")
             return False
 
+    @traced()
     async def _find_photos(
         self, nm_id: str, vol: int, part: int, basket: int
     ) -> List[str]:
@@ -387,6 +430,7 @@ class WBParser:
 
         return None
 
+    @traced()
     async def _find_video_hls(
         self,
         nm_id: str,
@@ -458,6 +502,8 @@ class WBParser:
                     f"остановлен на batch {batch_num}/{total_batches}, "
                     f"avg batch time: {avg_time:.3f}s"
                 )
+                _VIDEO_SEARCH.observe(elapsed, outcome="timeout")
+                _LOOKUP_PROBES.observe(i, kind="video")
                 return None
 
             batch = all_combinations[i:i + BATCH_SIZE]
@@ -505,6 +551,8 @@ class WBParser:
                     f"Video found for {nm_id}: basket={basket:02d}, vol={vol}, "
                     f"batch {batch_num}/{total_batches}, time={elapsed:.1f}s"
                 )
+                _VIDEO_SEARCH.observe(elapsed, outcome="found")
+                _LOOKUP_PROBES.observe(i + len(batch), kind="video")
                 return url
 
             # Задержка между батчами (уменьшена для скорости)
@@ -515,8 +563,52 @@ class WBParser:
             f"❌ Video NOT FOUND для {nm_id} после полного поиска "
             f"({elapsed:.1f}s, проверено {len(all_combinations)} комбинаций)"
         )
+        _VIDEO_SEARCH.observe(elapsed, outcome="not_found")
+        _LOOKUP_PROBES.observe(len(all_combinations), kind="video")
         return None
 
+    async def find_video(
+        self,
+        nm_id: str,
+        progress_callback: Optional[Callable[[int], Awaitable[None]]] = None
+    ) -> Optional[str]:
+        """
+        Найти видео с учётом кеша видео (L1 и L2).
+
+        Найденный в кеше результат (в том числе «видео нет») возвращается
+        без перебора basket; результат поиска сохраняется в кеш.
+
+        Args:
+            nm_id: Артикул
+            progress_callback: Callback для обновления прогресса (0-100%)
+
+        Returns:
+            URL видео или None
+        """
+        from services.video_cache import get_video_cache
+        cache = get_video_cache()
+        found_in_cache, cached_video = await cache.fetch(nm_id)
+
+        if found_in_cache:
+            # В кеше (может быть None если видео нет)
+            status = "есть" if cached_video else "НЕТ"
+            logger.info(f"🎥 Product {nm_id}: видео из КЕША ({status})")
+            return cached_video
+
+        # Нет в кеше - ищем
+        video_start = time.perf_counter()
+        video = await self._check_video(nm_id, progress_callback)
+        video_elapsed = time.perf_counter() - video_start
+
+        # Сохранить в кеш (даже если None - чтобы не искать повторно)
+        cache.set(nm_id, video)
+
+        if video:
+            logger.info(f"🎥 Product {nm_id}: видео найдено за {video_elapsed:.2f}s")
+        else:
+            logger.info(f"🎥 Product {nm_id}: видео НЕ найдено ({video_elapsed:.2f}s)")
+        return video
+
     async def _check_video(
         self,
         nm_id: str,
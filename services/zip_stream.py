@@ -0,0 +1,223 @@
+"""
+Потоковая сборка ZIP архива из файлов на CDN.
+
+Архив формируется на лету во время загрузки в Telegram: фото скачиваются
+параллельно (с ограничением), а их байты сразу уходят в тело запроса.
+Файлы .webp уже сжаты, поэтому используется метод STORED; CRC и размеры
+пишутся в data descriptor после содержимого файла, так что ни архив,
+ни отдельные файлы целиком в памяти или на диске не хранятся.
+Память ограничена: concurrency × queue_chunks × chunk_size.
+"""
+
+import asyncio
+import logging
+import struct
+import time
+import zlib
+from typing import AsyncIterator, Awaitable, Callable, List, Optional, Tuple
+
+from aiogram import Bot
+from aiogram.types import InputFile
+
+from services.http_session import get_http_session
+from utils.exceptions import WBAPIError
+
+logger = logging.getLogger(__name__)
+
+# Сигнатуры и флаги формата ZIP (PKWARE APPNOTE)
+_LOCAL_HEADER_SIG = 0x04034B50
+_DATA_DESCRIPTOR_SIG = 0x08074B50
+_CENTRAL_HEADER_SIG = 0x02014B50
+_END_OF_CENTRAL_DIR_SIG = 0x06054B50
+_ZIP_VERSION = 20
+_FLAG_DATA_DESCRIPTOR = 0x0008
+_FLAG_UTF8 = 0x0800
+_METHOD_STORED = 0
+
+_EOF = object()
+
+Fetcher = Callable[[str, int], AsyncIterator[bytes]]
+
+
+def _dos_datetime(timestamp: float) -> Tuple[int, int]:
+    """Дата и время в формате MS-DOS (как в заголовках ZIP)."""
+    t = time.localtime(timestamp)
+    dos_time = (t.tm_hour << 11) | (t.tm_min << 5) | (t.tm_sec // 2)
+    dos_date = ((t.tm_year - 1980) << 9) | (t.tm_mon << 5) | t.tm_mday
+    return dos_time, dos_date
+
+
+class _ZipWriter:
+    """Генератор служебных записей ZIP для последовательной записи файлов."""
+
+    def __init__(self):
+        self._offset = 0
+        self._central: List[bytes] = []
+        self._name = b""
+        self._entry_offset = 0
+        self._crc = 0
+        self._size = 0
+        self._time, self._date = _dos_datetime(time.time())
+
+    @property
+    def written(self) -> int:
+        """Сколько байт архива уже сформировано."""
+        return self._offset
+
+    def begin(self, name: str) -> bytes:
+        """Local file header очередного файла."""
+        self._name = name.encode("utf-8")
+        self._entry_offset = self._offset
+        self._crc = 0
+        self._size = 0
+        header = struct.pack(
+            "<IHHHHHIIIHH",
+            _LOCAL_HEADER_SIG,
+            _ZIP_VERSION,
+            _FLAG_DATA_DESCRIPTOR | _FLAG_UTF8,
+            _METHOD_STORED,
+            self._time,
+            self._date,
+            0, 0, 0,  # CRC и размеры — в data descriptor
+            len(self._name),
+            0,
+        ) + self._name
+        self._offset += len(header)
+        return header
+
+    def update(self, chunk: bytes) -> None:
+        """Учесть очередной фрагмент содержимого файла."""
+        self._crc = zlib.crc32(chunk, self._crc)
+        self._size += len(chunk)
+        self._offset += len(chunk)
+
+    def end(self) -> bytes:
+        """Data descriptor текущего файла."""
+        descriptor = struct.pack(
+            "<IIII", _DATA_DESCRIPTOR_SIG, self._crc, self._size, self._size
+        )
+        self._offset += len(descriptor)
+        self._central.append(struct.pack(
+            "<IHHHHHHIIIHHHHHII",
+            _CENTRAL_HEADER_SIG,
+            _ZIP_VERSION,
+            _ZIP_VERSION,
+            _FLAG_DATA_DESCRIPTOR | _FLAG_UTF8,
+            _METHOD_STORED,
+            self._time,
+            self._date,
+            self._crc,
+            self._size,
+            self._size,
+            len(self._name),
+            0, 0, 0, 0, 0,
+            self._entry_offset,
+        ) + self._name)
+        return descriptor
+
+    def finish(self) -> bytes:
+        """Central directory и end of central directory record."""
+        central = b"".join(self._central)
+        end = struct.pack(
+            "<IHHHHIIH",
+            _END_OF_CENTRAL_DIR_SIG,
+            0, 0,
+            len(self._central),
+            len(self._central),
+            len(central),
+            self._offset,
+            0,
+        )
+        self._offset += len(central) + len(end)
+        return central + end
+
+
+async def _fetch_url(url: str, chunk_size: int) -> AsyncIterator[bytes]:
+    """Потоковое чтение файла через общую HTTP сессию."""
+    session = await get_http_session()
+    async with session.get(url) as response:
+        if response.status != 200:
+            raise WBAPIError(f"HTTP {response.status} при загрузке {url}")
+        async for chunk in response.content.iter_chunked(chunk_size):
+            yield chunk
+
+
+class ZipStreamInputFile(InputFile):
+    """InputFile, собирающий ZIP из URL во время отправки в Telegram."""
+
+    def __init__(
+        self,
+        entries: List[Tuple[str, str]],
+        filename: str,
+        concurrency: int = 4,
+        max_bytes: Optional[int] = None,
+        queue_chunks: int = 8,
+        chunk_size: int = 64 * 1024,
+        fetch: Optional[Fetcher] = None,
+        on_entry: Optional[Callable[[int, int], Awaitable[None]]] = None
+    ):
+        """
+        Args:
+            entries: Пары (имя файла в архиве, URL)
+            filename: Имя архива для Telegram
+            concurrency: Одновременных загрузок с CDN
+            max_bytes: Лимит размера архива (None — без лимита)
+            queue_chunks: Буфер фрагментов на один загружаемый файл
+            chunk_size: Размер фрагмента
+            fetch: Источник содержимого по URL (по умолчанию общая HTTP сессия)
+            on_entry: Callback после упаковки каждого файла (done, total)
+        """
+        super().__init__(filename=filename, chunk_size=chunk_size)
+        self.entries = entries
+        self.concurrency = concurrency
+        self.max_bytes = max_bytes
+        self.queue_chunks = queue_chunks
+        self._fetch = fetch or _fetch_url
+        self._on_entry = on_entry
+
+    async def read(self, bot: Bot) -> AsyncIterator[bytes]:
+        semaphore = asyncio.Semaphore(self.concurrency)
+        queues = [asyncio.Queue(maxsize=self.queue_chunks) for _ in self.entries]
+
+        async def produce(url: str, queue: asyncio.Queue) -> None:
+            # Семафор выдаётся в порядке очереди, поэтому текущий файл архива
+            # всегда загружается, а следующие ждут места в своих буферах
+            try:
+                async with semaphore:
+                    async for chunk in self._fetch(url, self.chunk_size):
+                        await queue.put(chunk)
+                await queue.put(_EOF)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                await queue.put(e)
+
+        tasks = [
+            asyncio.create_task(produce(url, queue))
+            for (_, url), queue in zip(self.entries, queues)
+        ]
+        writer = _ZipWriter()
+        total = len(self.entries)
+        try:
+            for done, ((name, _), queue) in enumerate(zip(self.entries, queues), start=1):
+                yield writer.begin(name)
+                while True:
+                    item = await queue.get()
+                    if item is _EOF:
+                        break
+                    if isinstance(item, Exception):
+                        raise item
+                    writer.update(item)
+                    if self.max_bytes is not None and writer.written > self.max_bytes:
+                        raise WBAPIError(
+                            f"Архив превышает лимит {self.max_bytes // (1024 * 1024)} MB"
+                        )
+                    yield item
+                yield writer.end()
+                if self._on_entry:
+                    await self._on_entry(done, total)
+            yield writer.finish()
+            logger.debug(f"🗂 Архив {self.filename} сформирован: {writer.written} байт")
+        finally:
+            for task in tasks:
+                task.cancel()
@@ -125,3 +125,42 @@ def mock_aiohttp():
     """Mock aiohttp responses."""
     with aioresponses() as m:
         yield m
+
+
+@pytest.fixture(autouse=True)
+def telegram_rate_limiter(monkeypatch):
+    """Свежий лимитер Telegram без ожиданий для каждого теста."""
+    from services.telegram_limiter import TelegramRateLimiter
+
+    limiter = TelegramRateLimiter(chat_rate=1000, chat_burst=1000)
+    monkeypatch.setattr("services.telegram_limiter._telegram_rate_limiter", limiter)
+    return limiter
+
+
+@pytest.fixture(autouse=True)
+def message_editor(monkeypatch):
+    """Свежий коалесцер правок без задержек для каждого теста."""
+    from services.message_editor import MessageEditCoalescer
+
+    editor = MessageEditCoalescer(min_interval=0)
+    monkeypatch.setattr("services.message_editor._message_editor", editor)
+    return editor
+
+
+@pytest.fixture(autouse=True)
+def event_buffer(monkeypatch):
+    """Свежий буфер событий аналитики для каждого теста."""
+    from services.event_buffer import AnalyticsEventBuffer
+
+    buffer = AnalyticsEventBuffer(batch_size=100, flush_interval=60, max_pending=1000)
+    monkeypatch.setattr("services.event_buffer._event_buffer", buffer)
+    yield buffer
+    buffer.stop()
+
+
+@pytest.fixture(autouse=True)
+def circuit_breakers(monkeypatch):
+    """Пустой реестр circuit breaker'ов для каждого теста."""
+    breakers = {}
+    monkeypatch.setattr("utils.circuit_breaker._breakers", breakers)
+    return breakers
@@ -1,9 +1,10 @@
 """Тесты для services/analytics.py."""
 
+import json
 import pytest
 from datetime import date, datetime
 from unittest.mock import AsyncMock, MagicMock, patch
-from services.analytics import AnalyticsService
+from services.analytics import AnalyticsService, STAT_KEYS
 
 
 @pytest.fixture
@@ -39,9 +40,8 @@ class TestTrackUserStart:
         mock_conn.__aexit__ = AsyncMock()
         mock_pool.acquire = MagicMock(return_value=mock_conn)
 
-        # fetchrow возвращает None (пользователь не найден)
-        mock_conn.fetchrow = AsyncMock(return_value=None)
-        mock_conn.execute = AsyncMock()
+        # upsert вставил строку (xmax = 0)
+        mock_conn.fetchval = AsyncMock(return_value=True)
 
         with patch("services.analytics.get_pool", return_value=mock_pool):
             result = await analytics.track_user_start(
@@ -54,13 +54,13 @@ class TestTrackUserStart:
         # Проверяем что вернулся True (новый пользователь)
         assert result is True
 
-        # Проверяем что был INSERT в users
-        calls = mock_conn.execute.call_args_list
-        assert len(calls) == 2  # INSERT users + INSERT events
-
-        # Проверяем первый вызов (INSERT users)
-        insert_users_sql = calls[0][0][0]
-        assert "INSERT INTO shared.users" in insert_users_sql
+        # Один запрос: upsert пользователя + событие user_start
+        mock_conn.fetchval.assert_called_once()
+        sql = mock_conn.fetchval.call_args[0][0]
+        assert "INSERT INTO shared.users" in sql
+        assert "ON CONFLICT (telegram_id) DO UPDATE" in sql
+        assert "xmax = 0" in sql
+        assert "INSERT INTO shared.analytics_events" in sql
 
     @pytest.mark.asyncio
     async def test_returning_user(self, analytics):
@@ -71,9 +71,8 @@ class TestTrackUserStart:
         mock_conn.__aexit__ = AsyncMock()
         mock_pool.acquire = MagicMock(return_value=mock_conn)
 
-        # fetchrow возвращает запись (пользователь существует)
-        mock_conn.fetchrow = AsyncMock(return_value={"telegram_id": 123456789})
-        mock_conn.execute = AsyncMock()
+        # upsert обновил существующую строку
+        mock_conn.fetchval = AsyncMock(return_value=False)
 
         with patch("services.analytics.get_pool", return_value=mock_pool):
             result = await analytics.track_user_start(
@@ -86,12 +85,9 @@ class TestTrackUserStart:
         # Проверяем что вернулся False (повторный пользователь)
         assert result is False
 
-        # Проверяем что был UPDATE users
-        calls = mock_conn.execute.call_args_list
-        assert len(calls) == 2  # UPDATE users + INSERT events
-
-        update_users_sql = calls[0][0][0]
-        assert "UPDATE shared.users" in update_users_sql
+        # Обновление данных пользователя в том же запросе
+        mock_conn.fetchval.assert_called_once()
+        assert "last_seen = NOW()" in mock_conn.fetchval.call_args[0][0]
 
     @pytest.mark.asyncio
     async def test_db_unavailable(self, analytics):
@@ -116,8 +112,8 @@ class TestTrackUserStart:
         mock_conn.__aexit__ = AsyncMock()
         mock_pool.acquire = MagicMock(return_value=mock_conn)
 
-        # fetchrow бросает исключение
-        mock_conn.fetchrow = AsyncMock(side_effect=Exception("Database error"))
+        # fetchval бросает исключение
+        mock_conn.fetchval = AsyncMock(side_effect=Exception("Database error"))
 
         with patch("services.analytics.get_pool", return_value=mock_pool):
             result = await analytics.track_user_start(
@@ -135,134 +131,96 @@ class TestTrackArticleRequest:
     """Тесты для track_article_request."""
 
     @pytest.mark.asyncio
-    async def test_success(self, analytics):
-        """Успешная запись события article_request."""
-        mock_pool, mock_conn = MagicMock(), MagicMock()
-
-        mock_conn.__aenter__ = AsyncMock(return_value=mock_conn)
-        mock_conn.__aexit__ = AsyncMock()
-        mock_pool.acquire = MagicMock(return_value=mock_conn)
-        mock_conn.execute = AsyncMock()
+    async def test_success(self, analytics, event_buffer):
+        """Событие article_request попадает в буфер."""
+        await analytics.track_article_request(
+            user_id=123456789,
+            nm_id=12345678
+        )
+
+        assert len(event_buffer) == 1
+        telegram_id, event_type, event_data = event_buffer._records[0][:3]
+        assert telegram_id == 123456789
+        assert event_type == "article_request"
+        assert json.loads(event_data) == {"nm_id": 12345678}
 
-        with patch("services.analytics.get_pool", return_value=mock_pool):
-            await analytics.track_article_request(
-                user_id=123456789,
-                nm_id=12345678
-            )
+    @pytest.mark.asyncio
+    async def test_db_unavailable(self, analytics, event_buffer):
+        """БД недоступна - не падаем, события отбрасываются при записи."""
+        await analytics.track_article_request(
+            user_id=123456789,
+            nm_id=12345678
+        )
 
-        # Проверяем что был INSERT в events
-        mock_conn.execute.assert_called_once()
-        call_args = mock_conn.execute.call_args[0]
-        assert "INSERT INTO shared.analytics_events" in call_args[0]
-        assert "article_request" in call_args[0]
+        with patch("services.event_buffer.get_pool", return_value=None):
+            assert await event_buffer.flush() == 0
 
-    @pytest.mark.asyncio
-    async def test_db_unavailable(self, analytics):
-        """БД недоступна - не падаем."""
-        with patch("services.analytics.get_pool", return_value=None):
-            # Не должно бросить исключение
-            await analytics.track_article_request(
-                user_id=123456789,
-                nm_id=12345678
-            )
+        assert event_buffer.dropped == 1
 
 
 class TestTrackPhotosSent:
     """Тесты для track_photos_sent."""
 
     @pytest.mark.asyncio
-    async def test_success(self, analytics):
-        """Успешная запись события photo_sent."""
-        mock_pool, mock_conn = MagicMock(), MagicMock()
+    async def test_success(self, analytics, event_buffer):
+        """Событие photo_sent попадает в буфер."""
+        await analytics.track_photos_sent(
+            user_id=123456789,
+            nm_id=12345678,
+            count=5
+        )
 
-        mock_conn.__aenter__ = AsyncMock(return_value=mock_conn)
-        mock_conn.__aexit__ = AsyncMock()
-        mock_pool.acquire = MagicMock(return_value=mock_conn)
-        mock_conn.execute = AsyncMock()
-
-        with patch("services.analytics.get_pool", return_value=mock_pool):
-            await analytics.track_photos_sent(
-                user_id=123456789,
-                nm_id=12345678,
-                count=5
-            )
-
-        # Проверяем что был INSERT
-        mock_conn.execute.assert_called_once()
-        call_args = mock_conn.execute.call_args[0]
-        assert "photo_sent" in call_args[0]
+        _, event_type, event_data = event_buffer._records[0][:3]
+        assert event_type == "photo_sent"
+        assert json.loads(event_data) == {"nm_id": 12345678, "count": 5}
 
 
 class TestTrackVideoSent:
     """Тесты для track_video_sent."""
 
     @pytest.mark.asyncio
-    async def test_success(self, analytics):
-        """Успешная запись события video_sent."""
-        mock_pool, mock_conn = MagicMock(), MagicMock()
-
-        mock_conn.__aenter__ = AsyncMock(return_value=mock_conn)
-        mock_conn.__aexit__ = AsyncMock()
-        mock_pool.acquire = MagicMock(return_value=mock_conn)
-        mock_conn.execute = AsyncMock()
+    async def test_success(self, analytics, event_buffer):
+        """Событие video_sent попадает в буфер."""
+        await analytics.track_video_sent(
+            user_id=123456789,
+            nm_id=12345678
+        )
 
-        with patch("services.analytics.get_pool", return_value=mock_pool):
-            await analytics.track_video_sent(
-                user_id=123456789,
-                nm_id=12345678
-            )
-
-        # Проверяем что был INSERT
-        mock_conn.execute.assert_called_once()
-        call_args = mock_conn.execute.call_args[0]
-        assert "video_sent" in call_args[0]
+        _, event_type, event_data = event_buffer._records[0][:3]
+        assert event_type == "video_sent"
+        assert json.loads(event_data) == {"nm_id": 12345678}
 
 
 class TestTrackError:
     """Тесты для track_error."""
 
     @pytest.mark.asyncio
-    async def test_success(self, analytics):
-        """Успешная запись события error."""
-        mock_pool, mock_conn = MagicMock(), MagicMock()
-
-        mock_conn.__aenter__ = AsyncMock(return_value=mock_conn)
-        mock_conn.__aexit__ = AsyncMock()
-        mock_pool.acquire = MagicMock(return_value=mock_conn)
-        mock_conn.execute = AsyncMock()
-
-        with patch("services.analytics.get_pool", return_value=mock_pool):
-            await analytics.track_error(
-                user_id=123456789,
-                error_type="product_not_found",
-                error_message="Товар 12345678 не найден"
-            )
-
-        # Проверяем что был INSERT
-        mock_conn.execute.assert_called_once()
-        call_args = mock_conn.execute.call_args[0]
-        assert "error" in call_args[0]
+    async def test_success(self, analytics, event_buffer):
+        """Событие error попадает в буфер."""
+        await analytics.track_error(
+            user_id=123456789,
+            error_type="product_not_found",
+            error_message="Товар 12345678 не найден"
+        )
+
+        _, event_type, event_data = event_buffer._records[0][:3]
+        assert event_type == "error"
+        assert json.loads(event_data)["error_type"] == "product_not_found"
 
     @pytest.mark.asyncio
-    async def test_special_characters_in_message(self, analytics):
+    async def test_special_characters_in_message(self, analytics, event_buffer):
         """Обработка спецсимволов в сообщении об ошибке."""
-        mock_pool, mock_conn = MagicMock(), MagicMock()
+        message = 'Message with "quotes", \'apostrophes\' and \\ backslash'
 
-        mock_conn.__aenter__ = AsyncMock(return_value=mock_conn)
-        mock_conn.__aexit__ = AsyncMock()
-        mock_pool.acquire = MagicMock(return_value=mock_conn)
-        mock_conn.execute = AsyncMock()
+        await analytics.track_error(
+            user_id=123456789,
+            error_type="test_error",
+            error_message=message
+        )
 
-        with patch("services.analytics.get_pool", return_value=mock_pool):
-            # Сообщение с кавычками
-            await analytics.track_error(
-                user_id=123456789,
-                error_type="test_error",
-                error_message='Message with "quotes" and \'apostrophes\''
-            )
-
-        # Проверяем что не упало
-        mock_conn.execute.assert_called_once()
+        # JSON корректен и сообщение не искажено
+        event_data = event_buffer._records[0][2]
+        assert json.loads(event_data)["message"] == message
 
 
 class TestGetDailyStats:
@@ -277,22 +235,21 @@ class TestGetDailyStats:
         mock_conn.__aexit__ = AsyncMock()
         mock_pool.acquire = MagicMock(return_value=mock_conn)
 
-        # Мокируем все запросы к БД
-        mock_conn.fetchval = AsyncMock(side_effect=[
-            5,   # new_users
-            23,  # total_users
-            8,   # returning_users
-            42,  # article_requests
-            15,  # videos_sent
-            2,   # errors
+        # Окончательной строки rollup нет — день пересчитывается одним запросом
+        mock_conn.fetchrow = AsyncMock(side_effect=[
+            None,
+            {
+                "new_users": 5,
+                "total_users": 23,
+                "returning_users": 8,
+                "article_requests": 42,
+                "photos_sent": 156,
+                "unique_products": 38,
+                "videos_sent": 15,
+                "errors": 2,
+            },
         ])
 
-        # Мокируем fetchrow для фото
-        mock_conn.fetchrow = AsyncMock(return_value={
-            "total_photos": 156,
-            "unique_products": 38
-        })
-
         with patch("services.analytics.get_pool", return_value=mock_pool):
             stats = await analytics.get_daily_stats(date(2026, 1, 22))
 
@@ -307,6 +264,30 @@ class TestGetDailyStats:
         assert stats["videos_sent"] == 15
         assert stats["errors"] == 2
 
+        # Второй запрос — пересчёт rollup с COUNT(*) FILTER
+        refresh_sql = mock_conn.fetchrow.call_args_list[1][0][0]
+        assert "INSERT INTO shared.analytics_daily_rollup" in refresh_sql
+        assert "FILTER (WHERE event_type = 'video_sent')" in refresh_sql
+
+    @pytest.mark.asyncio
+    async def test_final_rollup_row_is_used(self, analytics):
+        """Окончательная строка rollup возвращается без пересчёта."""
+        mock_pool, mock_conn = MagicMock(), MagicMock()
+
+        mock_conn.__aenter__ = AsyncMock(return_value=mock_conn)
+        mock_conn.__aexit__ = AsyncMock()
+        mock_pool.acquire = MagicMock(return_value=mock_conn)
+
+        row = {key: 1 for key in STAT_KEYS}
+        mock_conn.fetchrow = AsyncMock(return_value=row)
+
+        with patch("services.analytics.get_pool", return_value=mock_pool):
+            stats = await analytics.get_daily_stats(date(2026, 1, 22))
+
+        assert stats == row
+        mock_conn.fetchrow.assert_called_once()
+        assert "FROM shared.analytics_daily_rollup" in mock_conn.fetchrow.call_args[0][0]
+
     @pytest.mark.asyncio
     async def test_db_unavailable(self, analytics):
         """БД недоступна - возвращает None."""
@@ -324,10 +305,75 @@ class TestGetDailyStats:
         mock_conn.__aexit__ = AsyncMock()
         mock_pool.acquire = MagicMock(return_value=mock_conn)
 
-        # fetchval бросает исключение
-        mock_conn.fetchval = AsyncMock(side_effect=Exception("Query error"))
+        # fetchrow бросает исключение
+        mock_conn.fetchrow = AsyncMock(side_effect=Exception("Query error"))
 
         with patch("services.analytics.get_pool", return_value=mock_pool):
             stats = await analytics.get_daily_stats(date(2026, 1, 22))
 
         assert stats is None
+
+
+class TestStatsRange:
+    """Тесты для get_stats_range."""
+
+    @pytest.mark.asyncio
+    async def test_reads_rollup_rows(self, analytics):
+        """Статистика за период читается из rollup."""
+        mock_pool, mock_conn = MagicMock(), MagicMock()
+
+        mock_conn.__aenter__ = AsyncMock(return_value=mock_conn)
+        mock_conn.__aexit__ = AsyncMock()
+        mock_pool.acquire = MagicMock(return_value=mock_conn)
+
+        rows = [
+            {"day": date(2026, 1, 21), **{key: 1 for key in STAT_KEYS}},
+            {"day": date(2026, 1, 22), **{key: 2 for key in STAT_KEYS}},
+        ]
+        mock_conn.fetch = AsyncMock(return_value=rows)
+
+        with patch("services.analytics.get_pool", return_value=mock_pool):
+            result = await analytics.get_stats_range(date(2026, 1, 21), date(2026, 1, 22))
+
+        assert [r["day"] for r in result] == [date(2026, 1, 21), date(2026, 1, 22)]
+        assert result[1]["photos_sent"] == 2
+        assert "shared.analytics_daily_rollup" in mock_conn.fetch.call_args[0][0]
+
+
+class TestMaintainPartitions:
+    """Тесты для maintain_partitions."""
+
+    @pytest.mark.asyncio
+    async def test_creates_and_detaches(self, analytics):
+        """Создание будущих партиций и отсоединение старых."""
+        mock_pool, mock_conn = MagicMock(), MagicMock()
+
+        mock_conn.__aenter__ = AsyncMock(return_value=mock_conn)
+        mock_conn.__aexit__ = AsyncMock()
+        mock_pool.acquire = MagicMock(return_value=mock_conn)
+        mock_conn.fetchval = AsyncMock(return_value=1)
+        mock_conn.fetch = AsyncMock(return_value=[{"name": "analytics_events_2025_01"}])
+
+        with patch("services.analytics.get_pool", return_value=mock_pool):
+            result = await analytics.maintain_partitions(months_ahead=2, retention_months=12)
+
+        assert result == {"created": 1, "detached": ["analytics_events_2025_01"]}
+        assert "ensure_analytics_partitions" in mock_conn.fetchval.call_args[0][0]
+        assert mock_conn.fetch.call_args[0][1] == 12
+
+    @pytest.mark.asyncio
+    async def test_retention_disabled(self, analytics):
+        """retention_months=0 - партиции не отсоединяются."""
+        mock_pool, mock_conn = MagicMock(), MagicMock()
+
+        mock_conn.__aenter__ = AsyncMock(return_value=mock_conn)
+        mock_conn.__aexit__ = AsyncMock()
+        mock_pool.acquire = MagicMock(return_value=mock_conn)
+        mock_conn.fetchval = AsyncMock(return_value=0)
+        mock_conn.fetch = AsyncMock()
+
+        with patch("services.analytics.get_pool", return_value=mock_pool):
+            result = await analytics.maintain_partitions(months_ahead=2, retention_months=0)
+
+        assert result == {"created": 0, "detached": []}
+        assert not mock_conn.fetch.called
@@ -296,4 +296,45 @@ class TestCallbacksHandler:
 
         # track_event НЕ должен вызываться для photo_sent/video_sent
         for call in mock_gateway.track_event.call_args_list:
-            assert call[0][1] not in ("photo_sent", "video_sent")
\ No newline at end of file
+            assert call[0][1] not in ("photo_sent", "video_sent")
+    @pytest.mark.asyncio
+    async def test_handle_download_zip(self, callback_query, bot, product_media):
+        """Тест: загрузка фото архивом."""
+        callback_query.data = "download:12345678:zip"
+
+        with patch('bot.handlers.callbacks.get_wb_media_client') as mock_get_client, \
+             patch('bot.handlers.callbacks.MediaDownloader') as MockDownloader:
+
+            mock_client = AsyncMock()
+            mock_client.get_product_media = AsyncMock(return_value=product_media)
+            mock_get_client.return_value = mock_client
+
+            mock_downloader = MagicMock()
+            mock_downloader.send_photos_archive = AsyncMock()
+            MockDownloader.return_value = mock_downloader
+
+            await handle_download_callback(callback_query, bot)
+
+        mock_client.get_product_media.assert_called_once_with("12345678", skip_video=True)
+        assert mock_downloader.send_photos_archive.called
+
+    @pytest.mark.asyncio
+    async def test_queued_callback_not_answered_twice(self, callback_query, bot, product_media):
+        """Тест: callback из очереди загрузок уже отвечен — повторный answer не вызывается."""
+        callback_query.data = "download:12345678:video"
+
+        with patch('bot.handlers.callbacks.get_wb_media_client') as mock_get_client, \
+             patch('bot.handlers.callbacks.MediaDownloader') as MockDownloader:
+
+            mock_client = AsyncMock()
+            mock_client.get_product_media = AsyncMock(return_value=product_media)
+            mock_get_client.return_value = mock_client
+
+            mock_downloader = MagicMock()
+            mock_downloader.send_video = AsyncMock()
+            MockDownloader.return_value = mock_downloader
+
+            await handle_download_callback(callback_query, bot, callback_answered=True)
+
+        assert not callback_query.answer.called
+        assert mock_downloader.send_video.called
@@ -0,0 +1,151 @@
+"""Тесты для utils/circuit_breaker.py"""
+
+import asyncio
+import pytest
+from unittest.mock import AsyncMock
+
+from utils.circuit_breaker import (
+    STATE_CLOSED,
+    STATE_HALF_OPEN,
+    STATE_OPEN,
+    CircuitBreaker,
+    circuit_breakers_snapshot,
+    get_circuit_breaker,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def breaker(clock):
+    return CircuitBreaker("svc", failure_threshold=3, recovery_timeout=30, clock=clock)
+
+
+class TestCircuitBreaker:
+    """Тесты состояний breaker'а."""
+
+    def test_opens_after_threshold(self, breaker):
+        """Тест: после N ошибок подряд вызовы отклоняются."""
+        for _ in range(3):
+            assert breaker.allow()
+            breaker.record_failure()
+
+        assert breaker.state == STATE_OPEN
+        assert not breaker.allow()
+        assert breaker.snapshot()["rejected"] == 1
+        assert breaker.snapshot()["opened"] == 1
+
+    def test_success_resets_failures(self, breaker):
+        """Тест: успех сбрасывает счётчик ошибок подряд."""
+        breaker.record_failure()
+        breaker.record_failure()
+        breaker.record_success()
+        breaker.record_failure()
+
+        assert breaker.state == STATE_CLOSED
+
+    def test_half_open_single_probe(self, breaker, clock):
+        """Тест: после recovery_timeout пропускается одна проба."""
+        for _ in range(3):
+            breaker.record_failure()
+        clock.now = 30
+
+        assert breaker.state == STATE_HALF_OPEN
+        assert breaker.allow()
+        assert not breaker.allow()
+
+        breaker.record_success()
+        assert breaker.state == STATE_CLOSED
+        assert breaker.allow()
+
+    def test_failed_probe_reopens(self, breaker, clock):
+        """Тест: ошибка пробы снова размыкает breaker на recovery_timeout."""
+        for _ in range(3):
+            breaker.record_failure()
+        clock.now = 30
+        assert breaker.allow()
+        breaker.record_failure()
+
+        assert breaker.state == STATE_OPEN
+        clock.now = 59
+        assert not breaker.allow()
+        clock.now = 60
+        assert breaker.allow()
+
+    def test_release_frees_half_open_probe(self, breaker, clock):
+        """Тест: отменённая проба освобождает слот half-open."""
+        for _ in range(3):
+            breaker.record_failure()
+        clock.now = 30
+
+        assert breaker.allow()
+        assert not breaker.allow()
+        breaker.release()
+
+        assert breaker.state == STATE_HALF_OPEN
+        assert breaker.allow()
+
+    def test_registry_per_service(self):
+        """Тест: у каждого сервиса свой breaker."""
+        assert get_circuit_breaker("a") is get_circuit_breaker("a")
+        assert get_circuit_breaker("a") is not get_circuit_breaker("b")
+        assert set(circuit_breakers_snapshot()) == {"a", "b"}
+
+
+class TestWbMediaClientBreaker:
+    """Тесты: WbMediaClient не ждёт недоступный сервис."""
+
+    @pytest.mark.asyncio
+    async def test_open_breaker_skips_service(self, product_media):
+        """Тест: при разомкнутом breaker запрос сразу идёт в WBParser."""
+        from services.wb_media_client import WB_MEDIA_BREAKER, WbMediaClient
+
+        client = WbMediaClient.__new__(WbMediaClient)
+        client.use_service = True
+        client.service_url = "http://wb-media-service:8013"
+        client.timeout = 40
+        client._get_via_service = AsyncMock(side_effect=Exception("timeout"))
+        client._get_via_parser = AsyncMock(return_value=product_media)
+
+        breaker = get_circuit_breaker(WB_MEDIA_BREAKER)
+        for _ in range(breaker.failure_threshold):
+            await client.get_product_media("12345678")
+        client._get_via_service.reset_mock()
+
+        media = await client.get_product_media("12345678")
+
+        assert media is product_media
+        client._get_via_service.assert_not_called()
+        assert breaker.state == STATE_OPEN
+
+    @pytest.mark.asyncio
+    async def test_cancelled_probe_released(self, product_media):
+        """Тест: отменённая half-open проба не блокирует следующие."""
+        from services.wb_media_client import WB_MEDIA_BREAKER, WbMediaClient
+
+        client = WbMediaClient.__new__(WbMediaClient)
+        client.use_service = True
+        client._get_via_service = AsyncMock(side_effect=asyncio.CancelledError())
+        client._get_via_parser = AsyncMock(return_value=product_media)
+
+        breaker = get_circuit_breaker(WB_MEDIA_BREAKER)
+        for _ in range(breaker.failure_threshold):
+            breaker.record_failure()
+        breaker._opened_at -= breaker.recovery_timeout
+
+        with pytest.raises(asyncio.CancelledError):
+            await client.get_product_media("12345678")
+
+        assert breaker.state == STATE_HALF_OPEN
+        assert breaker.allow()
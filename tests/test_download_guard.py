@@ -0,0 +1,136 @@
+"""Тесты для bot/middlewares/download_guard.py"""
+
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+from bot.middlewares.download_guard import DownloadGuardMiddleware
+
+
+def _callback(data: str, user_id: int = 1):
+    callback = MagicMock()
+    callback.data = data
+    callback.from_user.id = user_id
+    callback.message.chat.id = user_id
+    callback.answer = AsyncMock()
+    return callback
+
+
+class BlockingHandler:
+    """Handler, который не завершается до release()."""
+
+    def __init__(self):
+        self.calls = []
+        self._gate = asyncio.Event()
+
+    async def __call__(self, event, data):
+        self.calls.append((event.data, dict(data)))
+        await self._gate.wait()
+        return "done"
+
+    def release(self):
+        self._gate.set()
+
+
+class TestDownloadGuardMiddleware:
+    """Тесты защиты загрузок."""
+
+    @pytest.mark.asyncio
+    async def test_double_tap_is_deduped(self):
+        """Тест: повторное нажатие во время загрузки отбрасывается."""
+        guard = DownloadGuardMiddleware(concurrency=1, queue=2)
+        handler = BlockingHandler()
+
+        first = asyncio.create_task(guard(handler, _callback("download:123:video"), {}))
+        await asyncio.sleep(0)
+        second = _callback("download:123:video")
+        assert await guard(handler, second, {}) is None
+
+        handler.release()
+        assert await first == "done"
+        assert len(handler.calls) == 1
+        second.answer.assert_called_once()
+        assert guard.snapshot()["deduped"] == 1
+        assert guard.snapshot()["in_flight"] == 0
+
+    @pytest.mark.asyncio
+    async def test_heavy_jobs_are_queued(self):
+        """Тест: вторая тяжёлая загрузка ждёт первую, callback отвечен сразу."""
+        guard = DownloadGuardMiddleware(concurrency=1, queue=2)
+        handler = BlockingHandler()
+
+        first = asyncio.create_task(guard(handler, _callback("download:1:video"), {}))
+        await asyncio.sleep(0)
+        queued_callback = _callback("download:2:zip")
+        second = asyncio.create_task(guard(handler, queued_callback, {}))
+        await asyncio.sleep(0)
+
+        assert len(handler.calls) == 1
+        queued_callback.answer.assert_called_once()
+
+        handler.release()
+        await asyncio.gather(first, second)
+
+        assert len(handler.calls) == 2
+        assert handler.calls[1][1]["callback_answered"] is True
+        assert guard.snapshot()["queued"] == 1
+
+    @pytest.mark.asyncio
+    async def test_rejects_over_queue(self):
+        """Тест: сверх concurrency + queue загрузки отклоняются."""
+        guard = DownloadGuardMiddleware(concurrency=1, queue=1)
+        handler = BlockingHandler()
+
+        tasks = [
+            asyncio.create_task(guard(handler, _callback(f"download:{n}:video"), {}))
+            for n in range(2)
+        ]
+        await asyncio.sleep(0)
+        rejected = _callback("download:9:both")
+        assert await guard(handler, rejected, {}) is None
+
+        handler.release()
+        await asyncio.gather(*tasks)
+
+        assert rejected.answer.call_args.kwargs["show_alert"] is True
+        assert guard.snapshot()["rejected"] == 1
+
+    @pytest.mark.asyncio
+    async def test_photos_and_other_users_not_limited(self):
+        """Тест: фото и загрузки других пользователей не ждут чужой очереди."""
+        guard = DownloadGuardMiddleware(concurrency=1, queue=0)
+        handler = BlockingHandler()
+
+        busy = asyncio.create_task(guard(handler, _callback("download:1:video", user_id=1), {}))
+        photo = asyncio.create_task(guard(handler, _callback("download:2:photo", user_id=1), {}))
+        other = asyncio.create_task(guard(handler, _callback("download:1:video", user_id=2), {}))
+        await asyncio.sleep(0)
+
+        assert len(handler.calls) == 3
+
+        handler.release()
+        await asyncio.gather(busy, photo, other)
+
+    @pytest.mark.asyncio
+    async def test_other_callbacks_pass_through(self):
+        """Тест: callback без download: обрабатывается без проверок."""
+        guard = DownloadGuardMiddleware(concurrency=1, queue=0)
+        handler = AsyncMock(return_value="ok")
+
+        assert await guard(handler, _callback("other:1"), {}) == "ok"
+
+    @pytest.mark.asyncio
+    async def test_inline_message_without_chat(self):
+        """Тест: callback inline-сообщения (message=None) дедуплицируется по пользователю."""
+        guard = DownloadGuardMiddleware(concurrency=1, queue=2)
+        handler = BlockingHandler()
+        callback = _callback("download:123:video", user_id=5)
+        callback.message = None
+
+        first = asyncio.create_task(guard(handler, callback, {}))
+        await asyncio.sleep(0)
+        assert await guard(handler, callback, {}) is None
+
+        handler.release()
+        assert await first == "done"
+        assert guard.snapshot()["deduped"] == 1
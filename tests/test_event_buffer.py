@@ -0,0 +1,192 @@
+"""Тесты для services/event_buffer.py"""
+
+import asyncio
+import json
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import asyncpg
+
+from services.event_buffer import _COLUMNS, AnalyticsEventBuffer
+
+
+@pytest.fixture
+def mock_pool():
+    """Mock пула asyncpg."""
+    pool = MagicMock()
+    conn = MagicMock()
+    conn.__aenter__ = AsyncMock(return_value=conn)
+    conn.__aexit__ = AsyncMock(return_value=False)
+    conn.copy_records_to_table = AsyncMock()
+    conn.executemany = AsyncMock()
+    conn.execute = AsyncMock()
+    pool.acquire = MagicMock(return_value=conn)
+    return pool, conn
+
+
+class TestAnalyticsEventBuffer:
+    """Тесты буфера событий."""
+
+    @pytest.mark.asyncio
+    async def test_flush_uses_copy(self, mock_pool):
+        """Тест: пачка записывается одной командой COPY."""
+        pool, conn = mock_pool
+        buffer = AnalyticsEventBuffer(batch_size=100, flush_interval=60, max_pending=1000)
+        for i in range(5):
+            buffer.add(i, "article_request", {"nm_id": i})
+
+        with patch("services.event_buffer.get_pool", return_value=pool):
+            assert await buffer.flush() == 5
+
+        conn.copy_records_to_table.assert_called_once()
+        kwargs = conn.copy_records_to_table.call_args.kwargs
+        assert kwargs["schema_name"] == "shared"
+        assert len(kwargs["records"]) == 5
+        assert json.loads(kwargs["records"][2][2]) == {"nm_id": 2}
+        assert len(buffer) == 0
+        assert buffer.written == 5
+
+    @pytest.mark.asyncio
+    async def test_typed_columns_not_written(self):
+        """Тест: генерируемые колонки (nm_id, count, ...) и created_at не передаются в COPY."""
+        buffer = AnalyticsEventBuffer(batch_size=100, flush_interval=60, max_pending=1000)
+        buffer.add(1, "photo_sent", {"nm_id": "12345678", "count": 5})
+        buffer.stop()
+
+        assert _COLUMNS == ("telegram_id", "event_type", "event_data")
+        assert len(buffer._records[0]) == len(_COLUMNS)
+
+    @pytest.mark.asyncio
+    async def test_size_trigger(self, mock_pool):
+        """Тест: при достижении batch_size запись запускается сама."""
+        pool, conn = mock_pool
+        buffer = AnalyticsEventBuffer(batch_size=3, flush_interval=60, max_pending=1000)
+
+        with patch("services.event_buffer.get_pool", return_value=pool):
+            for i in range(3):
+                buffer.add(i, "video_sent", {"nm_id": i})
+            await asyncio.sleep(0.01)
+
+        conn.copy_records_to_table.assert_called_once()
+        assert buffer.written == 3
+
+    @pytest.mark.asyncio
+    async def test_time_trigger(self, mock_pool):
+        """Тест: неполная пачка записывается по таймеру."""
+        pool, conn = mock_pool
+        buffer = AnalyticsEventBuffer(batch_size=100, flush_interval=0.01, max_pending=1000)
+
+        with patch("services.event_buffer.get_pool", return_value=pool):
+            buffer.add(1, "video_sent", {"nm_id": 1})
+            await asyncio.sleep(0.05)
+
+        assert buffer.written == 1
+
+    @pytest.mark.asyncio
+    async def test_fk_violation_falls_back_to_executemany(self, mock_pool):
+        """Тест: событие неизвестного пользователя не отменяет всю пачку."""
+        pool, conn = mock_pool
+        conn.copy_records_to_table.side_effect = asyncpg.ForeignKeyViolationError("fk")
+        buffer = AnalyticsEventBuffer(batch_size=100, flush_interval=60, max_pending=1000)
+        buffer.add(1, "error", {"error_type": "x", "message": "y"})
+        buffer.add(2, "error", {"error_type": "x", "message": "y"})
+
+        with patch("services.event_buffer.get_pool", return_value=pool):
+            await buffer.flush()
+
+        conn.executemany.assert_called_once()
+        sql, records = conn.executemany.call_args[0]
+        assert "WHERE EXISTS" in sql
+        assert len(records) == 2
+
+    @pytest.mark.asyncio
+    async def test_failed_flush_requeues(self, mock_pool):
+        """Тест: при ошибке БД события возвращаются в буфер."""
+        pool, conn = mock_pool
+        conn.copy_records_to_table.side_effect = OSError("connection lost")
+        buffer = AnalyticsEventBuffer(batch_size=100, flush_interval=60, max_pending=1000)
+        buffer.add(1, "video_sent", {"nm_id": 1})
+
+        with patch("services.event_buffer.get_pool", return_value=pool):
+            assert await buffer.flush() == 0
+
+        assert len(buffer) == 1
+        buffer.stop()
+
+    @pytest.mark.asyncio
+    async def test_timeout_requeues(self, mock_pool):
+        """Тест: таймаут соединения — пачка возвращается в буфер."""
+        pool, conn = mock_pool
+        conn.copy_records_to_table.side_effect = asyncio.TimeoutError()
+        buffer = AnalyticsEventBuffer(batch_size=100, flush_interval=60, max_pending=1000)
+        buffer.add(1, "video_sent", {"nm_id": 1})
+
+        with patch("services.event_buffer.get_pool", return_value=pool):
+            assert await buffer.flush() == 0
+
+        assert len(buffer) == 1
+        conn.execute.assert_not_called()
+        buffer.stop()
+
+    @pytest.mark.asyncio
+    async def test_rejected_batch_written_per_row(self, mock_pool):
+        """Тест: пачка, отклонённая БД, пишется по одному; плохое событие отбрасывается."""
+        pool, conn = mock_pool
+        conn.copy_records_to_table.side_effect = asyncpg.DataError("invalid input")
+        bad = asyncpg.UntranslatableCharacterError("\\u0000 cannot be converted to text")
+        conn.execute.side_effect = [None, bad, None]
+        buffer = AnalyticsEventBuffer(batch_size=100, flush_interval=60, max_pending=1000)
+        buffer.add(1, "video_sent", {"nm_id": 1})
+        buffer.add(2, "error", {"message": "\x00"})
+        buffer.add(3, "video_sent", {"nm_id": 3})
+
+        with patch("services.event_buffer.get_pool", return_value=pool):
+            assert await buffer.flush() == 2
+
+        assert conn.execute.call_count == 3
+        assert conn.execute.call_args_list[1][0][1] == 2
+        assert buffer.written == 2
+        assert buffer.rejected == 1
+        assert len(buffer) == 0
+
+    @pytest.mark.asyncio
+    async def test_per_row_connection_loss_requeues_rest(self, mock_pool):
+        """Тест: обрыв соединения при записи по одному — в буфер только незаписанные."""
+        pool, conn = mock_pool
+        conn.copy_records_to_table.side_effect = asyncpg.DataError("invalid input")
+        conn.execute.side_effect = [None, OSError("connection lost")]
+        buffer = AnalyticsEventBuffer(batch_size=100, flush_interval=60, max_pending=1000)
+        for i in range(3):
+            buffer.add(i, "video_sent", {"nm_id": i})
+
+        with patch("services.event_buffer.get_pool", return_value=pool):
+            assert await buffer.flush() == 1
+
+        assert [record[0] for record in buffer._records] == [1, 2]
+        assert buffer.rejected == 0
+        buffer.stop()
+
+    @pytest.mark.asyncio
+    async def test_max_pending_drops_oldest(self):
+        """Тест: при переполнении отбрасываются старые события."""
+        buffer = AnalyticsEventBuffer(batch_size=100, flush_interval=60, max_pending=2)
+        for i in range(3):
+            buffer.add(i, "video_sent", {"nm_id": i})
+        buffer.stop()
+
+        assert len(buffer) == 2
+        assert buffer.dropped == 1
+        assert buffer._records[0][0] == 1
+
+    @pytest.mark.asyncio
+    async def test_close_flushes_remaining(self, mock_pool):
+        """Тест: close записывает остаток буфера."""
+        pool, conn = mock_pool
+        buffer = AnalyticsEventBuffer(batch_size=100, flush_interval=60, max_pending=1000)
+        buffer.add(1, "video_sent", {"nm_id": 1})
+
+        with patch("services.event_buffer.get_pool", return_value=pool):
+            await buffer.close()
+
+        assert buffer.written == 1
+        assert len(buffer) == 0
@@ -0,0 +1,106 @@
+"""Тесты для services/event_emitter.py"""
+
+import asyncio
+import pytest
+from unittest.mock import AsyncMock
+
+from services.event_emitter import (
+    POLICY_BLOCK,
+    POLICY_DROP_OLDEST,
+    POLICY_SAMPLE,
+    EventEmitter,
+)
+
+
+class TestEventEmitter:
+    """Тесты очереди доставки событий."""
+
+    @pytest.mark.asyncio
+    async def test_emit_delivers_in_background(self):
+        """Тест: emit возвращается сразу, доставка выполняется воркером."""
+        handler = AsyncMock(return_value=True)
+        emitter = EventEmitter(handler, maxsize=10, workers=1)
+
+        assert await emitter.emit(123, "photo_sent", {"nm_id": 1}) is True
+        handler.assert_not_called()
+
+        await emitter.close(timeout=1)
+
+        handler.assert_awaited_once_with(123, "photo_sent", {"nm_id": 1})
+        assert emitter.snapshot()["delivered"] == 1
+
+    @pytest.mark.asyncio
+    async def test_drop_oldest(self):
+        """Тест: при переполнении вытесняется самое старое событие."""
+        delivered = []
+
+        async def handler(user_id, event_type, event_data):
+            delivered.append(event_data["n"])
+            return True
+
+        emitter = EventEmitter(handler, maxsize=2, workers=1, policy=POLICY_DROP_OLDEST)
+        for n in range(4):
+            await emitter.emit(1, "article_request", {"n": n})
+        await emitter.close(timeout=1)
+
+        assert delivered == [2, 3]
+        assert emitter.stats.dropped == 2
+
+    @pytest.mark.asyncio
+    async def test_sample_drops_new_when_full(self):
+        """Тест: sample отбрасывает новые события при заполненной очереди."""
+        handler = AsyncMock(return_value=True)
+        emitter = EventEmitter(handler, maxsize=4, workers=1, policy=POLICY_SAMPLE)
+
+        accepted = [await emitter.emit(1, "article_request", {}) for _ in range(10)]
+        await emitter.close(timeout=1)
+
+        assert accepted[:2] == [True, True]
+        assert accepted.count(True) <= 4
+        assert emitter.stats.dropped == accepted.count(False)
+        assert handler.await_count == accepted.count(True)
+
+    @pytest.mark.asyncio
+    async def test_block_delays_without_loss(self):
+        """Тест: block ждёт места в очереди и не теряет события."""
+        release = asyncio.Event()
+
+        async def slow_delivery(*args):
+            await release.wait()
+            return True
+
+        handler = AsyncMock(side_effect=slow_delivery)
+        emitter = EventEmitter(handler, maxsize=1, workers=1, policy=POLICY_BLOCK)
+
+        await emitter.emit(1, "video_sent", {})
+        await asyncio.sleep(0)  # Воркер забирает первое событие
+        await emitter.emit(1, "video_sent", {})
+        blocked = asyncio.create_task(emitter.emit(1, "video_sent", {}))
+        await asyncio.sleep(0)
+        assert not blocked.done()
+
+        release.set()
+        await asyncio.wait_for(blocked, timeout=1)
+        await emitter.close(timeout=1)
+
+        assert handler.await_count == 3
+        assert emitter.stats.dropped == 0
+        assert emitter.stats.delayed >= 1
+
+    @pytest.mark.asyncio
+    async def test_handler_error_counted(self):
+        """Тест: ошибка доставки не останавливает воркер."""
+        handler = AsyncMock(side_effect=[RuntimeError("boom"), True])
+        emitter = EventEmitter(handler, maxsize=10, workers=1)
+
+        await emitter.emit(1, "error", {})
+        await emitter.emit(1, "error", {})
+        await emitter.close(timeout=1)
+
+        assert emitter.stats.failed == 1
+        assert emitter.stats.delivered == 1
+
+    def test_unknown_policy(self):
+        """Тест: неизвестная политика переполнения отклоняется."""
+        with pytest.raises(ValueError):
+            EventEmitter(AsyncMock(), maxsize=1, policy="drop_newest")
@@ -0,0 +1,166 @@
+"""Тесты для services/event_spool.py"""
+
+import asyncio
+import threading
+import pytest
+from unittest.mock import patch
+
+from services.event_spool import EventSpool
+
+
+def _event(n: int) -> dict:
+    return {"telegram_id": n, "event_type": "article_request", "event_data": {"nm_id": n}}
+
+
+@pytest.fixture
+def spool(tmp_path):
+    return EventSpool(str(tmp_path), segment_bytes=1024 * 1024, max_bytes=10 * 1024 * 1024)
+
+
+class TestEventSpool:
+    """Тесты журнала событий."""
+
+    @pytest.mark.asyncio
+    async def test_replay_delivers_and_removes_segments(self, spool):
+        """Тест: replay отправляет события пачками и удаляет сегмент."""
+        for n in range(5):
+            spool.append(_event(n))
+
+        batches = []
+
+        async def send(events):
+            batches.append(events)
+            return []
+
+        delivered = await spool.replay(send, batch_size=2)
+
+        assert delivered == 5
+        assert [len(b) for b in batches] == [2, 2, 1]
+        assert batches[0][0] == _event(0)
+        assert spool.sealed_segments() == []
+        await spool.close()
+
+    @pytest.mark.asyncio
+    async def test_replay_keeps_events_when_service_down(self, spool):
+        """Тест: события для повтора и неотправленные остаются в журнале."""
+        for n in range(4):
+            spool.append(_event(n))
+
+        async def send_down(events):
+            return events
+
+        assert await spool.replay(send_down, batch_size=2) == 0
+
+        sent = []
+
+        async def send_ok(events):
+            sent.extend(events)
+            return []
+
+        assert await spool.replay(send_ok, batch_size=2) == 4
+        assert sent == [_event(n) for n in range(4)]
+        await spool.close()
+
+    @pytest.mark.asyncio
+    async def test_replay_failure_does_not_seal_or_rewrite(self, spool):
+        """Тест: без доставки сегмент не перезаписывается и новые не закрываются."""
+        for n in range(4):
+            spool.append(_event(n))
+
+        async def send_down(events):
+            return events
+
+        assert await spool.replay(send_down, batch_size=2) == 0
+        sealed = spool.sealed_segments()
+        assert len(sealed) == 1
+        mtime = sealed[0].stat().st_mtime_ns
+
+        spool.append(_event(4))
+        with patch.object(spool, "_rewrite_segment") as rewrite:
+            assert await spool.replay(send_down, batch_size=2) == 0
+        rewrite.assert_not_called()
+        assert spool.sealed_segments() == sealed
+        assert sealed[0].stat().st_mtime_ns == mtime
+        assert spool._file_size > 0
+        await spool.close()
+
+    @pytest.mark.asyncio
+    async def test_replay_skipped_while_not_ready(self, spool):
+        """Тест: пока получатель не готов (breaker разомкнут), проход пропускается."""
+        spool.append(_event(1))
+        calls = []
+
+        async def send(events):
+            calls.append(events)
+            return []
+
+        assert await spool.replay(send, ready=lambda: False) == 0
+        assert calls == []
+        assert spool.sealed_segments() == []
+
+        assert await spool.replay(send, ready=lambda: True) == 1
+        await spool.close()
+
+    @pytest.mark.asyncio
+    async def test_segments_rotate_and_size_is_bounded(self, tmp_path):
+        """Тест: сегменты ротируются, старые удаляются при превышении лимита."""
+        spool = EventSpool(str(tmp_path), segment_bytes=200, max_bytes=600)
+        for n in range(100):
+            spool.append(_event(n))
+        await spool.close()
+
+        assert spool.dropped_segments > 0
+        assert spool.size_bytes() <= 600
+
+    @pytest.mark.asyncio
+    async def test_survives_restart_and_skips_torn_line(self, tmp_path):
+        """Тест: журнал читается после перезапуска, недописанная строка пропускается."""
+        spool = EventSpool(str(tmp_path), segment_bytes=1024 * 1024, max_bytes=1024 * 1024)
+        spool.append(_event(1))
+        await spool.close()
+        segment = spool.sealed_segments()[0]
+        with open(segment, "a", encoding="utf-8") as f:
+            f.write('{"telegram_id": 2, "event_')
+
+        restarted = EventSpool(str(tmp_path), segment_bytes=1024 * 1024, max_bytes=1024 * 1024)
+        restarted.append(_event(3))
+        sent = []
+
+        async def send(events):
+            sent.extend(events)
+            return []
+
+        await restarted.replay(send)
+        await restarted.close()
+
+        assert sent == [_event(1), _event(3)]
+
+    @pytest.mark.asyncio
+    async def test_background_fsync(self, tmp_path):
+        """Тест: дописанные события сбрасываются на диск по таймеру."""
+        spool = EventSpool(
+            str(tmp_path), segment_bytes=1024 * 1024, max_bytes=1024 * 1024,
+            fsync_interval=0.01
+        )
+        spool.append(_event(1))
+        await asyncio.sleep(0.05)
+
+        segment = next(tmp_path.glob("events-*.jsonl"))
+        assert segment.read_text(encoding="utf-8").strip() != ""
+        await spool.close()
+
+    @pytest.mark.asyncio
+    async def test_seal_fsync_off_event_loop(self, tmp_path):
+        """Тест: fsync закрываемого сегмента выполняется вне потока event loop."""
+        spool = EventSpool(str(tmp_path), segment_bytes=10, max_bytes=1024 * 1024)
+        threads = []
+
+        def fsync(fd):
+            threads.append(threading.current_thread())
+
+        with patch("services.event_spool.os.fsync", side_effect=fsync):
+            spool.append(_event(1))
+            assert threads == []
+            await spool.close()
+
+        assert threads and threading.main_thread() not in threads
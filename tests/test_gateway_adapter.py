@@ -36,6 +36,9 @@ class TestTrackEventWithAnalyticsService:
             adapter.use_analytics_service = True
             adapter.analytics_service_url = "http://analytics-service:8003"
             adapter.analytics_service_timeout = 10
+            adapter.http2 = False
+            adapter.max_connections = 20
+            adapter.keepalive_expiry = 30.0
             adapter.gateway_url = "http://api-gateway:8000"
             adapter.api_key = None
             adapter.timeout = 10
@@ -82,6 +85,9 @@ class TestTrackEventWithAnalyticsService:
             adapter.use_analytics_service = True
             adapter.analytics_service_url = "http://analytics-service:8003"
             adapter.analytics_service_timeout = 10
+            adapter.http2 = False
+            adapter.max_connections = 20
+            adapter.keepalive_expiry = 30.0
             adapter.gateway_url = "http://api-gateway:8000"
             adapter.api_key = None
             adapter.timeout = 10
@@ -120,6 +126,27 @@ class TestTrackEventWithAnalyticsService:
             assert result is True
             mock_local_analytics.track_article_request.assert_called_once_with(123, 456)
 
+    @pytest.mark.asyncio
+    async def test_track_event_enqueued_to_emitter(self):
+        """track_event с очередью возвращается до доставки, close доставляет событие."""
+        from services.event_emitter import EventEmitter
+        from services.gateway_adapter import GatewayAdapter
+
+        mock_local_analytics = AsyncMock()
+        adapter = GatewayAdapter.__new__(GatewayAdapter)
+        adapter.use_analytics_service = False
+        adapter._analytics = mock_local_analytics
+        adapter._emitter = EventEmitter(adapter._deliver_event, maxsize=10, workers=1)
+
+        result = await adapter.track_event(123, "article_request", {"nm_id": 456})
+
+        assert result is True
+        mock_local_analytics.track_article_request.assert_not_called()
+
+        await adapter.close()
+
+        mock_local_analytics.track_article_request.assert_called_once_with(123, 456)
+
     @pytest.mark.asyncio
     async def test_track_event_photo_sent_via_service(self):
         """track_event photo_sent через analytics-service."""
@@ -138,6 +165,9 @@ class TestTrackEventWithAnalyticsService:
             adapter.use_analytics_service = True
             adapter.analytics_service_url = "http://analytics-service:8003"
             adapter.analytics_service_timeout = 10
+            adapter.http2 = False
+            adapter.max_connections = 20
+            adapter.keepalive_expiry = 30.0
             adapter.gateway_url = "http://api-gateway:8000"
             adapter.api_key = None
             adapter.timeout = 10
@@ -172,6 +202,9 @@ class TestTrackEventWithAnalyticsService:
             adapter.use_analytics_service = True
             adapter.analytics_service_url = "http://analytics-service:8003"
             adapter.analytics_service_timeout = 10
+            adapter.http2 = False
+            adapter.max_connections = 20
+            adapter.keepalive_expiry = 30.0
             adapter.gateway_url = "http://api-gateway:8000"
             adapter.api_key = None
             adapter.timeout = 10
@@ -189,6 +222,143 @@ class TestTrackEventWithAnalyticsService:
             )
 
 
+class TestPersistentClients:
+    """Тесты: долгоживущие клиенты микросервисов."""
+
+    @pytest.mark.asyncio
+    async def test_analytics_client_reused_between_events(self):
+        """AnalyticsClient создаётся один раз и закрывается в close()."""
+        mock_analytics_client = AsyncMock()
+        mock_analytics_client.events.record = AsyncMock()
+
+        with patch(
+            "analytics_client.AnalyticsClient", return_value=mock_analytics_client
+        ) as client_cls:
+            from services.gateway_adapter import GatewayAdapter
+            adapter = GatewayAdapter.__new__(GatewayAdapter)
+            adapter.use_gateway = False
+            adapter.use_analytics_service = True
+            adapter.analytics_service_url = "http://analytics-service:8003"
+            adapter.analytics_service_timeout = 10
+            adapter.http2 = False
+            adapter.max_connections = 20
+            adapter.keepalive_expiry = 30.0
+
+            await adapter.track_event(1, "article_request", {"nm_id": 1})
+            await adapter.track_event(2, "video_sent", {"nm_id": 2})
+
+            client_cls.assert_called_once()
+            mock_analytics_client.open.assert_awaited_once()
+            assert mock_analytics_client.events.record.await_count == 2
+
+            await adapter.close()
+
+            mock_analytics_client.close.assert_awaited_once()
+            assert adapter._analytics_client is None
+
+    @pytest.mark.asyncio
+    async def test_track_event_goes_to_batcher(self):
+        """При включённой пакетной отправке событие добавляется в EventBatcher."""
+        from services.gateway_adapter import GatewayAdapter
+        adapter = GatewayAdapter.__new__(GatewayAdapter)
+        adapter.use_analytics_service = True
+        adapter._event_batcher = MagicMock()
+
+        result = await adapter.track_event(123, "photo_sent", {"nm_id": 1, "count": 5})
+
+        assert result is True
+        adapter._event_batcher.add.assert_called_once_with(
+            telegram_id=123,
+            event_type="photo_sent",
+            event_data={"nm_id": 1, "count": 5},
+        )
+
+    @pytest.mark.asyncio
+    async def test_batch_outcome_drives_breaker(self):
+        """В пакетном режиме breaker учитывает результат пачки, а не постановку в очередь."""
+        from analytics_client import BatchEventError, BatchResult
+        from services.gateway_adapter import ANALYTICS_BREAKER, GatewayAdapter
+        from utils.circuit_breaker import STATE_OPEN, get_circuit_breaker
+
+        adapter = GatewayAdapter.__new__(GatewayAdapter)
+        adapter.use_analytics_service = True
+        adapter._event_batcher = MagicMock()
+        breaker = get_circuit_breaker(ANALYTICS_BREAKER)
+
+        down = BatchResult(errors=[BatchEventError(index=0, detail="timeout", retryable=True)])
+        for _ in range(breaker.failure_threshold - 1):
+            adapter._record_batch_result(down)
+            await adapter.track_event(1, "video_sent", {"nm_id": 1})
+        adapter._record_batch_result(down)
+
+        assert breaker.state == STATE_OPEN
+        assert breaker.stats.successes == 0
+
+    @pytest.mark.asyncio
+    async def test_rejected_batch_events_written_locally(self):
+        """События, отклонённые analytics-service в пакете, пишутся в локальную БД."""
+        from services.gateway_adapter import GatewayAdapter
+        mock_local_analytics = AsyncMock()
+        adapter = GatewayAdapter.__new__(GatewayAdapter)
+        adapter._analytics = mock_local_analytics
+
+        await adapter._track_events_local([
+            {"telegram_id": 1, "event_type": "video_sent", "event_data": {"nm_id": 7}},
+            {"telegram_id": 2, "event_type": "article_request"},
+        ])
+
+        mock_local_analytics.track_video_sent.assert_called_once_with(1, 7)
+        mock_local_analytics.track_article_request.assert_called_once_with(2, 0)
+
+    @pytest.mark.asyncio
+    async def test_service_error_goes_to_spool(self):
+        """При ошибке analytics-service событие пишется в журнал, а не в БД."""
+        from services.gateway_adapter import GatewayAdapter
+        mock_local_analytics = AsyncMock()
+        adapter = GatewayAdapter.__new__(GatewayAdapter)
+        adapter.use_analytics_service = True
+        adapter._analytics = mock_local_analytics
+        adapter._spool = MagicMock()
+        adapter.get_analytics_client = AsyncMock(side_effect=Exception("Connection refused"))
+
+        result = await adapter.track_event(123, "video_sent", {"nm_id": 7})
+
+        assert result is True
+        adapter._spool.append.assert_called_once_with(
+            {"telegram_id": 123, "event_type": "video_sent", "event_data": {"nm_id": 7}}
+        )
+        mock_local_analytics.track_video_sent.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_replay_events_splits_retry_and_rejected(self):
+        """Повтор из журнала: недоступность — оставить, отклонённые — в локальную БД."""
+        from analytics_client import BatchEventError, BatchResult
+        from services.gateway_adapter import GatewayAdapter
+
+        events = [
+            {"telegram_id": 1, "event_type": "article_request", "event_data": {"nm_id": 1}},
+            {"telegram_id": 2, "event_type": "article_request", "event_data": {"nm_id": 2}},
+            {"telegram_id": 3, "event_type": "article_request", "event_data": {"nm_id": 3}},
+        ]
+        mock_client = MagicMock()
+        mock_client.events.record_batch = AsyncMock(return_value=BatchResult(
+            accepted=1,
+            errors=[
+                BatchEventError(index=1, detail="bad"),
+                BatchEventError(index=2, detail="timeout", retryable=True),
+            ],
+        ))
+        mock_local_analytics = AsyncMock()
+        adapter = GatewayAdapter.__new__(GatewayAdapter)
+        adapter._analytics = mock_local_analytics
+        adapter.get_analytics_client = AsyncMock(return_value=mock_client)
+
+        retry = await adapter._replay_events(events)
+
+        assert retry == [events[2]]
+        mock_local_analytics.track_article_request.assert_called_once_with(2, 2)
+
+
 class TestDigestWithAnalyticsService:
     """Тесты: digest.py с USE_ANALYTICS_SERVICE."""
 
@@ -198,22 +368,20 @@ class TestDigestWithAnalyticsService:
         from datetime import date
 
         mock_stats_client = AsyncMock()
-        mock_stats_client.get_daily = AsyncMock(return_value=MagicMock(
+        mock_stats_client.get_digest = AsyncMock(return_value=MagicMock(
             date="2026-02-07",
             stats={"article_request": 10, "photo_sent": 5},
             total_events=15,
+            users_count=42,
+            funnel_started=42,
+            funnel_active=30,
+            funnel_returning=15,
         ))
-        mock_stats_client.get_users_count = AsyncMock(return_value=MagicMock(count=42))
-        mock_stats_client.get_users_by_event = AsyncMock(side_effect=[
-            MagicMock(count=42),   # funnel_started (user.started)
-            MagicMock(count=30),   # funnel_active (article_request)
-            MagicMock(count=15),   # funnel_returning (article_request, min_count=2)
-        ])
 
         mock_analytics_client = AsyncMock()
         mock_analytics_client.stats = mock_stats_client
-        mock_analytics_client.__aenter__ = AsyncMock(return_value=mock_analytics_client)
-        mock_analytics_client.__aexit__ = AsyncMock(return_value=None)
+        mock_gateway = MagicMock()
+        mock_gateway.get_analytics_client = AsyncMock(return_value=mock_analytics_client)
 
         mock_settings = MagicMock()
         mock_settings.USE_ANALYTICS_SERVICE = True
@@ -226,15 +394,18 @@ class TestDigestWithAnalyticsService:
         mock_send = AsyncMock(return_value=True)
 
         with patch("services.digest.get_settings", return_value=mock_settings), \
-             patch("analytics_client.AnalyticsClient", return_value=mock_analytics_client), \
+             patch("services.digest.get_gateway_adapter", return_value=mock_gateway), \
              patch("services.digest.send_daily_digest", mock_send):
 
             from services.digest import send_daily_digest_job
             result = await send_daily_digest_job(mock_bot, target_date=date(2026, 2, 7))
 
             assert result is True
-            mock_stats_client.get_daily.assert_called_once_with("2026-02-07")
-            mock_stats_client.get_users_count.assert_called_once()
+            mock_stats_client.get_digest.assert_called_once_with(
+                "2026-02-07",
+                started_event="user_start",
+                active_event="article_request",
+            )
             # Проверяем что stats конвертирован в dict
             call_args = mock_send.call_args
             stats_dict = call_args[0][1]
@@ -252,15 +423,15 @@ class TestDigestWithAnalyticsService:
         from datetime import date
 
         mock_stats_client = AsyncMock()
-        mock_stats_client.get_daily = AsyncMock(side_effect=Exception("Service down"))
+        mock_stats_client.get_digest = AsyncMock(side_effect=Exception("Service down"))
 
         mock_analytics_client = AsyncMock()
         mock_analytics_client.stats = mock_stats_client
-        mock_analytics_client.__aenter__ = AsyncMock(return_value=mock_analytics_client)
-        mock_analytics_client.__aexit__ = AsyncMock(return_value=None)
+        mock_gateway = MagicMock()
+        mock_gateway.get_analytics_client = AsyncMock(return_value=mock_analytics_client)
 
         mock_local_analytics = AsyncMock()
-        mock_local_analytics.get_daily_stats = AsyncMock(return_value={
+        mock_local_analytics.refresh_daily_rollup = AsyncMock(return_value={
             "new_users": 3, "total_users": 10, "article_requests": 5,
         })
 
@@ -274,7 +445,7 @@ class TestDigestWithAnalyticsService:
         mock_bot = AsyncMock()
 
         with patch("services.digest.get_settings", return_value=mock_settings), \
-             patch("analytics_client.AnalyticsClient", return_value=mock_analytics_client), \
+             patch("services.digest.get_gateway_adapter", return_value=mock_gateway), \
              patch("services.digest.AnalyticsService", return_value=mock_local_analytics), \
              patch("services.digest.send_daily_digest", new_callable=AsyncMock, return_value=True):
 
@@ -282,7 +453,7 @@ class TestDigestWithAnalyticsService:
             result = await send_daily_digest_job(mock_bot, target_date=date(2026, 2, 7))
 
             assert result is True
-            mock_local_analytics.get_daily_stats.assert_called_once()
+            mock_local_analytics.refresh_daily_rollup.assert_called_once()
 
     @pytest.mark.asyncio
     async def test_digest_local_when_flag_disabled(self):
@@ -290,7 +461,7 @@ class TestDigestWithAnalyticsService:
         from datetime import date
 
         mock_local_analytics = AsyncMock()
-        mock_local_analytics.get_daily_stats = AsyncMock(return_value={
+        mock_local_analytics.refresh_daily_rollup = AsyncMock(return_value={
             "new_users": 3, "total_users": 10, "article_requests": 5,
         })
 
@@ -309,4 +480,4 @@ class TestDigestWithAnalyticsService:
             result = await send_daily_digest_job(mock_bot, target_date=date(2026, 2, 7))
 
             assert result is True
-            mock_local_analytics.get_daily_stats.assert_called_once()
\ No newline at end of file
+            mock_local_analytics.refresh_daily_rollup.assert_called_once()
\ No newline at end of file
@@ -0,0 +1,145 @@
+"""Тесты для utils/hedging.py и hedged-запросов WbMediaClient."""
+
+import asyncio
+import pytest
+
+from services.wb_parser import ProductMedia
+from utils.circuit_breaker import STATE_CLOSED, get_circuit_breaker
+from utils.hedging import LatencyHedge
+
+
+class TestLatencyHedge:
+    """Тесты порога и метрик."""
+
+    def test_default_delay_until_enough_samples(self):
+        """Тест: пока замеров мало, порог — default_delay."""
+        hedge = LatencyHedge(min_samples=5, default_delay=3.0)
+        for _ in range(4):
+            hedge.record(0.1)
+
+        assert hedge.delay() == 3.0
+
+    def test_delay_is_percentile(self):
+        """Тест: порог — перцентиль латентности, не ниже min_delay."""
+        hedge = LatencyHedge(percentile=0.9, min_samples=10, min_delay=0.05)
+        for n in range(1, 11):
+            hedge.record(n / 10)
+
+        assert hedge.delay() == 1.0
+
+        fast = LatencyHedge(min_samples=1, min_delay=0.2)
+        fast.record(0.01)
+        assert fast.delay() == 0.2
+
+    def test_window_drops_old_samples(self):
+        """Тест: учитываются только последние window замеров."""
+        hedge = LatencyHedge(percentile=0.5, window=3, min_samples=3, min_delay=0)
+        for latency in (10.0, 10.0, 10.0, 1.0, 1.0, 1.0):
+            hedge.record(latency)
+
+        assert hedge.delay() == 1.0
+
+    def test_snapshot_ratios(self):
+        """Тест: доля хеджированных запросов и побед запасного пути."""
+        hedge = LatencyHedge()
+        hedge.stats.requests = 10
+        hedge.stats.hedged = 4
+        hedge.stats.backup_wins = 3
+        hedge.stats.primary_wins = 1
+
+        snapshot = hedge.snapshot()
+
+        assert snapshot["hedge_rate"] == 0.4
+        assert snapshot["backup_win_ratio"] == 0.75
+
+
+def _media(source: str) -> ProductMedia:
+    return ProductMedia(nm_id="12345678", name=source, photos=[], video=None)
+
+
+def _client(service_delay: float, parser_delay: float, service_error=None):
+    from services.wb_media_client import WbMediaClient
+
+    client = WbMediaClient.__new__(WbMediaClient)
+    client.use_service = True
+    client.service_url = "http://wb-media-service:8013"
+    client.timeout = 40
+    client._hedge = LatencyHedge(default_delay=0.05, min_delay=0.01)
+    client.cancelled = []
+
+    async def via_service(nm_id, skip_video, skip_photos):
+        try:
+            await asyncio.sleep(service_delay)
+        except asyncio.CancelledError:
+            client.cancelled.append("service")
+            raise
+        if service_error is not None:
+            raise service_error
+        return _media("service")
+
+    async def via_parser(nm_id, skip_video, skip_photos):
+        try:
+            await asyncio.sleep(parser_delay)
+        except asyncio.CancelledError:
+            client.cancelled.append("parser")
+            raise
+        return _media("parser")
+
+    client._get_via_service = via_service
+    client._get_via_parser = via_parser
+    return client
+
+
+class TestWbMediaClientHedging:
+    """Тесты: параллельный WBParser при медленном сервисе."""
+
+    @pytest.mark.asyncio
+    async def test_fast_service_no_hedge(self):
+        """Тест: сервис ответил до порога — WBParser не запускается."""
+        client = _client(service_delay=0, parser_delay=0)
+
+        media = await client.get_product_media("12345678")
+
+        assert media.name == "service"
+        assert client._hedge.stats.hedged == 0
+        assert client._hedge.stats.requests == 1
+
+    @pytest.mark.asyncio
+    async def test_slow_service_parser_wins(self):
+        """Тест: сервис медленнее порога — побеждает WBParser, сервис отменяется."""
+        client = _client(service_delay=1.0, parser_delay=0)
+
+        media = await client.get_product_media("12345678")
+
+        assert media.name == "parser"
+        assert client.cancelled == ["service"]
+        assert client._hedge.snapshot()["backup_win_ratio"] == 1.0
+        # Отменённый запрос учтён в окне латентности (не меньше порога)
+        assert len(client._hedge._samples) == 1
+        assert client._hedge._samples[0] >= 0.05
+        # Отменённый запрос не считается отказом сервиса
+        assert get_circuit_breaker("wb-media-service").stats.failures == 0
+
+    @pytest.mark.asyncio
+    async def test_slow_service_still_wins(self):
+        """Тест: сервис ответил раньше WBParser после hedge — WBParser отменяется."""
+        client = _client(service_delay=0.1, parser_delay=1.0)
+
+        media = await client.get_product_media("12345678")
+
+        assert media.name == "service"
+        assert client.cancelled == ["parser"]
+        assert client._hedge.stats.primary_wins == 1
+
+    @pytest.mark.asyncio
+    async def test_service_error_falls_back_to_parser(self):
+        """Тест: ошибка сервиса до порога — обычный fallback на WBParser."""
+        client = _client(service_delay=0, parser_delay=0, service_error=Exception("boom"))
+
+        media = await client.get_product_media("12345678")
+
+        assert media.name == "parser"
+        assert client._hedge.stats.hedged == 0
+        breaker = get_circuit_breaker("wb-media-service")
+        assert breaker.stats.failures == 1
+        assert breaker.state == STATE_CLOSED
@@ -0,0 +1,217 @@
+"""Тесты для services/media_cache_l2.py"""
+
+import json
+import time
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from services.media_cache_l2 import (
+    L2Cache,
+    PostgresCacheStore,
+    SqliteCacheStore,
+    close_media_cache_l2,
+)
+from services.video_cache import VideoCache
+from services.wb_parser import WBParser
+
+
+@pytest.fixture
+def store(tmp_path):
+    return SqliteCacheStore(str(tmp_path / "cache.sqlite3"))
+
+
+class TestSqliteCacheStore:
+    """Тесты локального хранилища L2."""
+
+    @pytest.mark.asyncio
+    async def test_put_get_and_expiry(self, store):
+        """Тест: запись, чтение и пропуск истекших записей."""
+        now = time.time()
+        await store.put_many([
+            ("video", "1", "https://example.com/1.m3u8", now + 60),
+            ("video", "2", None, now + 60),
+            ("video", "3", "https://example.com/3.m3u8", now - 1),
+        ])
+
+        assert await store.get("video", "1") == ("https://example.com/1.m3u8", now + 60)
+        assert await store.get("video", "2") == (None, now + 60)
+        assert await store.get("video", "3") is None
+        assert await store.delete_expired() == 1
+        await store.close()
+
+    @pytest.mark.asyncio
+    async def test_survives_reopen(self, tmp_path):
+        """Тест: записи переживают рестарт (новое соединение к файлу)."""
+        path = str(tmp_path / "cache.sqlite3")
+        first = SqliteCacheStore(path)
+        await first.put_many([("basket", "1234", 15, time.time() + 60)])
+        await first.close()
+
+        second = SqliteCacheStore(path)
+        rows = await second.load("basket", limit=10)
+        await second.close()
+
+        assert [(key, value) for key, value, _ in rows] == [("1234", 15)]
+
+
+class TestL2Cache:
+    """Тесты write-behind / read-through."""
+
+    @pytest.mark.asyncio
+    async def test_write_behind_coalesces(self, store):
+        """Тест: записи копятся и сбрасываются пачкой, повтор ключа заменяет значение."""
+        l2 = L2Cache(store, flush_interval=60)
+        l2.put("video", "1", "old", ttl=60)
+        l2.put("video", "1", "new", ttl=60)
+        l2.put("video", "2", None, ttl=60)
+
+        # До сброса запись уже читается из очереди
+        assert (await l2.get("video", "1"))[0] == "new"
+        assert await store.get("video", "1") is None
+
+        await l2.flush()
+
+        assert (await store.get("video", "1"))[0] == "new"
+        assert l2.snapshot()["writes"] == 2
+        await l2.close()
+
+    @pytest.mark.asyncio
+    async def test_store_errors_are_not_raised(self):
+        """Тест: недоступность хранилища не ломает кеш."""
+        broken = MagicMock()
+        broken.get = AsyncMock(side_effect=Exception("db down"))
+        broken.put_many = AsyncMock(side_effect=Exception("db down"))
+        broken.load = AsyncMock(side_effect=Exception("db down"))
+        l2 = L2Cache(broken)
+
+        assert await l2.get("video", "1") is None
+        assert await l2.load("video", 10) == []
+        l2.put("video", "1", "url", ttl=60)
+        await l2.flush()
+
+        assert l2.snapshot()["errors"] == 3
+
+
+class TestL2Integration:
+    """Тесты прогрева и дочитывания in-memory кешей."""
+
+    @pytest.mark.asyncio
+    async def test_video_cache_warm_start(self, tmp_path):
+        """Тест: новый процесс получает видео предыдущего из L2."""
+        path = str(tmp_path / "cache.sqlite3")
+        l2 = L2Cache(SqliteCacheStore(path))
+        cache = VideoCache()
+        await cache.attach_l2(l2)
+        cache.set("1", "https://example.com/1.m3u8")
+        cache.set("2", None)
+        await l2.close()
+
+        restarted_l2 = L2Cache(SqliteCacheStore(path))
+        restarted = VideoCache()
+        assert await restarted.attach_l2(restarted_l2) == 2
+
+        assert restarted.get("1") == (True, "https://example.com/1.m3u8")
+        assert restarted.get("2") == (True, None)
+        await restarted_l2.close()
+
+    @pytest.mark.asyncio
+    async def test_video_cache_read_through(self, store):
+        """Тест: промах L1 дочитывается из L2 (запись другой реплики)."""
+        await store.put_many([("video", "7", "https://example.com/7.m3u8", time.time() + 60)])
+        l2 = L2Cache(store)
+        cache = VideoCache()
+        cache._l2 = l2
+
+        assert await cache.fetch("7") == (True, "https://example.com/7.m3u8")
+        assert cache.get("7") == (True, "https://example.com/7.m3u8")
+        assert cache.snapshot()["l2_hits"] == 1
+        assert cache.snapshot()["misses"] == 0
+        assert await cache.fetch("8") == (False, None)
+        assert cache.snapshot()["misses"] == 1
+        await l2.close()
+
+    @pytest.mark.asyncio
+    async def test_find_video_uses_l2(self, store):
+        """Тест: поиск видео для карточки берёт ответ из L2, включая «видео нет»."""
+        await store.put_many([
+            ("video", "7", "https://example.com/7.m3u8", time.time() + 60),
+            ("video", "8", None, time.time() + 60),
+        ])
+        l2 = L2Cache(store)
+        cache = VideoCache()
+        cache._l2 = l2
+        parser = WBParser.__new__(WBParser)
+        parser._check_video = AsyncMock(return_value="https://example.com/9.m3u8")
+
+        with patch("services.video_cache._video_cache", cache):
+            assert await parser.find_video("7") == "https://example.com/7.m3u8"
+            assert await parser.find_video("8") is None
+            parser._check_video.assert_not_called()
+
+            assert await parser.find_video("9") == "https://example.com/9.m3u8"
+
+        parser._check_video.assert_called_once_with("9", None)
+        assert cache.get("9") == (True, "https://example.com/9.m3u8")
+        await l2.close()
+
+    @pytest.mark.asyncio
+    async def test_basket_cache_warm_start(self, store, monkeypatch):
+        """Тест: WBParser получает vol → basket из снимка L2."""
+        monkeypatch.setattr(WBParser, "_basket_cache", {})
+        monkeypatch.setattr(WBParser, "_l2", None)
+        await store.put_many([("basket", "1234", 15, time.time() + 60)])
+        l2 = L2Cache(store)
+
+        await WBParser.attach_l2(l2)
+
+        assert WBParser._basket_cache == {1234: 15}
+        await l2.close()
+
+    @pytest.mark.asyncio
+    async def test_close_detaches_caches(self, store, monkeypatch):
+        """Тест: после закрытия L2 кеши видео и basket к нему не обращаются."""
+        monkeypatch.setattr(WBParser, "_l2", None)
+        cache = VideoCache()
+        l2 = L2Cache(store)
+        await cache.attach_l2(l2)
+        await WBParser.attach_l2(l2)
+
+        with patch("services.media_cache_l2._media_cache_l2", l2), \
+             patch("services.video_cache._video_cache", cache):
+            await close_media_cache_l2()
+
+        assert cache._l2 is None
+        assert WBParser._l2 is None
+        cache.set("1", "https://example.com/1.m3u8")
+        assert l2._pending == {}
+
+
+class TestPostgresCacheStore:
+    """Тесты хранилища L2 в PostgreSQL."""
+
+    @pytest.mark.asyncio
+    async def test_put_many_upsert(self):
+        """Тест: пачка записей пишется одним executemany с JSON значениями."""
+        pool, conn = MagicMock(), MagicMock()
+        conn.__aenter__ = AsyncMock(return_value=conn)
+        conn.__aexit__ = AsyncMock(return_value=False)
+        conn.executemany = AsyncMock()
+        pool.acquire = MagicMock(return_value=conn)
+
+        with patch("services.media_cache_l2.get_pool", AsyncMock(return_value=pool)):
+            await PostgresCacheStore().put_many([
+                ("video", "1", None, 100.0),
+                ("basket", "1234", 15, 200.0),
+            ])
+
+        sql, rows = conn.executemany.call_args.args
+        assert "ON CONFLICT (namespace, key)" in sql
+        assert rows == [("video", "1", json.dumps(None), 100.0), ("basket", "1234", "15", 200.0)]
+
+    @pytest.mark.asyncio
+    async def test_no_pool(self):
+        """Тест: без БД L2 пуст (graceful degradation)."""
+        with patch("services.media_cache_l2.get_pool", AsyncMock(return_value=None)):
+            store = PostgresCacheStore()
+            assert await store.get("video", "1") is None
+            assert await store.load("video", 10) == []
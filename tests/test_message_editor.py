@@ -0,0 +1,152 @@
+"""Тесты для services/message_editor.py"""
+
+import asyncio
+import time
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from aiogram.exceptions import TelegramBadRequest
+
+from services.message_editor import MessageEditCoalescer
+
+
+@pytest.fixture
+def status_msg():
+    """Mock сообщения о прогрессе."""
+    msg = MagicMock()
+    msg.chat.id = 123456789
+    msg.message_id = 42
+    msg.edit_text = AsyncMock()
+    msg.delete = AsyncMock()
+    return msg
+
+
+class TestMessageEditCoalescer:
+    """Тесты коалесцирования правок."""
+
+    @pytest.mark.asyncio
+    async def test_first_edit_is_immediate(self, status_msg):
+        """Тест: первая правка применяется сразу."""
+        editor = MessageEditCoalescer(min_interval=10)
+
+        await editor.request(status_msg, "10%")
+
+        status_msg.edit_text.assert_called_once_with(text="10%")
+
+    @pytest.mark.asyncio
+    async def test_noop_edit_skipped(self, status_msg):
+        """Тест: правка с тем же текстом не отправляется."""
+        editor = MessageEditCoalescer(min_interval=0)
+
+        await editor.request(status_msg, "10%")
+        await editor.request(status_msg, "10%")
+
+        assert status_msg.edit_text.call_count == 1
+        assert editor.skipped == 1
+
+    @pytest.mark.asyncio
+    async def test_only_latest_pending_text_is_sent(self, status_msg):
+        """Тест: в интервале отправляется только последний текст."""
+        editor = MessageEditCoalescer(min_interval=0.05)
+
+        await editor.request(status_msg, "10%")
+        await editor.request(status_msg, "20%")
+        await editor.request(status_msg, "30%")
+        await asyncio.sleep(0.1)
+
+        texts = [c.kwargs["text"] for c in status_msg.edit_text.call_args_list]
+        assert texts == ["10%", "30%"]
+        assert editor.coalesced == 1
+
+    @pytest.mark.asyncio
+    async def test_delete_drops_pending(self, status_msg):
+        """Тест: удаление сообщения отменяет отложенную правку."""
+        editor = MessageEditCoalescer(min_interval=0.05)
+
+        await editor.request(status_msg, "10%")
+        await editor.request(status_msg, "20%")
+        await editor.delete(status_msg)
+        await asyncio.sleep(0.1)
+
+        assert status_msg.edit_text.call_count == 1
+        assert status_msg.delete.called
+        assert editor.pending_count() == 0
+
+    @pytest.mark.asyncio
+    async def test_edit_now_replaces_pending(self, status_msg):
+        """Тест: edit_now применяется сразу и отменяет отложенную правку."""
+        editor = MessageEditCoalescer(min_interval=0.05)
+
+        await editor.request(status_msg, "10%")
+        await editor.request(status_msg, "20%")
+        await editor.edit_now(status_msg, "Готово")
+        await asyncio.sleep(0.1)
+
+        texts = [c.kwargs["text"] for c in status_msg.edit_text.call_args_list]
+        assert texts == ["10%", "Готово"]
+
+    @pytest.mark.asyncio
+    async def test_message_gone_forgets_state(self, status_msg):
+        """Тест: 'message to edit not found' — состояние сообщения сбрасывается."""
+        editor = MessageEditCoalescer(min_interval=0)
+        status_msg.edit_text.side_effect = TelegramBadRequest(
+            MagicMock(), "Bad Request: message to edit not found"
+        )
+
+        await editor.request(status_msg, "10%")
+
+        assert editor._states == {}
+
+    def test_idle_states_evicted_from_head(self):
+        """Тест: при лимите давно не менявшиеся состояния снимаются с головы."""
+        editor = MessageEditCoalescer(min_interval=0)
+        editor.MAX_STATES = 3
+        editor._state("a")
+        editor._state("b").last_sent = time.monotonic()
+        editor._state("c")
+
+        editor._state("d")
+
+        assert list(editor._states) == ["b", "c", "d"]
+
+    def test_state_limit_is_strict(self):
+        """Тест: активные состояния не позволяют превысить MAX_STATES."""
+        editor = MessageEditCoalescer(min_interval=0)
+        editor.MAX_STATES = 3
+        for key in "abc":
+            state = editor._state(key)
+            state.last_sent = time.monotonic()
+            state.pending = ("1%", {})
+
+        editor._state("d")
+
+        assert list(editor._states) == ["b", "c", "d"]
+
+    @pytest.mark.asyncio
+    async def test_edits_of_one_message_serialized(self, status_msg):
+        """Тест: новая правка ждёт ответа на предыдущую правку того же сообщения."""
+        editor = MessageEditCoalescer(min_interval=0)
+        release = asyncio.Event()
+        active = 0
+        max_active = 0
+
+        async def slow_edit(text, **kwargs):
+            nonlocal active, max_active
+            active += 1
+            max_active = max(max_active, active)
+            await release.wait()
+            active -= 1
+
+        status_msg.edit_text = AsyncMock(side_effect=slow_edit)
+
+        first = asyncio.create_task(editor.edit_now(status_msg, "50%"))
+        second = asyncio.create_task(editor.edit_now(status_msg, "готово"))
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        assert status_msg.edit_text.call_count == 1
+
+        release.set()
+        assert await first and await second
+
+        assert max_active == 1
+        texts = [call.kwargs["text"] for call in status_msg.edit_text.call_args_list]
+        assert texts == ["50%", "готово"]
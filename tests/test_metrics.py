@@ -0,0 +1,170 @@
+"""Тесты для utils/metrics.py и метрик сервисов."""
+
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from aiohttp import web
+from aiohttp.test_utils import TestClient, TestServer
+
+from services.telegram_scheduler import _REQUEST_SECONDS, TelegramRequestScheduler
+from services.video_cache import VideoCache
+from utils.metrics import (
+    CONTENT_TYPE,
+    MetricsRegistry,
+    metrics_handler,
+    render_metrics,
+)
+
+
+class TestMetricsRegistry:
+    """Тесты реестра и формата экспорта."""
+
+    def test_counter_with_labels(self):
+        """Тест: счётчик с метками и экранирование значений."""
+        registry = MetricsRegistry()
+        requests = registry.counter("requests_total", "Запросы", ("method",))
+        requests.inc(method="sendVideo")
+        requests.inc(2, method="sendVideo")
+        requests.inc(method='a"b')
+
+        assert requests.value(method="sendVideo") == 3
+        text = registry.render()
+        assert "# TYPE requests_total counter" in text
+        assert 'requests_total{method="sendVideo"} 3' in text
+        assert 'requests_total{method="a\\"b"} 1' in text
+
+    def test_labels_must_match(self):
+        """Тест: набор меток должен совпадать с объявленным."""
+        registry = MetricsRegistry()
+        requests = registry.counter("requests_total", "Запросы", ("method",))
+
+        with pytest.raises(ValueError):
+            requests.inc()
+        with pytest.raises(ValueError):
+            requests.inc(method="x", lane="user")
+
+    def test_redeclare_returns_same_metric(self):
+        """Тест: повторное объявление возвращает ту же метрику, другой тип — ошибка."""
+        registry = MetricsRegistry()
+        first = registry.histogram("search_seconds", "Поиск")
+
+        assert registry.histogram("search_seconds", "Поиск") is first
+        with pytest.raises(ValueError):
+            registry.counter("search_seconds", "Поиск")
+
+    def test_histogram_buckets_cumulative(self):
+        """Тест: корзины гистограммы кумулятивные, есть +Inf, сумма и количество."""
+        registry = MetricsRegistry()
+        search = registry.histogram("search_seconds", "Поиск", ("outcome",), buckets=(1, 5))
+        for value in (0.5, 1, 3, 10):
+            search.observe(value, outcome="found")
+
+        assert search.count(outcome="found") == 4
+        text = registry.render()
+        assert 'search_seconds_bucket{outcome="found",le="1"} 2' in text
+        assert 'search_seconds_bucket{outcome="found",le="5"} 3' in text
+        assert 'search_seconds_bucket{outcome="found",le="+Inf"} 4' in text
+        assert 'search_seconds_sum{outcome="found"} 14.5' in text
+        assert 'search_seconds_count{outcome="found"} 4' in text
+
+    def test_histogram_time(self):
+        """Тест: time() учитывает блок, в том числе завершённый ошибкой."""
+        registry = MetricsRegistry()
+        search = registry.histogram("search_seconds", "Поиск")
+
+        with search.time():
+            pass
+        with pytest.raises(RuntimeError):
+            with search.time():
+                raise RuntimeError("boom")
+
+        assert search.count() == 2
+
+    def test_gauge_function(self):
+        """Тест: значение gauge читается функцией при экспорте."""
+        registry = MetricsRegistry()
+        queue = {"user": 3, "background": 0}
+        registry.gauge("queue_depth", "Очередь", ("lane",)).set_function(
+            lambda: {(lane,): depth for lane, depth in queue.items()}
+        )
+        registry.gauge("pool_size", "Пул").set_function(lambda: 7)
+
+        text = registry.render()
+        assert 'queue_depth{lane="user"} 3' in text
+        assert 'queue_depth{lane="background"} 0' in text
+        assert "pool_size 7" in text
+
+        queue["user"] = 1
+        assert 'queue_depth{lane="user"} 1' in registry.render()
+
+    def test_failing_function_skipped(self):
+        """Тест: ошибка функции метрики не ломает экспорт остальных."""
+        registry = MetricsRegistry()
+        registry.gauge("broken", "Сломана").set_function(lambda: 1 / 0)
+        registry.gauge("ok", "Работает").set_function(lambda: 1)
+
+        text = registry.render()
+        assert "# TYPE broken gauge" in text
+        assert "ok 1" in text
+
+
+class TestMetricsEndpoint:
+    """Тесты HTTP экспорта."""
+
+    @pytest.mark.asyncio
+    async def test_metrics_handler(self):
+        """Тест: GET /metrics отдаёт реестр процесса в формате Prometheus."""
+        app = web.Application()
+        app.router.add_get("/metrics", metrics_handler)
+
+        async with TestClient(TestServer(app)) as client:
+            response = await client.get("/metrics")
+            assert response.status == 200
+            assert response.headers["Content-Type"] == CONTENT_TYPE
+            text = await response.text()
+
+        assert "# TYPE telegram_request_seconds histogram" in text
+        assert "# TYPE db_pool_connections gauge" in text
+
+
+class TestServiceMetrics:
+    """Тесты метрик сервисов."""
+
+    @pytest.mark.asyncio
+    async def test_telegram_request_time_per_method(self):
+        """Тест: время запроса к Bot API учитывается по методу."""
+        scheduler = TelegramRequestScheduler(rate=100)
+        method = MagicMock()
+        method.__api_method__ = "sendVideo"
+        method.chat_id = 1
+        before = _REQUEST_SECONDS.count(method="sendVideo")
+
+        await scheduler(AsyncMock(return_value="ok"), MagicMock(), method)
+
+        assert _REQUEST_SECONDS.count(method="sendVideo") == before + 1
+
+    def test_db_pool_connections(self):
+        """Тест: соединения пула делятся на занятые и свободные."""
+        pool = MagicMock()
+        pool.get_size.return_value = 5
+        pool.get_idle_size.return_value = 2
+
+        with patch("db.connection._pool", pool):
+            text = render_metrics()
+
+        assert 'db_pool_connections{state="busy"} 3' in text
+        assert 'db_pool_connections{state="idle"} 2' in text
+
+    def test_video_cache_lookups(self):
+        """Тест: обращения к кешу видео экспортируются по результату."""
+        cache = VideoCache()
+        cache.set("1", "https://video")
+        cache.get("1")
+        cache.get("2")
+
+        with patch("services.video_cache._video_cache", cache):
+            text = render_metrics()
+
+        assert 'video_cache_lookups_total{result="hit"} 1' in text
+        assert 'video_cache_lookups_total{result="miss"} 1' in text
+        assert 'video_cache_size{unit="entries"} 1' in text
@@ -0,0 +1,89 @@
+"""Тесты для services/photo_delivery.py"""
+
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.types import BufferedInputFile
+
+from services.photo_delivery import (
+    PhotoDelivery,
+    PhotoDeliveryStats,
+    STRATEGY_URL,
+    STRATEGY_PREFETCH,
+    _ByteBudget,
+)
+from utils.exceptions import WBAPIError
+
+
+URLS = [
+    "https://basket-01.wbbasket.ru/vol123/part12345/12345678/images/big/1.webp",
+    "https://basket-01.wbbasket.ru/vol123/part12345/12345678/images/big/2.webp",
+]
+
+
+class TestPhotoDelivery:
+    """Тесты выбора стратегии доставки."""
+
+    @pytest.mark.asyncio
+    async def test_url_passthrough_success(self, bot):
+        """Тест: Telegram принял URL — prefetch не выполняется."""
+        stats = PhotoDeliveryStats()
+        delivery = PhotoDelivery(bot, stats=stats)
+
+        with patch.object(delivery, "prefetch", AsyncMock()) as mock_prefetch:
+            strategy = await delivery.send_group(123, URLS)
+
+        assert strategy == STRATEGY_URL
+        assert not mock_prefetch.called
+        media = bot.send_media_group.call_args[1]["media"]
+        assert [m.media for m in media] == URLS
+        assert stats.snapshot()[STRATEGY_URL]["successes"] == 1
+
+    @pytest.mark.asyncio
+    async def test_fallback_to_prefetch_on_rejection(self, bot):
+        """Тест: отказ Telegram по URL → отправка скачанных файлов."""
+        stats = PhotoDeliveryStats()
+        delivery = PhotoDelivery(bot, stats=stats)
+        bot.send_media_group.side_effect = [
+            TelegramBadRequest(MagicMock(), "failed to get HTTP URL content"),
+            None,
+        ]
+
+        with patch.object(delivery, "prefetch", AsyncMock(return_value=[b"a", b"bb"])):
+            strategy = await delivery.send_group(123, URLS)
+
+        assert strategy == STRATEGY_PREFETCH
+        assert bot.send_media_group.call_count == 2
+        media = bot.send_media_group.call_args[1]["media"]
+        assert all(isinstance(m.media, BufferedInputFile) for m in media)
+
+        snapshot = stats.snapshot()
+        assert snapshot[STRATEGY_URL]["failures"] == 1
+        assert snapshot[STRATEGY_PREFETCH]["successes"] == 1
+        assert snapshot[STRATEGY_PREFETCH]["bytes_fetched"] == 3
+
+    @pytest.mark.asyncio
+    async def test_url_disabled_after_failures(self, bot):
+        """Тест: после серии отказов URL passthrough пропускается."""
+        stats = PhotoDeliveryStats(failure_threshold=2, cooldown_seconds=60)
+        stats.record(STRATEGY_URL, False, 0.1)
+        stats.record(STRATEGY_URL, False, 0.1)
+        assert stats.url_allowed() is False
+
+        delivery = PhotoDelivery(bot, stats=stats)
+        with patch.object(delivery, "prefetch", AsyncMock(return_value=[b"a", b"b"])):
+            strategy = await delivery.send_group(123, URLS)
+
+        assert strategy == STRATEGY_PREFETCH
+        assert bot.send_media_group.call_count == 1
+
+
+class TestByteBudget:
+    """Тесты лимита байт prefetch."""
+
+    def test_budget_exceeded(self):
+        """Тест: превышение лимита байт → WBAPIError."""
+        budget = _ByteBudget(limit=10)
+        budget.consume(6)
+        with pytest.raises(WBAPIError, match="лимит"):
+            budget.consume(5)
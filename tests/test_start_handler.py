@@ -1,10 +1,13 @@
 """Тесты для bot/handlers/start.py"""
 
+import asyncio
 import pytest
-from unittest.mock import AsyncMock, MagicMock
+from unittest.mock import AsyncMock, MagicMock, patch
 from aiogram.types import Message
 
+from bot.handlers import start
 from bot.handlers.start import cmd_start, cmd_help
+from services.gateway_adapter import UserRegistrationResult
 
 
 class TestStartHandler:
@@ -30,6 +33,48 @@ class TestStartHandler:
         assert "артикул" in second_call_args
         assert "скачать" in second_call_args or "Чтобы скачать" in second_call_args
 
+    @pytest.mark.asyncio
+    async def test_cmd_start_replies_before_registration(self, message):
+        """Тест: ответ на /start не ждёт регистрацию, уведомление уходит в фоне."""
+        registered = asyncio.Event()
+
+        async def slow_register(**kwargs):
+            await registered.wait()
+            return UserRegistrationResult(
+                telegram_id=kwargs["user_id"], username="testuser", is_new=True
+            )
+
+        gateway = MagicMock()
+        gateway.register_user = AsyncMock(side_effect=slow_register)
+
+        with patch("bot.handlers.start.get_gateway_adapter", return_value=gateway), \
+             patch("bot.handlers.start.send_new_user_notification") as mock_notify:
+            await cmd_start(message)
+
+            # Приветствие отправлено, регистрация ещё не завершена
+            assert message.answer.call_count == 2
+            assert not mock_notify.called
+
+            registered.set()
+            await asyncio.gather(*start._background_tasks)
+
+        mock_notify.assert_called_once()
+        assert mock_notify.call_args.kwargs["user_id"] == message.from_user.id
+
+    @pytest.mark.asyncio
+    async def test_registration_error_is_logged(self, message):
+        """Тест: ошибка регистрации в фоне не роняет обработчик."""
+        gateway = MagicMock()
+        gateway.register_user = AsyncMock(side_effect=Exception("DB down"))
+
+        with patch("bot.handlers.start.get_gateway_adapter", return_value=gateway), \
+             patch("bot.handlers.start.send_new_user_notification") as mock_notify:
+            await cmd_start(message)
+            await asyncio.gather(*start._background_tasks)
+
+        assert message.answer.call_count == 2
+        assert not mock_notify.called
+
     @pytest.mark.asyncio
     async def test_cmd_help(self, message):
         """Тест: команда /help отправляет справку."""
@@ -0,0 +1,171 @@
+"""Тесты для utils/token_bucket.py и services/telegram_limiter.py"""
+
+import time
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from aiogram.exceptions import TelegramBadRequest, TelegramRetryAfter
+
+from utils.token_bucket import TokenBucket
+from services.telegram_limiter import TelegramRateLimiter
+from config.settings import get_settings
+from services.photo_delivery import (
+    STRATEGY_PREFETCH,
+    STRATEGY_URL,
+    PhotoDelivery,
+    PhotoDeliveryStats,
+    PreparedGroup,
+)
+
+
+class FakeClock:
+    """Управляемые часы для детерминированных тестов."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestTokenBucket:
+    """Тесты token bucket."""
+
+    def test_burst_then_refill(self):
+        """Тест: burst расходуется сразу, затем токены пополняются по rate."""
+        clock = FakeClock()
+        bucket = TokenBucket(rate=1.0, capacity=2, clock=clock)
+
+        assert bucket.try_consume() is True
+        assert bucket.try_consume() is True
+        assert bucket.try_consume() is False
+        assert bucket.time_until() == pytest.approx(1.0)
+
+        clock.now += 1.0
+        assert bucket.try_consume() is True
+
+    def test_drain_pauses_refill(self):
+        """Тест: drain (flood wait) обнуляет ведро и откладывает пополнение."""
+        clock = FakeClock()
+        bucket = TokenBucket(rate=1.0, capacity=3, clock=clock)
+
+        bucket.drain(5.0)
+        assert bucket.try_consume() is False
+        assert bucket.time_until() == pytest.approx(6.0)
+
+        clock.now += 5.5
+        assert bucket.try_consume() is False
+        clock.now += 0.5
+        assert bucket.try_consume() is True
+
+    @pytest.mark.asyncio
+    async def test_acquire_waits(self):
+        """Тест: acquire ждёт недостающие токены."""
+        bucket = TokenBucket(rate=100.0, capacity=1)
+        assert await bucket.acquire() == 0.0
+        waited = await bucket.acquire()
+        assert waited > 0
+
+
+class TestTelegramRateLimiter:
+    """Тесты лимитера Telegram."""
+
+    @pytest.mark.asyncio
+    async def test_penalize_blocks_chat_only(self):
+        """Тест: flood wait блокирует только свой чат."""
+        limiter = TelegramRateLimiter(chat_rate=100, chat_burst=1)
+        limiter.penalize(1, 10)
+
+        assert limiter._chat_bucket(1).time_until() > 9
+        assert await limiter.acquire(2) == 0.0
+
+    def test_idle_chats_evicted_from_head(self):
+        """Тест: полные buckets снимаются с головы, активные и лимит сохраняются."""
+        clock = FakeClock()
+        limiter = TelegramRateLimiter(chat_rate=1, chat_burst=1)
+        limiter.MAX_CHAT_BUCKETS = 3
+
+        with patch("services.telegram_limiter.TokenBucket",
+                   side_effect=lambda **kw: TokenBucket(clock=clock, **kw)):
+            limiter._chat_bucket(1).try_consume()
+            limiter._chat_bucket(2).try_consume()
+            clock.now += 10  # Чаты 1 и 2 снова полны
+            limiter._chat_bucket(2).try_consume()
+            limiter._chat_bucket(3)
+
+            assert list(limiter._chats) == [2, 3]
+
+            limiter._chat_bucket(3).try_consume()
+            limiter._chat_bucket(4).try_consume()
+            limiter._chat_bucket(5)
+
+        assert list(limiter._chats) == [3, 4, 5]
+
+
+class TestFloodRetry:
+    """Тесты обработки retry_after при отправке групп."""
+
+    @pytest.mark.asyncio
+    async def test_two_albums_without_wait(self, bot):
+        """Тест: две группы по 10 фото подряд при настройках по умолчанию не ждут."""
+        settings = get_settings()
+        limiter = TelegramRateLimiter(
+            chat_rate=settings.TELEGRAM_CHAT_RATE, chat_burst=settings.TELEGRAM_CHAT_BURST
+        )
+        delivery = PhotoDelivery(bot, stats=PhotoDeliveryStats(), limiter=limiter)
+        urls = [f"https://example.com/{i}.webp" for i in range(10)]
+        group = PreparedGroup(
+            urls=urls, strategy=STRATEGY_URL, media=[MagicMock() for _ in urls]
+        )
+
+        start = time.perf_counter()
+        await delivery.send_prepared(123, group)
+        await delivery.send_prepared(123, group)
+
+        assert time.perf_counter() - start < 0.5
+        assert bot.send_media_group.call_count == 2
+
+    @pytest.mark.asyncio
+    async def test_fallback_charged_once(self, bot, telegram_rate_limiter):
+        """Тест: повтор отправки через prefetch не списывает токен чата второй раз."""
+        bot.send_media_group.side_effect = [TelegramBadRequest(MagicMock(), "wrong file"), None]
+        delivery = PhotoDelivery(bot, stats=PhotoDeliveryStats())
+        group = PreparedGroup(
+            urls=["https://example.com/1.webp"], strategy=STRATEGY_URL, media=[MagicMock()]
+        )
+        prefetched = PreparedGroup(
+            urls=group.urls, strategy=STRATEGY_PREFETCH, media=[MagicMock()]
+        )
+
+        with patch.object(telegram_rate_limiter, "acquire", new=AsyncMock()) as mock_acquire, \
+             patch.object(delivery, "_prepare_prefetch", new=AsyncMock(return_value=prefetched)):
+            assert await delivery.send_prepared(123, group) == STRATEGY_PREFETCH
+
+        mock_acquire.assert_called_once_with(123)
+
+    @pytest.mark.asyncio
+    async def test_retry_after_is_honoured(self, bot, telegram_rate_limiter):
+        """Тест: после TelegramRetryAfter группа отправляется повторно."""
+        bot.send_media_group.side_effect = [
+            TelegramRetryAfter(MagicMock(), "Flood control", retry_after=0),
+            None,
+        ]
+        delivery = PhotoDelivery(bot, stats=PhotoDeliveryStats())
+
+        with patch.object(telegram_rate_limiter, "penalize") as mock_penalize:
+            await delivery.send_group(123, ["https://example.com/1.webp"])
+
+        assert bot.send_media_group.call_count == 2
+        mock_penalize.assert_called_once_with(123, 0)
+
+    @pytest.mark.asyncio
+    async def test_retry_after_exhausted(self, bot):
+        """Тест: после исчерпания повторов ошибка пробрасывается."""
+        bot.send_media_group.side_effect = TelegramRetryAfter(
+            MagicMock(), "Flood control", retry_after=0
+        )
+        delivery = PhotoDelivery(bot, stats=PhotoDeliveryStats())
+
+        with pytest.raises(TelegramRetryAfter):
+            await delivery.send_group(123, ["https://example.com/1.webp"])
+
+        assert bot.send_media_group.call_count == delivery.settings.TELEGRAM_FLOOD_RETRIES + 1
@@ -0,0 +1,108 @@
+"""Тесты для services/telegram_scheduler.py"""
+
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from aiogram.methods import (
+    DeleteWebhook,
+    EditMessageText,
+    GetUpdates,
+    SendMessage,
+)
+
+from services.telegram_scheduler import (
+    LANE_BACKGROUND,
+    LANE_PROGRESS,
+    LANE_USER,
+    TelegramRequestScheduler,
+)
+
+CHANNEL_ID = -1001234567890
+
+
+@pytest.fixture
+def scheduler():
+    return TelegramRequestScheduler(rate=1000, background_chat_ids=[CHANNEL_ID])
+
+
+class TestClassify:
+    """Тесты выбора полосы."""
+
+    def test_user_reply(self, scheduler):
+        """Тест: ответ пользователю — пользовательская полоса."""
+        method = SendMessage(chat_id=123, text="hi")
+        assert scheduler.classify(method) == LANE_USER
+
+    def test_progress_edit(self, scheduler):
+        """Тест: правка сообщения — полоса прогресса."""
+        method = EditMessageText(chat_id=123, message_id=1, text="50%")
+        assert scheduler.classify(method) == LANE_PROGRESS
+
+    def test_channel_notification(self, scheduler):
+        """Тест: сообщение в канал аналитики — фоновая полоса."""
+        method = SendMessage(chat_id=CHANNEL_ID, text="new user")
+        assert scheduler.classify(method) == LANE_BACKGROUND
+
+    def test_service_methods_exempt(self, scheduler):
+        """Тест: getUpdates и deleteWebhook не ограничиваются."""
+        assert scheduler.classify(GetUpdates()) is None
+        assert scheduler.classify(DeleteWebhook()) is None
+
+
+class TestScheduling:
+    """Тесты очереди с приоритетами."""
+
+    @pytest.mark.asyncio
+    async def test_fast_path_without_wait(self, scheduler):
+        """Тест: при свободных токенах запрос проходит без ожидания."""
+        assert await scheduler.acquire(LANE_USER) == 0.0
+        assert scheduler.snapshot()["user"]["requests"] == 1
+
+    @pytest.mark.asyncio
+    async def test_priority_order(self):
+        """Тест: при очереди пользовательские запросы обслуживаются первыми."""
+        scheduler = TelegramRequestScheduler(rate=50, capacity=1)
+        await scheduler.acquire(LANE_USER)  # Исчерпываем burst
+
+        order = []
+
+        async def request(lane, name):
+            await scheduler.acquire(lane)
+            order.append(name)
+
+        tasks = [
+            asyncio.create_task(request(LANE_BACKGROUND, "notify")),
+            asyncio.create_task(request(LANE_PROGRESS, "edit")),
+            asyncio.create_task(request(LANE_USER, "reply")),
+        ]
+        await asyncio.gather(*tasks)
+
+        assert order == ["reply", "edit", "notify"]
+        snapshot = scheduler.snapshot()
+        assert snapshot["background"]["max_wait"] >= snapshot["user"]["max_wait"]
+        assert all(lane["queued"] == 0 for lane in snapshot.values())
+
+    @pytest.mark.asyncio
+    async def test_cancelled_waiter_skipped(self):
+        """Тест: отменённое ожидание не блокирует очередь."""
+        scheduler = TelegramRequestScheduler(rate=50, capacity=1)
+        await scheduler.acquire(LANE_USER)
+
+        cancelled = asyncio.create_task(scheduler.acquire(LANE_USER))
+        await asyncio.sleep(0)
+        cancelled.cancel()
+
+        waited = await asyncio.wait_for(scheduler.acquire(LANE_PROGRESS), timeout=1)
+        assert waited > 0
+
+    @pytest.mark.asyncio
+    async def test_middleware_calls_next(self, scheduler):
+        """Тест: middleware передаёт запрос дальше по цепочке."""
+        make_request = AsyncMock(return_value="ok")
+        bot = MagicMock()
+        method = SendMessage(chat_id=123, text="hi")
+
+        result = await scheduler(make_request, bot, method)
+
+        assert result == "ok"
+        make_request.assert_called_once_with(bot, method)
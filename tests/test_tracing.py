@@ -0,0 +1,267 @@
+"""Тесты для utils/tracing.py и трассировки запросов."""
+
+import asyncio
+import json
+import logging
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from bot.middlewares.tracing import TracingMiddleware
+from services.event_emitter import EventEmitter
+from utils.decorators import log_execution_time
+from utils.tracing import (
+    JsonSpanExporter,
+    OtlpSpanExporter,
+    RequestIdFilter,
+    create_background_task,
+    current_request_id,
+    current_span,
+    span,
+    traced,
+)
+
+
+class _CollectingExporter:
+    def __init__(self):
+        self.spans = []
+
+    def export(self, span_):
+        self.spans.append(span_)
+
+
+@pytest.fixture
+def exported():
+    """Завершённые spans теста."""
+    exporter = _CollectingExporter()
+    with patch("utils.tracing._exporter", exporter):
+        yield exporter.spans
+
+
+class TestSpans:
+    """Тесты API spans."""
+
+    def test_nested_spans_share_trace(self, exported):
+        """Тест: вложенный span в той же трассе, родитель — внешний span."""
+        assert current_request_id() is None
+
+        with span("update", user_id=1) as root:
+            assert current_request_id() == root.trace_id
+            with span("find_basket", vol=12) as child:
+                assert current_span() is child
+
+        assert current_span() is None
+        assert [s.name for s in exported] == ["find_basket", "update"]
+        assert child.trace_id == root.trace_id
+        assert child.parent_id == root.span_id
+        assert root.parent_id is None
+        assert child.attributes == {"vol": 12}
+        assert root.end_ns >= child.end_ns
+
+    def test_parent_none_starts_new_trace(self, exported):
+        """Тест: parent=None открывает новую трассу внутри текущей."""
+        with span("outer") as outer:
+            with span("update", parent=None) as root:
+                assert root.trace_id != outer.trace_id
+                assert root.parent_id is None
+
+    def test_error_recorded(self, exported):
+        """Тест: исключение помечает span ошибкой и пробрасывается."""
+        with pytest.raises(ValueError):
+            with span("convert"):
+                raise ValueError("bad playlist")
+
+        assert exported[0].error == "ValueError: bad playlist"
+        assert exported[0].to_dict()["status"] == "error"
+
+    @pytest.mark.asyncio
+    async def test_traced_decorator(self, exported):
+        """Тест: traced() выполняет функцию в span с её именем."""
+        @traced()
+        async def find_video():
+            return current_span().name
+
+        @traced("ffmpeg")
+        def convert():
+            return current_span().name
+
+        assert await find_video() == "TestSpans.test_traced_decorator.<locals>.find_video"
+        assert convert() == "ffmpeg"
+        assert len(exported) == 2
+
+    @pytest.mark.asyncio
+    async def test_log_execution_time_span(self, exported, caplog):
+        """Тест: log_execution_time открывает span, время пишется в DEBUG."""
+        @log_execution_time()
+        async def send_video():
+            return current_request_id()
+
+        with caplog.at_level(logging.INFO):
+            with span("update") as root:
+                assert await send_video() == root.trace_id
+
+        assert exported[0].name.endswith("send_video")
+        assert exported[0].parent_id == root.span_id
+        assert "завершена за" not in caplog.text
+
+
+class TestPropagation:
+    """Тесты передачи трассы в задачи."""
+
+    @pytest.mark.asyncio
+    async def test_create_task_inherits_trace(self, exported):
+        """Тест: задача, запущенная в запросе, остаётся в его трассе после его завершения."""
+        started = asyncio.Event()
+        release = asyncio.Event()
+
+        async def search_video():
+            started.set()
+            await release.wait()
+            with span("search_video") as child:
+                return child
+
+        with span("update") as root:
+            task = asyncio.create_task(search_video())
+            await started.wait()
+
+        release.set()
+        child = await task
+        assert child.trace_id == root.trace_id
+        assert child.parent_id == root.span_id
+
+    @pytest.mark.asyncio
+    async def test_background_task_detached(self, exported):
+        """Тест: create_background_task не наследует трассу запроса."""
+        async def worker():
+            return current_request_id()
+
+        with span("update"):
+            task = create_background_task(worker())
+
+        assert await task is None
+
+    @pytest.mark.asyncio
+    async def test_emitter_delivers_in_request_trace(self, exported):
+        """Тест: событие аналитики доставляется в трассе запроса, который его отправил."""
+        seen = []
+
+        async def handler(user_id, event_type, event_data):
+            seen.append(current_request_id())
+            return True
+
+        emitter = EventEmitter(handler, maxsize=10, workers=1)
+        with span("update") as root:
+            await emitter.emit(1, "article_request", {})
+        await emitter.emit(2, "digest", {})
+        await emitter._queue.join()
+        for worker in emitter._workers:
+            worker.cancel()
+
+        assert seen == [root.trace_id, None]
+        deliver = next(s for s in exported if s.name == "analytics.deliver")
+        assert deliver.parent_id == root.span_id
+
+    @pytest.mark.asyncio
+    async def test_tracing_middleware(self, exported):
+        """Тест: обновление обрабатывается в новой трассе с атрибутами."""
+        event = MagicMock()
+        event.event_type = "message"
+        event.update_id = 42
+        user = MagicMock()
+        user.id = 7
+        handler = AsyncMock(side_effect=lambda e, d: current_request_id())
+
+        request_id = await TracingMiddleware()(handler, event, {"event_from_user": user})
+
+        assert request_id == exported[0].trace_id
+        assert exported[0].name == "update.message"
+        assert exported[0].attributes == {"update_id": 42, "user_id": 7}
+
+
+class TestRequestIdFilter:
+    """Тесты request_id в логах."""
+
+    def test_filter_adds_request_id(self):
+        """Тест: запись лога получает request_id запроса ("-" вне запроса)."""
+        log_filter = RequestIdFilter()
+        record = logging.LogRecord("test", logging.INFO, __file__, 1, "msg", None, None)
+
+        log_filter.filter(record)
+        assert record.request_id == "-"
+
+        with span("update") as root:
+            log_filter.filter(record)
+        assert record.request_id == root.trace_id
+
+
+class TestExporters:
+    """Тесты экспорта spans."""
+
+    @pytest.mark.asyncio
+    async def test_json_exporter(self, tmp_path):
+        """Тест: JSON экспорт пишет строку на span."""
+        path = tmp_path / "spans.jsonl"
+        exporter = JsonSpanExporter(str(path))
+
+        with patch("utils.tracing._exporter", exporter):
+            with span("update", user_id=1):
+                with span("ffmpeg", mode="copy"):
+                    pass
+        await exporter.close()
+
+        lines = [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+        assert [line["name"] for line in lines] == ["ffmpeg", "update"]
+        assert lines[0]["parent_id"] == lines[1]["span_id"]
+        assert lines[0]["attributes"] == {"mode": "copy"}
+        assert lines[0]["status"] == "ok"
+
+    def test_otlp_payload(self, exported):
+        """Тест: spans преобразуются в OTLP/JSON."""
+        with span("update") as root:
+            with pytest.raises(RuntimeError):
+                with span("ffmpeg", bytes=1024, ratio=0.5, ok=True):
+                    raise RuntimeError("timeout")
+
+        payload = OtlpSpanExporter("http://collector").payload(exported)
+        spans = payload["resourceSpans"][0]["scopeSpans"][0]["spans"]
+        child, parent = spans
+
+        assert child["traceId"] == root.trace_id and len(child["traceId"]) == 32
+        assert child["parentSpanId"] == parent["spanId"]
+        assert "parentSpanId" not in parent
+        assert child["status"] == {"code": 2, "message": "RuntimeError: timeout"}
+        assert parent["status"] == {"code": 1}
+        assert {"key": "bytes", "value": {"intValue": "1024"}} in child["attributes"]
+        assert {"key": "ratio", "value": {"doubleValue": 0.5}} in child["attributes"]
+        assert {"key": "ok", "value": {"boolValue": True}} in child["attributes"]
+
+    @pytest.mark.asyncio
+    async def test_otlp_flush(self):
+        """Тест: OTLP экспорт отправляет spans пачкой, недоступный коллектор не ломает работу."""
+        received = []
+
+        async def collector(request):
+            received.append(await request.json())
+            return web.json_response({})
+
+        app = web.Application()
+        app.router.add_post("/v1/traces", collector)
+        async with TestServer(app) as server:
+            exporter = OtlpSpanExporter(str(server.make_url("/v1/traces")), flush_interval=60)
+            with patch("utils.tracing._exporter", exporter):
+                with span("update"):
+                    pass
+            await exporter.close()
+
+        spans = received[0]["resourceSpans"][0]["scopeSpans"][0]["spans"]
+        assert [s["name"] for s in spans] == ["update"]
+        assert exporter.exported == 1
+
+        down = OtlpSpanExporter("http://127.0.0.1:1/v1/traces", flush_interval=60)
+        with patch("utils.tracing._exporter", down):
+            with span("update"):
+                pass
+        await down.close()
+        assert down.failed == 1
@@ -0,0 +1,130 @@
+"""Тесты для services/user_limiter.py и RateLimiterMiddleware."""
+
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from bot.middlewares.rate_limiter import RateLimiterMiddleware
+from services.user_limiter import PostgresRateLimiter, UserRateLimiter
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def mock_pool():
+    """Mock пула asyncpg."""
+    pool = MagicMock()
+    conn = MagicMock()
+    conn.__aenter__ = AsyncMock(return_value=conn)
+    conn.__aexit__ = AsyncMock(return_value=False)
+    pool.acquire = MagicMock(return_value=conn)
+    return pool, conn
+
+
+class TestUserRateLimiter:
+    """Тесты token bucket в памяти."""
+
+    def test_burst_then_refill(self, clock):
+        """Тест: burst запросов подряд, затем ожидание пополнения."""
+        limiter = UserRateLimiter(rate=1 / 3, burst=2, clock=clock)
+
+        assert limiter.hit(1) == 0
+        assert limiter.hit(1) == 0
+        assert limiter.hit(1) == pytest.approx(3.0)
+
+        clock.now = 3.0
+        assert limiter.hit(1) == 0
+
+    def test_users_are_independent(self, clock):
+        """Тест: у каждого пользователя свой bucket."""
+        limiter = UserRateLimiter(rate=1 / 3, burst=1, clock=clock)
+
+        assert limiter.hit(1) == 0
+        assert limiter.hit(2) == 0
+        assert limiter.hit(1) > 0
+
+    def test_idle_users_are_evicted(self, clock):
+        """Тест: полные buckets неактивных пользователей удаляются по ходу запросов."""
+        limiter = UserRateLimiter(rate=1, burst=1, clock=clock)
+        for user_id in range(1000):
+            limiter.hit(user_id)
+
+        clock.now = 5.0
+        limiter.hit(5000)
+
+        assert len(limiter) == 1
+
+    def test_max_users_bound(self, clock):
+        """Тест: число buckets не превышает max_users."""
+        limiter = UserRateLimiter(rate=1, burst=1, max_users=100, clock=clock)
+        for user_id in range(1000):
+            limiter.hit(user_id)
+
+        assert len(limiter) == 100
+
+
+class TestPostgresRateLimiter:
+    """Тесты общего лимитера в PostgreSQL."""
+
+    @pytest.mark.asyncio
+    async def test_allowed(self, mock_pool):
+        """Тест: UPSERT вернул остаток токенов — запрос разрешён."""
+        pool, conn = mock_pool
+        conn.fetchval = AsyncMock(return_value=0.0)
+        limiter = PostgresRateLimiter(rate=1 / 3, burst=1, fallback=UserRateLimiter(1, 1))
+
+        with patch("services.user_limiter.get_pool", AsyncMock(return_value=pool)):
+            assert await limiter.check(1) == 0
+
+        conn.fetchval.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_denied_returns_wait(self, mock_pool):
+        """Тест: UPSERT не обновил строку — возвращается время ожидания."""
+        pool, conn = mock_pool
+        conn.fetchval = AsyncMock(side_effect=[None, 0.5])
+        limiter = PostgresRateLimiter(rate=1 / 3, burst=1, fallback=UserRateLimiter(1, 1))
+
+        with patch("services.user_limiter.get_pool", AsyncMock(return_value=pool)):
+            assert await limiter.check(1) == pytest.approx(1.5)
+
+    @pytest.mark.asyncio
+    async def test_db_error_uses_local_limit(self, mock_pool):
+        """Тест: при ошибке БД работает локальный лимит."""
+        pool, conn = mock_pool
+        conn.fetchval = AsyncMock(side_effect=Exception("connection lost"))
+        fallback = UserRateLimiter(rate=1 / 3, burst=1)
+        limiter = PostgresRateLimiter(rate=1 / 3, burst=1, fallback=fallback)
+
+        with patch("services.user_limiter.get_pool", AsyncMock(return_value=pool)):
+            assert await limiter.check(1) == 0
+            assert await limiter.check(1) > 0
+
+
+class TestRateLimiterMiddleware:
+    """Тесты middleware."""
+
+    @pytest.mark.asyncio
+    async def test_blocks_and_answers(self, clock):
+        """Тест: превышение лимита — ответ пользователю, handler не вызывается."""
+        middleware = RateLimiterMiddleware(UserRateLimiter(rate=1 / 3, burst=1, clock=clock))
+        handler = AsyncMock(return_value="ok")
+        event = MagicMock()
+        event.from_user.id = 42
+        event.answer = AsyncMock()
+
+        assert await middleware(handler, event, {}) == "ok"
+        assert await middleware(handler, event, {}) is None
+
+        handler.assert_called_once()
+        assert "Подождите 3 сек." in event.answer.call_args.args[0]
@@ -1,7 +1,14 @@
 """Тесты для services/video_cache.py"""
 
+import asyncio
 import time
-from services.video_cache import VideoCache
+
+import pytest
+
+from unittest.mock import patch
+
+from services import video_cache
+from services.video_cache import VideoCache, close_video_cache, get_video_cache
 
 
 class TestVideoCache:
@@ -88,3 +95,97 @@ class TestVideoCache:
         assert cache.size() == 1
         found, _ = cache.get("345678")
         assert found is True
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestVideoCacheBounds:
+    """Тесты LRU, отрицательного TTL и метрик."""
+
+    def test_lru_eviction(self):
+        """Тест: при переполнении вытесняется давно не запрошенная запись."""
+        cache = VideoCache(max_entries=2)
+        cache.set("1", "url1")
+        cache.set("2", "url2")
+        cache.get("1")
+        cache.set("3", "url3")
+
+        assert cache.size() == 2
+        assert cache.get("2") == (False, None)
+        assert cache.get("1") == (True, "url1")
+        assert cache.snapshot()["evicted"] == 1
+
+    def test_negative_ttl_shorter(self):
+        """Тест: «видео нет» истекает раньше найденного видео."""
+        clock = FakeClock()
+        cache = VideoCache(ttl_seconds=3600, negative_ttl_seconds=600, clock=clock)
+        cache.set("1", "url1")
+        cache.set("2", None)
+
+        clock.now = 601
+        assert cache.get("2") == (False, None)
+        assert cache.get("1") == (True, "url1")
+
+    def test_stats_and_memory(self):
+        """Тест: доля попаданий и учёт памяти."""
+        cache = VideoCache()
+        cache.set("1", "https://example.com/video.m3u8")
+        cache.set("2", None)
+        cache.get("1")
+        cache.get("2")
+        cache.get("3")
+
+        snapshot = cache.snapshot()
+        assert snapshot["hits"] == 1
+        assert snapshot["negative_hits"] == 1
+        assert snapshot["hit_ratio"] == round(2 / 3, 3)
+        assert snapshot["bytes"] > 0
+
+    def test_bytes_return_to_zero(self):
+        """Тест: после вытеснения и перезаписи учёт памяти не расходится."""
+        clock = FakeClock()
+        cache = VideoCache(ttl_seconds=10, max_entries=3, clock=clock)
+        for n in range(10):
+            cache.set(str(n), f"url{n}")
+        cache.set("9", None)
+
+        clock.now = 100
+        cache.clear_expired()
+
+        assert cache.size() == 0
+        assert cache.size_bytes() == 0
+
+    @pytest.mark.asyncio
+    async def test_sweeper(self):
+        """Тест: фоновая очистка удаляет истекшие записи."""
+        clock = FakeClock()
+        cache = VideoCache(ttl_seconds=10, clock=clock)
+        cache.set("1", "url1")
+        clock.now = 20
+
+        cache.start_sweeper(0.01)
+        await asyncio.sleep(0.05)
+        await cache.close()
+
+        assert cache.size() == 0
+
+    @pytest.mark.asyncio
+    async def test_close_resets_singleton(self):
+        """Тест: close_video_cache останавливает очистку и сбрасывает singleton."""
+        with patch("services.video_cache._video_cache", None):
+            cache = get_video_cache()
+            cache.start_sweeper(60)
+            sweeper = cache._sweeper
+
+            await close_video_cache()
+
+            assert video_cache._video_cache is None
+            assert sweeper.done()
+            assert get_video_cache() is not cache
+            await close_video_cache()
@@ -300,7 +300,7 @@ class TestWbMediaClientFallback:
 
     @pytest.mark.asyncio
     async def test_search_video_fallback_on_error(self, product_media):
-        """Тест: при ошибке сервиса search_video — fallback на WBParser._check_video."""
+        """Тест: при ошибке сервиса search_video — fallback на WBParser.find_video."""
         with patch("services.wb_media_client.httpx.AsyncClient") as MockClient, \
              patch("services.wb_media_client.WBParser") as MockParser:
 
@@ -315,7 +315,7 @@ class TestWbMediaClientFallback:
             mock_parser = AsyncMock()
             mock_parser.__aenter__.return_value = mock_parser
             mock_parser.__aexit__.return_value = None
-            mock_parser._check_video = AsyncMock(return_value="https://video.url/hls/index.m3u8")
+            mock_parser.find_video = AsyncMock(return_value="https://video.url/hls/index.m3u8")
             MockParser.return_value = mock_parser
 
             from services.wb_media_client import WbMediaClient
@@ -327,7 +327,7 @@ class TestWbMediaClientFallback:
             video_url = await client.search_video("12345678")
 
         assert video_url == "https://video.url/hls/index.m3u8"
-        mock_parser._check_video.assert_called_once()
+        mock_parser.find_video.assert_called_once()
 
 
 class TestWbMediaClientLocalMode:
@@ -363,14 +363,14 @@ class TestWbMediaClientLocalMode:
 
     @pytest.mark.asyncio
     async def test_search_video_local_when_flag_off(self):
-        """Тест: USE_WB_MEDIA_SERVICE=False — search_video через WBParser._check_video."""
+        """Тест: USE_WB_MEDIA_SERVICE=False — search_video через WBParser.find_video."""
         with patch("services.wb_media_client.WBParser") as MockParser, \
              patch("services.wb_media_client.httpx.AsyncClient") as MockClient:
 
             mock_parser = AsyncMock()
             mock_parser.__aenter__.return_value = mock_parser
             mock_parser.__aexit__.return_value = None
-            mock_parser._check_video = AsyncMock(
+            mock_parser.find_video = AsyncMock(
                 return_value="https://videonme-basket-01.wbbasket.ru/hls/index.m3u8"
             )
             MockParser.return_value = mock_parser
@@ -385,7 +385,50 @@ class TestWbMediaClientLocalMode:
 
         assert video_url == "https://videonme-basket-01.wbbasket.ru/hls/index.m3u8"
         MockClient.assert_not_called()
-        mock_parser._check_video.assert_called_once()
+        mock_parser.find_video.assert_called_once()
+
+
+class TestWbMediaClientConnectionPool:
+    """Тесты: общий HTTP клиент к wb-media-service."""
+
+    @pytest.mark.asyncio
+    async def test_client_reused_between_calls(self):
+        """Тест: фото и видео запрашиваются через один httpx клиент."""
+        from services.wb_media_client import WbMediaClient
+        client = WbMediaClient.__new__(WbMediaClient)
+        client.use_service = True
+        client.service_url = "http://wb-media-service:8013"
+        client.timeout = 40
+
+        requests = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            requests.append(request)
+            return httpx.Response(
+                200, json={"nm_id": 12345678, "photos": ["p1"], "video_url": "v1"}
+            )
+
+        real_client_cls = httpx.AsyncClient
+
+        def make_client(**kwargs):
+            return real_client_cls(transport=httpx.MockTransport(handler), **kwargs)
+
+        with patch(
+            "services.wb_media_client.httpx.AsyncClient", side_effect=make_client
+        ) as MockClient:
+            await client.get_product_media("12345678", skip_video=True)
+            http_client = client._client
+            video = await client.search_video("12345678")
+
+        MockClient.assert_called_once()
+        assert video == "v1"
+        assert len(requests) == 2
+        assert client._client is http_client
+
+        await client.close()
+
+        assert http_client.is_closed
+        assert client._client is None
 
 
 class TestGetWbMediaClient:
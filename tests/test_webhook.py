@@ -0,0 +1,118 @@
+"""Тесты для bot/webhook.py"""
+
+import asyncio
+import json
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+from aiohttp.test_utils import TestClient, TestServer
+
+from bot.webhook import WebhookServer, derive_secret_token
+
+UPDATE = {
+    "update_id": 1,
+    "message": {
+        "message_id": 1,
+        "date": 0,
+        "chat": {"id": 1, "type": "private"},
+        "from": {"id": 1, "is_bot": False, "first_name": "Test"},
+        "text": "12345678",
+    },
+}
+
+
+def _server(feed, secret_token="s3cret"):
+    bot = MagicMock()
+    bot.token = "123456:ABC"
+    bot.session.json_loads = json.loads
+    bot.session.json_dumps = json.dumps
+    dp = MagicMock()
+    dp.workflow_data = {}
+    dp.emit_startup = AsyncMock()
+    dp.emit_shutdown = AsyncMock()
+    dp.feed_raw_update = feed
+    return WebhookServer(bot, dp, host="127.0.0.1", port=0, path="/webhook", secret_token=secret_token)
+
+
+class TestWebhookServer:
+    """Тесты webhook сервера."""
+
+    @pytest.mark.asyncio
+    async def test_secret_token_required(self):
+        """Тест: обновление без верного секрета отклоняется."""
+        feed = AsyncMock(return_value=None)
+        server = _server(feed)
+
+        async with TestClient(TestServer(server.app)) as client:
+            response = await client.post("/webhook", json=UPDATE)
+            assert response.status == 401
+
+            response = await client.post(
+                "/webhook", json=UPDATE,
+                headers={"X-Telegram-Bot-Api-Secret-Token": "s3cret"}
+            )
+            assert response.status == 200
+            await asyncio.sleep(0)
+
+        feed.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_secret_derived_when_not_set(self):
+        """Тест: без WEBHOOK_SECRET секрет выводится из токена и проверяется."""
+        feed = AsyncMock(return_value=None)
+        server = _server(feed, secret_token=None)
+        secret = derive_secret_token("123456:ABC")
+
+        assert server.secret_token == secret
+        assert secret != derive_secret_token("654321:XYZ")
+        async with TestClient(TestServer(server.app)) as client:
+            response = await client.post("/webhook", json=UPDATE)
+            assert response.status == 401
+
+            response = await client.post(
+                "/webhook", json=UPDATE,
+                headers={"X-Telegram-Bot-Api-Secret-Token": secret}
+            )
+            assert response.status == 200
+            await asyncio.sleep(0)
+
+        feed.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_health_and_readiness(self):
+        """Тест: /healthz всегда 200, /readyz 503 пока реплика не готова."""
+        server = _server(AsyncMock(return_value=None))
+
+        async with TestClient(TestServer(server.app)) as client:
+            assert (await client.get("/healthz")).status == 200
+            assert (await client.get("/readyz")).status == 503
+
+            server.ready = True
+            assert (await client.get("/readyz")).status == 200
+
+    @pytest.mark.asyncio
+    async def test_drain_waits_and_rejects_new_updates(self):
+        """Тест: при остановке принятые обновления дорабатываются, новые получают 503."""
+        gate = asyncio.Event()
+        done = []
+
+        async def feed(bot, update, **kwargs):
+            await gate.wait()
+            done.append(update["update_id"])
+
+        server = _server(feed)
+        headers = {"X-Telegram-Bot-Api-Secret-Token": "s3cret"}
+
+        async with TestClient(TestServer(server.app)) as client:
+            assert (await client.post("/webhook", json=UPDATE, headers=headers)).status == 200
+            assert server.handler.pending == 1
+
+            drain = asyncio.create_task(server.handler.drain(timeout=5))
+            await asyncio.sleep(0)
+            response = await client.post("/webhook", json=UPDATE, headers=headers)
+            assert response.status == 503
+
+            gate.set()
+            assert await drain is True
+
+        assert done == [1]
@@ -0,0 +1,118 @@
+"""Тесты для services/zip_stream.py"""
+
+import io
+import zipfile
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+from services.media_downloader import MediaDownloader
+from services.wb_parser import ProductMedia
+from services.zip_stream import ZipStreamInputFile
+from utils.exceptions import NoMediaError, WBAPIError
+
+
+def make_fetch(files, fail_url=None):
+    """Fake источник: отдаёт содержимое files[url] фрагментами по 3 байта."""
+    calls = []
+
+    async def fetch(url, chunk_size):
+        calls.append(url)
+        if url == fail_url:
+            raise WBAPIError(f"HTTP 404 при загрузке {url}")
+        data = files[url]
+        for i in range(0, len(data), 3):
+            yield data[i:i + 3]
+
+    fetch.calls = calls
+    return fetch
+
+
+async def collect(input_file):
+    return b"".join([chunk async for chunk in input_file.read(MagicMock())])
+
+
+class TestZipStreamInputFile:
+    """Тесты потоковой сборки ZIP."""
+
+    @pytest.mark.asyncio
+    async def test_archive_is_valid(self):
+        """Тест: архив читается zipfile, содержимое и порядок совпадают."""
+        files = {f"https://cdn/{i}.webp": bytes([i]) * (i * 7) for i in range(1, 6)}
+        entries = [(f"photo_{i}.webp", url) for i, url in enumerate(files, start=1)]
+        progress = AsyncMock()
+
+        archive = ZipStreamInputFile(
+            entries, "photos.zip", concurrency=2, queue_chunks=1,
+            fetch=make_fetch(files), on_entry=progress
+        )
+        data = await collect(archive)
+
+        with zipfile.ZipFile(io.BytesIO(data)) as zf:
+            assert zf.testzip() is None
+            assert zf.namelist() == [name for name, _ in entries]
+            for name, url in entries:
+                assert zf.read(name) == files[url]
+        assert progress.call_count == 5
+        progress.assert_called_with(5, 5)
+
+    @pytest.mark.asyncio
+    async def test_fetch_error_propagates(self):
+        """Тест: ошибка загрузки файла прерывает архив."""
+        files = {"https://cdn/1.webp": b"abc", "https://cdn/2.webp": b"def"}
+        archive = ZipStreamInputFile(
+            [("1.webp", "https://cdn/1.webp"), ("2.webp", "https://cdn/2.webp")],
+            "photos.zip",
+            fetch=make_fetch(files, fail_url="https://cdn/2.webp"),
+        )
+
+        with pytest.raises(WBAPIError):
+            await collect(archive)
+
+    @pytest.mark.asyncio
+    async def test_max_bytes_limit(self):
+        """Тест: превышение лимита размера прерывает архив."""
+        files = {"https://cdn/1.webp": b"x" * 1000}
+        archive = ZipStreamInputFile(
+            [("1.webp", "https://cdn/1.webp")], "photos.zip",
+            max_bytes=500, fetch=make_fetch(files)
+        )
+
+        with pytest.raises(WBAPIError, match="лимит"):
+            await collect(archive)
+
+
+class TestSendPhotosArchive:
+    """Тесты отправки архива через MediaDownloader."""
+
+    @pytest.mark.asyncio
+    async def test_sends_single_document(self, bot, message):
+        """Тест: все фото уходят одним документом."""
+        bot.send_document = AsyncMock()
+        media = ProductMedia(
+            nm_id="12345678",
+            name="Товар",
+            photos=[f"https://cdn/{i}.webp" for i in range(1, 13)],
+            video=None
+        )
+        on_success = AsyncMock()
+
+        await MediaDownloader(bot).send_photos_archive(
+            123, media, message, on_success=on_success
+        )
+
+        bot.send_document.assert_called_once()
+        document = bot.send_document.call_args.kwargs["document"]
+        assert isinstance(document, ZipStreamInputFile)
+        assert len(document.entries) == 12
+        assert document.filename == "12345678_photos.zip"
+        assert not bot.send_media_group.called
+        on_success.assert_called_once_with(12)
+        assert message.delete.called
+
+    @pytest.mark.asyncio
+    async def test_no_photos_error(self, bot, message):
+        """Тест: NoMediaError если у товара нет фото."""
+        media = ProductMedia(nm_id="12345678", name="Товар", photos=[], video=None)
+
+        with pytest.raises(NoMediaError):
+            await MediaDownloader(bot).send_photos_archive(123, media, message)
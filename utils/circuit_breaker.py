@@ -0,0 +1,166 @@
+"""
+Circuit breaker для вызовов микросервисов.
+
+После failure_threshold ошибок подряд breaker размыкается (open): вызовы
+сразу идут в fallback без ожидания таймаута. Через recovery_timeout он
+переходит в half-open и пропускает пробные вызовы; успешная проба
+замыкает его (closed), ошибка снова размыкает.
+"""
+
+import logging
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional
+
+from config.settings import get_settings
+
+logger = logging.getLogger(__name__)
+
+STATE_CLOSED = "closed"
+STATE_OPEN = "open"
+STATE_HALF_OPEN = "half_open"
+
+
+@dataclass
+class BreakerStats:
+    """Счётчики circuit breaker."""
+
+    calls: int = 0
+    successes: int = 0
+    failures: int = 0
+    rejected: int = 0
+    opened: int = 0
+
+
+class CircuitBreaker:
+    """Circuit breaker с half-open пробами."""
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int,
+        recovery_timeout: float,
+        half_open_max_calls: int = 1,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        """
+        Args:
+            name: Имя сервиса (для логов и метрик)
+            failure_threshold: Ошибок подряд до размыкания
+            recovery_timeout: Время в open до пробного вызова (сек)
+            half_open_max_calls: Одновременных проб в half-open
+            clock: Источник времени (для тестов)
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self._clock = clock
+        self._state = STATE_CLOSED
+        self._consecutive_failures = 0
+        self._opened_at = 0.0
+        self._probes = 0
+        self.stats = BreakerStats()
+
+    @property
+    def state(self) -> str:
+        """Текущее состояние (open переходит в half_open по таймауту)."""
+        if (
+            self._state == STATE_OPEN
+            and self._clock() - self._opened_at >= self.recovery_timeout
+        ):
+            self._state = STATE_HALF_OPEN
+            self._probes = 0
+        return self._state
+
+    def allow(self) -> bool:
+        """
+        Можно ли вызывать сервис.
+
+        Returns:
+            False если breaker разомкнут — вызывающий сразу идёт в fallback
+        """
+        state = self.state
+        if state == STATE_CLOSED:
+            self.stats.calls += 1
+            return True
+        if state == STATE_HALF_OPEN and self._probes < self.half_open_max_calls:
+            self._probes += 1
+            self.stats.calls += 1
+            return True
+        self.stats.rejected += 1
+        return False
+
+    def record_success(self) -> None:
+        """Учесть успешный вызов."""
+        self.stats.successes += 1
+        self._consecutive_failures = 0
+        if self._state != STATE_CLOSED:
+            logger.info(f"✅ Circuit breaker {self.name}: сервис восстановлен")
+        self._state = STATE_CLOSED
+        self._probes = 0
+
+    def record_failure(self) -> None:
+        """Учесть ошибку вызова."""
+        self.stats.failures += 1
+        self._consecutive_failures += 1
+        if (
+            self._state == STATE_HALF_OPEN
+            or self._consecutive_failures >= self.failure_threshold
+        ):
+            self._open()
+
+    def release(self) -> None:
+        """Вызов отменён без результата (например, проиграл hedged-гонку)."""
+        if self._state == STATE_HALF_OPEN and self._probes > 0:
+            self._probes -= 1
+
+    def _open(self) -> None:
+        if self._state != STATE_OPEN:
+            self.stats.opened += 1
+            logger.warning(
+                f"⚠️  Circuit breaker {self.name} разомкнут: "
+                f"ошибок подряд={self._consecutive_failures}, "
+                f"проба через {self.recovery_timeout:.0f}s"
+            )
+        self._state = STATE_OPEN
+        self._opened_at = self._clock()
+        self._probes = 0
+
+    def snapshot(self) -> Dict:
+        """Состояние и счётчики."""
+        return {
+            "state": self.state,
+            "calls": self.stats.calls,
+            "successes": self.stats.successes,
+            "failures": self.stats.failures,
+            "rejected": self.stats.rejected,
+            "opened": self.stats.opened,
+        }
+
+
+# Реестр breaker'ов по имени сервиса
+_breakers: Dict[str, CircuitBreaker] = {}
+
+
+def get_circuit_breaker(name: str) -> CircuitBreaker:
+    """Получить (создать) breaker сервиса name."""
+    breaker = _breakers.get(name)
+    if breaker is None:
+        settings = get_settings()
+        breaker = CircuitBreaker(
+            name,
+            failure_threshold=settings.CIRCUIT_FAILURE_THRESHOLD,
+            recovery_timeout=settings.CIRCUIT_RECOVERY_TIMEOUT,
+        )
+        _breakers[name] = breaker
+    return breaker
+
+
+def circuit_breakers_snapshot(name: Optional[str] = None) -> Dict[str, Dict]:
+    """Метрики всех breaker'ов (или одного)."""
+    return {
+        key: breaker.snapshot()
+        for key, breaker in _breakers.items()
+        if name is None or key == name
+    }
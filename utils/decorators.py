@@ -6,10 +6,15 @@ import functools
 import inspect
 from typing import Callable, Any
 
+from utils.tracing import span
+
 
 def log_execution_time(logger: logging.Logger = None):
     """
-    Декоратор для логирования времени выполнения функции.
+    Декоратор: span трассировки на время выполнения функции.
+
+    Длительность видна в трассе запроса (utils/tracing.py), в лог она
+    пишется на уровне DEBUG; ошибки — на уровне ERROR.
 
     Args:
         logger: Logger для вывода. Если None, используется logger модуля функции
@@ -36,9 +41,10 @@ def log_execution_time(logger: logging.Logger = None):
             logger.debug(f"⏱️  START: {func_name}()")
 
             try:
-                result = await func(*args, **kwargs)
+                with span(func_name):
+                    result = await func(*args, **kwargs)
                 elapsed = time.perf_counter() - start_time
-                logger.info(f"✅ {func_name}() завершена за {elapsed:.3f}s")
+                logger.debug(f"✅ {func_name}() завершена за {elapsed:.3f}s")
                 return result
             except Exception as e:
                 elapsed = time.perf_counter() - start_time
@@ -59,9 +65,10 @@ def log_execution_time(logger: logging.Logger = None):
             logger.debug(f"⏱️  START: {func_name}()")
 
             try:
-                result = func(*args, **kwargs)
+                with span(func_name):
+                    result = func(*args, **kwargs)
                 elapsed = time.perf_counter() - start_time
-                logger.info(f"✅ {func_name}() завершена за {elapsed:.3f}s")
+                logger.debug(f"✅ {func_name}() завершена за {elapsed:.3f}s")
                 return result
             except Exception as e:
                 elapsed = time.perf_counter() - start_time
@@ -0,0 +1,75 @@
+"""
+Порог и метрики hedged-запросов.
+
+Hedged-запрос: если основной путь не ответил за время, близкое к его p95,
+параллельно запускается запасной путь и берётся первый ответ. Порог
+считается по скользящему окну последних латентностей основного пути.
+"""
+
+from collections import deque
+from dataclasses import dataclass
+from typing import Deque, Dict
+
+
+@dataclass
+class HedgeStats:
+    """Счётчики hedged-запросов."""
+
+    requests: int = 0
+    hedged: int = 0
+    primary_wins: int = 0
+    backup_wins: int = 0
+
+
+class LatencyHedge:
+    """Скользящий перцентиль латентности основного пути и метрики хеджирования."""
+
+    def __init__(
+        self,
+        percentile: float = 0.95,
+        window: int = 200,
+        min_samples: int = 20,
+        default_delay: float = 3.0,
+        min_delay: float = 0.2
+    ):
+        """
+        Args:
+            percentile: Перцентиль латентности, после которого запускается hedge
+            window: Сколько последних замеров учитывать
+            min_samples: Замеров до перехода с default_delay на перцентиль
+            default_delay: Порог, пока замеров мало (сек)
+            min_delay: Нижняя граница порога (сек)
+        """
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.default_delay = default_delay
+        self.min_delay = min_delay
+        self._samples: Deque[float] = deque(maxlen=window)
+        self.stats = HedgeStats()
+
+    def record(self, latency: float) -> None:
+        """Учесть латентность запроса основного пути (для отменённого — время до отмены)."""
+        self._samples.append(latency)
+
+    def delay(self) -> float:
+        """Через сколько секунд запускать запасной путь."""
+        if len(self._samples) < self.min_samples:
+            return self.default_delay
+        ordered = sorted(self._samples)
+        index = min(len(ordered) - 1, int(len(ordered) * self.percentile))
+        return max(self.min_delay, ordered[index])
+
+    def snapshot(self) -> Dict:
+        """Порог, доля хеджированных запросов и доля побед запасного пути."""
+        stats = self.stats
+        return {
+            "delay": round(self.delay(), 3),
+            "requests": stats.requests,
+            "hedged": stats.hedged,
+            "hedge_rate": round(stats.hedged / stats.requests, 3) if stats.requests else 0.0,
+            "primary_wins": stats.primary_wins,
+            "backup_wins": stats.backup_wins,
+            "backup_win_ratio": (
+                round(stats.backup_wins / stats.hedged, 3) if stats.hedged else 0.0
+            ),
+        }
@@ -4,6 +4,7 @@ import logging
 from logging.handlers import RotatingFileHandler
 import sys
 from config.settings import Settings
+from utils.tracing import RequestIdFilter
 
 
 def setup_logger() -> None:
@@ -11,14 +12,15 @@ def setup_logger() -> None:
     settings = Settings()
 
     # Детальный формат логов с дополнительными полями
+    # (request_id — трасса запроса, см. utils/tracing.py)
     detailed_format = (
         '%(asctime)s - %(name)s - %(levelname)s - '
-        '[%(filename)s:%(lineno)d] - '
+        '[%(request_id)s] - [%(filename)s:%(lineno)d] - '
         '%(funcName)s() - %(message)s'
     )
 
     # Формат для консоли (более компактный)
-    console_format = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    console_format = '%(asctime)s - %(name)s - %(levelname)s - [%(request_id)s] - %(message)s'
 
     # Формат времени
     date_format = '%Y-%m-%d %H:%M:%S'
@@ -35,10 +37,12 @@ def setup_logger() -> None:
         encoding='utf-8'
     )
     file_handler.setFormatter(detailed_formatter)
+    file_handler.addFilter(RequestIdFilter())
 
     # Console handler
     console_handler = logging.StreamHandler(sys.stdout)
     console_handler.setFormatter(console_formatter)
+    console_handler.addFilter(RequestIdFilter())
 
     # Настройка root logger
     root_logger = logging.getLogger()
@@ -0,0 +1,86 @@
+"""Token bucket для ограничения частоты операций."""
+
+import asyncio
+import time
+from typing import Callable
+
+
+class TokenBucket:
+    """
+    Классический token bucket.
+
+    Токены пополняются со скоростью rate в секунду до capacity.
+    Операция стоимостью cost выполняется, если в ведре есть cost токенов.
+    """
+
+    __slots__ = ("rate", "capacity", "_tokens", "_updated", "_clock")
+
+    def __init__(
+        self,
+        rate: float,
+        capacity: float,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        """
+        Args:
+            rate: Скорость пополнения (токенов в секунду)
+            capacity: Максимум токенов (размер burst)
+            clock: Источник времени (для тестов)
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self._clock = clock
+        self._tokens = capacity
+        self._updated = clock()
+
+    def _refill(self) -> None:
+        now = self._clock()
+        elapsed = now - self._updated
+        if elapsed > 0:
+            self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+            self._updated = now
+
+    @property
+    def tokens(self) -> float:
+        """Текущее количество токенов."""
+        self._refill()
+        return self._tokens
+
+    def try_consume(self, cost: float = 1.0) -> bool:
+        """Забрать cost токенов, если они есть. Не блокирует."""
+        self._refill()
+        if self._tokens >= cost:
+            self._tokens -= cost
+            return True
+        return False
+
+    def time_until(self, cost: float = 1.0) -> float:
+        """Сколько секунд ждать, пока накопится cost токенов."""
+        self._refill()
+        missing = min(cost, self.capacity) - self._tokens
+        if missing <= 0:
+            return 0.0
+        # После drain() пополнение начинается не раньше _updated
+        paused = max(0.0, self._updated - self._clock())
+        return paused + missing / self.rate
+
+    def drain(self, seconds: float) -> None:
+        """Обнулить ведро и отложить пополнение на seconds (например, flood wait)."""
+        self._refill()
+        self._tokens = 0.0
+        self._updated = max(self._updated, self._clock() + seconds)
+
+    async def acquire(self, cost: float = 1.0) -> float:
+        """
+        Дождаться cost токенов и забрать их.
+
+        Returns:
+            Сколько секунд пришлось ждать
+        """
+        waited = 0.0
+        cost = min(cost, self.capacity)
+        while not self.try_consume(cost):
+            delay = max(self.time_until(cost), 0.001)
+            await asyncio.sleep(delay)
+            waited += delay
+        return waited
@@ -0,0 +1,373 @@
+"""
+Трассировка запросов: spans на contextvars.
+
+Каждое обновление Telegram открывает корневой span (TracingMiddleware),
+его trace_id — request_id, который RequestIdFilter добавляет в каждую
+запись лога. Текущий span наследуется задачами asyncio.create_task,
+поэтому фоновый поиск видео, конвертация и отправка остаются в трассе
+запроса. Долгоживущие воркеры запускаются через create_background_task
+и не наследуют трассу запроса, в котором были созданы.
+
+Завершённые spans экспортируются (TRACING_EXPORT):
+- json — по строке JSON на span в файл TRACING_JSON_PATH
+- otlp — пачками в коллектор OpenTelemetry (OTLP/HTTP, JSON)
+
+Usage:
+    with span("ffmpeg", mode="copy") as s:
+        ...
+        s.set(bytes=size)
+
+    @traced()
+    async def find_basket(...):
+        ...
+"""
+
+import asyncio
+import contextvars
+import functools
+import inspect
+import json
+import logging
+import secrets
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Coroutine, Deque, Dict, Iterator, List, Optional
+
+import aiohttp
+
+from config.settings import get_settings
+
+logger = logging.getLogger(__name__)
+
+# Текущий span задачи
+_current_span: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar(
+    "current_span", default=None
+)
+
+# Маркер «родитель — текущий span»
+_CURRENT: Any = object()
+
+
+class Span:
+    """Интервал работы внутри трассы запроса."""
+
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "attributes",
+                 "start_ns", "end_ns", "error")
+
+    def __init__(
+        self,
+        name: str,
+        trace_id: str,
+        parent_id: Optional[str] = None,
+        attributes: Optional[Dict[str, Any]] = None
+    ):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.attributes: Dict[str, Any] = {}
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.error: Optional[str] = None
+        if attributes:
+            self.set(**attributes)
+
+    def set(self, **attributes) -> None:
+        """Добавить атрибуты (None пропускаются)."""
+        for key, value in attributes.items():
+            if value is not None:
+                self.attributes[key] = value
+
+    @property
+    def duration(self) -> float:
+        """Длительность (сек); для незавершённого — до текущего момента."""
+        end = self.end_ns if self.end_ns is not None else time.time_ns()
+        return (end - self.start_ns) / 1e9
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Span для JSON экспорта."""
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start": round(self.start_ns / 1e9, 6),
+            "duration_ms": round(self.duration * 1000, 3),
+            "status": "error" if self.error else "ok",
+            "error": self.error,
+            "attributes": self.attributes,
+        }
+
+
+def current_span() -> Optional[Span]:
+    """Текущий span (None вне запроса)."""
+    return _current_span.get()
+
+
+def current_request_id() -> Optional[str]:
+    """request_id (trace_id) текущего запроса."""
+    span_ = _current_span.get()
+    return span_.trace_id if span_ is not None else None
+
+
+def annotate(**attributes) -> None:
+    """Добавить атрибуты текущему span (если он есть)."""
+    span_ = _current_span.get()
+    if span_ is not None:
+        span_.set(**attributes)
+
+
+@contextmanager
+def span(name: str, parent: Optional[Span] = _CURRENT, **attributes) -> Iterator[Span]:
+    """
+    Открыть span на время блока.
+
+    Args:
+        name: Имя операции
+        parent: Родительский span (по умолчанию текущий, None — новая трасса)
+        **attributes: Атрибуты span
+
+    Yields:
+        Span (атрибуты можно дополнять через set)
+    """
+    if parent is _CURRENT:
+        parent = _current_span.get()
+    if parent is None:
+        span_ = Span(name, secrets.token_hex(16), attributes=attributes)
+    else:
+        span_ = Span(name, parent.trace_id, parent.span_id, attributes)
+
+    token = _current_span.set(span_)
+    try:
+        yield span_
+    except BaseException as e:
+        span_.error = f"{type(e).__name__}: {e}" if str(e) else type(e).__name__
+        raise
+    finally:
+        span_.end_ns = time.time_ns()
+        _current_span.reset(token)
+        _export(span_)
+
+
+def traced(name: Optional[str] = None):
+    """
+    Декоратор: выполнение функции в span.
+
+    Args:
+        name: Имя span (по умолчанию qualname функции)
+    """
+    def decorator(func: Callable) -> Callable:
+        span_name = name or func.__qualname__
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs) -> Any:
+                with span(span_name):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def sync_wrapper(*args, **kwargs) -> Any:
+            with span(span_name):
+                return func(*args, **kwargs)
+        return sync_wrapper
+
+    return decorator
+
+
+def create_background_task(coro: Coroutine, name: Optional[str] = None) -> asyncio.Task:
+    """
+    Создать задачу вне трассы текущего запроса.
+
+    Для воркеров и фоновых сбросов, которые переживают запрос,
+    в котором были запущены, и обслуживают другие запросы.
+    """
+    context = contextvars.copy_context()
+    context.run(_current_span.set, None)
+    return asyncio.create_task(coro, name=name, context=context)
+
+
+class RequestIdFilter(logging.Filter):
+    """Добавляет request_id текущего запроса в записи лога ("-" вне запроса)."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = current_request_id() or "-"
+        return True
+
+
+class JsonSpanExporter:
+    """Экспорт spans в файл: одна строка JSON на span."""
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path: Путь к файлу (дописывается)
+        """
+        self.path = path
+        self._file = open(path, "a", encoding="utf-8", buffering=1)
+
+    def export(self, span_: Span) -> None:
+        self._file.write(json.dumps(span_.to_dict(), ensure_ascii=False) + "\n")
+
+    async def close(self) -> None:
+        self._file.close()
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+class OtlpSpanExporter:
+    """
+    Экспорт spans в коллектор OpenTelemetry по OTLP/HTTP (JSON).
+
+    Spans копятся в ограниченной очереди (при переполнении теряются
+    старые) и отправляются пачкой раз в flush_interval. Недоступность
+    коллектора не влияет на обработку запросов.
+    """
+
+    def __init__(
+        self,
+        endpoint: str,
+        service_name: str = "mpcabinet-picture-bot",
+        flush_interval: float = 5.0,
+        max_pending: int = 2048
+    ):
+        """
+        Args:
+            endpoint: URL приёма spans (http://localhost:4318/v1/traces)
+            service_name: service.name в ресурсе
+            flush_interval: Период отправки (сек)
+            max_pending: Максимум spans в очереди
+        """
+        self.endpoint = endpoint
+        self.service_name = service_name
+        self.flush_interval = flush_interval
+        self._pending: Deque[Span] = deque(maxlen=max_pending)
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._flusher: Optional[asyncio.Task] = None
+        self.exported = 0
+        self.failed = 0
+
+    def export(self, span_: Span) -> None:
+        self._pending.append(span_)
+        if self._flusher is None or self._flusher.done():
+            self._flusher = create_background_task(self._run())
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    def payload(self, spans: List[Span]) -> Dict[str, Any]:
+        """Тело запроса ExportTraceServiceRequest."""
+        return {
+            "resourceSpans": [{
+                "resource": {"attributes": [
+                    {"key": "service.name", "value": {"stringValue": self.service_name}},
+                ]},
+                "scopeSpans": [{
+                    "scope": {"name": __name__},
+                    "spans": [self._span(s) for s in spans],
+                }],
+            }],
+        }
+
+    @staticmethod
+    def _span(span_: Span) -> Dict[str, Any]:
+        data = {
+            "traceId": span_.trace_id,
+            "spanId": span_.span_id,
+            "name": span_.name,
+            "kind": 1,  # SPAN_KIND_INTERNAL
+            "startTimeUnixNano": str(span_.start_ns),
+            "endTimeUnixNano": str(span_.end_ns),
+            "attributes": [
+                {"key": key, "value": _otlp_value(value)}
+                for key, value in span_.attributes.items()
+            ],
+            # STATUS_CODE_OK / STATUS_CODE_ERROR
+            "status": {"code": 2, "message": span_.error} if span_.error else {"code": 1},
+        }
+        if span_.parent_id:
+            data["parentSpanId"] = span_.parent_id
+        return data
+
+    async def flush(self) -> None:
+        """Отправить накопленные spans."""
+        if not self._pending:
+            return
+        spans = list(self._pending)
+        self._pending.clear()
+
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=5))
+        try:
+            async with self._session.post(self.endpoint, json=self.payload(spans)) as response:
+                if response.status >= 400:
+                    raise aiohttp.ClientResponseError(
+                        response.request_info, response.history, status=response.status
+                    )
+            self.exported += len(spans)
+        except (aiohttp.ClientError, asyncio.TimeoutError, OSError) as e:
+            self.failed += len(spans)
+            logger.debug(f"OTLP экспорт: {len(spans)} spans потеряно ({type(e).__name__}: {e})")
+
+    async def close(self) -> None:
+        """Отправить остаток и закрыть сессию."""
+        if self._flusher is not None:
+            self._flusher.cancel()
+            await asyncio.gather(self._flusher, return_exceptions=True)
+            self._flusher = None
+        await self.flush()
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+        logger.info(f"OTLP экспорт: отправлено={self.exported}, потеряно={self.failed}")
+
+
+# Экспортёр процесса (None — spans только для request_id в логах)
+_exporter: Optional[Any] = None
+
+
+def _export(span_: Span) -> None:
+    if _exporter is None:
+        return
+    try:
+        _exporter.export(span_)
+    except Exception as e:
+        logger.debug(f"Ошибка экспорта span {span_.name}: {e}")
+
+
+def start_tracing() -> Optional[Any]:
+    """Создать экспортёр spans по настройкам (TRACING_EXPORT)."""
+    global _exporter
+    settings = get_settings()
+    mode = settings.TRACING_EXPORT.lower()
+    if mode == "json":
+        _exporter = JsonSpanExporter(settings.TRACING_JSON_PATH)
+        logger.info(f"✅ Трассировка: spans в {settings.TRACING_JSON_PATH}")
+    elif mode == "otlp":
+        _exporter = OtlpSpanExporter(
+            settings.TRACING_OTLP_ENDPOINT,
+            flush_interval=settings.TRACING_OTLP_FLUSH_INTERVAL,
+        )
+        logger.info(f"✅ Трассировка: OTLP → {settings.TRACING_OTLP_ENDPOINT}")
+    elif mode:
+        logger.warning(f"⚠️  Неизвестный TRACING_EXPORT={mode}, экспорт spans выключен")
+    return _exporter
+
+
+async def close_tracing() -> None:
+    """Отправить оставшиеся spans и закрыть экспортёр."""
+    global _exporter
+    if _exporter is not None:
+        exporter, _exporter = _exporter, None
+        await exporter.close()